@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+"""
+Compare Trace with ColumnarTrace for one trace holding many spans: the cost
+of creating the spans, the memory they hold (with tracemalloc, python 3
+only), and of whole-trace scans (a duration filter and an export).
+
+Run from the repository root: `python -m benchmarks.bench_columnar [spans]`
+"""
+
+from __future__ import print_function
+
+import datetime
+import gc
+import sys
+import timeit
+
+from gaesd import SDK, ColumnarTrace, Trace
+
+try:
+    import tracemalloc
+except ImportError:  # pragma: no cover
+    # python 2:
+    tracemalloc = None
+
+SPANS = 200000
+NAMES = ['db.query', 'cache.get', 'http.request', 'render']
+START_TIME = datetime.datetime(2017, 7, 14, 2, 40)
+
+
+def fill(trace, count):
+    for i in range(count):
+        trace.span(
+            name=NAMES[i % len(NAMES)],
+            start_time=START_TIME,
+            end_time=START_TIME + datetime.timedelta(microseconds=i),
+        )
+
+
+def measure(trace_type, sdk, count):
+    trace = trace_type.new(sdk)
+
+    gc.collect()
+    if tracemalloc is not None:
+        tracemalloc.start()
+    create = timeit.timeit(lambda: fill(trace, count), number=1)
+    gc.collect()
+    memory = None
+    if tracemalloc is not None:
+        memory = tracemalloc.get_traced_memory()[0] / float(count)
+        tracemalloc.stop()
+
+    duration = datetime.timedelta(microseconds=count // 2)
+    scan = timeit.timeit(lambda: trace[duration], number=1)
+    export = timeit.timeit(trace.export, number=1)
+    return create, memory, scan, export
+
+
+def main(count=SPANS):
+    sdk = SDK(project_id='benchmark-project', auto=False)
+
+    print('1 trace with {0} spans:'.format(count))
+    print('  {0:<14} {1:>10} {2:>12} {3:>10} {4:>10}'.format(
+        'trace', 'create ms', 'bytes/span', 'scan ms', 'export ms'))
+
+    for trace_type in [Trace, ColumnarTrace]:
+        create, memory, scan, export = measure(trace_type, sdk, count)
+        memory = '-' if memory is None else '{0:.0f}'.format(memory)
+        print('  {0:<14} {1:>10.0f} {2:>12} {3:>10.0f} {4:>10.0f}'.format(
+            trace_type.__name__, create * 1e3, memory, scan * 1e3,
+            export * 1e3))
+        SDK.clear()
+
+
+if __name__ == '__main__':
+    sys.exit(main(*[int(arg) for arg in sys.argv[1:]]))
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+"""
+Measure the bytes and CPU saved by compressing patchTraces request bodies.
+
+For each encoding and level: the body size on the wire, the CPU time spent
+serializing and compressing it, and the time of a SimpleRestDispatcher
+dispatch against a local stand-in for the StackDriver REST API (on loopback
+bandwidth is free, so this shows the CPU overhead only).
+
+Run from the repository root: `python -m benchmarks.bench_compression`
+"""
+
+from __future__ import print_function
+
+import json
+import sys
+import timeit
+
+from gaesd import SDK
+from gaesd.core.dispatchers.compression import Compressor
+from gaesd.core.dispatchers.rest_dispatcher import SimpleRestDispatcher
+from tests.core.dispatchers.local_server import LocalServer
+
+DISPATCHES = 100
+SPANS = 1000
+
+CONFIGURATIONS = [
+    (None, None),
+    ('gzip', 1),
+    ('gzip', 6),
+    ('gzip', 9),
+    ('deflate', 1),
+    ('deflate', 6),
+]
+
+
+def new_trace(sdk):
+    trace = sdk.trace()
+    for index in range(SPANS):
+        labels = {
+            'http/method': 'GET',
+            'http/url': '/api/v1/items/{0}'.format(index),
+            'http/status_code': '200',
+        }
+        with trace.span(name='span-{0}'.format(index), labels=labels):
+            pass
+    return trace
+
+
+def timed(func, dispatches=DISPATCHES):
+    return timeit.timeit(func, number=dispatches) / dispatches
+
+
+def encode(trace, compressor):
+    body = json.dumps(
+        {'traces': [trace.export()]}, separators=(',', ':')).encode('utf-8')
+    if compressor is None:
+        return body
+    return compressor(body)[0]
+
+
+def main():
+    sdk = SDK(project_id='benchmark-project', auto=False)
+    trace = new_trace(sdk)
+
+    print('{0} dispatches of a {1} span trace:'.format(DISPATCHES, SPANS))
+    print('  {0:<12} {1:>10} {2:>7} {3:>14} {4:>15}'.format(
+        'encoding', 'bytes', 'ratio', 'encode us', 'dispatch us'))
+
+    raw = len(encode(trace, None))
+    for encoding, level in CONFIGURATIONS:
+        compressor = Compressor.new(encoding, level=level, threshold=0)
+        size = len(encode(trace, compressor))
+        encode_seconds = timed(lambda: encode(trace, compressor))
+
+        with LocalServer() as server:
+            dispatcher = SimpleRestDispatcher(
+                sdk=sdk,
+                root_url=server.url,
+                token_provider=lambda: 'token',
+                compression=compressor,
+            )
+            dispatch_seconds = timed(lambda: dispatcher._dispatch([trace]))
+
+        name = '{0}-{1}'.format(encoding, level) if encoding else 'none'
+        print('  {0:<12} {1:>10d} {2:>7.2f} {3:>14.1f} {4:>15.1f}'.format(
+            name, size, float(size) / raw, encode_seconds * 1e6,
+            dispatch_seconds * 1e6))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+"""
+Measure the cost of a `sdk.decorators.span` decorated call, compared with a
+plain call, while the SDK is enabled, while the current trace is not sampled
+and while the SDK is disabled.
+
+Run from the repository root: `python -m benchmarks.bench_decorators`
+"""
+
+from __future__ import print_function
+
+import sys
+import timeit
+
+from gaesd import AlwaysOffSampler, SDK
+
+CALLS = 100000
+
+
+def func():
+    pass
+
+
+def timed(func, calls=CALLS):
+    return timeit.timeit(func, number=calls) / calls
+
+
+def configure(sdk, name):
+    SDK.clear()
+    if name == 'disabled':
+        sdk.enabler = False
+    elif name == 'unsampled':
+        sdk.sampler = AlwaysOffSampler()
+        sdk.trace()
+
+
+def main():
+    sdk = SDK(project_id='benchmark-project', auto=False)
+    # Don't dispatch the traces while measuring:
+    sdk.dispatcher._dispatch = lambda traces: None
+    decorated = sdk.decorators.span(func)
+    plain = timed(func)
+
+    print('{0} calls:'.format(CALLS))
+    print('  {0:<12} {1:>10} {2:>10}'.format('sdk', 'ns/call', 'x plain'))
+    print('  {0:<12} {1:>10.0f} {2:>10.1f}'.format('plain', plain * 1e9, 1))
+
+    for name in ['enabled', 'unsampled', 'disabled']:
+        configure(sdk, name)
+        seconds = timed(decorated, calls=CALLS // 10 if name == 'enabled'
+                        else CALLS)
+        print('  {0:<12} {1:>10.0f} {2:>10.1f}'.format(
+            name, seconds * 1e9, seconds / plain))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
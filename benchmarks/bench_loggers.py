@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+"""
+Check that memory stays flat while a long-lived worker creates (and
+dispatches) many traces and spans: no logger is created per Trace or Span,
+neither in `SDK.loggers` nor in the logging module's registry.
+
+Run from the repository root: `python -m benchmarks.bench_loggers`
+"""
+
+from __future__ import print_function
+
+import gc
+import logging
+import sys
+import timeit
+
+from gaesd import SDK
+
+try:
+    import tracemalloc
+except ImportError:  # pragma: no cover
+    # python 2:
+    tracemalloc = None
+
+ROUNDS = 5
+TRACES = 2000
+SPANS = 10
+
+
+def run(sdk):
+    for _ in range(TRACES):
+        with sdk.trace() as trace:
+            for _ in range(SPANS):
+                with trace.span(name='span'):
+                    pass
+        sdk()
+        SDK.clear()
+
+
+def allocated():
+    gc.collect()
+    if tracemalloc is None:
+        return None
+    return tracemalloc.get_traced_memory()[0]
+
+
+def main():
+    sdk = SDK(project_id='benchmark-project', auto=False)
+    # Don't dispatch the traces while measuring:
+    sdk.dispatcher._dispatch = lambda traces: None
+    if tracemalloc is not None:
+        tracemalloc.start()
+
+    # Warm up caches (eg: the class loggers):
+    run(sdk)
+    registered = len(logging.Logger.manager.loggerDict)
+    base = allocated()
+
+    print('{0} rounds of {1} traces with {2} spans:'.format(
+        ROUNDS, TRACES, SPANS))
+    print('  {0:<6} {1:>10} {2:>10} {3:>12} {4:>12}'.format(
+        'round', 'ms', 'loggers', 'sdk.loggers', 'KiB growth'))
+
+    for i in range(ROUNDS):
+        seconds = timeit.timeit(lambda: run(sdk), number=1)
+        memory = allocated()
+        growth = '-' if memory is None else \
+            '{0:.1f}'.format((memory - base) / 1024.0)
+        print('  {0:<6} {1:>10.0f} {2:>10} {3:>12} {4:>12}'.format(
+            i + 1, seconds * 1e3, len(logging.Logger.manager.loggerDict),
+            len(sdk.loggers), growth))
+
+    if len(logging.Logger.manager.loggerDict) != registered:
+        print('Loggers leaked!')
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+"""
+Measure the memory held per Span and per Trace (with tracemalloc, python 3
+only) while a request keeps many spans until they are dispatched.
+
+Run from the repository root: `python -m benchmarks.bench_memory`
+"""
+
+from __future__ import print_function
+
+import gc
+import sys
+import tracemalloc
+
+from gaesd import SDK, Trace
+
+SPANS = 50000
+TRACES = 10000
+
+
+def measure(create, count):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = create(count)
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # Keep them alive until measured:
+    del objects
+    return (after - before) / float(count)
+
+
+def new_spans(sdk):
+    def create(count):
+        trace = sdk.trace()
+        return [trace.span(name='span') for _ in range(count)]
+    return create
+
+
+def new_traces(sdk):
+    def create(count):
+        return [Trace.new(sdk) for _ in range(count)]
+    return create
+
+
+def main():
+    sdk = SDK(project_id='benchmark-project', auto=False)
+
+    per_span = measure(new_spans(sdk), SPANS)
+    SDK.clear()
+    per_trace = measure(new_traces(sdk), TRACES)
+    SDK.clear()
+
+    print('  {0:<8} {1:>8} {2:>14}'.format('object', 'count', 'bytes/object'))
+    print('  {0:<8} {1:>8} {2:>14.0f}'.format('Span', SPANS, per_span))
+    print('  {0:<8} {1:>8} {2:>14.0f}'.format('Trace', TRACES, per_trace))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
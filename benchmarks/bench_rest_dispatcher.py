@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+"""
+Compare the cost of a dispatch against a local stand-in for the StackDriver
+REST API:
+
+1. SimpleRestDispatcher over it's pool of persistent connections.
+2. The same request on a new connection each time.
+3. GoogleApiClientDispatcher (googleapiclient + httplib2).
+
+Run from the repository root: `python -m benchmarks.bench_rest_dispatcher`
+"""
+
+from __future__ import print_function
+
+import json
+import sys
+import time
+
+from six.moves import http_client
+from six.moves.urllib.parse import urlsplit
+
+from gaesd import SDK
+from gaesd.core.dispatchers.google_api_client_cache import DISCOVERY_DOCUMENT
+from gaesd.core.dispatchers.rest_dispatcher import SimpleRestDispatcher
+from tests.core.dispatchers.local_server import LocalServer
+
+DISPATCHES = 500
+SPANS = 20
+
+
+def new_trace(sdk):
+    trace = sdk.trace()
+    for index in range(SPANS):
+        with trace.span(name='span-{0}'.format(index)):
+            pass
+    return trace
+
+
+def timed(func, dispatches=DISPATCHES):
+    start = time.time()
+    for _ in range(dispatches):
+        func()
+    return (time.time() - start) / dispatches
+
+
+def bench_pooled(sdk, server, trace):
+    dispatcher = SimpleRestDispatcher(
+        sdk=sdk, root_url=server.url, token_provider=lambda: 'token')
+    return timed(lambda: dispatcher._dispatch([trace]))
+
+
+def bench_new_connection(sdk, server, trace):
+    dispatcher = SimpleRestDispatcher(
+        sdk=sdk, root_url=server.url, token_provider=lambda: 'token')
+    parts = urlsplit(server.url)
+
+    def dispatch():
+        prep = dispatcher._prep_dispatch([trace])
+        connection = http_client.HTTPConnection(parts.hostname, parts.port)
+        connection.request(
+            'PATCH',
+            urlsplit(prep.url).path,
+            json.dumps(prep.body, separators=(',', ':')).encode('utf-8'),
+            {'Content-Type': 'application/json',
+             'Authorization': 'Bearer token'},
+        )
+        connection.getresponse().read()
+        connection.close()
+
+    return timed(dispatch)
+
+
+def bench_google_api_client(sdk, server, trace):
+    try:
+        import httplib2
+        from googleapiclient import discovery
+        from oauth2client.client import AccessTokenCredentials
+    except ImportError:
+        return None
+
+    with open(DISCOVERY_DOCUMENT) as f:
+        document = json.load(f)
+    document['rootUrl'] = server.url + '/'
+
+    credentials = AccessTokenCredentials('token', 'gaesd-benchmark')
+    service = discovery.build_from_document(
+        document, credentials=credentials)
+    http = credentials.authorize(httplib2.Http())
+
+    def dispatch():
+        service.projects().patchTraces(
+            projectId=sdk.project_id,
+            body={'traces': [trace.export()]},
+        ).execute(http=http)
+
+    return timed(dispatch)
+
+
+def main():
+    sdk = SDK(project_id='benchmark-project', auto=False)
+    trace = new_trace(sdk)
+
+    benches = [
+        ('pooled keep-alive', bench_pooled),
+        ('new connection', bench_new_connection),
+        ('googleapiclient', bench_google_api_client),
+    ]
+
+    print('{0} dispatches of a {1} span trace:'.format(DISPATCHES, SPANS))
+    for name, bench in benches:
+        with LocalServer() as server:
+            seconds = bench(sdk, server, trace)
+            connections = server.connections
+
+        if seconds is None:
+            print('  {0:<20} skipped (not installed)'.format(name))
+            continue
+
+        print('  {0:<20} {1:8.1f} us/dispatch, {2:4d} connections'.format(
+            name, seconds * 1e6, connections))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+"""
+Measure assembling a trace by hand: adding many spans with `+=` (each add
+checks for a duplicate span id), then looking them up by span id and
+checking that they are in the SDK.
+
+Run from the repository root: `python -m benchmarks.bench_span_index [spans]`
+"""
+
+from __future__ import print_function
+
+import operator
+import sys
+import timeit
+
+from gaesd import SDK, ColumnarTrace, Span, Trace
+
+SPANS = 100000
+
+
+def measure(trace_type, sdk, count):
+    source = Trace.new(sdk)
+    spans = [Span(trace=source, span_id=i + 1) for i in range(count)]
+
+    def add():
+        for span in spans:
+            operator.iadd(trace, span)
+
+    def get():
+        for span in spans:
+            trace.get_span(span.span_id)
+
+    sdk.trace_type = trace_type
+    trace = sdk.trace()
+    added = timeit.timeit(add, number=1)
+    found = timeit.timeit(get, number=1)
+    contains = timeit.timeit(lambda: spans[-1] in sdk, number=1)
+    return added, found, contains
+
+
+def main(count=SPANS):
+    sdk = SDK(project_id='benchmark-project', auto=False)
+
+    print('1 trace with {0} spans:'.format(count))
+    print('  {0:<14} {1:>12} {2:>16} {3:>12}'.format(
+        'trace', 'add ns/span', 'get_span ns/span', 'in sdk us'))
+
+    for trace_type in [Trace, ColumnarTrace]:
+        added, found, contains = measure(trace_type, sdk, count)
+        print('  {0:<14} {1:>12.0f} {2:>16.0f} {3:>12.1f}'.format(
+            trace_type.__name__, added / count * 1e9, found / count * 1e9,
+            contains * 1e6))
+        SDK.clear()
+
+
+if __name__ == '__main__':
+    sys.exit(main(*[int(arg) for arg in sys.argv[1:]]))
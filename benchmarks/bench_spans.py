@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+"""
+Measure the cost of creating, entering and exiting a span, of reading a
+span's duration and of exporting a span.
+
+Run from the repository root: `python -m benchmarks.bench_spans`
+"""
+
+from __future__ import print_function
+
+import sys
+import timeit
+
+from gaesd import SDK
+
+SPANS = 20000
+
+
+def main():
+    sdk = SDK(project_id='benchmark-project', auto=False)
+    # Don't dispatch the traces while measuring:
+    sdk.dispatcher._dispatch = lambda traces: None
+    trace = sdk.trace()
+    spans = [trace.span(name='span') for _ in range(SPANS)]
+    it = iter(spans)
+
+    def enter_exit():
+        with next(it):
+            pass
+
+    results = [
+        ('enter+exit', timeit.timeit(enter_exit, number=SPANS)),
+        ('duration', timeit.timeit(
+            lambda: [span.duration for span in spans], number=1)),
+        ('export', timeit.timeit(
+            lambda: [span.export() for span in spans], number=1)),
+    ]
+
+    print('{0} spans:'.format(SPANS))
+    print('  {0:<12} {1:>10}'.format('operation', 'ns/span'))
+    for name, seconds in results:
+        print('  {0:<12} {1:>10.0f}'.format(name, seconds / SPANS * 1e9))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+"""
+Measure a batch job creating many traces in one thread: the cost of
+creating a trace (each checks for a duplicate trace id), and of checking
+that a trace and a span are in the SDK, as the number of traces grows.
+
+Run from the repository root: `python -m benchmarks.bench_traces`
+"""
+
+from __future__ import print_function
+
+import sys
+import timeit
+
+from gaesd import SDK
+
+COUNTS = [1000, 5000, 20000]
+
+
+def measure(sdk, count):
+    SDK.clear()
+    created = timeit.timeit(
+        lambda: [sdk.trace() for _ in range(count)], number=1)
+
+    trace = sdk.traces[0]
+    span = trace.span()
+    trace_in = timeit.timeit(lambda: trace in sdk, number=1000) / 1000
+    span_in = timeit.timeit(lambda: span in sdk, number=1000) / 1000
+    SDK.clear()
+    return created / count, trace_in, span_in
+
+
+def main():
+    sdk = SDK(project_id='benchmark-project', auto=False)
+
+    print('  {0:>8} {1:>14} {2:>14} {3:>14}'.format(
+        'traces', 'trace() us', 'trace in us', 'span in us'))
+    for count in COUNTS:
+        created, trace_in, span_in = measure(sdk, count)
+        print('  {0:>8} {1:>14.1f} {2:>14.2f} {3:>14.2f}'.format(
+            count, created * 1e6, trace_in * 1e6, span_in * 1e6))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
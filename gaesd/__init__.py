@@ -10,9 +10,26 @@
 #     /\____/
 #     \_/__/
 
+import sys
+
+from .core.columnar import ColumnarSpan, ColumnarTrace
+from .core.context import ContextVarsContext, ThreadLocalContext
 from .core.decorators import Decorators, SpanDecorators, TraceDecorators
+from .core.dispatchers.batching_dispatcher import BatchingDispatcher
 from .core.dispatchers.dispatcher import Dispatcher
+from .core.dispatchers.resilient_dispatcher import ResilientDispatcher
+from .core.dispatchers.socket_dispatcher import SocketDispatcher
+from .core.dispatchers.spool_dispatcher import SpoolDispatcher
+from .core.dispatchers.tail_sampling import (
+    ErrorPolicy, LatencyPolicy, ProbabilityPolicy, SpanNamePolicy, TailPolicy,
+)
+from .core.dispatchers.tail_sampling_dispatcher import \
+    TailSamplingDispatcher
 from .core.helpers import Helpers
+from .core.sampling import (
+    AlwaysOffSampler, AlwaysOnSampler, ParentBasedSampler, ProbabilitySampler,
+    RateLimitingSpanSampler, Sampler, SpanNameRuleSampler, SpanSampler,
+)
 from .core.span import Span, SpanKind
 from .core.trace import Trace
 from .core.utils import (
@@ -33,7 +50,19 @@ __all__.extend([
     'Span',
     'SpanKind',
     'Trace',
+    'ColumnarTrace',
+    'ColumnarSpan',
     'Dispatcher',
+    'BatchingDispatcher',
+    'ResilientDispatcher',
+    'SpoolDispatcher',
+    'SocketDispatcher',
+    'TailSamplingDispatcher',
+    'TailPolicy',
+    'LatencyPolicy',
+    'ErrorPolicy',
+    'SpanNamePolicy',
+    'ProbabilityPolicy',
     'Helpers',
     'Decorators',
     'InvalidSliceError',
@@ -41,4 +70,19 @@ __all__.extend([
     'DuplicateSpanEntryError',
     'TraceDecorators',
     'SpanDecorators',
+    'ThreadLocalContext',
+    'ContextVarsContext',
+    'Sampler',
+    'AlwaysOnSampler',
+    'AlwaysOffSampler',
+    'ProbabilitySampler',
+    'ParentBasedSampler',
+    'SpanSampler',
+    'RateLimitingSpanSampler',
+    'SpanNameRuleSampler',
 ])
+
+if sys.version_info >= (3, 5):  # pragma no-cover
+    from .core.dispatchers.async_dispatcher import AsyncDispatcher
+
+    __all__.append('AsyncDispatcher')
@@ -0,0 +1,423 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+"""
+Local collector agent.
+
+Receives traces from the `SocketDispatcher` of every process on the host,
+merges them by trace id, and forwards them to StackDriver in batches with
+a single (pooled) dispatcher per project.
+
+Usage: `gaesd-agent [--udp HOST:PORT | --unix PATH] [options]`
+"""
+
+from __future__ import print_function
+
+import argparse
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+from functools import partial
+
+import six
+from six.moves import queue
+
+from .core.dispatchers.rest_dispatcher import SimpleRestDispatcher
+from .core.dispatchers.socket_dispatcher import (
+    DEFAULT_ADDRESS, MAX_DATAGRAM_SIZE, decode, new_socket,
+)
+from .sdk import SDK
+
+__all__ = ['Agent', 'main']
+
+
+def _is_export(export):
+    """
+    Determine if a decoded trace has the shape of a `Trace.export()`.
+
+    :param export: A trace decoded from a datagram.
+    :rtype: bool
+    """
+    if not isinstance(export, dict):
+        return False
+    for key in ['projectId', 'traceId']:
+        if not isinstance(export.get(key), six.string_types):
+            return False
+
+    spans = export.get('spans') or []
+    if not isinstance(spans, list):
+        return False
+    for span in spans:
+        if not isinstance(span, dict):
+            return False
+        if not isinstance(span.get('spanId'), six.string_types):
+            return False
+    return True
+
+
+class MergedTrace(object):
+    """
+    A trace assembled from the (partial) traces received for it's trace id.
+    """
+
+    def __init__(self, project_id, trace_id):
+        """
+        :param str project_id: The trace's project.
+        :param str trace_id: The trace's id.
+        """
+        self._project_id = project_id
+        self._trace_id = trace_id
+        # spanId => span, in order received:
+        self._spans = {}
+        self._order = []
+
+    def __repr__(self):
+        return 'MergedTrace({0})[{1}]'.format(self._trace_id, len(self._order))
+
+    def __len__(self):
+        return len(self._order)
+
+    def merge(self, spans):
+        """
+        Add spans to this trace. A span received again replaces the earlier
+            copy.
+
+        :param list(dict) spans: Exported spans.
+        """
+        for span in spans:
+            span_id = span.get('spanId')
+            if span_id not in self._spans:
+                self._order.append(span_id)
+            self._spans[span_id] = span
+
+    def export(self):
+        """
+        Export this trace as a dict.
+
+        :rtype: dict
+        """
+        return {
+            'projectId': self._project_id,
+            'traceId': self._trace_id,
+            'spans': [self._spans[span_id] for span_id in self._order],
+        }
+
+
+class Agent(object):
+    """
+    Receives, merges and batches traces from local processes.
+
+    A batch is forwarded once it holds `batch_size` traces or `interval`
+    seconds after it's first trace arrived. While serving, batches are
+    forwarded by a worker thread so the receive loop only reads and merges
+    (a slow StackDriver does not make the socket's buffer overflow).
+    """
+    BATCH_SIZE = 100
+    INTERVAL = 2.0
+
+    def __init__(
+        self, address=None, dispatcher=SimpleRestDispatcher, batch_size=None,
+        interval=None,
+    ):
+        """
+        :param address: Unix socket path, or (host, port) for UDP, to receive
+            on. Default=`DEFAULT_ADDRESS`.
+        :type address: Union[str, tuple(str, int)]
+        :param dispatcher: Dispatcher type used to forward traces.
+            Default=SimpleRestDispatcher.
+        :type dispatcher: type(Dispatcher)
+        :param int batch_size: Forward once this many traces are waiting.
+            Default=`BATCH_SIZE`.
+        :param float interval: Forward traces at most this many seconds after
+            they arrive. Default=`INTERVAL`.
+        """
+        self._address = address or DEFAULT_ADDRESS
+        self._dispatcher_type = dispatcher
+        self._batch_size = batch_size or self.BATCH_SIZE
+        self._interval = interval if interval is not None else self.INTERVAL
+        self._dispatchers = {}
+        # (projectId, traceId) => MergedTrace, in order received:
+        self._pending = {}
+        self._order = []
+        self._deadline = None
+        self._socket = None
+        self._stopping = threading.Event()
+        self._received = 0
+        self._forwarded = 0
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    @property
+    def address(self):
+        """
+        Retrieve the address received on (with the actual port, when
+            bound to port 0).
+
+        :rtype: Union[str, tuple(str, int)]
+        """
+        if self._socket is not None:
+            return self._socket.getsockname()
+        return self._address
+
+    @property
+    def received(self):
+        """
+        Retrieve the number of (partial) traces received.
+
+        :rtype: int
+        """
+        return self._received
+
+    @property
+    def forwarded(self):
+        """
+        Retrieve the number of merged traces forwarded.
+
+        :rtype: int
+        """
+        return self._forwarded
+
+    @property
+    def pending(self):
+        """
+        Retrieve the number of merged traces waiting to be forwarded.
+
+        :rtype: int
+        """
+        return len(self._order)
+
+    def bind(self):
+        """
+        Create and bind the receiving socket.
+        """
+        sock = new_socket(self._address)
+        # Left behind by a previous agent:
+        self._unlink()
+        sock.bind(self._address)
+        self._socket = sock
+
+    def dispatcher_for(self, project_id):
+        """
+        Retrieve the dispatcher that forwards the project's traces.
+
+        :param str project_id: The project.
+        :rtype: Dispatcher
+        """
+        dispatcher = self._dispatchers.get(project_id)
+        if dispatcher is None:
+            sdk = SDK(
+                project_id=project_id,
+                dispatcher=self._dispatcher_type,
+                auto=False,
+                enabler=True,
+            )
+            dispatcher = self._dispatchers[project_id] = sdk.dispatcher
+        return dispatcher
+
+    def receive(self, datagram):
+        """
+        Merge the traces of a datagram into the pending traces. A malformed
+            datagram is ignored (entirely).
+
+        :param bytes datagram: A datagram sent by a SocketDispatcher.
+        """
+        try:
+            exports = decode(datagram)
+        except (ValueError, KeyError, TypeError):
+            exports = None
+        if not isinstance(exports, list) or not all(
+            _is_export(export) for export in exports
+        ):
+            self.logger.warning('Ignored malformed datagram')
+            return
+
+        for export in exports:
+            key = (export.get('projectId'), export.get('traceId'))
+            trace = self._pending.get(key)
+            if trace is None:
+                trace = self._pending[key] = MergedTrace(*key)
+                self._order.append(key)
+            trace.merge(export.get('spans') or [])
+            self._received += 1
+
+        if self._order and self._deadline is None:
+            self._deadline = time.time() + self._interval
+
+    def is_due(self):
+        """
+        Determine if the pending traces should be forwarded now.
+
+        :rtype: bool
+        """
+        if not self._order:
+            return False
+        if len(self._order) >= self._batch_size:
+            return True
+        return time.time() >= self._deadline
+
+    def forward(self):
+        """
+        Forward all pending traces, one dispatch per project.
+        """
+        self._forward_batch(self._take_batch())
+
+    def serve_forever(self, poll_interval=0.5):
+        """
+        Receive and forward traces until `stop()` is called.
+
+        :param float poll_interval: Maximum seconds between checks for
+            pending traces being due (or the agent being stopped).
+        """
+        if self._socket is None:
+            self.bind()
+
+        batches = queue.Queue()
+        forwarder = threading.Thread(
+            target=self._run_forwarder, args=(batches,),
+            name='{0}-forwarder'.format(self.__class__.__name__))
+        forwarder.daemon = True
+        forwarder.start()
+
+        try:
+            while not self._stopping.is_set():
+                timeout = poll_interval
+                if self._deadline is not None:
+                    timeout = max(
+                        0, min(timeout, self._deadline - time.time()))
+                self._socket.settimeout(timeout)
+
+                try:
+                    datagram = self._socket.recv(MAX_DATAGRAM_SIZE)
+                except socket.timeout:
+                    pass
+                else:
+                    self.receive(datagram)
+
+                if self.is_due():
+                    batches.put(self._take_batch())
+
+            # Traces sent before we stopped:
+            self._socket.setblocking(False)
+            while True:
+                try:
+                    self.receive(self._socket.recv(MAX_DATAGRAM_SIZE))
+                except socket.error:
+                    break
+
+            if self._order:
+                batches.put(self._take_batch())
+        finally:
+            # Forward the batches already taken before returning:
+            batches.put(None)
+            forwarder.join()
+
+    def stop(self):
+        """
+        Stop serving (forwarding any pending traces first).
+        """
+        self._stopping.set()
+
+    def close(self):
+        """
+        Close the receiving socket.
+        """
+        if self._socket is None:
+            return
+        self._socket.close()
+        self._socket = None
+        self._unlink()
+
+    def _take_batch(self):
+        by_project = {}
+        for key in self._order:
+            by_project.setdefault(key[0], []).append(self._pending[key])
+
+        self._pending = {}
+        self._order = []
+        self._deadline = None
+        return by_project
+
+    def _forward_batch(self, by_project):
+        for project_id, traces in by_project.items():
+            try:
+                self.dispatcher_for(project_id)._dispatch_chunked(traces)
+            except Exception:
+                self.logger.exception(
+                    'Failed to forward %s traces', len(traces))
+            else:
+                self._forwarded += len(traces)
+
+    def _run_forwarder(self, batches):
+        while True:
+            batch = batches.get()
+            if batch is None:
+                return
+            self._forward_batch(batch)
+
+    def _unlink(self):
+        is_path = isinstance(self._address, six.string_types)
+        if is_path and os.path.exists(self._address):
+            os.unlink(self._address)
+
+
+def _address(value):
+    host, _, port = value.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+def _parser():
+    parser = argparse.ArgumentParser(
+        prog='gaesd-agent',
+        description='Forward traces from local processes to StackDriver.')
+    address = parser.add_mutually_exclusive_group()
+    address.add_argument(
+        '--udp', type=_address, metavar='HOST:PORT',
+        help='UDP address to receive on (default: {0}:{1}).'.format(
+            *DEFAULT_ADDRESS))
+    address.add_argument(
+        '--unix', metavar='PATH', help='Unix socket path to receive on.')
+    parser.add_argument(
+        '--batch-size', type=int, default=Agent.BATCH_SIZE,
+        help='Forward once this many traces are waiting.')
+    parser.add_argument(
+        '--interval', type=float, default=Agent.INTERVAL,
+        help='Forward traces at most this many seconds after they arrive.')
+    parser.add_argument(
+        '--root-url', help='Root url of the StackDriver REST API.')
+    parser.add_argument(
+        '--log-level', default='INFO', help='Logging level.')
+    return parser
+
+
+def main(argv=None):
+    """
+    Entry point of the `gaesd-agent` command.
+
+    :param list(str) argv: Command line arguments. Default=`sys.argv[1:]`.
+    """
+    args = _parser().parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper())
+
+    agent = Agent(
+        address=args.unix or args.udp,
+        dispatcher=partial(SimpleRestDispatcher, root_url=args.root_url),
+        batch_size=args.batch_size,
+        interval=args.interval,
+    )
+    agent.bind()
+    handler = signal.signal(
+        signal.SIGTERM, lambda signum, frame: agent.stop())
+    agent.logger.info('Receiving traces on %s', agent.address)
+
+    try:
+        agent.serve_forever()
+    except KeyboardInterrupt:
+        agent.forward()
+    finally:
+        signal.signal(signal.SIGTERM, handler)
+        agent.close()
+
+
+if __name__ == '__main__':  # pragma: no cover
+    main()
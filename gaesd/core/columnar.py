@@ -0,0 +1,747 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+"""
+Column-oriented span storage: a Trace keeping it's spans' fields in
+parallel arrays (one row per span), handing out lightweight Span views on
+demand.
+"""
+
+import array
+import datetime
+from collections import MutableSequence
+
+import six
+from six.moves import map, range, zip
+
+from .span import Span, SpanKind
+from .trace import Trace
+from .utils import InvalidSliceError, datetime_to_ns, ns_to_timestamp, \
+    seconds_to_ns
+
+__all__ = [
+    'ColumnarTrace', 'ColumnarSpan', 'SpanColumns', 'MISSING', 'NO_ID',
+]
+
+try:
+    array.array('q')
+    _INT64 = 'q'
+    _UINT64 = 'Q'
+except ValueError:  # pragma: no cover
+    # python 2 (a C long is 64 bits on 64 bit unix):
+    _INT64 = 'l'
+    _UINT64 = 'L'
+
+#: Marks a missing value (eg: the end of a running span) in a column:
+MISSING = -(1 << 63)
+#: Marks a missing (parent) span id in a column (span ids are unsigned 64
+#: bit integers, other than 0):
+NO_ID = 0
+
+_KINDS = list(SpanKind)
+_KIND_INDEX = dict((kind, index) for index, kind in enumerate(_KINDS))
+_UNSPECIFIED = _KIND_INDEX[SpanKind.unspecified]
+
+#: Marks (the row of) a completed span since removed from it's trace:
+_REMOVED = -1
+
+#: Creates a (ColumnarSpan) view without calling it's constructor:
+_new_view = object.__new__
+
+#: The Span constructor arguments stored in the columns:
+_SPAN_ARGS = frozenset(
+    ['name', 'span_kind', 'start_time', 'end_time', 'labels'])
+
+
+def _to_column(value):
+    return int(value) if value is not None else MISSING
+
+
+def _from_column(value):
+    return value if value != MISSING else None
+
+
+def _to_id_column(span_id):
+    return int(span_id) if span_id is not None else NO_ID
+
+
+def _from_id_column(span_id):
+    return span_id if span_id != NO_ID else None
+
+
+def _id_key(span_id):
+    """
+    :return: The key of a (parent) span id in the indexes of rows, None if it
+        can't be in them.
+    """
+    try:
+        return _to_id_column(span_id)
+    except (TypeError, ValueError):
+        return None
+
+
+class SpanColumns(object):
+    """
+    The fields of a trace's spans in parallel arrays, one row per span:
+        span ids and parent span ids (unsigned), start and end times (in
+        nanoseconds since the epoch) and kinds. Names are interned in a name
+        table, and labels are only kept for the rows that have any.
+
+    Rows are never removed, so that the views of a trace's spans stay valid
+        (the trace keeps the order of it's rows separately).
+    """
+    __slots__ = (
+        'span_ids', 'parent_ids', 'start_ns', 'end_ns', 'kinds', 'names',
+        'labels', 'name_table', '_name_index',
+    )
+
+    def __init__(self):
+        self.span_ids = array.array(_UINT64)
+        self.parent_ids = array.array(_UINT64)
+        self.start_ns = array.array(_INT64)
+        self.end_ns = array.array(_INT64)
+        self.kinds = array.array('b')
+        # Indexes into the name table:
+        self.names = array.array('l')
+        # row => labels:
+        self.labels = {}
+        self.name_table = []
+        self._name_index = {}
+
+    def __len__(self):
+        return len(self.span_ids)
+
+    def intern(self, name):
+        """
+        Retrieve the index of a name in the name table, adding it if needed.
+
+        :param str name:
+        :rtype: int
+        """
+        index = self._name_index.get(name)
+        if index is None:
+            index = self._name_index[name] = len(self.name_table)
+            self.name_table.append(name)
+        return index
+
+    def append(
+        self, span_id, parent_span_id=None, name='', span_kind=None,
+        start_ns=None, end_ns=None, labels=None,
+    ):
+        """
+        Add a row.
+
+        :param int span_id:
+        :param int parent_span_id:
+        :param str name:
+        :param span_kind:
+        :type span_kind: Union[SpanKind, six.string_types]
+        :param int start_ns: Nanoseconds since the epoch, or None.
+        :param int end_ns: Nanoseconds since the epoch, or None.
+        :param dict labels:
+        :return: The new row.
+        :rtype: int
+        """
+        row = len(self.span_ids)
+        self.span_ids.append(int(span_id))
+        self.parent_ids.append(_to_id_column(parent_span_id))
+        self.start_ns.append(start_ns if start_ns is not None else MISSING)
+        self.end_ns.append(end_ns if end_ns is not None else MISSING)
+        self.kinds.append(
+            _KIND_INDEX[SpanKind(span_kind)] if span_kind is not None
+            else _UNSPECIFIED)
+        self.names.append(self.intern(name))
+        if labels:
+            self.labels[row] = labels
+        return row
+
+    def export(self, row):
+        """
+        Export a row as a (StackDriver) span dict.
+
+        :param int row:
+        :rtype: Dict[str, str]
+        """
+        parent_id = self.parent_ids[row]
+        labels = self.labels.get(row)
+
+        return {
+            'spanId': str(self.span_ids[row]),
+            'kind': _KINDS[self.kinds[row]].value,
+            'name': self.name_table[self.names[row]],
+            'startTime': ns_to_timestamp(_from_column(self.start_ns[row])),
+            'endTime': ns_to_timestamp(_from_column(self.end_ns[row])),
+            'parentSpanId': str(parent_id) if parent_id != NO_ID else None,
+            'labels': dict(
+                (str(label), str(label_value))
+                for label, label_value in labels.items()
+            ) if labels else {},
+        }
+
+
+class _RowLabels(dict):
+    """
+    The labels of a row without any: stored in the columns on first write,
+        so that reading the labels of a span doesn't add a dict to it's row.
+    """
+    __slots__ = ('_columns', '_row')
+
+    def __init__(self, columns, row):
+        super(_RowLabels, self).__init__()
+        self._columns = columns
+        self._row = row
+
+    def _store(self):
+        stored = self._columns.labels.setdefault(self._row, self)
+        if stored is not self:
+            # The labels of another view of the row were written first:
+            stored.update(self)
+
+    def __setitem__(self, label, value):
+        super(_RowLabels, self).__setitem__(label, value)
+        self._store()
+
+    def update(self, *args, **kwargs):
+        super(_RowLabels, self).update(*args, **kwargs)
+        if self:
+            self._store()
+
+    def setdefault(self, label, default=None):
+        value = super(_RowLabels, self).setdefault(label, default)
+        self._store()
+        return value
+
+
+class ColumnarSpan(Span):
+    """
+    A view of one row of a ColumnarTrace's columns: supports the whole Span
+        API, reading and writing the columns.
+
+    Views are created on demand (see `ColumnarTrace.view`), two views of the
+        same row are equal.
+    """
+    __slots__ = ('_row',)
+
+    @classmethod
+    def view(cls, trace, row):
+        """
+        Create a view of a row of the trace's columns.
+
+        :param ColumnarTrace trace:
+        :param int row:
+        :rtype: ColumnarSpan
+        """
+        span = cls.__new__(cls)
+        span._trace = trace
+        span._row = row
+        return span
+
+    def __eq__(self, other):
+        if isinstance(other, ColumnarSpan):
+            return self._trace is other._trace and self._row == other._row
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def __hash__(self):
+        return hash((id(self._trace), self._row))
+
+    @property
+    def row(self):
+        """
+        Retrieve the row of the trace's columns that this span views.
+
+        :rtype: int
+        """
+        return self._row
+
+    # The Span attributes, read from (and written to) the columns:
+
+    @property
+    def _span_id(self):
+        return self._trace.columns.span_ids[self._row]
+
+    @_span_id.setter
+    def _span_id(self, span_id):
+        self._trace.columns.span_ids[self._row] = int(span_id)
+
+    @property
+    def _parent_span_id(self):
+        return _from_id_column(self._trace.columns.parent_ids[self._row])
+
+    @_parent_span_id.setter
+    def _parent_span_id(self, parent_span_id):
+        self._trace.columns.parent_ids[self._row] = _to_id_column(
+            parent_span_id)
+
+    @property
+    def _name(self):
+        columns = self._trace.columns
+        return columns.name_table[columns.names[self._row]]
+
+    @_name.setter
+    def _name(self, name):
+        columns = self._trace.columns
+        columns.names[self._row] = columns.intern(name)
+
+    @property
+    def _start_ns(self):
+        return _from_column(self._trace.columns.start_ns[self._row])
+
+    @_start_ns.setter
+    def _start_ns(self, start_ns):
+        self._trace.columns.start_ns[self._row] = _to_column(start_ns)
+
+    @property
+    def _end_ns(self):
+        return _from_column(self._trace.columns.end_ns[self._row])
+
+    @_end_ns.setter
+    def _end_ns(self, end_ns):
+        self._trace.columns.end_ns[self._row] = _to_column(end_ns)
+
+    @property
+    def _span_kind(self):
+        return _KINDS[self._trace.columns.kinds[self._row]]
+
+    @_span_kind.setter
+    def _span_kind(self, span_kind):
+        self._trace.columns.kinds[self._row] = _KIND_INDEX[span_kind]
+
+    @property
+    def _labels(self):
+        columns = self._trace.columns
+        labels = columns.labels.get(self._row)
+        if labels is None:
+            labels = _RowLabels(columns, self._row)
+        return labels
+
+    def export(self):
+        return self._trace.columns.export(self._row)
+
+
+class _RowSpans(MutableSequence):
+    """
+    The views of a list of rows (of a trace's spans), as a list of spans.
+    """
+    __slots__ = ('_trace', '_rows')
+
+    def __init__(self, trace, rows):
+        self._trace = trace
+        self._rows = rows
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _changing(self, appended_row=None):
+        """
+        Notify the trace that it's rows are about to change, unless appending
+            the row that follows them (see `ColumnarTrace._sequential`).
+        """
+        rows = self._rows
+        if rows is self._trace._order and appended_row != len(rows):
+            self._trace._sequential = False
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._trace.views(self._rows[index])
+        return self._trace.view(self._rows[index])
+
+    def __setitem__(self, index, span):
+        if isinstance(index, slice):
+            raise InvalidSliceError(index)
+        row = self._trace.row_of(span)
+        self._changing()
+        self._rows[index] = row
+
+    def __delitem__(self, index):
+        self._changing()
+        del self._rows[index]
+
+    def insert(self, index, span):
+        row = self._trace.row_of(span)
+        self._changing(row if index >= len(self._rows) else None)
+        self._rows.insert(index, row)
+
+    def index(self, span, *args):
+        if not isinstance(span, ColumnarSpan) or span.trace is not self._trace:
+            raise ValueError('{0!r} is not in list'.format(span))
+        if args:
+            return self._rows[slice(*args)].index(span.row) + args[0]
+        return self._rows.index(span.row)
+
+    def __contains__(self, span):
+        try:
+            self.index(span)
+            return True
+        except ValueError:
+            return False
+
+
+class ColumnarTrace(Trace):
+    """
+    A Trace keeping it's spans in columns (see `SpanColumns`) rather than as
+        Span objects: each span costs a few dozen bytes, and bulk operations
+        (export, range queries and duration filters) scan the columns.
+
+    Spans are handed out as views (`ColumnarSpan`) created on demand. A span
+        added to this trace (eg: `trace + span`) that is not one of it's
+        views is copied into the columns.
+
+    The span id and parent span id indexes (see `get_span`) are built on
+        first use, and kept up to date from then on.
+
+    :note: Every span handed out is a new view: looking a span up (eg:
+        `get_span`, about three times slower than a Trace's) or iterating
+        over the spans costs a view each, where a Trace returns the Span it
+        holds. Range queries and duration filters cost no more than a
+        Trace's (they scan the columns directly while the spans are in the
+        order they were created), exports less.
+
+    Use it with `SDK(..., trace_type=ColumnarTrace)`. Span and parent span
+        ids must be unsigned 64 bit integers.
+    """
+    __slots__ = (
+        '_columns', '_order', '_sequential', '_completed_rows',
+        '_completed_row_positions',
+    )
+
+    def __init__(
+        self, sdk, trace_id=None, root_span_id=None, parent_sampled=None,
+    ):
+        """
+        :param SDK sdk: Instance of SDK this trace belongs to.
+        :param six.string_types trace_id: TraceId
+        :param str/int root_span_id: Default span_id to give a trace's top
+            level spans.
+        :param bool parent_sampled: The caller's sampling decision, passed to
+            the SDK's sampler. Default=None (unknown).
+        """
+        self._columns = SpanColumns()
+        # The rows of this trace's spans, in order:
+        self._order = array.array('l')
+        # Whether they are the rows 0..n-1 (see `_scan`):
+        self._sequential = True
+        # The rows of it's completed spans, in the order that they completed
+        # (`_REMOVED` for those since removed):
+        self._completed_rows = array.array('l')
+        # completed row => it's offset in `_completed_rows`:
+        self._completed_row_positions = {}
+        super(ColumnarTrace, self).__init__(
+            sdk, trace_id=trace_id, root_span_id=root_span_id,
+            parent_sampled=parent_sampled)
+        # Built on first use (see `_indexes`):
+        self._span_index = self._child_spans = None
+
+    @property
+    def columns(self):
+        """
+        Retrieve the columns holding this trace's spans.
+
+        :rtype: SpanColumns
+        """
+        return self._columns
+
+    # The Trace's span lists, as views of the rows:
+
+    @property
+    def _spans(self):
+        return _RowSpans(self, self._order)
+
+    @_spans.setter
+    def _spans(self, spans):
+        self._order = array.array('l', [self.row_of(span) for span in spans])
+        self._sequential = self._order == array.array(
+            'l', range(len(self._order)))
+        # Rebuilt on first use:
+        self._span_index = self._child_spans = None
+
+    @property
+    def _completed(self):
+        return _RowSpans(self, self._completed_rows)
+
+    @_completed.setter
+    def _completed(self, spans):
+        self._completed_rows = array.array('l')
+        self._completed_row_positions = {}
+        for span in spans:
+            self._complete(span)
+
+    def view(self, row):
+        """
+        Create a view of one of this trace's rows.
+
+        :param int row:
+        :rtype: ColumnarSpan
+        """
+        # `ColumnarSpan.view`, inlined:
+        span = _new_view(ColumnarSpan)
+        span._trace = self
+        span._row = row
+        return span
+
+    def views(self, rows):
+        """
+        Create views of several of this trace's rows.
+
+        :param list(int) rows:
+        :rtype: list(ColumnarSpan)
+        """
+        spans = [_new_view(ColumnarSpan) for _ in rows]
+        for span, row in zip(spans, rows):
+            span._trace = self
+            span._row = row
+        return spans
+
+    def row_of(self, span):
+        """
+        Retrieve the row of a span, copying it into the columns if it is not
+            a view of this trace's rows.
+
+        :param Span span:
+        :rtype: int
+        :raises: TypeError
+        """
+        if isinstance(span, ColumnarSpan) and span.trace is self:
+            return span.row
+        if not isinstance(span, Span):
+            raise TypeError('{0} is not an instance of Span'.format(span))
+
+        return self._columns.append(
+            span.span_id, span.parent_span_id, span.name, span.span_kind,
+            span.start_ns, span.end_ns, dict(span.labels),
+        )
+
+    def _new_span(self, parent_span_id, span_args):
+        if not _SPAN_ARGS.issuperset(span_args):
+            raise TypeError('Unexpected span arguments: {0}'.format(
+                ', '.join(sorted(set(span_args) - _SPAN_ARGS))))
+
+        start_time = span_args.get('start_time')
+        end_time = span_args.get('end_time')
+        row = self._columns.append(
+            Span.new_span_id(), parent_span_id,
+            name=span_args.get('name', ''),
+            span_kind=span_args.get('span_kind'),
+            start_ns=datetime_to_ns(start_time) if start_time is not None
+            else None,
+            end_ns=datetime_to_ns(end_time) if end_time is not None
+            else None,
+            labels=span_args.get('labels'),
+        )
+        if row != len(self._order):
+            self._sequential = False
+        self._order.append(row)
+        span = self.view(row)
+        self._index_span(span)
+        return span
+
+    def _complete(self, span):
+        row = self.row_of(span)
+        if row not in self._completed_row_positions:
+            self._completed_row_positions[row] = len(self._completed_rows)
+            self._completed_rows.append(row)
+
+    def _uncomplete(self, span):
+        position = self._completed_row_positions.pop(span.row, None)
+        if position is not None:
+            self._completed_rows[position] = _REMOVED
+
+    def _completed_rows_in(self, start=0, stop=None):
+        return [
+            row for row in self._completed_rows[start:stop]
+            if row != _REMOVED
+        ]
+
+    @property
+    def completed_spans(self):
+        return self.views(self._completed_rows_in())
+
+    @property
+    def completed_count(self):
+        return len(self._completed_row_positions)
+
+    @property
+    def span_ids(self):
+        span_ids = self._columns.span_ids
+        return [span_ids[row] for row in self._order]
+
+    def __len__(self):
+        return len(self._order)
+
+    def _indexes(self):
+        """
+        Retrieve the span id and parent span id indexes (of rows), building
+            them on first use.
+
+        :rtype: tuple(dict, dict)
+        """
+        if self._span_index is None:
+            span_ids = self._columns.span_ids
+            parent_ids = self._columns.parent_ids
+            span_index = {}
+            child_spans = {}
+            for row in self._order:
+                span_index[span_ids[row]] = row
+                child_spans.setdefault(parent_ids[row], []).append(row)
+            self._span_index = span_index
+            self._child_spans = child_spans
+
+        return self._span_index, self._child_spans
+
+    def get_span(self, span_id, default=None):
+        span_index = self._span_index
+        if span_index is None:
+            span_index = self._indexes()[0]
+        if not isinstance(span_id, six.integer_types):
+            span_id = _id_key(span_id)
+        row = span_index.get(span_id)
+        return self.view(row) if row is not None else default
+
+    def get_children(self, parent_span_id):
+        return self.views(
+            self._indexes()[1].get(_id_key(parent_span_id), ()))
+
+    def _index_span(self, span):
+        if self._span_index is None:
+            return
+
+        row = span.row
+        self._span_index[self._columns.span_ids[row]] = row
+        self._child_spans.setdefault(
+            self._columns.parent_ids[row], []).append(row)
+
+    def _unindex_span(self, span):
+        if self._span_index is None:
+            return
+
+        row = span.row
+        span_id = self._columns.span_ids[row]
+        if self._span_index.get(span_id) == row:
+            del self._span_index[span_id]
+        self._remove_child(self._columns.parent_ids[row], row)
+
+    def _remove_child(self, parent_id, row):
+        rows = self._child_spans.get(parent_id)
+        if rows is None or row not in rows:
+            return
+        rows.remove(row)
+        if not rows:
+            del self._child_spans[parent_id]
+
+    def _reparent(self, span, parent_span_id):
+        if self._span_index is None or not isinstance(span, ColumnarSpan) or \
+                span.trace is not self:
+            return
+
+        row = span.row
+        if self._span_index.get(self._columns.span_ids[row]) != row:
+            return
+        self._remove_child(_to_id_column(parent_span_id), row)
+        self._child_spans.setdefault(
+            self._columns.parent_ids[row], []).append(row)
+
+    def _adopt(self, span):
+        return self.view(self.row_of(span))
+
+    def _export_rows(self, rows):
+        export = self._columns.export
+        return {
+            'projectId': str(self.project_id),
+            'traceId': str(self.trace_id),
+            'spans': [export(row) for row in rows],
+        }
+
+    def export(self, spans=None):
+        if spans is None:
+            return self._export_rows(self._order)
+
+        exported = self._export_rows([])
+        for span in spans:
+            if span is None:
+                continue
+            if isinstance(span, ColumnarSpan) and span.trace is self:
+                exported['spans'].append(self._columns.export(span.row))
+            else:
+                exported['spans'].append(span.export())
+        return exported
+
+    def export_completed(self, start=0, stop=None):
+        return self._export_rows(self._completed_rows_in(start, stop))
+
+    def _scan(self):
+        """
+        Iterate over the start and end times of this trace's spans, in order.
+
+        :return: (row, start_ns, end_ns) tuples.
+        :rtype: iterator
+        """
+        starts = self._columns.start_ns
+        ends = self._columns.end_ns
+        order = self._order
+        if self._sequential:
+            # The rows 0..n-1, no need to look them up:
+            return zip(range(len(order)), starts, ends)
+        return zip(
+            order, map(starts.__getitem__, order),
+            map(ends.__getitem__, order))
+
+    def rows_in_range(self, from_=None, to_=None):
+        """
+        Find the rows of the spans such that:
+        (from_ <= span.start_ns) and (span.end_ns < to_)
+
+        :param int from_: The optional lower bound (nanoseconds since the
+            epoch).
+        :param int to_: The optional upper bound (nanoseconds since the
+            epoch).
+        :rtype: list(int)
+        """
+        if from_ is None:
+            from_ = MISSING + 1
+        if to_ is None:
+            to_ = -MISSING
+
+        return [
+            row for row, start, end in self._scan()
+            if from_ <= start and end != MISSING and end < to_
+        ]
+
+    def rows_with_duration_less_than(self, duration_ns):
+        """
+        Find the rows of the spans with a duration <= the given one.
+
+        :param int duration_ns: The duration, in nanoseconds.
+        :rtype: list(int)
+        """
+        return [
+            row for row, start, end in self._scan()
+            if end - start <= duration_ns
+            if end != MISSING and start != MISSING
+        ]
+
+    def __getitem__(self, item):
+        views = self.views
+
+        if isinstance(item, slice):
+            start = item.start
+            stop = item.stop
+
+            if all(isinstance(i, (datetime.datetime, type(None)))
+                   for i in [start, stop]):
+                rows = self.rows_in_range(
+                    datetime_to_ns(start) if start is not None else None,
+                    datetime_to_ns(stop) if stop is not None else None,
+                )
+                return views(rows)[::item.step]
+            if all(isinstance(i, float) for i in [start, stop]):
+                rows = self.rows_in_range(
+                    seconds_to_ns(start), seconds_to_ns(stop))
+                return views(rows)[::item.step]
+        elif isinstance(item, datetime.timedelta):
+            rows = self.rows_with_duration_less_than(
+                seconds_to_ns(item.total_seconds()))
+            return views(rows)
+
+        return super(ColumnarTrace, self).__getitem__(item)
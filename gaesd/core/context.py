@@ -0,0 +1,299 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+"""
+Context backends: where the SDK keeps the traces and span stacks of the
+current request (and dispatchers their cached traces).
+"""
+
+import copy
+import itertools
+import threading
+from collections import Sequence
+
+try:
+    import contextvars
+except ImportError:  # pragma: no cover
+    # python < 3.7:
+    contextvars = None
+
+__all__ = [
+    'Context', 'ThreadLocalContext', 'ContextVarsContext', 'TraceIndex',
+    'TraceList', 'new_context',
+]
+
+
+class TraceList(Sequence):
+    """
+    An immutable list of traces sharing it's items with the lists it was
+        appended from: `appended` is O(1) rather than a copy of the list,
+        yet a list never sees the traces appended to another one.
+
+    Slicing returns a (plain) list.
+    """
+    __slots__ = ('_items', '_length')
+
+    def __init__(self, traces=()):
+        """
+        :param list(gaesd.Trace) traces:
+        """
+        self._items = list(traces)
+        self._length = len(self._items)
+
+    def appended(self, trace):
+        """
+        Create a list of these traces followed by the trace.
+
+        :param gaesd.Trace trace:
+        :rtype: TraceList
+        """
+        items = self._items
+        length = self._length
+        if len(items) == length:
+            items.append(trace)
+        # Another list (in another task or thread) appended first:
+        if items[length] is not trace:
+            items = items[:length]
+            items.append(trace)
+
+        appended = TraceList.__new__(TraceList)
+        appended._items = items
+        appended._length = length + 1
+        return appended
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._items[:self._length][index]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError('list index out of range')
+        return self._items[index]
+
+    def __iter__(self):
+        return itertools.islice(self._items, self._length)
+
+    def __eq__(self, other):
+        if not isinstance(other, (list, TraceList)):
+            return NotImplemented
+        return self[:] == other[:]
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '{0}({1!r})'.format(self.__class__.__name__, self[:])
+
+
+class TraceIndex(object):
+    """
+    A context's traces by trace id, valid for one list of traces: a context
+        whose list of traces is not `traces` (eg: a task that started with
+        it's parent's traces, after the parent changed them) builds it's
+        own index.
+    """
+    __slots__ = ('traces', 'by_id')
+
+    def __init__(self, traces):
+        """
+        :param list(gaesd.Trace) traces:
+        """
+        self.traces = traces
+        self.by_id = dict((trace.trace_id, trace) for trace in traces)
+
+
+class Context(object):
+    """
+    Base of the context backends. Values are read and set as attributes
+        (reading an unset value without a default raises AttributeError).
+
+    Values must be treated as immutable (copy-on-write): replace a value
+        rather than changing it in place, so that a change made by one
+        request is never seen by another one sharing it's parent's context.
+        The trace id index (see `TraceIndex`) is the exception: it is
+        changed in place, but only used while it is valid for the context's
+        traces.
+    """
+    #: Values of the attributes not yet set by the current thread (or task):
+    DEFAULTS = {'traces': [], 'span_stacks': {}, 'trace_index': None}
+
+    def __getattr__(self, name):
+        # Only called for attributes that are not set:
+        return self._default(name)
+
+    def _default(self, name):
+        try:
+            return copy.copy(self.DEFAULTS[name])
+        except KeyError:
+            raise AttributeError(name)
+
+    def _stacks(self):
+        return self.span_stacks
+
+    def _trace_index(self):
+        index = self.trace_index
+        traces = self.traces
+        if index is None or index.traces is not traces:
+            index = self.trace_index = TraceIndex(traces)
+        return index
+
+    def find_trace(self, trace_id):
+        """
+        Retrieve the trace with the trace id in this context.
+
+        :param trace_id:
+        :return: The trace, or None.
+        :rtype: gaesd.Trace
+        """
+        return self._trace_index().by_id.get(trace_id)
+
+    def set_traces(self, traces, added=(), removed=()):
+        """
+        Replace the traces of this context, updating the trace id index.
+
+        :param list(gaesd.Trace) traces: The new list of traces (a copy, see
+            `Context`).
+        :param list(gaesd.Trace) added: The traces added to the list.
+        :param list(gaesd.Trace) removed: The traces removed from the list.
+        """
+        index = self._trace_index()
+        by_id = index.by_id
+        for trace in removed:
+            if by_id.get(trace.trace_id) is trace:
+                del by_id[trace.trace_id]
+        for trace in added:
+            by_id[trace.trace_id] = trace
+        # Other contexts sharing the index now rebuild their own:
+        index.traces = traces
+        self.traces = traces
+
+    def append_trace(self, trace):
+        """
+        Append the trace to the traces of this context, updating the trace
+            id index.
+
+        :param gaesd.Trace trace:
+        """
+        traces = self.traces
+        if not isinstance(traces, TraceList):
+            traces = TraceList(traces)
+        self.set_traces(traces.appended(trace), added=[trace])
+
+    def trace_id_changed(self, trace, trace_id):
+        """
+        Notify this context that a trace's trace id changed.
+
+        :param gaesd.Trace trace:
+        :param trace_id: The trace's previous trace id.
+        """
+        by_id = self._trace_index().by_id
+        if by_id.get(trace_id) is trace:
+            del by_id[trace_id]
+            by_id[trace.trace_id] = trace
+
+    def current_span(self, trace):
+        """
+        Retrieve the innermost span entered on the trace in this context.
+
+        :param gaesd.Trace trace:
+        :return: The span, or None.
+        :rtype: gaesd.Span
+        """
+        node = self._stacks().get(trace)
+        return node[0] if node is not None else None
+
+    def span_stack(self, trace):
+        """
+        Retrieve the spans entered on the trace in this context.
+
+        :param gaesd.Trace trace:
+        :return: The spans, outermost first.
+        :rtype: list(gaesd.Span)
+        """
+        spans = []
+        node = self._stacks().get(trace)
+        while node is not None:
+            spans.append(node[0])
+            node = node[1]
+        return spans[::-1]
+
+    def push_span(self, trace, span):
+        """
+        Make the span the innermost span of the trace in this context.
+
+        :param gaesd.Trace trace:
+        :param gaesd.Span span:
+        """
+        # Each stack is a linked list of (span, parent node), so pushing
+        # shares (rather than copies) the parent's stack:
+        stacks = dict(self._stacks())
+        stacks[trace] = (span, stacks.get(trace))
+        self.span_stacks = stacks
+
+    def pop_span(self, trace):
+        """
+        Remove the innermost span of the trace in this context.
+
+        :param gaesd.Trace trace:
+        """
+        stacks = dict(self._stacks())
+        node = stacks.pop(trace, None)
+        if node is not None and node[1] is not None:
+            stacks[trace] = node[1]
+        self.span_stacks = stacks
+
+
+class ThreadLocalContext(threading.local, Context):
+    """
+    Context backend for one request per thread.
+    """
+
+
+class ContextVarsContext(Context):
+    """
+    Context backend built on `contextvars` (python 3.7+): each asyncio task
+        (and each thread) has it's own values, and a new task starts with
+        those of the task that created it.
+    """
+
+    def __init__(self):
+        if contextvars is None:
+            raise RuntimeError('contextvars requires python 3.7+')
+        # name => ContextVar:
+        object.__setattr__(self, '_vars', {})
+
+    def _var(self, name):
+        var = self._vars.get(name)
+        if var is None:
+            var = self._vars.setdefault(
+                name, contextvars.ContextVar('gaesd.{0}'.format(name)))
+        return var
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+
+        try:
+            return self._var(name).get()
+        except LookupError:
+            return self._default(name)
+
+    def __setattr__(self, name, value):
+        self._var(name).set(value)
+
+
+def new_context():
+    """
+    Create the default context backend: a ContextVarsContext where
+        contextvars is available, a ThreadLocalContext otherwise.
+
+    :rtype: Context
+    """
+    if contextvars is not None:
+        return ContextVarsContext()
+    return ThreadLocalContext()
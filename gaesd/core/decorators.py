@@ -3,13 +3,16 @@
 
 import six
 
-__all__ = ['Decorators', 'TraceDecorators', 'SpanDecorators']
+__all__ = [
+    'Decorators', 'TraceDecorators', 'SpanDecorators', 'NoopDecorators',
+]
 
 
 class Decorators(object):
     """
     Encapsulation of decorator functionality.
     """
+    __slots__ = ('_sdk',)
 
     def __init__(self, sdk):
         self._sdk = sdk
@@ -35,11 +38,24 @@ class Decorators(object):
         def _new_span_decorator(func):
             @six.wraps(func)
             def __new_span_decorator_inner(*args, **kwargs):
+                # Fast path, for disabled SDKs and unsampled traces:
+                if trace is not None:
+                    if not trace.sampled:
+                        return func(*args, **kwargs)
+                elif not self._sdk.is_recording:
+                    return func(*args, **kwargs)
+
                 span_name = name
                 if callable(name):
                     span_name = func.__name__
                 span_args.setdefault('name', span_name)
 
+                # Fast path, for span names the SDK never records:
+                span_sampler = self._sdk.span_sampler
+                if span_sampler is not None and \
+                        span_sampler.is_disabled(span_args['name']):
+                    return func(*args, **kwargs)
+
                 if nested:
                     # Guard against creating a current_span:
                     if self._sdk.has_current_span:
@@ -102,6 +118,8 @@ class Decorators(object):
 
 
 class TraceDecorators(Decorators):
+    __slots__ = ('_trace',)
+
     def __init__(self, trace):
         super(TraceDecorators, self).__init__(trace.sdk)
         self._trace = trace
@@ -118,6 +136,8 @@ class TraceDecorators(Decorators):
 
 
 class SpanDecorators(Decorators):
+    __slots__ = ('_span',)
+
     def __init__(self, span):
         super(SpanDecorators, self).__init__(span.trace.sdk)
         self._span = span
@@ -135,3 +155,23 @@ class SpanDecorators(Decorators):
         span_args['parent_span'] = self._span
         return super(SpanDecorators, self).span(
             name=name, nested=True, **span_args)
+
+
+class NoopDecorators(object):
+    """
+    Decorators of the NoopTrace and NoopSpan: the decorated callables are
+        returned unchanged.
+    """
+    __slots__ = ()
+
+    def span(self, name=None, nested=True, **span_args):
+        if callable(name):
+            return name
+        return lambda func: func
+
+    def trace(
+        self, trace_id=None, _create_span=False, _span_args=None, **trace_args
+    ):
+        if callable(trace_id):
+            return trace_id
+        return lambda func: func
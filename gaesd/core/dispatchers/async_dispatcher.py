@@ -0,0 +1,251 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+"""
+asyncio dispatcher (python 3.5+ only).
+"""
+
+import asyncio
+import json
+
+from gaesd.core.dispatchers.async_http import StreamsHttpClient
+from gaesd.core.dispatchers.rest_dispatcher import RestDispatcher
+from gaesd.core.utils import DispatchError
+
+__all__ = ['AsyncDispatcher']
+
+# python 3.7+, else the (3.5.3+) private equivalent:
+_get_running_loop = getattr(
+    asyncio, 'get_running_loop', asyncio._get_running_loop)
+
+
+def _running_loop():
+    """
+    Retrieve the event loop running in the current thread.
+
+    :rtype: Optional[asyncio.AbstractEventLoop]
+    """
+    try:
+        return _get_running_loop()
+    except RuntimeError:
+        return None
+
+
+class AsyncDispatcher(RestDispatcher):
+    """
+    Dispatcher for asyncio applications.
+
+    Dispatching only buffers traces. A task on the event loop sends them to
+    the StackDriver REST API, through a non-blocking HTTP client, whenever
+    `batch_size` traces are buffered or `interval` seconds after the first
+    of them was buffered. Nothing blocks the event loop.
+
+    `await dispatcher.flush()` (or `await sdk.aflush()`) sends everything
+    buffered so far.
+
+    Without an explicit `loop`, the dispatcher sends from the loop running
+    when it first dispatches (or flushes), so an SDK can be created before
+    the loop (eg: at import time, then `asyncio.run(main())`). Traces
+    dispatched before any loop runs are buffered until then.
+    """
+    BATCH_SIZE = 50
+    INTERVAL = 5.0
+
+    def __init__(
+        self, sdk=None, auto=True, root_url=None, token_provider=None,
+        client=None, batch_size=None, interval=None, loop=None, **kwargs
+    ):
+        """
+        :param gaesd.SDK sdk: SDK instance to use.
+        :param bool auto: True=dispatch traces immediately upon span completion,
+            False=Otherwise.
+        :param str root_url: Root url of the API. Default=`_ROOT_URL`.
+        :param callable token_provider: Returns the OAuth2 access token to
+            send, or None to send no Authorization header. It is called in
+            the loop's default executor.
+            Default=The application default credentials' access token.
+        :param AsyncHttpClient client: Default=`StreamsHttpClient()`.
+        :param int batch_size: Send once this many traces are buffered.
+            Default=`BATCH_SIZE`.
+        :param float interval: Send buffered traces at most this many seconds
+            after they were buffered. Default=`INTERVAL`.
+        :param asyncio.AbstractEventLoop loop: The event loop to send from.
+            Default=The loop running when first dispatching (or flushing),
+            replaced by the running loop once it is no longer running.
+        :param kwargs: Passed directly through to the RestDispatcher
+            constructor (eg: `compression`).
+        """
+        super(AsyncDispatcher, self).__init__(
+            sdk=sdk, auto=auto, root_url=root_url, **kwargs)
+        self._token_provider = token_provider
+        self._client = client or StreamsHttpClient()
+        self._batch_size = batch_size or self.BATCH_SIZE
+        self._interval = interval if interval is not None else self.INTERVAL
+        self._loop = loop
+        self._buffer = []
+        self._task = None
+        self._wakeup = None
+        self._send_lock = None
+
+    @property
+    def client(self):
+        """
+        :rtype: AsyncHttpClient
+        """
+        return self._client
+
+    @property
+    def loop(self):
+        """
+        Retrieve the event loop sent from, None until one is found running.
+
+        :rtype: Optional[asyncio.AbstractEventLoop]
+        """
+        return self._loop
+
+    @property
+    def pending(self):
+        """
+        Retrieve the number of buffered traces.
+
+        :rtype: int
+        """
+        return len(self._buffer)
+
+    def _access_token(self):
+        if self._token_provider is not None:
+            return self._token_provider()
+
+        from gaesd.core.dispatchers.google_api_client_cache import \
+            client_cache
+        return client_cache.credentials.get_access_token().access_token
+
+    def _dispatch(self, traces):
+        """
+        Buffer the traces for the event loop task.
+
+        :param traces: List of traces to send to StackDriver.
+        :type traces: [core.Trace]
+        """
+        traces = list(traces)
+        running = _running_loop()
+        loop = self._bind_loop(running)
+        if loop is None or loop.is_closed():
+            # Sent once a loop runs (and dispatches or flushes):
+            self._buffer.extend(traces)
+        elif loop is running:
+            self._buffer_traces(traces)
+        else:
+            loop.call_soon_threadsafe(self._buffer_traces, traces)
+
+    def _bind_loop(self, running):
+        """
+        Send from the running loop when ours is not (or not yet) running.
+
+        :param asyncio.AbstractEventLoop running: The loop running in the
+            current thread, if any.
+        :rtype: Optional[asyncio.AbstractEventLoop]
+        """
+        loop = self._loop
+        if running is None or running is loop:
+            return loop
+        if loop is None or not loop.is_running():
+            # The task (and it's primitives) belonged to the previous loop:
+            self._loop = loop = running
+            self._task = None
+            self._wakeup = None
+            self._send_lock = None
+        return loop
+
+    def _buffer_traces(self, traces):
+        self._ensure_task()
+        # The first buffered trace starts the interval:
+        first = not self._buffer
+        self._buffer.extend(traces)
+        if first or len(self._buffer) >= self._batch_size:
+            self._wakeup.set()
+
+    def _ensure_task(self):
+        if self._task is not None and not self._task.done():
+            return
+
+        # Called on the loop's thread:
+        self._wakeup = asyncio.Event()
+        self._send_lock = asyncio.Lock()
+        self._task = self._loop.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            try:
+                await asyncio.wait_for(self._wait_for_batch(), self._interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                await self._send_buffer()
+            except Exception:
+                self.logger.exception('Failed to dispatch buffered traces')
+
+            if self._buffer:
+                # Buffered while sending:
+                self._wakeup.set()
+
+    async def _wait_for_batch(self):
+        while len(self._buffer) < self._batch_size:
+            self._wakeup.clear()
+            await self._wakeup.wait()
+
+    async def _send_buffer(self):
+        async with self._send_lock:
+            batch, self._buffer = self._buffer, []
+            if batch:
+                await self._post(batch)
+
+    async def _post(self, traces):
+        prep = self._prep_dispatch(traces)
+        body = json.dumps(prep.body, separators=(',', ':')).encode('utf-8')
+
+        headers = {'Content-Type': 'application/json'}
+        if self._compressor is not None:
+            body, encoding = self._compressor(body)
+            if encoding:
+                headers['Content-Encoding'] = encoding
+
+        token = await self._loop.run_in_executor(None, self._access_token)
+        if token:
+            headers['Authorization'] = 'Bearer {0}'.format(token)
+
+        status, _, data = await self._client.request(
+            'PATCH', prep.url, body, headers)
+        if not 200 <= status < 300:
+            raise DispatchError(status, data)
+
+        return data
+
+    async def flush(self):
+        """
+        Send every trace buffered so far.
+
+        :raises: DispatchError (or the client's error) if sending failed.
+        """
+        self._bind_loop(_running_loop())
+        # Let traces buffered from other threads arrive:
+        await asyncio.sleep(0)
+        if self._task is None and not self._buffer:
+            return
+        self._ensure_task()
+        await self._send_buffer()
+
+    async def aclose(self):
+        """
+        Send every buffered trace, then stop the batching task and close the
+            HTTP client.
+        """
+        try:
+            await self.flush()
+        finally:
+            if self._task is not None:
+                self._task.cancel()
+                self._task = None
+            await self._client.close()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+"""
+Non-blocking HTTP/1.1 client for asyncio (python 3.5+ only).
+"""
+
+import abc
+import asyncio
+import ssl
+from urllib.parse import urlsplit
+
+__all__ = ['AsyncHttpClient', 'StreamsHttpClient']
+
+
+class AsyncHttpClient(metaclass=abc.ABCMeta):
+    """
+    Base class of the HTTP clients used by the `AsyncDispatcher`.
+    """
+
+    @abc.abstractmethod
+    async def request(self, method, url, body=None, headers=None):
+        """
+        Send a request.
+
+        :param str method: HTTP method.
+        :param str url: Absolute url.
+        :param bytes body: Request body.
+        :param dict headers: Request headers.
+        :return: The response status, (lower-cased) headers and body.
+        :rtype: tuple(int, dict, bytes)
+        """
+        raise NotImplementedError  # pragma: no cover
+
+    async def close(self):
+        """
+        Release any resources (eg: connections) held by the client.
+        """
+
+
+class StreamsHttpClient(AsyncHttpClient):
+    """
+    HTTP/1.1 client built on asyncio streams, keeping connections alive
+    between requests (up to `pool_size` idle connections per host).
+    """
+    POOL_SIZE = 4
+    TIMEOUT = 10
+
+    def __init__(self, pool_size=None, timeout=None, ssl_context=None):
+        """
+        :param int pool_size: Maximum number of idle connections kept open
+            per host. Default=`POOL_SIZE`.
+        :param float timeout: Seconds to wait for a connection or response.
+            Default=`TIMEOUT`.
+        :param ssl.SSLContext ssl_context: Context for https connections.
+            Default=`ssl.create_default_context()`.
+        """
+        self._pool_size = pool_size or self.POOL_SIZE
+        self._timeout = timeout or self.TIMEOUT
+        self._ssl_context = ssl_context
+        # (scheme, host, port) => [(reader, writer)]:
+        self._idle = {}
+        self.created = 0
+
+    def _ssl(self, scheme):
+        if scheme != 'https':
+            return None
+        if self._ssl_context is None:
+            self._ssl_context = ssl.create_default_context()
+        return self._ssl_context
+
+    async def _connect(self, key):
+        idle = self._idle.get(key)
+        if idle:
+            return idle.pop(), True
+
+        scheme, host, port = key
+        self.created += 1
+        connection = await asyncio.wait_for(
+            asyncio.open_connection(
+                host, port, ssl=self._ssl(scheme),
+                server_hostname=host if scheme == 'https' else None),
+            self._timeout)
+        return connection, False
+
+    def _release(self, key, connection):
+        idle = self._idle.setdefault(key, [])
+        if len(idle) < self._pool_size:
+            idle.append(connection)
+        else:
+            connection[1].close()
+
+    async def request(self, method, url, body=None, headers=None):
+        parts = urlsplit(url)
+        scheme = parts.scheme or 'http'
+        port = parts.port or (443 if scheme == 'https' else 80)
+        key = (scheme, parts.hostname, port)
+        path = (parts.path or '/') + ('?' + parts.query if parts.query else '')
+
+        head = ['{0} {1} HTTP/1.1'.format(method, path)]
+        all_headers = {'Host': parts.netloc, 'Content-Length': len(body or b'')}
+        all_headers.update(headers or {})
+        head.extend('{0}: {1}'.format(k, v) for k, v in all_headers.items())
+        data = ('\r\n'.join(head) + '\r\n\r\n').encode('latin-1')
+        data += body or b''
+
+        while True:
+            (reader, writer), reused = await self._connect(key)
+            try:
+                writer.write(data)
+                response = await asyncio.wait_for(
+                    self._read_response(reader), self._timeout)
+            except (OSError, EOFError, asyncio.IncompleteReadError):
+                writer.close()
+                if reused:
+                    # The server closed the idle connection, try a new one:
+                    continue
+                raise
+            except BaseException:
+                writer.close()
+                raise
+
+            status, response_headers, response_body = response
+            if response_headers.get('connection', '').lower() == 'close':
+                writer.close()
+            else:
+                self._release(key, (reader, writer))
+
+            return response
+
+    @staticmethod
+    async def _read_response(reader):
+        status_line = await reader.readline()
+        if not status_line:
+            raise EOFError('Connection closed')
+        status = int(status_line.split()[1])
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            body = []
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                if not size:
+                    await reader.readline()
+                    break
+                body.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            return status, headers, b''.join(body)
+
+        if 'content-length' in headers:
+            length = int(headers['content-length'])
+            return status, headers, await reader.readexactly(length)
+
+        if status in (204, 304) or 100 <= status < 200:
+            return status, headers, b''
+
+        # Delimited by the server closing the connection:
+        headers['connection'] = 'close'
+        return status, headers, await reader.read()
+
+    async def close(self):
+        idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for _, writer in connections:
+                writer.close()
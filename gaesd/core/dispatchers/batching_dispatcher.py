@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+
+import threading
+import time
+
+from six.moves import queue
+
+from gaesd.core.dispatchers.dispatcher import Dispatcher, TracePatch
+
+__all__ = ['BatchingDispatcher']
+
+_FLUSH = object()
+_STOP = object()
+
+
+class BatchingDispatcher(Dispatcher):
+    """
+    Dispatcher that takes StackDriver calls off the request thread.
+
+    Traces are put on a bounded in-process queue and a background worker
+    thread sends them to another dispatcher (the `GoogleApiClientDispatcher`
+    by default) in batches, whenever `batch_size` traces are waiting or
+    `interval` seconds have passed since the first trace of the batch
+    arrived.
+    """
+    MAX_QUEUE_SIZE = 1000
+    BATCH_SIZE = 50
+    INTERVAL = 5.0
+
+    def __init__(
+        self, sdk=None, auto=True, dispatcher=None, max_queue_size=None,
+        batch_size=None, interval=None,
+    ):
+        """
+        :param gaesd.SDK sdk: SDK instance to use.
+        :param bool auto: True=queue traces immediately upon span completion,
+            False=Otherwise.
+        :param dispatcher: Dispatcher type used by the worker thread to send
+            each batch. Default=GoogleApiClientDispatcher.
+        :type dispatcher: type(Dispatcher)
+        :param int max_queue_size: Maximum number of queued traces, further
+            traces are dropped. Default=`MAX_QUEUE_SIZE`.
+        :param int batch_size: Send a batch once it holds this many traces.
+            Default=`BATCH_SIZE`.
+        :param float interval: Send a batch once it is this many seconds old.
+            Default=`INTERVAL`.
+        """
+        super(BatchingDispatcher, self).__init__(sdk=sdk, auto=auto)
+
+        if dispatcher is None:
+            from gaesd.core.dispatchers.google_api_client_dispatcher import \
+                GoogleApiClientDispatcher
+            dispatcher = GoogleApiClientDispatcher
+
+        self._dispatcher = dispatcher(sdk=sdk, auto=False)
+        self._batch_size = batch_size or self.BATCH_SIZE
+        self._interval = interval if interval is not None else self.INTERVAL
+        self._queue = queue.Queue(
+            maxsize=max_queue_size or self.MAX_QUEUE_SIZE)
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        self._dropped = 0
+
+    @property
+    def sdk(self):
+        """
+        Retrieve the SDK that this dispatcher is associated with.
+
+        :rtype:  gaesd.SDK
+        """
+        return self._sdk
+
+    @sdk.setter
+    def sdk(self, sdk):
+        """
+        Set the SDK that this dispatcher (and it's target dispatcher) is
+            associated with.
+
+        :param gaesd.SDK sdk: The new SDK to use.
+        """
+        self._sdk = sdk
+        self._dispatcher.sdk = sdk
+
+    @property
+    def dispatcher(self):
+        """
+        Retrieve the dispatcher used by the worker thread to send batches.
+
+        :rtype: Dispatcher
+        """
+        return self._dispatcher
+
+    @property
+    def dropped(self):
+        """
+        Retrieve the number of traces dropped because the queue was full.
+
+        :rtype: int
+        """
+        return self._dropped
+
+    @property
+    def pending(self):
+        """
+        Retrieve the (approximate) number of traces waiting in the queue.
+
+        :rtype: int
+        """
+        return self._queue.qsize()
+
+    def warmup(self):
+        """
+        Warm up the dispatcher used to send batches.
+        """
+        self._dispatcher.warmup()
+
+    def patch_trace(self, trace):
+        """
+        Ingest a new Trace into this dispatcher.
+
+        If this dispatcher's auto state is enabled, the spans of this trace
+            that completed since it was last queued will be queued for the
+            worker thread, otherwise it will be cached.
+
+        :param gaesd.Trace trace: The trace instance to ingest.
+        """
+        if self.auto:
+            patch = self._patch_for(trace)
+            if patch is not None:
+                # Once queued, the worker thread owns these spans:
+                self._acknowledge([patch])
+                self._enqueue(patch)
+        else:
+            super(BatchingDispatcher, self).patch_trace(trace)
+
+    def _dispatch(self, traces):
+        """
+        Queue the traces for the worker thread.
+
+        :param traces: List of traces to send to StackDriver.
+        :type traces: [core.Trace]
+        """
+        for trace in traces:
+            self._enqueue(trace)
+
+    def _enqueue(self, item):
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self._dropped += 1
+            self.logger.warning('Queue full, dropped trace')
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                worker = threading.Thread(
+                    target=self._run,
+                    name='{0}-worker'.format(self.__class__.__name__),
+                )
+                worker.daemon = True
+                worker.start()
+                self._worker = worker
+
+    def flush(self):
+        """
+        Block until every trace queued so far has been sent.
+        """
+        if self._worker is None:
+            return
+        self._queue.put(_FLUSH)
+        self._queue.join()
+
+    def stop(self):
+        """
+        Send all queued traces and stop the worker thread.
+        """
+        worker = self._worker
+        if worker is None:
+            return
+        self._queue.put(_STOP)
+        worker.join()
+        self._worker = None
+
+    def _run(self):
+        batch = []
+        received = 0
+        deadline = None
+
+        while True:
+            timeout = None
+            if batch:
+                timeout = max(0, deadline - time.time())
+
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            else:
+                received += 1
+
+            if item is not None and item is not _FLUSH and item is not _STOP:
+                if not batch:
+                    deadline = time.time() + self._interval
+                self._coalesce(batch, item)
+
+            if batch:
+                full = len(batch) >= self._batch_size
+                due = time.time() >= deadline
+                if full or due or item is _FLUSH or item is _STOP:
+                    self._send(batch)
+                    batch = []
+
+            if not batch:
+                for _ in range(received):
+                    self._queue.task_done()
+                received = 0
+
+            if item is _STOP:
+                return
+
+    @staticmethod
+    def _coalesce(batch, item):
+        """
+        Add the item to the batch, sending each trace at most once per batch.
+        """
+        trace = getattr(item, 'trace', item)
+
+        for index, queued in enumerate(batch):
+            if getattr(queued, 'trace', queued) is not trace:
+                continue
+            # Unless the whole trace is already being sent:
+            if isinstance(queued, TracePatch):
+                batch[index] = queued.merge(item) \
+                    if isinstance(item, TracePatch) else item
+            return
+
+        batch.append(item)
+
+    def _send(self, batch):
+        try:
+            self._dispatcher._dispatch_chunked(batch)
+        except Exception:
+            self.logger.exception(
+                'Failed to dispatch batch of %s traces', len(batch))
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+
+import json
+
+__all__ = [
+    'COMPACT_SEPARATORS', 'DEFAULT_SEPARATORS', 'ExportedTrace',
+    'split_traces',
+]
+
+#: JSON separators of the REST (and socket) dispatchers' bodies:
+COMPACT_SEPARATORS = (',', ':')
+#: JSON separators of `json.dumps` by default (eg: googleapiclient's bodies):
+DEFAULT_SEPARATORS = (', ', ': ')
+
+# Size of the `{"traces":[]}` request envelope:
+ENVELOPE_SIZE = len('{"traces":[]}')
+
+
+def _envelope_size(separators):
+    return len(json.dumps({'traces': []}, separators=separators))
+
+
+class ExportedTrace(object):
+    """
+    A trace (or trace patch) exported once, with it's encoded size.
+
+    Dispatchers call `export()` on the chunks they are given, so the trace
+        is not exported again.
+    """
+
+    def __init__(self, item, separators=COMPACT_SEPARATORS):
+        """
+        :param item: The trace or trace patch to export.
+        :type item: Union[gaesd.Trace, gaesd.core.dispatchers.TracePatch]
+        :param tuple(str, str) separators: JSON separators the export will be
+            encoded with. Default=`COMPACT_SEPARATORS`.
+        """
+        self._item = item
+        self._export = item.export()
+        self._size = len(json.dumps(self._export, separators=separators))
+
+    def __repr__(self):
+        return 'ExportedTrace({0!r})[{1}]'.format(self._item, self._size)
+
+    @property
+    def item(self):
+        """
+        Retrieve the exported trace or trace patch.
+
+        :rtype: Union[gaesd.Trace, gaesd.core.dispatchers.TracePatch]
+        """
+        return self._item
+
+    @property
+    def size(self):
+        """
+        Retrieve the JSON encoded size of the export in bytes.
+
+        :rtype: int
+        """
+        return self._size
+
+    def export(self):
+        """
+        Retrieve the export.
+
+        :rtype: dict
+        """
+        return self._export
+
+
+def split_traces(
+    traces, max_bytes=None, max_traces=None, separators=COMPACT_SEPARATORS,
+):
+    """
+    Split the traces into chunks that each encode to a patchTraces body of
+        at most `max_bytes` and contain at most `max_traces` traces.
+
+    A single trace larger than `max_bytes` is sent in a chunk of it's own.
+
+    :param traces: The traces (or trace patches) to split.
+    :type traces: list(Union[gaesd.Trace, gaesd.core.dispatchers.TracePatch])
+    :param int max_bytes: Maximum encoded size of a chunk. Default=Unlimited.
+    :param int max_traces: Maximum number of traces in a chunk.
+        Default=Unlimited.
+    :param tuple(str, str) separators: JSON separators the body will be
+        encoded with. Default=`COMPACT_SEPARATORS`.
+    :return: The chunks, in order.
+    :rtype: list(list(ExportedTrace))
+    """
+    envelope_size = _envelope_size(separators)
+    item_separator_size = len(separators[0])
+    chunks = []
+    chunk = []
+    chunk_size = envelope_size
+
+    for trace in traces:
+        exported = ExportedTrace(trace, separators=separators)
+        # The separating comma:
+        size = exported.size + (item_separator_size if chunk else 0)
+
+        full = max_traces is not None and len(chunk) >= max_traces
+        if max_bytes is not None and chunk_size + size > max_bytes:
+            full = True
+
+        if chunk and full:
+            chunks.append(chunk)
+            chunk = []
+            chunk_size = envelope_size
+            size = exported.size
+
+        chunk.append(exported)
+        chunk_size += size
+
+    if chunk:
+        chunks.append(chunk)
+
+    return chunks
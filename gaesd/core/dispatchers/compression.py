@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+
+import zlib
+
+__all__ = ['Compressor', 'ENCODINGS']
+
+# Content-Encoding => zlib wbits:
+_WBITS = {
+    'gzip': 16 + zlib.MAX_WBITS,
+    'deflate': zlib.MAX_WBITS,
+}
+
+ENCODINGS = tuple(sorted(_WBITS))
+
+
+class Compressor(object):
+    """
+    Compresses request bodies with a HTTP Content-Encoding.
+
+    Bodies smaller than the threshold are sent as-is: below a few hundred
+    bytes compression costs more CPU than it saves on the wire.
+    """
+    LEVEL = 6
+    THRESHOLD = 1024
+
+    def __init__(self, encoding='gzip', level=None, threshold=None):
+        """
+        :param str encoding: Content-Encoding to compress with, one of
+            `ENCODINGS`.
+        :param int level: zlib compression level (1=fastest, 9=smallest).
+            Default=`LEVEL`.
+        :param int threshold: Bodies smaller than this many bytes are not
+            compressed. Default=`THRESHOLD`.
+        :raises: ValueError
+        """
+        if encoding not in _WBITS:
+            raise ValueError(
+                'unsupported encoding {encoding}, expecting one of '
+                '{encodings}'.format(encoding=encoding, encodings=ENCODINGS))
+
+        self._encoding = encoding
+        self._level = self.LEVEL if level is None else level
+        self._threshold = self.THRESHOLD if threshold is None else threshold
+
+    def __repr__(self):
+        return 'Compressor({0}, level={1}, threshold={2})'.format(
+            self._encoding, self._level, self._threshold)
+
+    @classmethod
+    def new(cls, compression=None, level=None, threshold=None):
+        """
+        Create a compressor from a dispatcher's compression arguments.
+
+        :param compression: None/False=no compression, an encoding name or a
+            Compressor instance (returned as-is).
+        :type compression: Union[None, bool, str, Compressor]
+        :param int level: zlib compression level.
+        :param int threshold: Minimum body size to compress.
+        :rtype: Union[None, Compressor]
+        """
+        if not compression:
+            return None
+        if isinstance(compression, Compressor):
+            return compression
+        if compression is True:
+            compression = 'gzip'
+        return cls(encoding=compression, level=level, threshold=threshold)
+
+    @property
+    def encoding(self):
+        """
+        :rtype: str
+        """
+        return self._encoding
+
+    @property
+    def level(self):
+        """
+        :rtype: int
+        """
+        return self._level
+
+    @property
+    def threshold(self):
+        """
+        :rtype: int
+        """
+        return self._threshold
+
+    def __call__(self, data):
+        """
+        Compress the data if it is large enough.
+
+        :param data: Request body (text is utf-8 encoded).
+        :type data: Union[bytes, six.text_type]
+        :return: The (possibly) compressed body and it's Content-Encoding, or
+            None if it was not compressed.
+        :rtype: tuple(bytes, Union[None, str])
+        """
+        if not isinstance(data, bytes):
+            data = data.encode('utf-8')
+
+        if len(data) < self._threshold:
+            return data, None
+
+        compressor = zlib.compressobj(
+            self._level, zlib.DEFLATED, _WBITS[self._encoding])
+        return compressor.compress(data) + compressor.flush(), self._encoding
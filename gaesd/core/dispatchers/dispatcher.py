@@ -2,44 +2,132 @@
 # -*- coding: latin-1 -*-
 
 import abc
-from logging import getLogger
+import threading
+import weakref
 
 import six
+from six.moves import queue
 
-__all__ = ['Dispatcher']
+from gaesd.core.context import new_context
+from gaesd.core.dispatchers.chunking import COMPACT_SEPARATORS, split_traces
+from gaesd.core.utils import ClassLogger
+
+__all__ = ['Dispatcher', 'TracePatch']
+
+
+class TracePatch(object):
+    """
+    The spans of a Trace that completed since it was last dispatched.
+    """
+
+    def __init__(self, trace, start, stop):
+        """
+        :param gaesd.Trace trace: The trace being patched.
+        :param int start: Index of the first completed span to send.
+        :param int stop: Index after the last completed span to send.
+        """
+        self._trace = trace
+        self._start = start
+        self._stop = stop
+
+    def __repr__(self):
+        return 'TracePatch({0})[{1}:{2}]'.format(
+            self._trace.trace_id, self._start, self._stop)
+
+    @property
+    def trace(self):
+        """
+        Retrieve the trace being patched.
+
+        :rtype: gaesd.Trace
+        """
+        return self._trace
+
+    @property
+    def start(self):
+        """
+        Retrieve the index of the first completed span to send.
+
+        :rtype: int
+        """
+        return self._start
+
+    @property
+    def stop(self):
+        """
+        Retrieve the index after the last completed span to send.
+
+        :rtype: int
+        """
+        return self._stop
+
+    def merge(self, other):
+        """
+        Combine this patch with a later patch of the same trace.
+
+        :param TracePatch other: The later patch.
+        :return: A patch covering both patches.
+        :rtype: TracePatch
+        """
+        if other.trace is not self.trace:
+            raise ValueError('Cannot merge patches of different traces')
+
+        return TracePatch(
+            self.trace,
+            min(self.start, other.start),
+            max(self.stop, other.stop),
+        )
+
+    def export(self):
+        """
+        Export the patched spans of the trace as a dict.
+
+        :rtype: Dict[str, str]
+        """
+        return self._trace.export_completed(self._start, self._stop)
 
 
 @six.add_metaclass(abc.ABCMeta)
 class Dispatcher(object):
     """
     Base dispatcher class.
+
+    A dispatcher is shared by every thread (and asyncio task) using it's
+        SDK: each of them caches it's own traces awaiting dispatch.
     """
+    #: JSON separators of the request bodies, to measure them by:
+    JSON_SEPARATORS = COMPACT_SEPARATORS
 
-    def __init__(self, sdk=None, auto=True):
+    def __init__(
+        self, sdk=None, auto=True, max_batch_bytes=None, max_batch_traces=None,
+        concurrency=None,
+    ):
         """
         :param gaesd.SDK sdk: SDK instance to use.
         :param bool auto: True=dispatch traces immediately upon span completion,
             False=Otherwise.
+        :param int max_batch_bytes: Split dispatches into requests whose
+            JSON body (encoded with `JSON_SEPARATORS`) is at most this many
+            bytes.
+            Default=Unlimited.
+        :param int max_batch_traces: Split dispatches into requests of at most
+            this many traces. Default=Unlimited.
+        :param int concurrency: Number of split requests to send at once.
+            Default=1.
         """
         self._sdk = sdk
         self._auto = auto
-        self._traces = []
-
-    @property
-    def logger(self):
-        """
-        Retrieve this dispatchers's logger instance.
-        """
-        my_id = id(self)
-        name = self.__class__.__name__
-        logger_name = '{name}.{my_id}'.format(my_id=my_id, name=name)
+        # The traces awaiting dispatch, per thread (or task):
+        self._cache = new_context()
+        self._max_batch_bytes = max_batch_bytes
+        self._max_batch_traces = max_batch_traces
+        self._concurrency = concurrency or 1
+        # Number of each trace's completed spans already dispatched:
+        self._marks = weakref.WeakKeyDictionary()
+        self._marks_lock = threading.Lock()
 
-        logger = self.sdk.loggers.get(logger_name)
-        if logger is None:
-            self.sdk.loggers[logger_name] = getLogger(
-                '{name}'.format(name=logger_name))
-
-        return self.sdk.loggers[logger_name]
+    #: Shared by every instance of the class:
+    logger = ClassLogger()
 
     def set_logging_level(self, level):
         """
@@ -57,11 +145,24 @@ class Dispatcher(object):
         """
         Retrieve a list of the cached traces awaiting dispatch.
 
-        :return: A shallow-copy list of this dispatchers traces.
+        :return: A shallow-copy list of this dispatchers traces (those of
+            the current thread or task).
         :rtype: list(gaesd.Trace)
         """
         return self._traces[:]
 
+    @property
+    def _traces(self):
+        try:
+            return self._cache.traces
+        except AttributeError:
+            return []
+
+    @_traces.setter
+    def _traces(self, traces):
+        # Copy-on-write (see `gaesd.core.context.Context`):
+        self._cache.traces = traces
+
     @property
     def sdk(self):
         """
@@ -97,14 +198,42 @@ class Dispatcher(object):
         """
         self._auto = auto
 
+    @property
+    def max_batch_bytes(self):
+        """
+        Retrieve the maximum encoded size of a single request.
+
+        :rtype: Union[None, int]
+        """
+        return self._max_batch_bytes
+
+    @property
+    def max_batch_traces(self):
+        """
+        Retrieve the maximum number of traces in a single request.
+
+        :rtype: Union[None, int]
+        """
+        return self._max_batch_traces
+
+    @property
+    def concurrency(self):
+        """
+        Retrieve the number of split requests sent at once.
+
+        :rtype: int
+        """
+        return self._concurrency
+
     @property
     def is_enabled(self):
         """
-        Determine if this dispatcher is enabled
+        Determine if this dispatcher is enabled (using the SDK's cached
+            enabler result).
 
         :rtype: bool
         """
-        return self.sdk.is_enabled
+        return self.sdk.enabled_fast
 
     def __call__(self):
         """
@@ -114,16 +243,33 @@ class Dispatcher(object):
         :return: This dispatcher's enabled state.
         :rtype: bool
         """
-        if self.is_enabled:
+        dispatched = self._dispatch_all(self.is_enabled, self.traces)
+        self._traces = []
+        return dispatched
+
+    def _dispatch_all(self, enabled, traces):
+        """
+        Dispatch (or discard) the cached traces.
+
+        :note: Safe to call from any thread, unlike `__call__`.
+        :param bool enabled: True=Dispatch the traces, False=Discard them.
+        :param list(gaesd.Trace) traces: The cached traces.
+        :return: enabled.
+        :rtype: bool
+        """
+        if enabled and traces:
             self.logger.debug('Forced immediate dispatch')
-            self._dispatch(self.traces)
-            dispatched = True
-        else:
-            dispatched = False
+            self._dispatch_chunked(traces)
+            self._acknowledge(traces)
 
-        self._traces = []
+        return enabled
 
-        return dispatched
+    def warmup(self):
+        """
+        Do any expensive one-off setup (eg: building API clients) now rather
+            than on the first dispatch. Call this from a warmup request
+            handler.
+        """
 
     @abc.abstractmethod
     def _dispatch(self, traces):
@@ -136,6 +282,65 @@ class Dispatcher(object):
         """
         raise NotImplementedError  # pragma: no cover
 
+    def _dispatch_chunked(self, traces):
+        """
+        Dispatch the traces, split into requests within this dispatcher's
+            `max_batch_bytes` and `max_batch_traces` limits.
+
+        If any request fails, the first error is raised once all requests
+            have completed (nothing is acknowledged, so every trace is sent
+            again: StackDriver merges spans it already has).
+
+        :param traces: The traces (or trace patches) to dispatch.
+        :type traces: list(Union[gaesd.Trace, TracePatch])
+        """
+        if self._max_batch_bytes is None and self._max_batch_traces is None:
+            return self._dispatch(traces)
+
+        chunks = split_traces(
+            traces,
+            max_bytes=self._max_batch_bytes,
+            max_traces=self._max_batch_traces,
+            separators=self.JSON_SEPARATORS,
+        )
+        self.logger.debug(
+            'Dispatching %d traces in %d requests', len(traces), len(chunks))
+
+        if self._concurrency < 2 or len(chunks) < 2:
+            for chunk in chunks:
+                self._dispatch(chunk)
+        else:
+            self._dispatch_concurrently(chunks)
+
+    def _dispatch_concurrently(self, chunks):
+        pending = queue.Queue()
+        for chunk in chunks:
+            pending.put(chunk)
+        errors = []
+
+        def run():
+            while True:
+                try:
+                    chunk = pending.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    self._dispatch(chunk)
+                except Exception as e:
+                    errors.append(e)
+
+        threads = [
+            threading.Thread(target=run)
+            for _ in range(min(self._concurrency, len(chunks)))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if errors:
+            raise errors[0]
+
     def patch_trace(self, trace):
         """
         Ingest a new Trace into this dispatcher.
@@ -146,15 +351,65 @@ class Dispatcher(object):
         :param gaesd.Trace trace: The trace instance to ingest.
         """
         if self.auto:
+            patch = self._patch_for(trace)
+            if patch is not None:
+                # This patch supersedes any un-acknowledged one for the trace:
+                self._traces = [
+                    i for i in self._traces
+                    if getattr(i, 'trace', i) is not trace
+                ] + [patch]
+
+            if not self._traces:
+                return
+
             # Dispatch immediately:
             self.logger.debug('Immediate dispatch')
-            # Also dispatch any cached traces:
-            self._traces.append(trace)
-            self._dispatch(self._traces)
+            # Also dispatch any cached (un-acknowledged) traces:
+            traces = self._traces
+            self._dispatch_chunked(traces)
+            self._acknowledge(traces)
+            self._traces = []
         else:
             if trace in self._traces:
                 # Trace already cached!
                 return
             # Dispatch when called:
             self.logger.debug('Delayed dispatch')
-            self._traces.append(trace)
+            self._traces = self._traces + [trace]
+
+    def _patch_for(self, trace):
+        """
+        Create a patch of the trace's spans that completed since it was last
+            dispatched.
+
+        :param gaesd.Trace trace: The trace to patch.
+        :return: The patch, or None if no new spans completed.
+        :rtype: TracePatch
+        """
+        with self._marks_lock:
+            start = self._marks.get(trace, 0)
+        stop = trace.completed_offset
+
+        if stop <= start:
+            return None
+
+        return TracePatch(trace, start, stop)
+
+    def _acknowledge(self, traces):
+        """
+        Record that the traces (or trace patches) were dispatched, so that
+            their spans are not sent again.
+
+        :param traces: The dispatched traces and trace patches.
+        :type traces: list(Union[gaesd.Trace, TracePatch])
+        """
+        for item in traces:
+            if isinstance(item, TracePatch):
+                trace, stop = item.trace, item.stop
+            elif hasattr(item, 'completed_offset'):
+                trace, stop = item, item.completed_offset
+            else:
+                continue
+
+            with self._marks_lock:
+                self._marks[trace] = max(self._marks.get(trace, 0), stop)
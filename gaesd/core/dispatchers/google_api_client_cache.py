@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+
+import datetime
+import io
+import os
+import threading
+from logging import getLogger
+
+try:
+    import httplib2
+    from googleapiclient import discovery
+    from oauth2client.client import GoogleCredentials
+except ImportError:  # pragma: no cover
+    httplib2 = discovery = GoogleCredentials = None
+
+__all__ = ['DISCOVERY_DOCUMENT', 'GoogleApiClientCache', 'client_cache']
+
+#: The cloudtrace v1 discovery document bundled with this package:
+DISCOVERY_DOCUMENT = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'cloudtrace.v1.json')
+
+
+class GoogleApiClientCache(object):
+    """
+    Process-wide, thread-safe cache of the cloudtrace service and the
+        credentials it uses.
+
+    The service is built once, from a discovery document on disk rather
+        than one fetched over the network, and shared by every dispatcher.
+        Each thread gets it's own authorized `httplib2.Http` (which is not
+        thread-safe) to execute requests with.
+    """
+    #: Refresh the access token this many seconds before it expires:
+    REFRESH_MARGIN = 300
+    #: Wait this many seconds before retrying a failed refresh:
+    RETRY_INTERVAL = 30
+
+    def __init__(self, discovery_document=DISCOVERY_DOCUMENT):
+        """
+        :param str discovery_document: Path of the cloudtrace v1 discovery
+            document to build the service from. None=Fetch it from the
+            network. Default=The bundled document.
+        """
+        self.discovery_document = discovery_document
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self._credentials = None
+        self._service = None
+        self._refresher = None
+        self._stopped = threading.Event()
+
+    @property
+    def credentials(self):
+        """
+        Retrieve the (application default) credentials.
+
+        :rtype: oauth2client.client.GoogleCredentials
+        """
+        if self._credentials is None:
+            with self._lock:
+                if self._credentials is None:
+                    self._credentials = \
+                        GoogleCredentials.get_application_default()
+        return self._credentials
+
+    @property
+    def service(self):
+        """
+        Retrieve the cloudtrace service.
+
+        :rtype: googleapiclient.discovery.Resource
+        """
+        if self._service is None:
+            with self._lock:
+                if self._service is None:
+                    self._service = self._build()
+        return self._service
+
+    def _build(self):
+        document = self._read_discovery_document()
+
+        if document is None:
+            return discovery.build(
+                'cloudtrace',
+                'v1',
+                credentials=self.credentials,
+            )
+
+        return discovery.build_from_document(
+            document,
+            credentials=self.credentials,
+        )
+
+    def _read_discovery_document(self):
+        path = self.discovery_document
+        if path is None:
+            return None
+
+        try:
+            with io.open(path, encoding='utf-8') as f:
+                return f.read()
+        except (IOError, OSError):
+            getLogger(self.__class__.__name__).warning(
+                'Cannot read discovery document %s, fetching it instead',
+                path)
+            return None
+
+    @property
+    def http(self):
+        """
+        Retrieve the current thread's authorized http object.
+
+        :rtype: httplib2.Http
+        """
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            http = self.credentials.authorize(httplib2.Http())
+            self._local.http = http
+        return http
+
+    def refresh(self):
+        """
+        Refresh the access token if it is missing or about to expire.
+
+        :return: Seconds until the token next needs refreshing.
+        :rtype: float
+        """
+        credentials = self.credentials
+        now = datetime.datetime.utcnow()
+        margin = datetime.timedelta(seconds=self.REFRESH_MARGIN)
+        expiry = getattr(credentials, 'token_expiry', None)
+
+        if getattr(credentials, 'access_token', None) is None or \
+                expiry is None or expiry - margin <= now:
+            with self._lock:
+                credentials.refresh(httplib2.Http())
+            expiry = getattr(credentials, 'token_expiry', None)
+
+        if expiry is None:
+            return self.RETRY_INTERVAL
+
+        wait = (expiry - margin - now).total_seconds()
+        return max(wait, self.RETRY_INTERVAL)
+
+    def warmup(self):
+        """
+        Build the service and fetch an access token now, eg: from an
+            AppEngine warmup request handler.
+        """
+        _ = self.service  # NOQA: F841
+        self.refresh()
+
+    def prefetch(self):
+        """
+        Build the service and start refreshing the access token in the
+            background, so neither happens on the dispatch path.
+        """
+        _ = self.service  # NOQA: F841
+
+        with self._lock:
+            if self._refresher is not None and self._refresher.is_alive():
+                return
+            self._stopped.clear()
+            refresher = threading.Thread(
+                target=self._run,
+                name='{0}-refresher'.format(self.__class__.__name__),
+            )
+            refresher.daemon = True
+            refresher.start()
+            self._refresher = refresher
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                wait = self.refresh()
+            except Exception:
+                wait = self.RETRY_INTERVAL
+            self._stopped.wait(wait)
+
+    def clear(self):
+        """
+        Stop the background refresher and forget the service and
+            credentials.
+        """
+        with self._lock:
+            self._stopped.set()
+            refresher, self._refresher = self._refresher, None
+            self._credentials = None
+            self._service = None
+            self._local = threading.local()
+
+        if refresher is not None:
+            refresher.join()
+
+
+#: The process-wide cache used by all GoogleApiClientDispatchers:
+client_cache = GoogleApiClientCache()
@@ -11,7 +11,10 @@ except ImportError:  # pragma: no cover
         'GoogleApiClientDispatcher not available, please vendor-in required '
         'package: `google_api_python_client` and `oauth2client`')
 else:
+    from gaesd.core.dispatchers.chunking import DEFAULT_SEPARATORS
+    from gaesd.core.dispatchers.compression import Compressor
     from gaesd.core.dispatchers.dispatcher import Dispatcher
+    from gaesd.core.dispatchers.google_api_client_cache import client_cache
 
     __all__ = ['GoogleApiClientDispatcher']
 
@@ -19,34 +22,88 @@ else:
         """
         Dispatcher that uses the googleapiclient.
         """
+        _client_cache = client_cache
+        #: googleapiclient encodes bodies with `json.dumps`' defaults:
+        JSON_SEPARATORS = DEFAULT_SEPARATORS
+
+        def __init__(
+            self, sdk=None, auto=True, compression=None,
+            compression_level=None, compression_threshold=None, **kwargs
+        ):
+            """
+            :param gaesd.SDK sdk: SDK instance to use.
+            :param bool auto: True=dispatch traces immediately upon span
+                completion, False=Otherwise.
+            :param compression: Content-Encoding to compress request bodies
+                with (`gzip` or `deflate`), or a Compressor.
+                Default=No compression.
+            :type compression: Union[None, str, Compressor]
+            :param int compression_level: zlib compression level (1-9).
+            :param int compression_threshold: Request bodies smaller than
+                this many bytes are not compressed.
+            :param kwargs: Passed directly through to the Dispatcher
+                constructor (`max_batch_bytes`, `max_batch_traces`,
+                `concurrency`).
+            """
+            super(GoogleApiClientDispatcher, self).__init__(
+                sdk=sdk, auto=auto, **kwargs)
+            self._compressor = Compressor.new(
+                compression,
+                level=compression_level,
+                threshold=compression_threshold,
+            )
+
+        @property
+        def compressor(self):
+            """
+            Retrieve the compressor applied to request bodies.
+
+            :rtype: Union[None, Compressor]
+            """
+            return self._compressor
+
+        def warmup(self):
+            """
+            Build the cloudtrace service and fetch an access token now, then
+                keep refreshing the token in the background (see
+                `GoogleApiClientCache.prefetch`).
+            """
+            self._client_cache.warmup()
+            self._client_cache.prefetch()
 
         def _prep(self, traces):
-            if not hasattr(self, '__credentials'):
-                self.__credentials = GoogleCredentials.get_application_default()
-            if not hasattr(self, '__service'):
-                self.__service = discovery.build(
-                    'cloudtrace',
-                    'v1',
-                    credentials=self.__credentials,
-                )
+            service = self._client_cache.service
 
             project_id = self.sdk.project_id
             body = {
                 'traces': [trace.export() for trace in traces],
             }
 
-            self.logger.debug('PROJECT_ID: {0}'.format(project_id))
-            self.logger.debug('BODY: {0}'.format(body))
+            self.logger.debug('PROJECT_ID: %s', project_id)
+            self.logger.debug('BODY: %s', body)
 
-            return self.__service.projects().patchTraces(
+            request = service.projects().patchTraces(
                 projectId=self.sdk.project_id,
                 body=body,
             )
 
+            if self._compressor is not None:
+                self._compress(request)
+
+            return request
+
+        def _compress(self, request):
+            body, encoding = self._compressor(request.body)
+            if encoding:
+                request.body = body
+                request.body_size = len(body)
+                request.headers['content-encoding'] = encoding
+                request.headers['content-length'] = str(len(body))
+
         def _dispatch(self, traces):  # pragma: no cover
             return self._emit(
                 self._prep(traces),
             )
 
         def _emit(self, request):  # pragma: no cover
-            return request.execute()
+            return request.execute(http=self._client_cache.http)
@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+
+import socket
+import ssl
+import threading
+
+from six.moves import http_client, queue
+from six.moves.urllib.parse import urlsplit
+
+__all__ = ['ConnectionPool', 'pool_for']
+
+# TLS session resumption needs python 3.6+:
+_HAS_TLS_SESSIONS = hasattr(ssl.SSLSocket, 'session')
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def pool_for(url, **pool_args):
+    """
+    Retrieve the process-wide connection pool for the url's host, creating
+        it if necessary.
+
+    :param str url: Url (or root url) to connect to.
+    :param pool_args: Passed directly to the ConnectionPool constructor when
+        the pool is created.
+    :rtype: ConnectionPool
+    """
+    parts = urlsplit(url)
+    key = (parts.scheme, parts.netloc)
+
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = _pools[key] = ConnectionPool(url, **pool_args)
+
+    return pool
+
+
+def _no_delay(sock):
+    # Headers and body are sent separately; don't let Nagle's algorithm hold
+    # the body back waiting for the (delayed) ACK of the headers:
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    return sock
+
+
+class _HTTPConnection(http_client.HTTPConnection):
+    """
+    HTTP connection with Nagle's algorithm disabled.
+    """
+
+    def connect(self):
+        http_client.HTTPConnection.connect(self)
+        _no_delay(self.sock)
+
+
+class _HTTPSConnection(http_client.HTTPSConnection):
+    """
+    HTTPS connection that resumes it's pool's last TLS session.
+    """
+
+    def __init__(self, host, port=None, timeout=None, context=None, pool=None):
+        http_client.HTTPSConnection.__init__(
+            self, host, port, timeout=timeout, context=context)
+        self._ssl_context = context
+        self._pool = pool
+
+    def connect(self):
+        sock = _no_delay(
+            socket.create_connection((self.host, self.port), self.timeout))
+
+        kwargs = {'server_hostname': self.host}
+        if _HAS_TLS_SESSIONS and self._pool.tls_session is not None:
+            kwargs['session'] = self._pool.tls_session
+
+        self.sock = self._ssl_context.wrap_socket(sock, **kwargs)
+
+        if _HAS_TLS_SESSIONS:
+            self._pool.tls_session = self.sock.session
+
+
+class ConnectionPool(object):
+    """
+    Thread-safe pool of persistent HTTP/1.1 connections to a single host.
+    """
+    SIZE = 4
+    TIMEOUT = 10
+
+    def __init__(self, url, size=None, timeout=None, ssl_context=None):
+        """
+        :param str url: Url (or root url) of the host to connect to.
+        :param int size: Maximum number of idle connections kept open.
+            Default=`SIZE`.
+        :param float timeout: Socket timeout in seconds. Default=`TIMEOUT`.
+        :param ssl.SSLContext ssl_context: Context for https connections.
+            Default=`ssl.create_default_context()`.
+        """
+        parts = urlsplit(url)
+        self._scheme = parts.scheme
+        self._host = parts.hostname
+        self._port = parts.port
+        self._timeout = timeout or self.TIMEOUT
+        self._idle = queue.LifoQueue(maxsize=size or self.SIZE)
+        self._ssl_context = ssl_context
+        if self._scheme == 'https' and ssl_context is None:
+            self._ssl_context = ssl.create_default_context()
+        self.tls_session = None
+        self._created = 0
+
+    def __repr__(self):
+        return 'ConnectionPool({0}://{1}:{2})[{3}]'.format(
+            self._scheme, self._host, self._port, self._idle.qsize())
+
+    @property
+    def created(self):
+        """
+        Retrieve the number of connections this pool has opened.
+
+        :rtype: int
+        """
+        return self._created
+
+    def _new_connection(self):
+        self._created += 1
+
+        if self._scheme == 'https':
+            return _HTTPSConnection(
+                self._host,
+                self._port,
+                timeout=self._timeout,
+                context=self._ssl_context,
+                pool=self,
+            )
+
+        return _HTTPConnection(
+            self._host, self._port, timeout=self._timeout)
+
+    def _get(self):
+        try:
+            return self._idle.get_nowait(), True
+        except queue.Empty:
+            return self._new_connection(), False
+
+    def _put(self, connection):
+        try:
+            self._idle.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    def request(self, method, path, body=None, headers=None):
+        """
+        Send a request over a pooled connection.
+
+        A request that fails on a re-used connection (eg: the server closed
+            it while idle) is retried once on a new connection.
+
+        :param str method: HTTP method.
+        :param str path: Path (and query) of the request.
+        :param bytes body: Request body.
+        :param dict headers: Request headers.
+        :return: The response status, headers and body.
+        :rtype: tuple(int, dict, bytes)
+        """
+        headers = headers or {}
+
+        while True:
+            connection, reused = self._get()
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                data = response.read()
+            except (http_client.HTTPException, socket.error):
+                connection.close()
+                if reused:
+                    continue
+                raise
+
+            if response.will_close:
+                connection.close()
+            else:
+                self._put(connection)
+
+            return (
+                response.status,
+                dict((k.lower(), v) for k, v in response.getheaders()),
+                data,
+            )
+
+    def close(self):
+        """
+        Close all idle connections.
+        """
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
@@ -0,0 +1,305 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+
+import random
+import threading
+import time
+from collections import deque
+
+__all__ = [
+    'RetryPolicy',
+    'CircuitBreaker',
+    'DispatchMetrics',
+    'DropFallback',
+    'SpoolFallback',
+    'error_status',
+]
+
+
+def error_status(error):
+    """
+    Retrieve the HTTP status of a failed dispatch.
+
+    :param Exception error: The error raised by the dispatch.
+    :return: The status, or None if the error has no HTTP status (eg: a
+        socket error).
+    :rtype: Union[None, int]
+    """
+    status = getattr(error, 'status', None)
+    if status is None:
+        # googleapiclient.errors.HttpError:
+        status = getattr(getattr(error, 'resp', None), 'status', None)
+
+    try:
+        return int(status)
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy(object):
+    """
+    Bounded retries with exponential backoff and full jitter.
+
+    The n'th retry waits a random time between 0 and
+        `min(max_delay, base_delay * 2 ** n)` seconds.
+    """
+    RETRIES = 3
+    BASE_DELAY = 0.1
+    MAX_DELAY = 5.0
+    # Client errors other than these will fail again if retried:
+    RETRYABLE_STATUSES = (408, 429)
+
+    def __init__(
+        self, retries=None, base_delay=None, max_delay=None, sleep=time.sleep,
+    ):
+        """
+        :param int retries: Maximum number of retries after the first attempt.
+            Default=`RETRIES`.
+        :param float base_delay: Backoff of the first retry in seconds.
+            Default=`BASE_DELAY`.
+        :param float max_delay: Maximum backoff in seconds.
+            Default=`MAX_DELAY`.
+        :param callable sleep: Function used to wait.
+        """
+        self._retries = self.RETRIES if retries is None else retries
+        self._base_delay = base_delay or self.BASE_DELAY
+        self._max_delay = max_delay or self.MAX_DELAY
+        self._sleep = sleep
+
+    def __repr__(self):
+        return 'RetryPolicy(retries={0}, base={1}, max={2})'.format(
+            self._retries, self._base_delay, self._max_delay)
+
+    @property
+    def retries(self):
+        """
+        :rtype: int
+        """
+        return self._retries
+
+    def is_retryable(self, error):
+        """
+        Determine if the failed dispatch may succeed if retried.
+
+        :param Exception error: The error raised by the dispatch.
+        :rtype: bool
+        """
+        status = error_status(error)
+        if status is None or status >= 500:
+            return True
+        return status in self.RETRYABLE_STATUSES
+
+    def delay(self, retry):
+        """
+        Retrieve the (jittered) time to wait before a retry.
+
+        :param int retry: Zero-based index of the retry.
+        :rtype: float
+        """
+        ceiling = min(self._max_delay, self._base_delay * (2 ** retry))
+        return random.uniform(0, ceiling)
+
+    def backoff(self, retry):
+        """
+        Wait before a retry.
+
+        :param int retry: Zero-based index of the retry.
+        """
+        self._sleep(self.delay(retry))
+
+
+class CircuitBreaker(object):
+    """
+    Stops dispatching to a degraded API.
+
+    The breaker opens after `failure_threshold` consecutive failed
+        dispatches. While open, dispatches are rejected. After
+        `reset_timeout` seconds one trial dispatch is allowed (half-open):
+        success closes the breaker, failure opens it again.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    FAILURE_THRESHOLD = 5
+    RESET_TIMEOUT = 30.0
+
+    def __init__(
+        self, failure_threshold=None, reset_timeout=None, clock=time.time,
+    ):
+        """
+        :param int failure_threshold: Number of consecutive failures that
+            open the breaker. Default=`FAILURE_THRESHOLD`.
+        :param float reset_timeout: Seconds to stay open before allowing a
+            trial dispatch. Default=`RESET_TIMEOUT`.
+        :param callable clock: Function returning the current time in seconds.
+        """
+        self._failure_threshold = failure_threshold or self.FAILURE_THRESHOLD
+        self._reset_timeout = reset_timeout if reset_timeout is not None \
+            else self.RESET_TIMEOUT
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+
+    def __repr__(self):
+        return 'CircuitBreaker({0})[{1}]'.format(self.state, self._failures)
+
+    @property
+    def state(self):
+        """
+        Retrieve the breaker's state: `CLOSED`, `OPEN` or `HALF_OPEN`.
+
+        :rtype: str
+        """
+        if self._opened_at is None:
+            return self.CLOSED
+        if self._clock() - self._opened_at < self._reset_timeout:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    def allow(self):
+        """
+        Determine if a dispatch may be attempted now.
+
+        Only one trial dispatch is allowed at a time while half-open.
+
+        :rtype: bool
+        """
+        with self._lock:
+            state = self.state
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        """
+        Record a successful dispatch (closing the breaker).
+        """
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        """
+        Record a failed dispatch.
+
+        :return: True if this failure opened the breaker.
+        :rtype: bool
+        """
+        with self._lock:
+            self._failures += 1
+            was_open = self._opened_at is not None
+            if was_open or self._failures >= self._failure_threshold:
+                self._opened_at = self._clock()
+            self._trial = False
+            return not was_open and self._opened_at is not None
+
+
+class DispatchMetrics(object):
+    """
+    Thread-safe counters describing the outcome of dispatches.
+    """
+    NAMES = (
+        'attempts',
+        'successes',
+        'failures',
+        'retries',
+        'rejected',
+        'dropped',
+        'spooled',
+        'circuit_opened',
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = dict((name, 0) for name in self.NAMES)
+
+    def __repr__(self):
+        return 'DispatchMetrics({0})'.format(self.snapshot())
+
+    def __getitem__(self, name):
+        return self._counters[name]
+
+    def increment(self, name, count=1):
+        """
+        Increment a counter.
+
+        :param str name: The counter, one of `NAMES`.
+        :param int count: Amount to add.
+        """
+        with self._lock:
+            self._counters[name] += count
+
+    def snapshot(self):
+        """
+        Retrieve a copy of all counters.
+
+        :rtype: dict
+        """
+        with self._lock:
+            return dict(self._counters)
+
+
+class DropFallback(object):
+    """
+    Fallback that discards traces that could not be dispatched.
+    """
+    metric = 'dropped'
+
+    def __call__(self, traces):
+        """
+        :param list traces: The traces (or trace patches) not dispatched.
+        """
+
+    def drain(self):
+        """
+        :return: Nothing - dropped traces are gone.
+        :rtype: list
+        """
+        return []
+
+
+class SpoolFallback(object):
+    """
+    Fallback that keeps (up to `max_size`) traces that could not be
+        dispatched in memory, so they can be sent once the API recovers.
+
+    The oldest traces are discarded once the spool is full.
+    """
+    metric = 'spooled'
+    MAX_SIZE = 1000
+
+    def __init__(self, max_size=None):
+        """
+        :param int max_size: Maximum number of spooled traces.
+            Default=`MAX_SIZE`.
+        """
+        self._spool = deque(maxlen=max_size or self.MAX_SIZE)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._spool)
+
+    def __call__(self, traces):
+        """
+        :param list traces: The traces (or trace patches) not dispatched.
+        """
+        with self._lock:
+            self._spool.extend(traces)
+
+    def drain(self):
+        """
+        Remove and return all spooled traces.
+
+        :rtype: list
+        """
+        with self._lock:
+            traces = list(self._spool)
+            self._spool.clear()
+            return traces
@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+
+import six
+
+from gaesd.core.dispatchers.dispatcher import Dispatcher
+from gaesd.core.dispatchers.resilience import (
+    CircuitBreaker, DispatchMetrics, DropFallback, RetryPolicy, SpoolFallback,
+)
+
+__all__ = ['ResilientDispatcher']
+
+_FALLBACKS = {
+    'drop': DropFallback,
+    'spool': SpoolFallback,
+}
+
+
+class ResilientDispatcher(Dispatcher):
+    """
+    Dispatcher that never raises: it sends traces through another dispatcher
+    (the `GoogleApiClientDispatcher` by default), retrying failed dispatches
+    with jittered exponential backoff.
+
+    Repeated failures open a circuit breaker. While it is open, dispatches
+    are not attempted and traces go straight to the fallback: `drop` them,
+    or `spool` them in memory to be sent with the next successful dispatch.
+
+    Outcomes are counted in `metrics` (per dispatch: `attempts`,
+    `successes`, `failures`, `retries`, `circuit_opened`; per trace:
+    `rejected`, `dropped`, `spooled`).
+
+    :note: Retries back off on the dispatching thread. To keep them off the
+        request thread, use this as a `BatchingDispatcher`'s dispatcher.
+    """
+
+    def __init__(
+        self, sdk=None, auto=True, dispatcher=None, retry=None, breaker=None,
+        fallback=None, metrics=None, **kwargs
+    ):
+        """
+        :param gaesd.SDK sdk: SDK instance to use.
+        :param bool auto: True=dispatch traces immediately upon span completion,
+            False=Otherwise.
+        :param dispatcher: Dispatcher type used to send traces.
+            Default=GoogleApiClientDispatcher.
+        :type dispatcher: type(Dispatcher)
+        :param RetryPolicy retry: Default=`RetryPolicy()`.
+        :param CircuitBreaker breaker: Default=`CircuitBreaker()`.
+        :param fallback: What to do with traces that could not be sent:
+            `drop`, `spool` or a DropFallback/SpoolFallback-like instance.
+            Default=`drop`.
+        :type fallback: Union[None, str, DropFallback, SpoolFallback]
+        :param DispatchMetrics metrics: Counters to report outcomes to.
+            Default=`DispatchMetrics()`.
+        :param kwargs: Passed directly through to the Dispatcher constructor.
+        """
+        super(ResilientDispatcher, self).__init__(sdk=sdk, auto=auto, **kwargs)
+
+        if dispatcher is None:
+            from gaesd.core.dispatchers.google_api_client_dispatcher import \
+                GoogleApiClientDispatcher
+            dispatcher = GoogleApiClientDispatcher
+
+        if fallback is None:
+            fallback = 'drop'
+        if isinstance(fallback, six.string_types):
+            fallback = _FALLBACKS[fallback]()
+
+        self._dispatcher = dispatcher(sdk=sdk, auto=False)
+        self._retry = retry or RetryPolicy()
+        self._breaker = breaker or CircuitBreaker()
+        self._fallback = fallback
+        self._metrics = metrics or DispatchMetrics()
+
+    @property
+    def sdk(self):
+        """
+        Retrieve the SDK that this dispatcher is associated with.
+
+        :rtype:  gaesd.SDK
+        """
+        return self._sdk
+
+    @sdk.setter
+    def sdk(self, sdk):
+        """
+        Set the SDK that this dispatcher (and it's target dispatcher) is
+            associated with.
+
+        :param gaesd.SDK sdk: The new SDK to use.
+        """
+        self._sdk = sdk
+        self._dispatcher.sdk = sdk
+
+    @property
+    def dispatcher(self):
+        """
+        Retrieve the dispatcher used to send traces.
+
+        :rtype: Dispatcher
+        """
+        return self._dispatcher
+
+    @property
+    def retry(self):
+        """
+        :rtype: RetryPolicy
+        """
+        return self._retry
+
+    @property
+    def breaker(self):
+        """
+        :rtype: CircuitBreaker
+        """
+        return self._breaker
+
+    @property
+    def fallback(self):
+        """
+        :rtype: Union[DropFallback, SpoolFallback]
+        """
+        return self._fallback
+
+    @property
+    def metrics(self):
+        """
+        :rtype: DispatchMetrics
+        """
+        return self._metrics
+
+    def warmup(self):
+        """
+        Warm up the dispatcher used to send traces.
+        """
+        self._dispatcher.warmup()
+
+    def _dispatch(self, traces):
+        """
+        Send the traces (and any spooled traces), retrying on failure.
+
+        :param traces: List of traces to send to StackDriver.
+        :type traces: [core.Trace]
+        """
+        if not self._breaker.allow():
+            self._metrics.increment('rejected', len(traces))
+            self._fall_back(traces)
+            return
+
+        traces = list(traces)
+        spooled = self._fallback.drain()
+        error = self._attempt(spooled + traces)
+
+        if error is None:
+            self._breaker.record_success()
+            self._metrics.increment('successes')
+            return
+
+        self._metrics.increment('failures')
+        self.logger.warning(
+            'Failed to dispatch %s traces: %r', len(spooled) + len(traces),
+            error)
+
+        if self._breaker.record_failure():
+            self._metrics.increment('circuit_opened')
+            self.logger.warning('Circuit breaker opened')
+
+        self._fall_back(traces, spooled=spooled)
+
+    def _attempt(self, traces):
+        """
+        Send the traces, with retries.
+
+        :return: The last error, or None on success.
+        :rtype: Union[None, Exception]
+        """
+        retry = 0
+        while True:
+            self._metrics.increment('attempts')
+            try:
+                self._dispatcher._dispatch_chunked(traces)
+            except Exception as e:
+                if retry >= self._retry.retries or \
+                        not self._retry.is_retryable(e):
+                    return e
+            else:
+                return None
+
+            self._metrics.increment('retries')
+            self._retry.backoff(retry)
+            retry += 1
+
+    def _fall_back(self, traces, spooled=()):
+        # Spooled traces were counted when they first fell back:
+        self._fallback(list(spooled) + traces)
+        self._metrics.increment(self._fallback.metric, len(traces))
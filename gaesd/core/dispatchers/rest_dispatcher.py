@@ -2,25 +2,78 @@
 # -*- coding: latin-1 -*-
 
 import abc
+import json
 from collections import namedtuple
 
+from six.moves.urllib.parse import urlsplit
+
+from gaesd.core.dispatchers.compression import Compressor
 from gaesd.core.dispatchers.dispatcher import Dispatcher
+from gaesd.core.dispatchers.http_pool import pool_for
+from gaesd.core.utils import DispatchError
 
 PrepData = namedtuple('PrepData', ('url', 'body'))
 
 __all__ = ['PrepData', 'RestDispatcher', 'SimpleRestDispatcher']
 
 
-class RestDispatcher(Dispatcher):  # pragma: no cover
+class RestDispatcher(Dispatcher):
+    """
+    Base dispatcher for the StackDriver REST API.
+    """
     _ROOT_URL = 'https://cloudtrace.googleapis.com'
     _PATCH_TRACES_URL = '/v1/projects/{projectId}/traces'
 
+    def __init__(
+        self, sdk=None, auto=True, root_url=None, compression=None,
+        compression_level=None, compression_threshold=None, **kwargs
+    ):
+        """
+        :param gaesd.SDK sdk: SDK instance to use.
+        :param bool auto: True=dispatch traces immediately upon span completion,
+            False=Otherwise.
+        :param str root_url: Root url of the API. Default=`_ROOT_URL`.
+        :param compression: Content-Encoding to compress request bodies with
+            (`gzip` or `deflate`), or a Compressor. Default=No compression.
+        :type compression: Union[None, str, Compressor]
+        :param int compression_level: zlib compression level (1-9).
+        :param int compression_threshold: Request bodies smaller than this
+            many bytes are not compressed.
+        :param kwargs: Passed directly through to the Dispatcher constructor
+            (`max_batch_bytes`, `max_batch_traces`, `concurrency`).
+        """
+        super(RestDispatcher, self).__init__(sdk=sdk, auto=auto, **kwargs)
+        self._root_url = root_url or self._ROOT_URL
+        self._compressor = Compressor.new(
+            compression,
+            level=compression_level,
+            threshold=compression_threshold,
+        )
+
+    @property
+    def root_url(self):
+        """
+        Retrieve the root url of the API this dispatcher sends to.
+
+        :rtype: str
+        """
+        return self._root_url
+
+    @property
+    def compressor(self):
+        """
+        Retrieve the compressor applied to request bodies.
+
+        :rtype: Union[None, Compressor]
+        """
+        return self._compressor
+
     def _prep_dispatch(self, traces):
         # Dispatch!
         return PrepData(
             ''.join([
-                self._ROOT_URL,
-                self._PATCH_TRACES_URL.format(self.sdk.project_id)]),
+                self._root_url,
+                self._PATCH_TRACES_URL.format(projectId=self.sdk.project_id)]),
             {'traces': [trace.export() for trace in traces]}
         )
 
@@ -36,6 +89,91 @@ class RestDispatcher(Dispatcher):  # pragma: no cover
         raise NotImplementedError
 
 
-class SimpleRestDispatcher(RestDispatcher):  # pragma: no cover
+class SimpleRestDispatcher(RestDispatcher):
+    """
+    Dispatcher that PATCHes traces to the StackDriver REST API over a
+        process-wide pool of persistent HTTP/1.1 connections.
+    """
+
+    def __init__(
+        self, sdk=None, auto=True, root_url=None, token_provider=None,
+        pool_size=None, timeout=None, compression=None,
+        compression_level=None, compression_threshold=None, **kwargs
+    ):
+        """
+        :param gaesd.SDK sdk: SDK instance to use.
+        :param bool auto: True=dispatch traces immediately upon span completion,
+            False=Otherwise.
+        :param str root_url: Root url of the API. Default=`_ROOT_URL`.
+        :param callable token_provider: Returns the OAuth2 access token to
+            send, or None to send no Authorization header.
+            Default=The application default credentials' access token.
+        :param int pool_size: Maximum number of idle connections to keep open
+            (only used by the first dispatcher for each root url).
+        :param float timeout: Socket timeout in seconds (only used by the first
+            dispatcher for each root url).
+        :param compression: See `RestDispatcher`.
+        :param int compression_level: See `RestDispatcher`.
+        :param int compression_threshold: See `RestDispatcher`.
+        :param kwargs: Passed directly through to the Dispatcher constructor.
+        """
+        super(SimpleRestDispatcher, self).__init__(
+            sdk=sdk,
+            auto=auto,
+            root_url=root_url,
+            compression=compression,
+            compression_level=compression_level,
+            compression_threshold=compression_threshold,
+            **kwargs
+        )
+        self._token_provider = token_provider
+        self._pool = pool_for(self._root_url, size=pool_size, timeout=timeout)
+
+    @property
+    def pool(self):
+        """
+        Retrieve the connection pool this dispatcher sends with.
+
+        :rtype: gaesd.core.dispatchers.http_pool.ConnectionPool
+        """
+        return self._pool
+
+    def warmup(self):
+        """
+        Fetch an access token now.
+        """
+        self._access_token()
+
+    def _access_token(self):
+        if self._token_provider is not None:
+            return self._token_provider()
+
+        from gaesd.core.dispatchers.google_api_client_cache import \
+            client_cache
+        return client_cache.credentials.get_access_token().access_token
+
     def _dispatch(self, traces):
-        pass
+        return self._emit(
+            self._prep_dispatch(traces),
+        )
+
+    def _emit(self, prep):
+        parts = urlsplit(prep.url)
+        path = parts.path + ('?' + parts.query if parts.query else '')
+        body = json.dumps(prep.body, separators=(',', ':')).encode('utf-8')
+
+        headers = {'Content-Type': 'application/json'}
+        if self._compressor is not None:
+            body, encoding = self._compressor(body)
+            if encoding:
+                headers['Content-Encoding'] = encoding
+
+        token = self._access_token()
+        if token:
+            headers['Authorization'] = 'Bearer {0}'.format(token)
+
+        status, _, data = self._pool.request('PATCH', path, body, headers)
+        if not 200 <= status < 300:
+            raise DispatchError(status, data)
+
+        return data
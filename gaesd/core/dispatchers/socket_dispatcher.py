@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+
+import json
+import socket
+import threading
+
+import six
+
+from gaesd.core.dispatchers.chunking import split_traces
+from gaesd.core.dispatchers.dispatcher import Dispatcher
+
+__all__ = ['SocketDispatcher', 'DEFAULT_ADDRESS', 'MAX_DATAGRAM_SIZE']
+
+DEFAULT_ADDRESS = ('127.0.0.1', 5778)
+# Largest UDP payload (and safely below unix datagram socket limits):
+MAX_DATAGRAM_SIZE = 65507
+
+
+def new_socket(address):
+    """
+    Create a datagram socket for the address.
+
+    :param address: Unix socket path, or (host, port) for UDP.
+    :type address: Union[str, tuple(str, int)]
+    :rtype: socket.socket
+    """
+    if isinstance(address, six.string_types):
+        return socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    return socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+
+def encode(exports):
+    """
+    Encode trace exports as a datagram (a patchTraces body).
+
+    :param list(dict) exports: The exported traces.
+    :rtype: bytes
+    """
+    return json.dumps(
+        {'traces': exports}, separators=(',', ':')).encode('utf-8')
+
+
+def decode(datagram):
+    """
+    Decode a datagram created by `encode`.
+
+    :param bytes datagram:
+    :return: The exported traces.
+    :rtype: list(dict)
+    """
+    return json.loads(datagram.decode('utf-8'))['traces']
+
+
+class SocketDispatcher(Dispatcher):
+    """
+    Dispatcher that sends traces to a local collector agent (see
+    `gaesd.agent`) as datagrams over a Unix datagram or UDP socket.
+
+    Sending never blocks and never raises: if the agent is not running or
+    the socket's buffer is full, the traces are dropped (and counted in
+    `dropped`).
+    """
+
+    def __init__(
+        self, sdk=None, auto=True, address=None, max_datagram_size=None,
+        **kwargs
+    ):
+        """
+        :param gaesd.SDK sdk: SDK instance to use.
+        :param bool auto: True=dispatch traces immediately upon span completion,
+            False=Otherwise.
+        :param address: The agent's unix socket path, or (host, port) for UDP.
+            Default=`DEFAULT_ADDRESS`.
+        :type address: Union[str, tuple(str, int)]
+        :param int max_datagram_size: Maximum size of a datagram in bytes,
+            larger dispatches are split. Default=`MAX_DATAGRAM_SIZE`.
+        :param kwargs: Passed directly through to the Dispatcher constructor.
+        """
+        super(SocketDispatcher, self).__init__(sdk=sdk, auto=auto, **kwargs)
+        self._address = address or DEFAULT_ADDRESS
+        self._max_datagram_size = max_datagram_size or MAX_DATAGRAM_SIZE
+        self._socket = None
+        self._socket_lock = threading.Lock()
+        self._dropped = 0
+
+    @property
+    def address(self):
+        """
+        Retrieve the agent's address.
+
+        :rtype: Union[str, tuple(str, int)]
+        """
+        return self._address
+
+    @property
+    def dropped(self):
+        """
+        Retrieve the number of traces dropped because they could not be sent.
+
+        :rtype: int
+        """
+        return self._dropped
+
+    @property
+    def socket(self):
+        """
+        Retrieve the (non-blocking) socket used to send to the agent.
+
+        :rtype: socket.socket
+        """
+        if self._socket is None:
+            with self._socket_lock:
+                if self._socket is None:
+                    sock = new_socket(self._address)
+                    sock.setblocking(False)
+                    self._socket = sock
+
+        return self._socket
+
+    def _dispatch(self, traces):
+        """
+        Send the traces to the agent.
+
+        :param traces: List of traces to send to StackDriver.
+        :type traces: [core.Trace]
+        """
+        chunks = split_traces(traces, max_bytes=self._max_datagram_size)
+
+        for chunk in chunks:
+            datagram = encode([i.export() for i in chunk])
+            if len(datagram) <= self._max_datagram_size:
+                self._send(datagram, len(chunk))
+                continue
+
+            # A single trace too large for a datagram:
+            for part in self._split_spans(chunk[0].export()):
+                self._send(encode([part]), 1)
+
+    def _split_spans(self, export):
+        """
+        Split a trace too large for one datagram into partial traces (the
+            agent merges them back together by trace id).
+        """
+        parts = []
+        spans = export['spans']
+
+        while spans:
+            count = len(spans)
+            part = dict(export, spans=spans)
+            while count > 1 and len(encode([part])) > self._max_datagram_size:
+                count //= 2
+                part = dict(export, spans=spans[:count])
+
+            parts.append(part)
+            spans = spans[count:]
+
+        return parts
+
+    def _send(self, datagram, count):
+        try:
+            self.socket.sendto(datagram, self._address)
+        except (socket.error, OSError) as e:
+            self._dropped += count
+            self.logger.debug('Dropped %d traces: %r', count, e)
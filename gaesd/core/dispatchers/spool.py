@@ -0,0 +1,317 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+
+from gaesd.core.utils import SpoolLockedError
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    # windows:
+    fcntl = None
+
+__all__ = ['SpoolLog']
+
+# Record header: payload length, payload crc32.
+_HEADER = struct.Struct('>II')
+
+
+class SpoolLog(object):
+    """
+    Durable, append-only log of records split over fixed-size segment files.
+
+    Each segment is pre-allocated and memory-mapped; records are written
+    into the mapping as `length, crc32, payload`. Writes are synced to disk
+    (msync) every `sync_every` records or `sync_interval` seconds, whichever
+    comes first, and on `sync()`/`close()`.
+
+    Readers consume records from a persisted cursor. Once `acknowledge()`d,
+    the cursor is written to disk (atomically) and segments before it are
+    deleted, so a restarted process resumes after the last acknowledged
+    record. A record torn by a crash fails it's crc check and ends the
+    segment.
+
+    :note: A directory must only be used by one SpoolLog (process) at a time:
+        it is locked (`flock`, where available) until `close()`.
+    """
+    SEGMENT_SIZE = 4 * 1024 * 1024
+    SYNC_EVERY = 100
+    SYNC_INTERVAL = 1.0
+
+    _SUFFIX = '.seg'
+    _CURSOR = 'cursor'
+    _LOCK = 'lock'
+
+    def __init__(
+        self, directory, segment_size=None, sync_every=None,
+        sync_interval=None, clock=time.time,
+    ):
+        """
+        :param str directory: Directory to keep segments (and the cursor) in,
+            created if necessary.
+        :param int segment_size: Size of each segment file in bytes.
+            Default=`SEGMENT_SIZE`.
+        :param int sync_every: Sync after this many appended records.
+            Default=`SYNC_EVERY`.
+        :param float sync_interval: Sync appended records at least this many
+            seconds after the last sync. Default=`SYNC_INTERVAL`.
+        :param callable clock: Function returning the current time in seconds.
+        :raises: SpoolLockedError
+        """
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        self._directory = directory
+        self._lock_file = self._lock_directory()
+        self._segment_size = segment_size or self.SEGMENT_SIZE
+        self._sync_every = sync_every or self.SYNC_EVERY
+        self._sync_interval = sync_interval if sync_interval is not None \
+            else self.SYNC_INTERVAL
+        self._clock = clock
+        self._lock = threading.RLock()
+
+        segments = self._segments()
+        # Segments left by a previous process are never appended to:
+        self._next_seq = segments[-1] + 1 if segments else 0
+        self._cursor = self._read_cursor(segments)
+
+        # The segment being written:
+        self._active_seq = None
+        self._file = None
+        self._map = None
+        self._offset = 0
+        self._unsynced = 0
+        self._synced_at = clock()
+
+    def __repr__(self):
+        return 'SpoolLog({0})[{1}]'.format(self._directory, self._cursor)
+
+    @property
+    def directory(self):
+        """
+        :rtype: str
+        """
+        return self._directory
+
+    @property
+    def cursor(self):
+        """
+        Retrieve the position (segment, offset) after the last acknowledged
+            record.
+
+        :rtype: tuple(int, int)
+        """
+        return self._cursor
+
+    def _lock_directory(self):
+        lock_file = open(os.path.join(self._directory, self._LOCK), 'a')
+        if fcntl is None:  # pragma: no cover
+            return lock_file
+
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except (IOError, OSError):
+            lock_file.close()
+            raise SpoolLockedError(self._directory)
+        return lock_file
+
+    def _path(self, seq):
+        return os.path.join(
+            self._directory, '{0:020d}{1}'.format(seq, self._SUFFIX))
+
+    def _segments(self):
+        return sorted(
+            int(name[:-len(self._SUFFIX)])
+            for name in os.listdir(self._directory)
+            if name.endswith(self._SUFFIX)
+        )
+
+    def _read_cursor(self, segments):
+        first = segments[0] if segments else self._next_seq
+
+        try:
+            with open(os.path.join(self._directory, self._CURSOR)) as f:
+                seq, offset = [int(i) for i in f.read().split()]
+        except (IOError, OSError, ValueError):
+            return first, 0
+
+        if seq < first:
+            return first, 0
+        return seq, offset
+
+    def _write_cursor(self, cursor):
+        path = os.path.join(self._directory, self._CURSOR)
+        temp_path = path + '.tmp'
+
+        with open(temp_path, 'w') as f:
+            f.write('{0} {1}\n'.format(*cursor))
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.rename(temp_path, path)
+
+    def append(self, payload):
+        """
+        Append a record.
+
+        :param bytes payload: The (non-empty) record.
+        :raises: ValueError if the record is empty or the log closed.
+        """
+        if not payload:
+            raise ValueError('Cannot append an empty record')
+
+        size = _HEADER.size + len(payload)
+
+        with self._lock:
+            # The directory is no longer locked for us:
+            if self._lock_file.closed:
+                raise ValueError('Cannot append to a closed spool log')
+            if self._map is None or self._offset + size > len(self._map):
+                self._roll(size)
+
+            offset = self._offset
+            self._map[offset:offset + _HEADER.size] = _HEADER.pack(
+                len(payload), zlib.crc32(payload) & 0xffffffff)
+            self._map[offset + _HEADER.size:offset + size] = payload
+            self._offset += size
+            self._unsynced += 1
+
+            due = self._clock() - self._synced_at >= self._sync_interval
+            if due or self._unsynced >= self._sync_every:
+                self._sync()
+
+    def _roll(self, size):
+        """
+        Seal the active segment and start a new one that fits `size` bytes.
+        """
+        self._close_segment()
+
+        seq = self._next_seq
+        self._next_seq += 1
+
+        self._file = open(self._path(seq), 'w+b')
+        self._file.truncate(max(self._segment_size, size))
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        self._active_seq = seq
+        self._offset = 0
+
+    def _close_segment(self):
+        if self._map is None:
+            return
+
+        self._sync()
+        self._map.close()
+        self._file.close()
+        self._map = None
+        self._file = None
+        self._active_seq = None
+
+    def _sync(self):
+        if self._map is not None and self._unsynced:
+            self._map.flush()
+        self._unsynced = 0
+        self._synced_at = self._clock()
+
+    def sync(self):
+        """
+        Sync all appended records to disk.
+        """
+        with self._lock:
+            self._sync()
+
+    def read(self, max_records):
+        """
+        Read records after the cursor (without moving it).
+
+        :param int max_records: Maximum number of records to read.
+        :return: The records and the position after the last of them (to
+            `acknowledge()` once they are processed).
+        :rtype: tuple(list(bytes), tuple(int, int))
+        """
+        with self._lock:
+            seq, offset = self._cursor
+            records = []
+
+            while len(records) < max_records:
+                read, offset = self._read_segment(
+                    seq, offset, max_records - len(records))
+                records.extend(read)
+                if len(records) >= max_records:
+                    break
+
+                # End of this segment; move on if it's complete:
+                if seq == self._active_seq or seq + 1 >= self._next_seq:
+                    break
+                seq, offset = seq + 1, 0
+
+            return records, (seq, offset)
+
+    def _read_segment(self, seq, offset, max_records):
+        records = []
+
+        try:
+            f = open(self._path(seq), 'rb')
+        except (IOError, OSError):
+            return records, offset
+
+        with f:
+            f.seek(offset)
+            while len(records) < max_records:
+                header = f.read(_HEADER.size)
+                if len(header) < _HEADER.size:
+                    break
+
+                length, crc = _HEADER.unpack(header)
+                if not length:
+                    break
+
+                payload = f.read(length)
+                if len(payload) < length or \
+                        zlib.crc32(payload) & 0xffffffff != crc:
+                    # Torn (partially written) record:
+                    break
+
+                records.append(payload)
+                offset += _HEADER.size + length
+
+        return records, offset
+
+    def acknowledge(self, position):
+        """
+        Persist the cursor at the position, deleting segments before it.
+
+        :param tuple(int, int) position: Position returned by `read()`.
+        """
+        with self._lock:
+            if position == self._cursor:
+                return
+
+            self._write_cursor(position)
+            self._cursor = position
+
+            for seq in self._segments():
+                if seq >= position[0]:
+                    break
+                os.remove(self._path(seq))
+
+    def is_empty(self):
+        """
+        Determine if every record has been acknowledged.
+
+        :rtype: bool
+        """
+        return not self.read(1)[0]
+
+    def close(self):
+        """
+        Sync and close the active segment, and unlock the directory.
+        """
+        with self._lock:
+            self._close_segment()
+            self._lock_file.close()
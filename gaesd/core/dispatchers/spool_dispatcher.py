@@ -0,0 +1,276 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+
+import json
+import threading
+import time
+
+from gaesd.core.dispatchers.dispatcher import Dispatcher
+from gaesd.core.dispatchers.spool import SpoolLog
+
+__all__ = ['SpoolDispatcher']
+
+
+class SpooledTrace(object):
+    """
+    A trace export read back from the spool.
+    """
+
+    def __init__(self, payload):
+        """
+        :param bytes payload: The JSON encoded trace export.
+        """
+        self._payload = payload
+
+    def __repr__(self):
+        return 'SpooledTrace[{0}]'.format(len(self._payload))
+
+    def export(self):
+        """
+        Retrieve the trace export.
+
+        :rtype: dict
+        """
+        return json.loads(self._payload.decode('utf-8'))
+
+
+class SpoolDispatcher(Dispatcher):
+    """
+    Dispatcher that writes traces to a durable on-disk log (`SpoolLog`) and
+    sends them from there with a background replayer thread.
+
+    Dispatching only appends to a memory-mapped file, so request latency
+    does not depend on StackDriver being available. The replayer sends the
+    log in batches to another dispatcher (the `GoogleApiClientDispatcher` by
+    default), acknowledging each batch once it is sent: failed batches are
+    retried every `retry_interval` seconds. Traces spooled but not yet
+    acknowledged when the process stops are sent once a SpoolDispatcher is
+    created on the same directory again.
+
+    :note: Only one process at a time may use a spool directory (it is
+        locked, see `SpoolLog`), so each process needs it's own one.
+    """
+    BATCH_SIZE = 50
+    RETRY_INTERVAL = 5.0
+
+    def __init__(
+        self, sdk=None, auto=True, dispatcher=None, directory=None,
+        segment_size=None, sync_every=None, sync_interval=None,
+        batch_size=None, retry_interval=None, **kwargs
+    ):
+        """
+        :param gaesd.SDK sdk: SDK instance to use.
+        :param bool auto: True=spool traces immediately upon span completion,
+            False=Otherwise.
+        :param dispatcher: Dispatcher type used by the replayer to send
+            traces. Default=GoogleApiClientDispatcher.
+        :type dispatcher: type(Dispatcher)
+        :param str directory: Spool directory (required).
+        :param int segment_size: See `SpoolLog`.
+        :param int sync_every: See `SpoolLog`.
+        :param float sync_interval: See `SpoolLog`.
+        :param int batch_size: Maximum number of traces sent by the replayer
+            at once. Default=`BATCH_SIZE`.
+        :param float retry_interval: Seconds to wait before resending a batch
+            that failed. Default=`RETRY_INTERVAL`.
+        :param kwargs: Passed directly through to the Dispatcher constructor.
+        :raises: ValueError, gaesd.core.utils.SpoolLockedError
+        """
+        if not directory:
+            raise ValueError('SpoolDispatcher requires a spool directory')
+
+        super(SpoolDispatcher, self).__init__(sdk=sdk, auto=auto, **kwargs)
+
+        if dispatcher is None:
+            from gaesd.core.dispatchers.google_api_client_dispatcher import \
+                GoogleApiClientDispatcher
+            dispatcher = GoogleApiClientDispatcher
+
+        self._dispatcher = dispatcher(sdk=sdk, auto=False)
+        self._log = SpoolLog(
+            directory,
+            segment_size=segment_size,
+            sync_every=sync_every,
+            sync_interval=sync_interval,
+        )
+        self._batch_size = batch_size or self.BATCH_SIZE
+        self._retry_interval = retry_interval if retry_interval is not None \
+            else self.RETRY_INTERVAL
+        self._wakeup = threading.Event()
+        self._drained = threading.Condition()
+        self._stopping = False
+        self._stopped = False
+        self._replayer = None
+        self._replayer_lock = threading.Lock()
+
+        # Resume sending whatever a previous process left behind:
+        if not self._log.is_empty():
+            self._ensure_replayer()
+
+    @property
+    def sdk(self):
+        """
+        Retrieve the SDK that this dispatcher is associated with.
+
+        :rtype:  gaesd.SDK
+        """
+        return self._sdk
+
+    @sdk.setter
+    def sdk(self, sdk):
+        """
+        Set the SDK that this dispatcher (and it's target dispatcher) is
+            associated with.
+
+        :param gaesd.SDK sdk: The new SDK to use.
+        """
+        self._sdk = sdk
+        self._dispatcher.sdk = sdk
+
+    @property
+    def dispatcher(self):
+        """
+        Retrieve the dispatcher used by the replayer to send traces.
+
+        :rtype: Dispatcher
+        """
+        return self._dispatcher
+
+    @property
+    def log(self):
+        """
+        Retrieve the spool log.
+
+        :rtype: SpoolLog
+        """
+        return self._log
+
+    def warmup(self):
+        """
+        Warm up the dispatcher used by the replayer.
+        """
+        self._dispatcher.warmup()
+
+    def _dispatch(self, traces):
+        """
+        Append the traces to the spool.
+
+        :param traces: List of traces to send to StackDriver.
+        :type traces: [core.Trace]
+        """
+        if self._stopped:
+            # The spool is closed (and unlocked) for another writer:
+            self.logger.warning(
+                'Dropped %s traces dispatched after stop()', len(traces))
+            return
+
+        for trace in traces:
+            self._log.append(json.dumps(
+                trace.export(), separators=(',', ':')).encode('utf-8'))
+
+        self._ensure_replayer()
+        self._wakeup.set()
+
+    def _ensure_replayer(self):
+        if self._replayer is not None and self._replayer.is_alive():
+            return
+
+        with self._replayer_lock:
+            if self._replayer is None or not self._replayer.is_alive():
+                replayer = threading.Thread(
+                    target=self._run,
+                    name='{0}-replayer'.format(self.__class__.__name__),
+                )
+                replayer.daemon = True
+                replayer.start()
+                self._replayer = replayer
+
+    def flush(self, timeout=None):
+        """
+        Block until every spooled trace has been sent.
+
+        :param float timeout: Maximum number of seconds to wait.
+        :return: True if the spool was drained (never once stopped).
+        :rtype: bool
+        """
+        if self._stopped:
+            return False
+
+        self._log.sync()
+        if self._log.is_empty():
+            return True
+
+        self._ensure_replayer()
+        deadline = None if timeout is None else time.time() + timeout
+
+        with self._drained:
+            self._wakeup.set()
+            while not self._log.is_empty():
+                remaining = None if deadline is None else \
+                    deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._drained.wait(remaining)
+
+        return True
+
+    def stop(self):
+        """
+        Stop the replayer thread and close the spool. Traces not yet sent
+            stay in the spool (for the next dispatcher using it), traces
+            dispatched afterwards are dropped.
+        """
+        if self._stopped:
+            return
+        self._stopped = True
+
+        replayer = self._replayer
+        self._stopping = True
+        self._wakeup.set()
+        if replayer is not None:
+            replayer.join()
+        self._replayer = None
+        self._stopping = False
+        self._log.close()
+
+    def _run(self):
+        while True:
+            self._wakeup.clear()
+            # `stop()` sets `_stopping` before waking us:
+            if self._stopping:
+                return
+
+            records, position = self._log.read(self._batch_size)
+
+            if records and not self._send(records):
+                self._wait_to_retry()
+                continue
+
+            self._log.acknowledge(position)
+
+            if not records:
+                with self._drained:
+                    self._drained.notify_all()
+                self._wakeup.wait()
+
+    def _wait_to_retry(self):
+        # Traces spooled meanwhile wake us up, but must not cut the wait
+        # short (only `stop()` does):
+        deadline = time.time() + self._retry_interval
+        while not self._stopping:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return
+            self._wakeup.wait(remaining)
+            self._wakeup.clear()
+
+    def _send(self, records):
+        try:
+            self._dispatcher._dispatch_chunked(
+                [SpooledTrace(record) for record in records])
+        except Exception:
+            self.logger.exception(
+                'Failed to send %s spooled traces', len(records))
+            return False
+
+        return True
@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+"""
+Tail sampling policies: decide, once a trace has completed, whether it is
+kept (dispatched) or dropped.
+"""
+
+import abc
+import datetime
+
+import six
+
+from gaesd.core.sampling import ProbabilitySampler
+
+__all__ = [
+    'TailPolicy',
+    'LatencyPolicy',
+    'ErrorPolicy',
+    'SpanNamePolicy',
+    'ProbabilityPolicy',
+    'ERROR_LABELS',
+]
+
+#: Span labels that mark an error:
+ERROR_LABELS = ('error', '/error/message', '/error/name')
+
+
+@six.add_metaclass(abc.ABCMeta)
+class TailPolicy(object):
+    """
+    Decides whether a completed trace is kept.
+    """
+
+    @abc.abstractmethod
+    def __call__(self, trace):
+        """
+        :param gaesd.Trace trace: The completed trace.
+        :return: True=Keep the trace.
+        :rtype: bool
+        """
+        raise NotImplementedError  # pragma: no cover
+
+
+class LatencyPolicy(TailPolicy):
+    """
+    Keep traces whose root span took longer than a threshold.
+    """
+
+    def __init__(self, threshold):
+        """
+        :param threshold: Minimum duration (in seconds) of kept traces.
+        :type threshold: Union[float, datetime.timedelta]
+        """
+        if isinstance(threshold, datetime.timedelta):
+            threshold = threshold.total_seconds()
+        self._threshold = threshold
+
+    def __repr__(self):
+        return 'LatencyPolicy({0})'.format(self._threshold)
+
+    @property
+    def threshold(self):
+        """
+        Retrieve the minimum duration (in seconds) of kept traces.
+
+        :rtype: float
+        """
+        return self._threshold
+
+    @staticmethod
+    def duration(trace):
+        """
+        Retrieve the duration of the trace's root span: the longest of it's
+            top-level spans.
+
+        :param gaesd.Trace trace:
+        :return: Seconds, or None if no top-level span has a duration.
+        :rtype: float
+        """
+        durations = [
+            span.duration_ns for span in trace.spans
+            if span.parent_span_id == trace.root_span_id and span.has_duration
+        ]
+        return max(durations) / 1e9 if durations else None
+
+    def __call__(self, trace):
+        duration = self.duration(trace)
+        return duration is not None and duration > self._threshold
+
+
+class ErrorPolicy(TailPolicy):
+    """
+    Keep traces with a span labelled as an error, or with a 5xx HTTP status
+        code (the `/http/status_code` label).
+    """
+
+    def __init__(self, labels=ERROR_LABELS):
+        """
+        :param labels: Span labels that mark an error. Default=`ERROR_LABELS`.
+        :type labels: iterable(str)
+        """
+        self._labels = frozenset(labels)
+
+    def __repr__(self):
+        return 'ErrorPolicy({0})'.format(sorted(self._labels))
+
+    def __call__(self, trace):
+        for span in trace.spans:
+            labels = span.labels
+            if not labels:
+                continue
+            if not self._labels.isdisjoint(labels):
+                return True
+            if str(labels.get('/http/status_code', '')).startswith('5'):
+                return True
+        return False
+
+
+class SpanNamePolicy(TailPolicy):
+    """
+    Keep traces with a span of one of the given names.
+    """
+
+    def __init__(self, names):
+        """
+        :param iterable(str) names: The span names.
+        """
+        self._names = frozenset(names)
+
+    def __repr__(self):
+        return 'SpanNamePolicy({0})'.format(sorted(self._names))
+
+    def __call__(self, trace):
+        return any(span.name in self._names for span in trace.spans)
+
+
+class ProbabilityPolicy(TailPolicy):
+    """
+    Keep a baseline fraction of traces (decided from the trace id, see
+        `ProbabilitySampler`).
+    """
+
+    def __init__(self, rate):
+        """
+        :param float rate: Fraction of traces to keep, 0.0 to 1.0.
+        :raises: ValueError
+        """
+        self._sampler = ProbabilitySampler(rate)
+
+    def __repr__(self):
+        return 'ProbabilityPolicy({0})'.format(self._sampler.rate)
+
+    def __call__(self, trace):
+        return self._sampler.should_sample(trace.trace_id)
@@ -0,0 +1,349 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+
+import collections
+import heapq
+import itertools
+import threading
+import time
+import weakref
+
+from gaesd.core.dispatchers.dispatcher import Dispatcher, TracePatch
+from gaesd.core.dispatchers.tail_sampling import ErrorPolicy
+
+__all__ = ['TailSamplingDispatcher']
+
+
+class TailSamplingDispatcher(Dispatcher):
+    """
+    Dispatcher that holds traces until they complete and sends only those
+    that a tail sampling policy keeps through another dispatcher (the
+    `GoogleApiClientDispatcher` by default).
+
+    A trace is decided once all of it's spans have ended and no span has
+    completed for `decision_wait` seconds (or, if it never completes,
+    `max_wait` seconds after it arrived). It is kept if any of the
+    `policies` (see `gaesd.core.dispatchers.tail_sampling`) keeps it. Spans
+    of a kept trace that complete after the decision are sent as usual,
+    those of a dropped trace are dropped.
+
+    Decisions are made by a background thread, `flush()` decides every
+    waiting trace at once.
+    """
+    DECISION_WAIT = 1.0
+    MAX_WAIT = 30.0
+    MAX_PENDING = 1000
+
+    def __init__(
+        self, sdk=None, auto=True, dispatcher=None, policies=None,
+        decision_wait=None, max_wait=None, max_pending=None, clock=time.time,
+        **kwargs
+    ):
+        """
+        :param gaesd.SDK sdk: SDK instance to use.
+        :param bool auto: True=hold traces immediately upon span completion,
+            False=Otherwise.
+        :param dispatcher: Dispatcher type used to send kept traces.
+            Default=GoogleApiClientDispatcher.
+        :type dispatcher: type(Dispatcher)
+        :param policies: Keep a trace if any of these keeps it.
+            Default=`[ErrorPolicy()]`.
+        :type policies: list(TailPolicy)
+        :param float decision_wait: Seconds to wait for more spans once a
+            trace has completed. Default=`DECISION_WAIT`.
+        :param float max_wait: Decide traces that never complete this many
+            seconds after they arrived. Default=`MAX_WAIT`.
+        :param int max_pending: Maximum number of waiting traces, the oldest
+            one is decided early to make room. Default=`MAX_PENDING`.
+        :param callable clock: Returns the current time in seconds.
+        :param kwargs: Passed directly through to the Dispatcher constructor.
+        """
+        super(TailSamplingDispatcher, self).__init__(
+            sdk=sdk, auto=auto, **kwargs)
+
+        if dispatcher is None:
+            from gaesd.core.dispatchers.google_api_client_dispatcher import \
+                GoogleApiClientDispatcher
+            dispatcher = GoogleApiClientDispatcher
+
+        self._dispatcher = dispatcher(sdk=sdk, auto=False)
+        self._policies = list(policies) if policies is not None else \
+            [ErrorPolicy()]
+        self._decision_wait = decision_wait if decision_wait is not None \
+            else self.DECISION_WAIT
+        self._max_wait = max_wait if max_wait is not None else self.MAX_WAIT
+        self._max_pending = max_pending or self.MAX_PENDING
+        self._clock = clock
+        # trace => [arrived, last activity, next check, check seq], oldest
+        # first:
+        self._pending = collections.OrderedDict()
+        # (check, seq, trace), the earliest time each waiting trace could be
+        # due (entries whose seq is not their trace's check seq are stale):
+        self._checks = []
+        self._check_seqs = itertools.count()
+        # trace => kept:
+        self._decisions = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._kept = 0
+        self._dropped = 0
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._decider = None
+        self._decider_lock = threading.Lock()
+
+    @property
+    def sdk(self):
+        """
+        Retrieve the SDK that this dispatcher is associated with.
+
+        :rtype:  gaesd.SDK
+        """
+        return self._sdk
+
+    @sdk.setter
+    def sdk(self, sdk):
+        """
+        Set the SDK that this dispatcher (and it's target dispatcher) is
+            associated with.
+
+        :param gaesd.SDK sdk: The new SDK to use.
+        """
+        self._sdk = sdk
+        self._dispatcher.sdk = sdk
+
+    @property
+    def dispatcher(self):
+        """
+        Retrieve the dispatcher used to send kept traces.
+
+        :rtype: Dispatcher
+        """
+        return self._dispatcher
+
+    @property
+    def policies(self):
+        """
+        Retrieve the tail sampling policies.
+
+        :rtype: list(TailPolicy)
+        """
+        return self._policies[:]
+
+    @property
+    def kept(self):
+        """
+        Retrieve the number of traces kept.
+
+        :rtype: int
+        """
+        return self._kept
+
+    @property
+    def dropped(self):
+        """
+        Retrieve the number of traces dropped.
+
+        :rtype: int
+        """
+        return self._dropped
+
+    @property
+    def pending(self):
+        """
+        Retrieve the number of traces waiting for a decision.
+
+        :rtype: int
+        """
+        return len(self._pending)
+
+    def warmup(self):
+        """
+        Warm up the dispatcher used to send kept traces.
+        """
+        self._dispatcher.warmup()
+
+    def _dispatch(self, traces):
+        """
+        Hold the traces until they are decided (sending the new spans of
+            traces already kept).
+
+        :param traces: List of traces to send to StackDriver.
+        :type traces: [core.Trace]
+        """
+        now = self._clock()
+        forward = []
+        overflow = []
+
+        with self._lock:
+            first = self._first_check()
+            for item in traces:
+                trace = getattr(item, 'trace', item)
+                kept = self._decisions.get(trace)
+                if kept:
+                    forward.append(item)
+                elif kept is None:
+                    times = self._pending.get(trace)
+                    if times is None:
+                        if len(self._pending) >= self._max_pending:
+                            overflow.append(
+                                self._pending.popitem(last=False)[0])
+                        times = self._pending[trace] = [now, now, None, None]
+                    times[1] = now
+                    check = min(
+                        times[0] + self._max_wait, now + self._decision_wait)
+                    # Activity only delays a decision, so an earlier check
+                    # (which reschedules it) will do:
+                    if times[2] is None or check < times[2]:
+                        self._schedule(trace, times, check)
+            # Only wake the decider up if it has to decide sooner:
+            wakeup = first is None or self._first_check() < first
+
+        self._decide(overflow)
+        if forward:
+            self._send(forward)
+        self._ensure_decider()
+        if wakeup:
+            self._wakeup.set()
+
+    def decide(self, trace):
+        """
+        Apply the policies to a trace.
+
+        :param gaesd.Trace trace: The completed trace.
+        :return: True=Keep the trace.
+        :rtype: bool
+        """
+        for policy in self._policies:
+            try:
+                if policy(trace):
+                    return True
+            except Exception:
+                self.logger.exception('Tail sampling policy %r failed', policy)
+        return False
+
+    def _decide(self, traces):
+        kept = []
+        for trace in traces:
+            decision = self.decide(trace)
+            with self._lock:
+                self._decisions[trace] = decision
+                if decision:
+                    self._kept += 1
+                else:
+                    self._dropped += 1
+
+            if decision:
+                kept.append(TracePatch(trace, 0, trace.completed_offset))
+
+        if kept:
+            self._send(kept)
+
+    def _send(self, items):
+        try:
+            self._dispatcher._dispatch_chunked(items)
+        except Exception:
+            self.logger.exception(
+                'Failed to dispatch %s kept traces', len(items))
+
+    @staticmethod
+    def _is_complete(trace):
+        return trace.completed_count >= len(trace)
+
+    def _schedule(self, trace, times, check):
+        seq = next(self._check_seqs)
+        times[2:] = [check, seq]
+        heapq.heappush(self._checks, (check, seq, trace))
+
+    def _first_check(self):
+        """
+        Retrieve the time of the earliest check, dropping stale ones.
+
+        :return: The time, or None if no trace is waiting.
+        :rtype: float
+        """
+        checks = self._checks
+        while checks:
+            check, seq, trace = checks[0]
+            times = self._pending.get(trace)
+            if times is not None and times[3] == seq:
+                return check
+            heapq.heappop(checks)
+        return None
+
+    def _take_due(self, now):
+        """
+        Remove the traces due for a decision from the waiting traces.
+
+        :param float now: The current time.
+        :return: The due traces and the seconds until the next one is due
+            (None if no trace is waiting).
+        :rtype: tuple(list(gaesd.Trace), float)
+        """
+        due = []
+
+        with self._lock:
+            check = self._first_check()
+            while check is not None and check <= now:
+                _, _, trace = heapq.heappop(self._checks)
+                times = self._pending[trace]
+                arrived, active = times[:2]
+                deadline = arrived + self._max_wait
+                if self._is_complete(trace):
+                    deadline = min(deadline, active + self._decision_wait)
+
+                if deadline <= now:
+                    del self._pending[trace]
+                    due.append(trace)
+                else:
+                    self._schedule(trace, times, deadline)
+                check = self._first_check()
+
+        return due, check - now if check is not None else None
+
+    def _ensure_decider(self):
+        if self._decider is not None and self._decider.is_alive():
+            return
+
+        with self._decider_lock:
+            if self._decider is None or not self._decider.is_alive():
+                decider = threading.Thread(
+                    target=self._run,
+                    name='{0}-decider'.format(self.__class__.__name__),
+                )
+                decider.daemon = True
+                decider.start()
+                self._decider = decider
+
+    def _run(self):
+        while True:
+            self._wakeup.clear()
+            # `stop()` sets `_stopping` before waking us:
+            if self._stopping:
+                return
+
+            due, wait = self._take_due(self._clock())
+            self._decide(due)
+            self._wakeup.wait(wait)
+
+    def flush(self):
+        """
+        Decide every waiting trace now, sending those that are kept.
+        """
+        with self._lock:
+            traces = list(self._pending)
+            self._pending.clear()
+            del self._checks[:]
+        self._decide(traces)
+
+    def stop(self):
+        """
+        Decide every waiting trace and stop the decider thread.
+        """
+        decider = self._decider
+        self._stopping = True
+        self._wakeup.set()
+        if decider is not None:
+            decider.join()
+        self._decider = None
+        self._stopping = False
+        self.flush()
@@ -0,0 +1,435 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+"""
+Head-based sampling: decide, when a trace is created, whether it is
+recorded and dispatched.
+"""
+
+import abc
+import random
+import re
+import threading
+import time
+from collections import namedtuple
+
+import six
+
+__all__ = [
+    'Sampler',
+    'AlwaysOnSampler',
+    'AlwaysOffSampler',
+    'ProbabilitySampler',
+    'ParentBasedSampler',
+    'SpanSampler',
+    'RateLimitingSpanSampler',
+    'SpanNameRuleSampler',
+    'SAMPLING_WEIGHT_LABEL',
+    'TraceContext',
+    'parse_trace_context',
+    'TRACE_CONTEXT_HEADER',
+]
+
+#: The request header carrying the caller's trace context:
+TRACE_CONTEXT_HEADER = 'X-Cloud-Trace-Context'
+
+#: Span label holding the number of spans a kept span stands for:
+SAMPLING_WEIGHT_LABEL = 'gaesd/sampling_weight'
+
+# TRACE_ID/SPAN_ID;o=OPTIONS (SPAN_ID and OPTIONS are optional):
+_TRACE_CONTEXT_RE = re.compile(
+    r'^\s*([0-9a-fA-F]+)(?:/(\d*))?(?:;o=(\d+))?\s*$')
+
+
+class TraceContext(namedtuple('TraceContext', 'trace_id span_id sampled')):
+    """
+    A parsed `X-Cloud-Trace-Context` header.
+
+    :ivar str trace_id: The trace id.
+    :ivar int span_id: The caller's span id, or None.
+    :ivar bool sampled: The caller's sampling decision (`o=1`), or None if
+        it did not send one.
+    """
+
+
+def parse_trace_context(header):
+    """
+    Parse an `X-Cloud-Trace-Context` header (`TRACE_ID/SPAN_ID;o=1`).
+
+    :param str header: The header's value.
+    :return: The trace context, or None if the header is missing or
+        malformed.
+    :rtype: TraceContext
+    """
+    match = _TRACE_CONTEXT_RE.match(header or '')
+    if match is None:
+        return None
+
+    trace_id, span_id, options = match.groups()
+    return TraceContext(
+        trace_id=trace_id.lower(),
+        span_id=int(span_id) if span_id else None,
+        sampled=bool(int(options) & 1) if options is not None else None,
+    )
+
+
+@six.add_metaclass(abc.ABCMeta)
+class Sampler(object):
+    """
+    Decides whether a new trace is sampled (recorded and dispatched).
+    """
+
+    @abc.abstractmethod
+    def should_sample(self, trace_id, parent_sampled=None):
+        """
+        Decide whether to sample a new trace.
+
+        :param str trace_id: The new trace's id.
+        :param bool parent_sampled: The caller's sampling decision (from
+            it's trace context), or None if unknown.
+        :rtype: bool
+        """
+        raise NotImplementedError  # pragma: no cover
+
+
+class AlwaysOnSampler(Sampler):
+    """
+    Sample every trace.
+    """
+
+    def should_sample(self, trace_id, parent_sampled=None):
+        return True
+
+
+class AlwaysOffSampler(Sampler):
+    """
+    Sample no trace.
+    """
+
+    def should_sample(self, trace_id, parent_sampled=None):
+        return False
+
+
+class ProbabilitySampler(Sampler):
+    """
+    Sample a fraction of traces.
+
+    The decision is derived from the trace id, so every service seeing a
+        trace makes the same decision.
+    """
+    # Random (uuid4) bits at the end of a trace id:
+    ID_BITS = 48
+
+    def __init__(self, rate):
+        """
+        :param float rate: Fraction of traces to sample, 0.0 to 1.0.
+        :raises: ValueError
+        """
+        if not 0.0 <= rate <= 1.0:
+            raise ValueError('rate must be between 0.0 and 1.0')
+
+        self._rate = rate
+        self._bound = int(rate * (1 << self.ID_BITS))
+
+    def __repr__(self):
+        return 'ProbabilitySampler({0})'.format(self._rate)
+
+    @property
+    def rate(self):
+        """
+        Retrieve the fraction of traces sampled.
+
+        :rtype: float
+        """
+        return self._rate
+
+    def should_sample(self, trace_id, parent_sampled=None):
+        try:
+            value = int(str(trace_id)[-self.ID_BITS // 4:], 16)
+        except ValueError:
+            # Not a hex id:
+            value = random.getrandbits(self.ID_BITS)
+
+        return value < self._bound
+
+
+class ParentBasedSampler(Sampler):
+    """
+    Follow the caller's sampling decision (the `o=` trace option of the
+        `X-Cloud-Trace-Context` header), deferring to another sampler for
+        traces without one.
+    """
+
+    def __init__(self, root=None):
+        """
+        :param Sampler root: Decides for traces without a caller's decision.
+            Default=`AlwaysOnSampler()`.
+        """
+        self._root = root or AlwaysOnSampler()
+
+    def __repr__(self):
+        return 'ParentBasedSampler({0!r})'.format(self._root)
+
+    @property
+    def root(self):
+        """
+        Retrieve the sampler deciding for traces without a caller's decision.
+
+        :rtype: Sampler
+        """
+        return self._root
+
+    def should_sample(self, trace_id, parent_sampled=None):
+        if parent_sampled is not None:
+            return bool(parent_sampled)
+        return self._root.should_sample(trace_id)
+
+
+@six.add_metaclass(abc.ABCMeta)
+class SpanSampler(object):
+    """
+    Decides whether a new span of a sampled trace is recorded.
+    """
+
+    @abc.abstractmethod
+    def sample(self, name):
+        """
+        Decide whether to record a new span.
+
+        :param str name: The new span's name.
+        :return: The kept span's sampling weight (the number of spans it
+            stands for, itself included), or None to drop it.
+        :rtype: int
+        """
+        raise NotImplementedError  # pragma: no cover
+
+    def is_disabled(self, name):
+        """
+        Determine (without side-effects) if every new span of a name is
+            dropped, so that callers can skip creating it altogether.
+
+        :param str name: The span name.
+        :rtype: bool
+        """
+        return False
+
+
+class RateLimitingSpanSampler(SpanSampler):
+    """
+    Record at most `rate` spans per second of each span name (a token bucket
+        per name), so that hot span names are throttled without hiding rare
+        ones.
+
+    A kept span's weight is the number of spans of it's name seen since the
+        previous kept one.
+    """
+
+    def __init__(self, rate, burst=None, rates=None, clock=time.time):
+        """
+        :param float rate: Spans per second recorded of each span name.
+        :param float burst: Spans of a name recorded at once before the rate
+            applies. Default=`max(rate, 1)`.
+        :param dict rates: Span name => spans per second, overriding `rate`
+            for these names.
+        :param callable clock: Returns the current time in seconds.
+        :raises: ValueError
+        """
+        rates = dict(rates or {})
+        if rate < 0 or any(value < 0 for value in rates.values()):
+            raise ValueError('rate cannot be negative')
+
+        self._rate = rate
+        self._burst = burst
+        self._rates = rates
+        self._clock = clock
+        # name => [tokens, last refill, spans seen since the last kept one]:
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return 'RateLimitingSpanSampler({0})'.format(self._rate)
+
+    @property
+    def rate(self):
+        """
+        Retrieve the default spans per second recorded of each span name.
+
+        :rtype: float
+        """
+        return self._rate
+
+    def rate_for(self, name):
+        """
+        Retrieve the spans per second recorded of a span name.
+
+        :param str name: The span name.
+        :rtype: float
+        """
+        return self._rates.get(name, self._rate)
+
+    def _capacity(self, rate):
+        return self._burst if self._burst is not None else max(rate, 1)
+
+    def sample(self, name):
+        now = self._clock()
+        rate = self.rate_for(name)
+
+        with self._lock:
+            bucket = self._buckets.get(name)
+            if bucket is None:
+                bucket = self._buckets[name] = [self._capacity(rate), now, 0]
+            else:
+                elapsed = max(now - bucket[1], 0)
+                bucket[0] = min(
+                    self._capacity(rate), bucket[0] + elapsed * rate)
+                bucket[1] = now
+
+            bucket[2] += 1
+            if bucket[0] < 1:
+                return None
+
+            bucket[0] -= 1
+            weight, bucket[2] = bucket[2], 0
+            return weight
+
+
+class _RuleNode(object):
+    __slots__ = ('children', 'rate', 'descendants_rate')
+
+    def __init__(self):
+        self.children = {}
+        # Applies to this name and it's descendants:
+        self.rate = None
+        # Applies to it's descendants only (a `name.*` rule):
+        self.descendants_rate = None
+
+
+class SpanNameRuleSampler(SpanSampler):
+    """
+    Record a fraction of the spans of each span name, from hierarchical rules
+        on dotted span names:
+
+    - `'datastore'` applies to `datastore` and every `datastore.<...>` span,
+    - `'datastore.*'` applies to every `datastore.<...>` span only,
+    - `'*'` applies to every span.
+
+    The most specific (longest) matching rule wins. The rules are compiled
+        once into a prefix trie of name segments.
+
+    A kept span's weight is `1 / rate`. Spans kept by the rules may be
+        further sampled by another span sampler (the weights multiply).
+    """
+    SEPARATOR = '.'
+    WILDCARD = '*'
+    # Span names whose rate is memoized:
+    MAX_CACHED = 1000
+
+    def __init__(self, rules, default=1.0, sampler=None):
+        """
+        :param dict rules: Span name pattern => fraction of spans recorded,
+            0.0 to 1.0 (or True=1.0/False=0.0).
+        :param float default: Fraction of spans recorded if no rule matches.
+        :param SpanSampler sampler: Further samples the spans kept by the
+            rules. Default=None (keep them).
+        :raises: ValueError
+        """
+        self._root = _RuleNode()
+        self._root.rate = self._check_rate(default)
+        self._sampler = sampler
+        self._cache = {}
+
+        for pattern, rate in rules.items():
+            self._add_rule(pattern, self._check_rate(rate))
+
+    def __repr__(self):
+        return 'SpanNameRuleSampler()'
+
+    @property
+    def sampler(self):
+        """
+        Retrieve the span sampler further sampling the spans kept by the
+            rules.
+
+        :rtype: SpanSampler
+        """
+        return self._sampler
+
+    @staticmethod
+    def _check_rate(rate):
+        rate = float(rate)
+        if not 0.0 <= rate <= 1.0:
+            raise ValueError('rate must be between 0.0 and 1.0')
+        return rate
+
+    def _add_rule(self, pattern, rate):
+        segments = pattern.split(self.SEPARATOR)
+        descendants = segments[-1] == self.WILDCARD
+        if descendants:
+            segments.pop()
+
+        node = self._root
+        for segment in segments:
+            child = node.children.get(segment)
+            if child is None:
+                child = node.children[segment] = _RuleNode()
+            node = child
+
+        if descendants:
+            node.descendants_rate = rate
+        else:
+            node.rate = rate
+
+    def _lookup(self, name):
+        segments = name.split(self.SEPARATOR)
+        last = len(segments)
+        node = self._root
+        rate = None
+        depth = 0
+
+        while True:
+            if node.rate is not None:
+                rate = node.rate
+            if depth < last and node.descendants_rate is not None:
+                rate = node.descendants_rate
+            if depth == last:
+                return rate
+
+            node = node.children.get(segments[depth])
+            if node is None:
+                return rate
+            depth += 1
+
+    def rate_for(self, name):
+        """
+        Retrieve the fraction of spans of a name recorded by the rules.
+
+        :param str name: The span name.
+        :rtype: float
+        """
+        rate = self._cache.get(name)
+        if rate is None:
+            rate = self._lookup(name)
+            if len(self._cache) < self.MAX_CACHED:
+                self._cache[name] = rate
+        return rate
+
+    def is_disabled(self, name):
+        if self.rate_for(name) == 0.0:
+            return True
+        return self._sampler is not None and self._sampler.is_disabled(name)
+
+    def sample(self, name):
+        rate = self.rate_for(name)
+        if rate < 1.0:
+            if rate == 0.0 or random.random() >= rate:
+                return None
+            weight = int(round(1.0 / rate))
+        else:
+            weight = 1
+
+        if self._sampler is not None:
+            inner = self._sampler.sample(name)
+            if inner is None:
+                return None
+            weight *= inner
+
+        return weight
@@ -4,18 +4,23 @@
 import datetime
 import itertools
 import json
+import logging
 import operator
-from logging import getLogger
 
 import six
 from enum import Enum, unique
 
-from gaesd.core.decorators import SpanDecorators
+from gaesd.core.decorators import NoopDecorators, SpanDecorators
 from .utils import (
-    DuplicateSpanEntryError, NoDurationError, datetime_to_timestamp,
+    ClassLogger, DuplicateSpanEntryError, NoDurationError, datetime_to_ns,
+    monotonic_ns, ns_to_datetime, ns_to_timestamp,
 )
 
-__all__ = ['SpanKind', 'Span']
+__all__ = ['SpanKind', 'Span', 'NoopSpan', 'NOOP_SPAN']
+
+
+def _to_ns(dt):
+    return datetime_to_ns(dt) if dt is not None else None
 
 
 @unique
@@ -28,7 +33,14 @@ class SpanKind(Enum):
 class Span(object):
     """
     Representation of a StackDriver Span object. Can be used as a context-manager.
+
+    :note: Instances have no `__dict__` (see `__slots__`), subclasses adding
+        attributes should declare their own `__slots__`.
     """
+    __slots__ = (
+        '_trace', '_span_id', '_parent_span_id', '_name', '_start_ns',
+        '_end_ns', '_span_kind', '_labels', '__weakref__',
+    )
     _span_ids = itertools.count(1)
 
     def __init__(
@@ -46,9 +58,9 @@ class Span(object):
         :type name: six.string_types
         :param span_kind: StackDriver SpanKind
         :type span_kind: Union[SpanKind, six.string_types]
-        :param start_time: StackDriver startTime of this span
+        :param start_time: StackDriver startTime of this span (UTC).
         :type start_time: datetime.datetime
-        :param end_time: StackDriver endTime of this span
+        :param end_time: StackDriver endTime of this span (UTC).
         :type end_time: datetime.datetime
         :param labels: labels to associate with this span.
         :type labels: dict
@@ -57,27 +69,15 @@ class Span(object):
         self._span_id = span_id
         self._parent_span_id = parent_span_id
         self._name = name
-        self._start_time = start_time
-        self._end_time = end_time
+        # Nanoseconds since the epoch (see `start_ns`):
+        self._start_ns = _to_ns(start_time)
+        self._end_ns = _to_ns(end_time)
         self._span_kind = SpanKind(
             span_kind) if span_kind is not None else SpanKind.unspecified
         self._labels = labels or {}
 
-    @property
-    def logger(self):
-        """
-        Retrieve this Span's logger instance.
-        """
-        my_id = id(self)
-        name = self.__class__.__name__
-        logger_name = '{name}.{my_id}'.format(my_id=my_id, name=name)
-
-        logger = self.sdk.loggers.get(logger_name)
-        if logger is None:
-            self.sdk.loggers[logger_name] = getLogger(
-                '{name}'.format(name=logger_name))
-
-        return self.sdk.loggers[logger_name]
+    #: Shared by every instance of the class:
+    logger = ClassLogger()
 
     def set_logging_level(self, level):
         """
@@ -99,15 +99,17 @@ class Span(object):
         :rtype: Span
         """
         span = cls(*args, **kwargs)
-        span.logger.debug('Created {span}'.format(span=span))
+        logger = cls.logger
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('Created %s', span)
         return span
 
     def __repr__(self):
         return 'Span({0}<-{1})[({2} - {3}) - {4}]'.format(
             self.span_id,
             self.parent_span_id,
-            self._start_time,
-            self._end_time,
+            self.start_time,
+            self.end_time,
             self._span_kind.value,
         )
 
@@ -166,7 +168,10 @@ class Span(object):
 
         :param int parent_span_id:
         """
+        previous = self._parent_span_id
         self._parent_span_id = parent_span_id
+        if self._trace is not None:
+            self._trace._reparent(self, previous)
 
     @property
     def project_id(self):
@@ -206,51 +211,86 @@ class Span(object):
     @property
     def start_time(self):
         """
-        Retrieve this span's start time.
+        Retrieve this span's start time (UTC, to the microsecond).
 
-        :rtype: float
+        :rtype: datetime.datetime
         """
-        return self._start_time
+        start_ns = self._start_ns
+        return ns_to_datetime(start_ns) if start_ns is not None else None
 
     @start_time.setter
     def start_time(self, start_time):
         """
         Set this span's start time
 
-        :param datetime.datetime end_time: The new start time.
+        :param datetime.datetime end_time: The new start time (UTC), or
+            None.
+        :raises: TypeError
         """
-        self._start_time = start_time
+        self._start_ns = _to_ns(start_time)
+
+    @property
+    def start_ns(self):
+        """
+        Retrieve this span's start time.
+
+        :return: Nanoseconds since the epoch, or None.
+        :rtype: int
+        """
+        return self._start_ns
 
     @property
     def end_time(self):
         """
-        Retrieve this span's end time.
+        Retrieve this span's end time (UTC, to the microsecond).
 
-        :rtype: float
+        :rtype: datetime.datetime
         """
-        return self._end_time
+        end_ns = self._end_ns
+        return ns_to_datetime(end_ns) if end_ns is not None else None
 
     @end_time.setter
     def end_time(self, end_time):
         """
         Set this span's end time
 
-        :param datetime.datetime end_time: The new end time.
+        :param datetime.datetime end_time: The new end time (UTC), or None.
+        :raises: TypeError
         """
-        self._end_time = end_time
+        self._end_ns = _to_ns(end_time)
+
+    @property
+    def end_ns(self):
+        """
+        Retrieve this span's end time.
+
+        :return: Nanoseconds since the epoch, or None.
+        :rtype: int
+        """
+        return self._end_ns
 
     @property
     def duration(self):
         """
         Retrieve this span's duration
 
-        :rtype: float
+        :rtype: datetime.timedelta
         :raises: NoDurationError
         """
-        try:
-            return self.end_time - self.start_time
-        except:
+        return datetime.timedelta(microseconds=self.duration_ns // 1000)
+
+    @property
+    def duration_ns(self):
+        """
+        Retrieve this span's duration.
+
+        :return: Nanoseconds.
+        :rtype: int
+        :raises: NoDurationError
+        """
+        if self._start_ns is None or self._end_ns is None:
             raise NoDurationError(self)
+        return self._end_ns - self._start_ns
 
     @property
     def has_duration(self):
@@ -259,11 +299,7 @@ class Span(object):
 
         :rtype: bool
         """
-        try:
-            _ = self.duration  # NOQA: F841
-            return True
-        except NoDurationError:
-            return False
+        return self._start_ns is not None and self._end_ns is not None
 
     @property
     def span_kind(self):
@@ -302,8 +338,8 @@ class Span(object):
             'spanId': str(self.span_id),
             "kind": self.span_kind.value,
             "name": self.name,
-            "startTime": datetime_to_timestamp(self.start_time),
-            "endTime": datetime_to_timestamp(self.end_time),
+            "startTime": ns_to_timestamp(self._start_ns),
+            "endTime": ns_to_timestamp(self._end_ns),
             "parentSpanId": parent_span_id,
             "labels": labels,
         }
@@ -319,14 +355,15 @@ class Span(object):
         return json.dumps(self.export())
 
     def __enter__(self):
-        if self._start_time is not None:
+        if self._start_ns is not None:
             raise DuplicateSpanEntryError(self)
 
-        self._start_time = datetime.datetime.utcnow()
+        # Monotonic, anchored to the trace's wall-clock reference:
+        self._start_ns = monotonic_ns() + self._trace.clock_offset
         return self
 
     def __exit__(self, t, val, tb):
-        self._end_time = datetime.datetime.utcnow()
+        self._end_ns = monotonic_ns() + self._trace.clock_offset
 
         # Fire of this trace:
         self.trace.end(self)
@@ -347,8 +384,14 @@ class Span(object):
         :param other: The span to add
         :type other: Span
         """
-        operator.add(self.trace, other)
-        other.parent_span_id = self.span_id
+        trace = self.trace
+        operator.add(trace, other)
+        # The span the trace stored: `other` itself, or a view of the row it
+        # was copied into by a ColumnarTrace (see `ColumnarTrace._adopt`):
+        other = trace.get_span(other.span_id, other)
+        previous = other.parent_span_id
+        other._parent_span_id = self.span_id
+        trace._reparent(other, previous)
 
     def __iadd__(self, other):
         """
@@ -371,7 +414,7 @@ class Span(object):
         from gaesd.core.trace import Trace
 
         if isinstance(other, Span):
-            self._parent_span_id = other.span_id
+            self.parent_span_id = other.span_id
         elif isinstance(other, Trace):
             operator.add(other, self)
         else:
@@ -390,7 +433,7 @@ class Span(object):
         from gaesd.core.trace import Trace
 
         if isinstance(other, Span):
-            other.parent_span = self
+            other.parent_span_id = self.span_id
         elif isinstance(other, Trace):
             operator.sub(other, self)
         else:
@@ -421,3 +464,114 @@ class Span(object):
         :rtype: SpanDecorators
         """
         return SpanDecorators(self)
+
+
+class NoopSpan(Span):
+    """
+    The span of an unsampled (or disabled) trace: supports the whole Span
+        API but records nothing. Use the `NOOP_SPAN` singleton.
+    """
+    __slots__ = ()
+    # Never started nor ended:
+    _start_ns = None
+    _end_ns = None
+
+    def __init__(self):
+        pass
+
+    def set_logging_level(self, level):
+        pass
+
+    def __repr__(self):
+        return 'NoopSpan()'
+
+    @property
+    def sdk(self):
+        return None
+
+    @property
+    def labels(self):
+        # Never keep labels:
+        return {}
+
+    @property
+    def trace(self):
+        from gaesd.core.trace import NOOP_TRACE
+        return NOOP_TRACE
+
+    @property
+    def parent_span_id(self):
+        return None
+
+    @parent_span_id.setter
+    def parent_span_id(self, parent_span_id):
+        pass
+
+    @property
+    def project_id(self):
+        return None
+
+    @property
+    def span_id(self):
+        return None
+
+    @property
+    def name(self):
+        return ''
+
+    @name.setter
+    def name(self, name):
+        pass
+
+    @property
+    def start_time(self):
+        return None
+
+    @start_time.setter
+    def start_time(self, start_time):
+        pass
+
+    @property
+    def end_time(self):
+        return None
+
+    @end_time.setter
+    def end_time(self, end_time):
+        pass
+
+    @property
+    def span_kind(self):
+        return SpanKind.unspecified
+
+    @span_kind.setter
+    def span_kind(self, span_kind):
+        pass
+
+    def export(self):
+        return {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, t, val, tb):
+        pass
+
+    def span(self, **kwargs):
+        return self
+
+    def __add__(self, other):
+        pass
+
+    def __rshift__(self, other):
+        pass
+
+    def __lshift__(self, other):
+        pass
+
+    @property
+    def decorators(self):
+        return NoopDecorators()
+
+
+#: The (stateless) NoopSpan instance:
+NOOP_SPAN = NoopSpan()
@@ -3,32 +3,49 @@
 
 import datetime
 import json
+import logging
 import operator
 import uuid
 from collections import MutableSequence
-from logging import getLogger
 
-from gaesd.core.decorators import TraceDecorators
-from .span import Span
+from gaesd.core.decorators import NoopDecorators, TraceDecorators
+from .sampling import SAMPLING_WEIGHT_LABEL
+from .span import NOOP_SPAN, Span
 from .utils import (
-    InvalidSliceError, find_spans_in_datetime_range, find_spans_in_float_range,
-    find_spans_with_duration_less_than,
+    ClassLogger, InvalidSliceError, find_spans_in_datetime_range,
+    find_spans_in_float_range, find_spans_with_duration_less_than,
+    monotonic_ns, wall_clock_ns,
 )
 
-__all__ = ['Trace']
+__all__ = ['Trace', 'NoopTrace', 'NOOP_TRACE']
 
 
 class Trace(MutableSequence):
     """
     Representation of a StackDriver Trace object. Can be used as a context-manager.
-    """
 
-    def __init__(self, sdk, trace_id=None, root_span_id=None):
+    :note: Instances have no `__dict__` (see `__slots__`), subclasses adding
+        attributes should declare their own `__slots__`.
+    """
+    __slots__ = (
+        '_sdk', '_spans', '_trace_id', '_root_span_id', '_sampled',
+        '_completed', '_completed_positions', '_clock_offset', '_span_index',
+        '_child_spans',
+    ) + (
+        # python 2's MutableSequence has no `__slots__` (so already has one):
+        () if hasattr(MutableSequence, '__weakref__') else ('__weakref__',)
+    )
+
+    def __init__(
+        self, sdk, trace_id=None, root_span_id=None, parent_sampled=None,
+    ):
         """
         :param SDK sdk: Instance of SDK this trace belongs to.
         :param six.string_types trace_id: TraceId
         :param str/int root_span_id: Default span_id to give a trace's top
             level spans.
+        :param bool parent_sampled: The caller's sampling decision, passed to
+            the SDK's sampler. Default=None (unknown).
         """
         super(Trace, self).__init__()
         self._sdk = sdk
@@ -36,23 +53,22 @@ class Trace(MutableSequence):
         self._trace_id = trace_id if trace_id is not None else \
             self.new_trace_id()
         self._root_span_id = root_span_id
-        self._span_tree = []
-
-    @property
-    def logger(self):
-        """
-        Retrieve this trace's logger instance.
-        """
-        my_id = id(self)
-        name = self.__class__.__name__
-        logger_name = '{name}.{my_id}'.format(my_id=my_id, name=name)
-
-        logger = self.sdk.loggers.get(logger_name)
-        if logger is None:
-            self.sdk.loggers[logger_name] = getLogger(
-                '{name}'.format(name=logger_name))
-
-        return self.sdk.loggers[logger_name]
+        self._sampled = sdk.sampler.should_sample(
+            self._trace_id, parent_sampled)
+        # The completed spans, in the order that they completed (None for
+        # those since removed, see `completed_offset`):
+        self._completed = []
+        # completed span => it's offset in `_completed`:
+        self._completed_positions = {}
+        # span_id => span:
+        self._span_index = {}
+        # parent_span_id => spans, in the order they were added:
+        self._child_spans = {}
+        # The wall-clock reference of the spans' (monotonic) times:
+        self._clock_offset = wall_clock_ns() - monotonic_ns()
+
+    #: Shared by every instance of the class:
+    logger = ClassLogger()
 
     def set_logging_level(self, level):
         """
@@ -76,7 +92,9 @@ class Trace(MutableSequence):
         :rtype: Trace
         """
         trace = cls(*args, **kwargs)
-        trace.logger.debug('Created {trace}'.format(trace=trace))
+        logger = cls.logger
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('Created %s', trace)
         return trace
 
     def __repr__(self):
@@ -130,7 +148,30 @@ class Trace(MutableSequence):
         :param trace_id: The new trace id to use
         :type trace_id: six.string_types
         """
+        previous = self._trace_id
         self._trace_id = trace_id
+        self._sdk.context.trace_id_changed(self, previous)
+
+    @property
+    def clock_offset(self):
+        """
+        Retrieve the wall-clock reference of this trace's spans: a span's
+            start and end times are the monotonic clock's time plus this.
+
+        :return: Nanoseconds.
+        :rtype: int
+        """
+        return self._clock_offset
+
+    @property
+    def sampled(self):
+        """
+        Determine if this trace is sampled: an unsampled trace records no
+            spans and is never dispatched.
+
+        :rtype: bool
+        """
+        return self._sampled
 
     @property
     def sdk(self):
@@ -151,12 +192,44 @@ class Trace(MutableSequence):
         """
         return self._spans[:]
 
+    @property
+    def completed_spans(self):
+        """
+        Retrieve a list of this trace's completed spans, in the order that
+            they completed.
+
+        :return: A shallow-copy list of this Trace's completed spans.
+        :rtype: list(Span)
+        """
+        return [span for span in self._completed if span is not None]
+
+    @property
+    def completed_count(self):
+        """
+        Retrieve the number of this trace's completed spans.
+
+        :rtype: int
+        """
+        return len(self._completed_positions)
+
+    @property
+    def completed_offset(self):
+        """
+        Retrieve the offset after this trace's last completed span, in the
+            order that they completed (see `export_completed`). A span
+            removed from this trace keeps it's offset, so that the offsets
+            of the others never change.
+
+        :rtype: int
+        """
+        return len(self._completed)
+
     def set_default(self, **kwargs):
         """
         Set the default trace_id and root_span_id for this Trace instane.
         """
         if 'trace_id' in kwargs:
-            self._trace_id = kwargs['trace_id']
+            self.trace_id = kwargs['trace_id']
         if 'root_span_id' in kwargs:
             self._root_span_id = kwargs['root_span_id']
 
@@ -170,7 +243,21 @@ class Trace(MutableSequence):
         :return: The span
         :rtype: Span
         """
-        return self._span_tree[-1] if self._span_tree else self.sdk.new_span
+        if not self._sampled:
+            return NOOP_SPAN
+
+        span = self.sdk.context.current_span(self)
+        return span if span is not None else self.sdk.new_span
+
+    @property
+    def _span_tree(self):
+        """
+        Retrieve the spans entered on this trace by the current thread (or
+            asyncio task), outermost first.
+
+        :rtype: list(Span)
+        """
+        return self.sdk.context.span_stack(self)
 
     @property
     def span_ids(self):
@@ -182,6 +269,84 @@ class Trace(MutableSequence):
         """
         return [span.span_id for span in self._spans]
 
+    def get_span(self, span_id, default=None):
+        """
+        Retrieve one of this trace's spans by it's span id.
+
+        :param span_id: The span id.
+        :type span_id: str/int
+        :param default: Returned if no span of this trace has the span id.
+        :rtype: Span
+        """
+        return self._span_index.get(span_id, default)
+
+    def get_children(self, parent_span_id):
+        """
+        Retrieve this trace's spans with the given parent span id, in the
+            order they were added.
+
+        :param parent_span_id: The parent span id (`root_span_id` or None for
+            the top level spans).
+        :type parent_span_id: str/int
+        :rtype: list(Span)
+        """
+        return list(self._child_spans.get(parent_span_id, ()))
+
+    def _index_span(self, span):
+        """
+        Add a span to the span id and parent span id indexes.
+
+        :param Span span: A span just added to this trace.
+        """
+        self._span_index[span.span_id] = span
+        self._child_spans.setdefault(span.parent_span_id, []).append(span)
+
+    def _unindex_span(self, span):
+        """
+        Remove a span from the span id and parent span id indexes.
+
+        :param Span span: A span just removed from this trace.
+        """
+        if self._span_index.get(span.span_id) is span:
+            del self._span_index[span.span_id]
+        self._remove_child(span.parent_span_id, span)
+
+    def _remove_child(self, parent_span_id, span):
+        children = self._child_spans.get(parent_span_id)
+        if children is None:
+            return
+        for index, child in enumerate(children):
+            if child is span:
+                del children[index]
+                break
+        if not children:
+            del self._child_spans[parent_span_id]
+
+    def _reparent(self, span, parent_span_id):
+        """
+        Notify this Trace that one of it's span's parent span id changed.
+
+        :param Span span: The span.
+        :param parent_span_id: The span's previous parent span id.
+        """
+        if self._span_index.get(span.span_id) is not span:
+            return
+
+        self._remove_child(parent_span_id, span)
+        self._child_spans.setdefault(span.parent_span_id, []).append(span)
+
+    def _adopt(self, span):
+        """
+        Retrieve the span to store for a span being added to this trace: a
+            span added by hand from another trace now belongs to this one.
+
+        :param Span span: The span being added.
+        :rtype: Span
+        """
+        if span._trace is not self:
+            span._trace = self
+        return span
+
     @property
     def project_id(self):
         """
@@ -193,17 +358,20 @@ class Trace(MutableSequence):
         return self.sdk.project_id
 
     def _add_new_span_to_span_tree(self, new_span):
-        if not self._span_tree:
-            self._span_tree.append(new_span)
+        context = self.sdk.context
+        current = context.current_span(self)
+        if current is None:
+            context.push_span(self, new_span)
         else:
-            if self.spans and new_span:
-                if self._span_tree[-1].span_id == new_span.parent_span_id:
-                    self._span_tree.append(new_span)
+            if self._spans and new_span:
+                if current.span_id == new_span.parent_span_id:
+                    context.push_span(self, new_span)
 
     def _remove_span_from_span_tree(self, span):
-        if self._span_tree:
-            if self._span_tree[-1] is span:
-                self._span_tree.pop(-1)
+        context = self.sdk.context
+        current = context.current_span(self)
+        if current is not None and current is span:
+            context.pop_span(self)
 
     def span(self, parent_span=None, **span_args):
         """
@@ -212,12 +380,40 @@ class Trace(MutableSequence):
         :param parent_span: Optional parent span
         :type parent_span: Span
         :param span_args: Passed directly to the Span constructor.
-        :return: The new span
+        :return: The new span (`NOOP_SPAN` if this trace is not sampled, or
+            the SDK's span sampler dropped it).
         :rtype: Span
         """
+        if not self._sampled:
+            return NOOP_SPAN
+
+        span_sampler = self.sdk.span_sampler
+        if span_sampler is not None:
+            weight = span_sampler.sample(span_args.get('name', ''))
+            if weight is None:
+                return NOOP_SPAN
+            labels = dict(span_args.get('labels') or {})
+            labels[SAMPLING_WEIGHT_LABEL] = str(weight)
+            span_args['labels'] = labels
+
+        # Children of a dropped span are re-parented to the root span:
         parent_span_id = parent_span.span_id if parent_span is not None else \
-            self.root_span_id
+            None
+        if parent_span_id is None:
+            parent_span_id = self.root_span_id
+
+        span = self._new_span(parent_span_id, span_args)
+        self._add_new_span_to_span_tree(span)
+        return span
+
+    def _new_span(self, parent_span_id, span_args):
+        """
+        Create a new span and append it to this trace's spans.
 
+        :param parent_span_id: The new span's parent span id.
+        :param dict span_args: Passed directly to the Span constructor.
+        :rtype: Span
+        """
         span = Span.new(
             trace=self,
             span_id=Span.new_span_id(),
@@ -226,22 +422,40 @@ class Trace(MutableSequence):
         )
 
         self._spans.append(span)
-        self._add_new_span_to_span_tree(span)
+        self._index_span(span)
         return span
 
-    def export(self):
+    def export(self, spans=None):
         """
         Export this trace instance as a dict.
 
+        :param spans: Optional subset of this trace's spans to export.
+            Default=All spans.
+        :type spans: list(Span)
         :return: This exported Trace's data.
         :rtype: Dict[str, str]
         """
+        spans = self.spans if spans is None else spans
+
         return {
             'projectId': str(self.project_id),
             'traceId': str(self.trace_id),
-            'spans': [i.export() for i in self.spans if i is not None],
+            'spans': [i.export() for i in spans if i is not None],
         }
 
+    def export_completed(self, start=0, stop=None):
+        """
+        Export this trace instance as a dict, containing only a range of it's
+            completed spans.
+
+        :param int start: Offset of the first completed span to export.
+        :param int stop: Offset after the last completed span to export
+            (see `completed_offset`). Default=The last completed span.
+        :return: This exported Trace's data.
+        :rtype: Dict[str, str]
+        """
+        return self.export(spans=self._completed[start:stop])
+
     @property
     def json(self):
         """
@@ -264,9 +478,36 @@ class Trace(MutableSequence):
 
         :param Span span: The final span.
         """
+        if not self._sampled:
+            return
+
+        if span is not None:
+            self._complete(span)
+        else:
+            # Also pick up spans that were given an end_time by hand:
+            for each_span in self._spans:
+                if each_span.end_ns is not None:
+                    self._complete(each_span)
+
         self._remove_span_from_span_tree(span)
         self.sdk.patch_trace(self)
 
+    def _complete(self, span):
+        if span not in self._completed_positions:
+            self._completed_positions[span] = len(self._completed)
+            self._completed.append(span)
+
+    def _uncomplete(self, span):
+        """
+        Forget that a span removed from this trace completed, so that it is
+            not exported.
+
+        :param Span span: The removed span.
+        """
+        position = self._completed_positions.pop(span, None)
+        if position is not None:
+            self._completed[position] = None
+
     def __add__(self, other):
         """
         Add a span to the current Trace and make it the current_span.
@@ -277,14 +518,26 @@ class Trace(MutableSequence):
         if not isinstance(other, Span):
             raise TypeError('{0} is not an instance of Span'.format(other))
 
-        span_id = other.span_id
-        if span_id in self.span_ids:
-            raise ValueError(
-                'span_id {0} already present in this Trace'.format(span_id))
-
+        self._check_unique(other)
+        other = self._adopt(other)
         self._spans.append(other)
+        self._index_span(other)
         self._add_new_span_to_span_tree(other)
 
+    def _check_unique(self, span, replaced=None):
+        """
+        Make sure that no other span of this trace has the span's span id.
+
+        :param Span span: A span being added to this trace.
+        :param Span replaced: The span it replaces, if any.
+        :raises: ValueError
+        """
+        span_id = span.span_id
+        present = self.get_span(span_id)
+        if present is not None and (replaced is None or present != replaced):
+            raise ValueError(
+                'span_id {0} already present in this Trace'.format(span_id))
+
     def __iadd__(self, other):
         """
         :see: `__add__`
@@ -299,7 +552,7 @@ class Trace(MutableSequence):
 
         :rtype: int
         """
-        return len(self.spans)
+        return len(self._spans)
 
     def __sub__(self, other):
         """
@@ -314,6 +567,8 @@ class Trace(MutableSequence):
                 other=other))
 
         self._spans.remove(other)
+        self._unindex_span(other)
+        self._uncomplete(other)
         self._remove_span_from_span_tree(other)
 
     def __isub__(self, other):
@@ -381,6 +636,8 @@ class Trace(MutableSequence):
         :return: A new Decorators instance.
         :rtype: TraceDecorators
         """
+        if not self._sampled:
+            return NoopDecorators()
         return TraceDecorators(self)
 
     def __setitem__(self, index, value):
@@ -394,7 +651,15 @@ class Trace(MutableSequence):
         """
         if not isinstance(value, Span):
             raise TypeError('Can only insert item of type=Span')
+
+        replaced = self._spans[index]
+        self._check_unique(value, replaced)
+        value = self._adopt(value)
         self._spans[index] = value
+        self._unindex_span(replaced)
+        if replaced != value:
+            self._uncomplete(replaced)
+        self._index_span(value)
 
     def __delitem__(self, index):
         """
@@ -403,10 +668,135 @@ class Trace(MutableSequence):
         :param index: index to delete from
         :type index: int
         """
+        removed = self._spans[index]
         del self._spans[index]
+        for span in removed if isinstance(index, slice) else [removed]:
+            self._unindex_span(span)
+            self._uncomplete(span)
 
     def insert(self, index, value):
         'S.insert(index, object) -- insert object before index'
         if not isinstance(value, Span):
             raise TypeError('Can only insert item of type=Span')
+
+        self._check_unique(value)
+        value = self._adopt(value)
         self._spans.insert(index, value)
+        self._index_span(value)
+
+
+class NoopTrace(Trace):
+    """
+    The trace given out while the SDK is disabled: supports the whole Trace
+        API but records nothing. Use the `NOOP_TRACE` singleton.
+    """
+    __slots__ = ()
+    _sampled = False
+
+    def __init__(self):
+        pass
+
+    def set_logging_level(self, level):
+        pass
+
+    def __repr__(self):
+        return 'NoopTrace()'
+
+    @property
+    def root_span_id(self):
+        return None
+
+    @root_span_id.setter
+    def root_span_id(self, span_id):
+        pass
+
+    @property
+    def trace_id(self):
+        return None
+
+    @trace_id.setter
+    def trace_id(self, trace_id):
+        pass
+
+    @property
+    def sdk(self):
+        return None
+
+    @property
+    def spans(self):
+        return []
+
+    @property
+    def completed_spans(self):
+        return []
+
+    @property
+    def completed_count(self):
+        return 0
+
+    @property
+    def completed_offset(self):
+        return 0
+
+    def set_default(self, **kwargs):
+        pass
+
+    @property
+    def _span_tree(self):
+        return []
+
+    @property
+    def span_ids(self):
+        return []
+
+    def get_span(self, span_id, default=None):
+        return default
+
+    def get_children(self, parent_span_id):
+        return []
+
+    def _reparent(self, span, parent_span_id):
+        pass
+
+    @property
+    def project_id(self):
+        return None
+
+    def export(self, spans=None):
+        return {'projectId': None, 'traceId': None, 'spans': []}
+
+    def export_completed(self, start=0, stop=None):
+        return self.export()
+
+    def end(self, span=None):
+        pass
+
+    def __add__(self, other):
+        pass
+
+    def __sub__(self, other):
+        pass
+
+    def __len__(self):
+        return 0
+
+    def __iter__(self):
+        return iter(())
+
+    def __getitem__(self, item):
+        if isinstance(item, (slice, datetime.timedelta)):
+            return []
+        raise IndexError(item)
+
+    def __setitem__(self, index, value):
+        pass
+
+    def __delitem__(self, index):
+        pass
+
+    def insert(self, index, value):
+        pass
+
+
+#: The (stateless) NoopTrace instance:
+NOOP_TRACE = NoopTrace()
@@ -2,11 +2,22 @@
 # -*- coding: latin-1 -*-
 
 import datetime
+import time
+from logging import getLogger
 
 __all__ = [
+    'ClassLogger',
     'NoDurationError',
     'InvalidSliceError',
     'DuplicateSpanEntryError',
+    'DispatchError',
+    'SpoolLockedError',
+    'monotonic_ns',
+    'wall_clock_ns',
+    'datetime_to_ns',
+    'ns_to_datetime',
+    'ns_to_timestamp',
+    'seconds_to_ns',
     'find_spans_in_datetime_range',
     'find_spans_in_float_range',
     'find_spans_with_duration_less_than',
@@ -48,6 +59,157 @@ class DuplicateSpanEntryError(RuntimeError):
         self.span = span
 
 
+class DispatchError(RuntimeError):
+    """
+    StackDriver rejected a dispatch.
+    """
+
+    def __init__(self, status, body=None):
+        super(DispatchError, self).__init__(
+            'Dispatch failed with status {status}: {body}'.format(
+                status=status, body=body))
+        self.status = status
+        self.body = body
+
+
+class SpoolLockedError(RuntimeError):
+    """
+    The spool directory is in use by another SpoolLog (process).
+    """
+
+    def __init__(self, directory):
+        super(SpoolLockedError, self).__init__(
+            'Spool directory {directory} is in use'.format(
+                directory=directory))
+        self.directory = directory
+
+
+class ClassLogger(object):
+    """
+    Descriptor giving every instance of a class (and of each subclass) the
+        one logger named after it's class, eg: `Span`.
+
+    Unlike a logger per instance, this is never collected nor registered
+        with the logging module more than once per class, and it's level is
+        set with `SDK.set_logging_level(level, prefix=<class name>)`.
+    """
+    #: Names of the loggers handed out so far:
+    names = set()
+
+    def __init__(self):
+        # class => logger:
+        self._loggers = {}
+
+    def __get__(self, instance, owner):
+        logger = self._loggers.get(owner)
+        if logger is None:
+            logger = self._loggers[owner] = getLogger(owner.__name__)
+            self.names.add(owner.__name__)
+        return logger
+
+
+#: The (naive, UTC) epoch of the nanosecond timestamps:
+EPOCH = datetime.datetime(1970, 1, 1)
+NS_PER_SECOND = 10 ** 9
+
+if hasattr(time, 'perf_counter_ns'):
+    monotonic_ns = time.perf_counter_ns
+elif hasattr(time, 'perf_counter'):  # pragma: no cover
+    # python 3.3 - 3.6:
+    def monotonic_ns():
+        """
+        Retrieve a monotonic clock's time.
+
+        :return: Nanoseconds since an arbitrary point.
+        :rtype: int
+        """
+        return int(time.perf_counter() * NS_PER_SECOND)
+else:  # pragma: no cover
+    # python 2 (no monotonic clock):
+    def monotonic_ns():
+        """
+        Retrieve a monotonic clock's time.
+
+        :return: Nanoseconds since an arbitrary point.
+        :rtype: int
+        """
+        return int(time.time() * NS_PER_SECOND)
+
+if hasattr(time, 'time_ns'):
+    wall_clock_ns = time.time_ns
+else:  # pragma: no cover
+    def wall_clock_ns():
+        """
+        Retrieve the wall-clock time.
+
+        :return: Nanoseconds since the epoch.
+        :rtype: int
+        """
+        return int(time.time() * NS_PER_SECOND)
+
+
+def datetime_to_ns(dt):
+    """
+    Convert a (naive, UTC) datetime to nanoseconds since the epoch.
+
+    :param datetime.datetime dt:
+    :rtype: int
+    :raises: TypeError
+    """
+    if not isinstance(dt, datetime.datetime):
+        raise TypeError('{0!r} is not a datetime'.format(dt))
+
+    delta = dt - EPOCH
+    return (delta.days * 86400 + delta.seconds) * NS_PER_SECOND + \
+        delta.microseconds * 1000
+
+
+def ns_to_datetime(ns):
+    """
+    Convert nanoseconds since the epoch to a (naive, UTC) datetime.
+
+    :param int ns:
+    :return: The datetime (to the microsecond).
+    :rtype: datetime.datetime
+    """
+    return EPOCH + datetime.timedelta(microseconds=ns // 1000)
+
+
+# (seconds since the epoch, it's timestamp) of the last timestamp created:
+_last_second = (None, None)
+
+
+def ns_to_timestamp(ns=None):
+    """
+    Create a StackDriver compatible (RFC3339) timestamp, to the nanosecond.
+
+    :param int ns: Nanoseconds since the epoch.
+    :rtype: six.string_types
+    """
+    if ns is None:
+        return None
+
+    global _last_second
+
+    seconds, nanos = divmod(ns, NS_PER_SECOND)
+    # The spans of a trace mostly start and end within the same second:
+    last_second = _last_second
+    if last_second[0] == seconds:
+        timestamp = last_second[1]
+    else:
+        timestamp = (
+            EPOCH + datetime.timedelta(seconds=seconds)).isoformat('T')
+        _last_second = (seconds, timestamp)
+
+    if nanos:
+        # Like `datetime.isoformat`, unless finer than microseconds:
+        if nanos % 1000:
+            timestamp += '.{0:09d}'.format(nanos)
+        else:
+            timestamp += '.{0:06d}'.format(nanos // 1000)
+    return timestamp + 'Z'
+
+
 def datetime_to_timestamp(dt=None):
     """
     Create a StackDriver compatible timestamp.
@@ -65,45 +227,43 @@ def datetime_to_float(dt):
     :param datetime.datetime dt:
     :rtype: float
     """
-    epoch = datetime.datetime.utcfromtimestamp(0)
-    total_seconds = (dt - epoch).total_seconds()
+    total_seconds = (dt - EPOCH).total_seconds()
     # total_seconds will be in decimals (millisecond precision)
     return total_seconds
 
 
-def _find_spans_in_datetime_range(spans, from_, to_, func):
+def _find_spans_in_ns_range(spans, from_, to_):
     result = []
 
     for span in spans:
-        span_from = False
-        span_to = False
-
-        if from_ is not None:
-            if span.start_time is not None:
-                start_time = func(span.start_time)
-                # Deliberately `>=` not `>`:
-                if start_time >= from_:
-                    span_from = True
-        else:
-            if span.start_time is not None:
-                span_from = True
-
-        if to_ is not None:
-            if span.end_time is not None:
-                end_time = func(span.end_time)
-                # Deliberately `<` not `<=`:
-                if end_time < to_:
-                    span_to = True
-        else:
-            if span.end_time is not None:
-                span_to = True
+        start_ns = span.start_ns
+        end_ns = span.end_ns
+        if start_ns is None or end_ns is None:
+            continue
+
+        # Deliberately `>=` not `>`:
+        if from_ is not None and start_ns < from_:
+            continue
+        # Deliberately `<` not `<=`:
+        if to_ is not None and end_ns >= to_:
+            continue
 
-        if span_from and span_to:
-            result.append(span)
+        result.append(span)
 
     return result
 
 
+def seconds_to_ns(seconds):
+    """
+    Convert (floating point) seconds to nanoseconds, to the microsecond (as
+        `datetime_to_float`).
+
+    :param float seconds:
+    :rtype: int
+    """
+    return int(round(seconds * 1000000)) * 1000
+
+
 def find_spans_in_datetime_range(spans, from_=None, to_=None):
     """
     Find all the spans such that:
@@ -118,11 +278,10 @@ def find_spans_in_datetime_range(spans, from_=None, to_=None):
     :return: The spans that satisfy the bounds.
     :rtype: List(Span)
     """
-    return _find_spans_in_datetime_range(
+    return _find_spans_in_ns_range(
         spans=spans,
-        from_=from_,
-        to_=to_,
-        func=lambda x: x,
+        from_=datetime_to_ns(from_) if from_ is not None else None,
+        to_=datetime_to_ns(to_) if to_ is not None else None,
     )
 
 
@@ -140,11 +299,10 @@ def find_spans_in_float_range(spans, from_=None, to_=None):
     :return: The spans that satisfy the bounds.
     :rtype: List(Span)
     """
-    return _find_spans_in_datetime_range(
+    return _find_spans_in_ns_range(
         spans=spans,
-        from_=from_,
-        to_=to_,
-        func=datetime_to_float,
+        from_=seconds_to_ns(from_) if from_ is not None else None,
+        to_=seconds_to_ns(to_) if to_ is not None else None,
     )
 
 
@@ -154,21 +312,23 @@ def find_spans_with_duration_less_than(spans, duration):
     Spans with no duration will not be returned.
 
     :param list(Span) spans:
-    :param duration: The duration to use.
-    :type duration: Union[float, int]
+    :param duration: The duration to use (in seconds).
+    :type duration: Union[float, int, datetime.timedelta]
     :return: The spans that satisfy the duration.
     :rtype: List(Span)
     """
-    if isinstance(duration, (float, int)):
-        duration = datetime.timedelta(seconds=duration)
+    if isinstance(duration, datetime.timedelta):
+        duration = duration.total_seconds()
+    duration_ns = seconds_to_ns(duration)
 
     results = []
 
     for span in spans:
-        try:
-            if span.duration <= duration:
-                results.append(span)
-        except NoDurationError:
+        start_ns = span.start_ns
+        end_ns = span.end_ns
+        if start_ns is None or end_ns is None:
             continue
+        if end_ns - start_ns <= duration_ns:
+            results.append(span)
 
     return results
@@ -2,17 +2,20 @@
 # -*- coding: latin-1 -*-
 
 import operator
-import threading
+import time
 from collections import Callable, MutableSequence
 from logging import getLogger
 
+from .core.context import new_context
 from .core.decorators import Decorators
 from .core.dispatchers.google_api_client_dispatcher import (
     GoogleApiClientDispatcher
 )
 from .core.helpers import Helpers
+from .core.sampling import AlwaysOnSampler, parse_trace_context
 from .core.span import Span
-from .core.trace import Trace
+from .core.trace import NOOP_TRACE, Trace
+from .core.utils import ClassLogger
 
 DEFAULT_ENABLER = True
 
@@ -21,13 +24,16 @@ __all__ = ['SDK']
 
 class SDK(Callable, MutableSequence):
     """
-    Thread-aware main class controlling writing data to StackDriver.
+    Thread (and asyncio task) aware main class controlling writing data to
+    StackDriver.
     """
-    _context = threading.local()  # thread-local storage:
+    # Per thread (or task) storage:
+    _context = new_context()
 
     def __init__(
         self, project_id, dispatcher=GoogleApiClientDispatcher, auto=True,
-        enabler=DEFAULT_ENABLER,
+        enabler=DEFAULT_ENABLER, sampler=None, span_sampler=None,
+        enabler_ttl=None, trace_type=Trace,
     ):
         """
         :param project_id: appengine PROJECT id (eg: `joivy-dev5`)
@@ -40,11 +46,30 @@ class SDK(Callable, MutableSequence):
         :param enabler: Global kill switch. True=enabled, False=killed.
             Default=True.
         :type enabler: bool/callable
+        :param sampler: Decides which new traces are sampled.
+            Default=`AlwaysOnSampler()`.
+        :type sampler: gaesd.core.sampling.Sampler
+        :param span_sampler: Decides which new spans of sampled traces are
+            recorded. Default=None (every span).
+        :type span_sampler: gaesd.core.sampling.SpanSampler
+        :param enabler_ttl: Seconds for which a callable enabler's result is
+            cached by `enabled_fast`. Default=None (never cached).
+        :type enabler_ttl: float
+        :param trace_type: Trace type used by `trace()` (eg:
+            `gaesd.core.columnar.ColumnarTrace`). Default=Trace.
+        :type trace_type: type(Trace)
         """
         self._project_id = project_id
         self.clear()
-        self._context.dispatcher = dispatcher(sdk=self, auto=auto)
-        self._context.enabler = enabler
+        # Shared by every thread (and task), unlike the traces:
+        self._enabler = enabler
+        self._enabler_ttl = enabler_ttl
+        # (enabled, expiry time or None=never), or None=not evaluated:
+        self._enabled_cache = None
+        self._sampler = sampler or AlwaysOnSampler()
+        self._span_sampler = span_sampler
+        self._trace_type = trace_type
+        self._dispatcher = dispatcher(sdk=self, auto=auto)
         if not hasattr(self._context, 'loggers'):
             self._context.loggers = {}
         self._helpers = Helpers(self)
@@ -53,11 +78,19 @@ class SDK(Callable, MutableSequence):
     @property
     def loggers(self):
         """
-        Retrieve all logger instances associated with this SDK.
+        Retrieve all logger instances associated with this SDK (Traces,
+            Spans and Dispatchers use one logger per class instead, see
+            `ClassLogger`).
 
+        :note: Threads other than the one that created this SDK (eg: a
+            dispatcher's worker thread) get their own, empty, logger cache.
         :rtype: list
         """
-        return self._context.loggers
+        try:
+            return self._context.loggers
+        except AttributeError:
+            self._context.loggers = {}
+            return self._context.loggers
 
     @property
     def logger(self):
@@ -81,15 +114,47 @@ class SDK(Callable, MutableSequence):
         Set the logging level of a logger associated with this SDK, one
         of it's Traces or one of it's Spans, Helpers or Decorators.
 
+        :note: Traces, Spans and Dispatchers share one logger per class (eg:
+            `Span`), while each SDK has it's own (`SDK.<id>`, a child of the
+            `SDK` logger).
         :param int level: New logging level to set.
         :param prefix: All loggers with this prefix will have their levels set.
         :type prefix: Union[None, None, str]
         """
+        if prefix:
+            # The loggers below it (that have no level of their own) follow:
+            getLogger(prefix).setLevel(level)
+        else:
+            for logger_name in ClassLogger.names:
+                getLogger(logger_name).setLevel(level)
+
         for logger_name, logger in cls._context.loggers.items():
             if prefix and logger_name.split('.')[0] != prefix:
                 continue
             logger.setLevel(level)
 
+    @property
+    def context(self):
+        """
+        Retrieve the context backend holding the current thread's (or
+            task's) traces and span stacks.
+
+        :rtype: gaesd.core.context.Context
+        """
+        return self._context
+
+    @classmethod
+    def set_context(cls, context):
+        """
+        Replace the context backend (eg: with a `ThreadLocalContext` for one
+            request per thread on python 3.7+).
+
+        :note: Do this before creating an SDK, everything held by the
+            previous context is lost.
+        :param gaesd.core.context.Context context: The new backend.
+        """
+        cls._context = context
+
     @classmethod
     def new(cls, *args, **kwargs):
         """
@@ -128,19 +193,70 @@ class SDK(Callable, MutableSequence):
     def is_enabled(self):
         """
         Determine if the SDK is enabled.
-        An enabled SDK is one that will not dispatch traces to StackDriver
-        but will still create and capture traces and spans.
+        A disabled SDK creates no traces or spans (it hands out `NOOP_TRACE`)
+        and dispatches nothing to StackDriver.
 
         :return: True=Enabled, False=disabled.
         :rtype: bool
         """
-        value = self._context.enabler
+        value = self._enabler
+        if not callable(value):
+            return bool(value)
 
         try:
             return bool(value())
         except Exception:
             return bool(value)
 
+    @property
+    def enabled_fast(self):
+        """
+        Determine if the SDK is enabled, using the enabler's cached result
+            (see `enabler_ttl`). Used by the SDK's (and it's dispatcher's)
+            hot paths instead of `is_enabled`.
+
+        :return: True=Enabled, False=disabled.
+        :rtype: bool
+        """
+        cached = self._enabled_cache
+        if cached is not None:
+            if cached[1] is None or cached[1] > time.time():
+                return cached[0]
+
+        enabled = self.is_enabled
+        if not callable(self._enabler):
+            self._enabled_cache = (enabled, None)
+        elif self._enabler_ttl:
+            self._enabled_cache = (enabled, time.time() + self._enabler_ttl)
+        return enabled
+
+    def invalidate_enabler(self):
+        """
+        Discard the enabler's cached result, so that `enabled_fast` evaluates
+            it again.
+        """
+        self._enabled_cache = None
+
+    @property
+    def enabler_ttl(self):
+        """
+        Get the seconds for which a callable enabler's result is cached.
+
+        :return: Seconds, or None if it is never cached.
+        :rtype: float
+        """
+        return self._enabler_ttl
+
+    @enabler_ttl.setter
+    def enabler_ttl(self, enabler_ttl):
+        """
+        Set the seconds for which a callable enabler's result is cached.
+
+        :param float enabler_ttl: Seconds, or None to never cache it.
+        """
+        self._enabler_ttl = enabler_ttl
+        self.invalidate_enabler()
+
     @property
     def enabler(self):
         """
@@ -163,29 +279,97 @@ class SDK(Callable, MutableSequence):
         if enabler is None:
             raise ValueError('enabler cannot be None')
 
-        self._context.enabler = enabler
+        self._enabler = enabler
+        self.invalidate_enabler()
+
+    @property
+    def sampler(self):
+        """
+        Get the sampler deciding which new traces are sampled.
+
+        :rtype: gaesd.core.sampling.Sampler
+        """
+        return self._sampler
+
+    @sampler.setter
+    def sampler(self, sampler):
+        """
+        Set the sampler deciding which new traces are sampled.
+
+        :param gaesd.core.sampling.Sampler sampler: The new sampler.
+        :raises: ValueError
+        """
+        if sampler is None:
+            raise ValueError('sampler cannot be None')
+
+        self._sampler = sampler
+
+    @property
+    def span_sampler(self):
+        """
+        Get the sampler deciding which new spans of sampled traces are
+            recorded.
+
+        :return: The span sampler, or None if every span is recorded.
+        :rtype: gaesd.core.sampling.SpanSampler
+        """
+        return self._span_sampler
+
+    @span_sampler.setter
+    def span_sampler(self, span_sampler):
+        """
+        Set the sampler deciding which new spans of sampled traces are
+            recorded.
+
+        :param gaesd.core.sampling.SpanSampler span_sampler: The new span
+            sampler, or None to record every span.
+        """
+        self._span_sampler = span_sampler
+
+    @property
+    def trace_type(self):
+        """
+        Get the Trace type used to create new traces.
+
+        :rtype: type(Trace)
+        """
+        return self._trace_type
+
+    @trace_type.setter
+    def trace_type(self, trace_type):
+        """
+        Set the Trace type used to create new traces.
+
+        :param type(Trace) trace_type: The new Trace type.
+        """
+        self._trace_type = trace_type
 
     @property
     def dispatcher(self):
         """
-        Get the current SDK dispatcher in use.
+        Get the SDK's dispatcher, shared by every thread (and task).
 
         :rtype: Dispatcher
         """
-        return self._context.dispatcher
+        return self._dispatcher
 
     @classmethod
     def clear(cls, traces=True, enabler=True, dispatcher=True, loggers=False):
         """
         Clear the current thread's context of the named attributes.
         This will reset them to their default values.
+
+        :param bool traces: Clear the traces (and their span stacks).
+        :param bool enabler: Ignored, the enabler belongs to the SDK
+            instance (shared by all threads).
+        :param bool dispatcher: Ignored, the dispatcher belongs to the SDK
+            instance (shared by all threads).
+        :param bool loggers: Clear the loggers.
         """
         if traces:
             cls._context.traces = []
-        if enabler:
-            cls._context.enabler = False
-        if dispatcher:
-            cls._context.dispatcher = None
+            cls._context.trace_index = None
+            cls._context.span_stacks = {}
         if loggers:
             cls._context.loggers = {}
 
@@ -238,19 +422,45 @@ class SDK(Callable, MutableSequence):
         Create a new Trace instance.
 
         :param trace_args: kwargs passed directly to the Trace constructor.
-        :return: Trace context-manager
+        :return: Trace context-manager (`NOOP_TRACE` while this SDK is
+            disabled).
         :rtype: core.trace.Trace
         """
-        trace = Trace.new(self, **trace_args)
+        if not self.enabled_fast:
+            return NOOP_TRACE
+
+        trace = self._trace_type.new(self, **trace_args)
         trace_id = trace.trace_id
 
-        if trace_id in self._trace_ids:
+        context = self._context
+        if context.find_trace(trace_id) is not None:
             raise ValueError(
                 'duplicate trace_id {trace_id}'.format(trace_id=trace_id))
 
-        self._context.traces.append(trace)
+        context.append_trace(trace)
         return trace
 
+    def trace_from_header(self, header, **trace_args):
+        """
+        Create a new Trace continuing the caller's trace, from it's
+            `X-Cloud-Trace-Context` header (`TRACE_ID/SPAN_ID;o=1`): the
+            trace id, the caller's span (as the `root_span_id`) and it's
+            sampling decision are used. A missing or malformed header starts
+            a new trace.
+
+        :param str header: The header's value.
+        :param trace_args: kwargs passed directly to the Trace constructor.
+        :return: Trace context-manager
+        :rtype: core.trace.Trace
+        """
+        context = parse_trace_context(header)
+        if context is not None:
+            trace_args.setdefault('trace_id', context.trace_id)
+            trace_args.setdefault('root_span_id', context.span_id)
+            trace_args.setdefault('parent_sampled', context.sampled)
+
+        return self.trace(**trace_args)
+
     @property
     def new_trace(self):
         """
@@ -288,6 +498,20 @@ class SDK(Callable, MutableSequence):
             if self.current_trace.spans:
                 return True
 
+    @property
+    def is_recording(self):
+        """
+        Determine if new spans are recorded (without side-effects): this SDK
+            is enabled and the current trace, if any, is sampled.
+
+        :rtype: bool
+        """
+        if not self.enabled_fast:
+            return False
+
+        traces = self._context.traces
+        return not traces or traces[-1].sampled
+
     @property
     def new_span(self):
         """
@@ -317,6 +541,37 @@ class SDK(Callable, MutableSequence):
     def patch_trace(self, trace):
         return self.dispatcher.patch_trace(trace)
 
+    def warmup(self):
+        """
+        Prepare the dispatcher so that the first dispatch does not pay for
+            it's setup. Call this from a warmup request handler.
+        """
+        self.dispatcher.warmup()
+
+    def aflush(self):
+        """
+        Dispatch this SDK's traces without blocking the event loop:
+            `await sdk.aflush()`.
+
+        An `AsyncDispatcher` sends from the event loop, any other dispatcher
+            is called in the loop's default executor.
+
+        :return: Awaitable, resolving to whatever the dispatcher returns.
+        """
+        import asyncio
+
+        dispatcher = self.dispatcher
+        flush = getattr(dispatcher, 'flush', None)
+        if asyncio.iscoroutinefunction(flush):
+            dispatcher()
+            return flush()
+
+        # The dispatcher's buffer is thread (or task) local, so take it here:
+        traces = dispatcher.traces
+        dispatcher._traces = []
+        return asyncio.get_event_loop().run_in_executor(
+            None, dispatcher._dispatch_all, self.enabled_fast, traces)
+
     def __call__(self):
         """
         Call the dispatcher.
@@ -341,10 +596,11 @@ class SDK(Callable, MutableSequence):
         """
         if isinstance(other, Trace):
             trace_id = other.trace_id
-            if trace_id in self._trace_ids:
+            context = self._context
+            if context.find_trace(trace_id) is not None:
                 raise ValueError(
                     'invalid trace_id {trace_id}'.format(trace_id=trace_id))
-            self._context.traces.append(other)
+            context.append_trace(other)
         elif isinstance(other, Span):
             operator.add(self.current_trace, other)
         else:
@@ -386,20 +642,37 @@ class SDK(Callable, MutableSequence):
         """
         Determine if the trace is present in this SDK's traces.
         OR
-        Determine if the span is present in any of this SDK's traces.
+        Determine if the span is present in it's trace (the trace it was
+            last added to), and that trace in this SDK's traces.
 
         :type item: Union[Trace, Span]
         :rtype: bool
         """
         if isinstance(item, Trace):
-            return item in self._context.traces
+            return self._context.find_trace(item.trace_id) is item
         elif isinstance(item, Span):
-            return any([
-                item in span for span in
-                [trace.spans for trace in self._context.traces]
-            ])
+            # A span belongs to the trace it was last added to:
+            trace = item.trace
+            if trace is None or trace not in self:
+                return False
+            return trace.get_span(item.span_id) == item
         return False
 
+    def _check_unique(self, trace, replaced=None):
+        """
+        Make sure that no other trace of this context has the trace's trace
+            id.
+
+        :param Trace trace: A trace being added.
+        :param Trace replaced: The trace it replaces, if any.
+        :raises: ValueError
+        """
+        trace_id = trace.trace_id
+        present = self._context.find_trace(trace_id)
+        if present is not None and present is not replaced:
+            raise ValueError(
+                'duplicate trace_id {trace_id}'.format(trace_id=trace_id))
+
     def __setitem__(self, index, value):
         """
         Insert the trace into this SDK's trace list at the given index.
@@ -411,7 +684,11 @@ class SDK(Callable, MutableSequence):
         """
         if not isinstance(value, Trace):
             raise TypeError('Can only set item of type=Trace')
-        self._context.traces[index] = value
+        traces = self._context.traces[:]
+        replaced = traces[index]
+        self._check_unique(value, replaced)
+        traces[index] = value
+        self._context.set_traces(traces, added=[value], removed=[replaced])
 
     def __delitem__(self, index):
         """
@@ -420,11 +697,19 @@ class SDK(Callable, MutableSequence):
         :param index: index to delete from
         :type index: int
         """
-        del self._context.traces[index]
+        traces = self._context.traces[:]
+        removed = traces[index]
+        del traces[index]
+        self._context.set_traces(
+            traces,
+            removed=removed if isinstance(index, slice) else [removed])
 
     def insert(self, index, value):
         'S.insert(index, object) -- insert object before index'
         if not isinstance(value, Trace):
             raise TypeError('Can only insert item of type=Trace')
 
-        self._context.traces.insert(index, value)
+        self._check_unique(value)
+        traces = self._context.traces[:]
+        traces.insert(index, value)
+        self._context.set_traces(traces, added=[value])
@@ -50,6 +50,10 @@ setup(
     author_email=about['__author_email__'],
     url=about['__url__'],
     packages=['gaesd', 'gaesd/core', 'gaesd/core/dispatchers'],
+    package_data={'gaesd': ['core/dispatchers/cloudtrace.v1.json']},
+    entry_points={
+        'console_scripts': ['gaesd-agent = gaesd.agent:main'],
+    },
     license=about['__license__'],
     requires=requires,
     zip_safe=False,
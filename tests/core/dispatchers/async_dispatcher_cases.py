@@ -0,0 +1,281 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+"""
+The AsyncDispatcher test cases (python 3.5+ syntax), run by
+`test_async_dispatcher`.
+"""
+
+import asyncio
+import json
+import threading
+import unittest
+
+from gaesd.core.dispatchers.async_dispatcher import AsyncDispatcher
+from gaesd.core.dispatchers.async_http import StreamsHttpClient
+from gaesd.core.trace import Trace
+from gaesd.core.utils import DispatchError
+from gaesd.sdk import SDK
+from tests import PROJECT_ID
+from tests.core.dispatchers.local_server import LocalServer
+
+
+class TestAsyncDispatcherTestCase(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.server = LocalServer().__enter__()
+        self.dispatchers = []
+
+    def tearDown(self):
+        for dispatcher in self.dispatchers:
+            self.loop.run_until_complete(dispatcher.aclose())
+        self.server.__exit__(None, None, None)
+        self.loop.close()
+        asyncio.set_event_loop(None)
+        SDK.clear()
+
+    def new_sdk(self, auto=True, **kwargs):
+        kwargs.setdefault('root_url', self.server.url)
+        kwargs.setdefault('token_provider', lambda: 'my-token')
+
+        def dispatcher(sdk, auto):
+            dispatcher = AsyncDispatcher(sdk=sdk, auto=auto, **kwargs)
+            self.dispatchers.append(dispatcher)
+            return dispatcher
+
+        return SDK.new(
+            project_id=PROJECT_ID, dispatcher=dispatcher, auto=auto,
+            enabler=True)
+
+    def new_trace(self, sdk):
+        trace = sdk.trace()
+        with trace.span(name='span'):
+            pass
+        return trace
+
+    def run_until_complete(self, awaitable):
+        return self.loop.run_until_complete(awaitable)
+
+    def sent(self):
+        return [
+            trace
+            for _, _, _, body in self.server.requests
+            for trace in json.loads(body.decode('utf-8'))['traces']
+        ]
+
+    def test_flush(self):
+        sdk = self.new_sdk()
+        trace = self.new_trace(sdk)
+
+        # Nothing is sent synchronously:
+        self.assertEqual(self.server.requests, [])
+
+        self.run_until_complete(sdk.aflush())
+
+        (method, path, headers, _), = self.server.requests
+        self.assertEqual(method, 'PATCH')
+        self.assertEqual(path, '/v1/projects/{0}/traces'.format(PROJECT_ID))
+        self.assertEqual(headers['authorization'], 'Bearer my-token')
+        self.assertEqual(self.sent(), [trace.export()])
+
+    def test_aflush_non_auto(self):
+        sdk = self.new_sdk(auto=False)
+        traces = [self.new_trace(sdk) for _ in range(3)]
+
+        self.run_until_complete(sdk.aflush())
+
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(
+            self.sent(), [trace.export() for trace in traces])
+        self.assertEqual(sdk.dispatcher.traces, [])
+
+    def test_batch_task(self):
+        sdk = self.new_sdk(batch_size=3, interval=60)
+        dispatcher = sdk.dispatcher
+
+        async def run():
+            for _ in range(7):
+                self.new_trace(sdk)
+                # Let other coroutines (the batching task) run:
+                await asyncio.sleep(0.01)
+            self.assertEqual(dispatcher.pending, 1)
+            await dispatcher.flush()
+
+        self.run_until_complete(run())
+
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(len(self.sent()), 7)
+        self.assertEqual(self.server.connections, 1)
+
+    def test_interval(self):
+        sdk = self.new_sdk(batch_size=100, interval=0.01)
+
+        async def run():
+            self.new_trace(sdk)
+            await asyncio.sleep(0.2)
+
+        self.run_until_complete(run())
+        self.assertEqual(len(self.sent()), 1)
+
+    def test_dispatch_from_other_thread(self):
+        sdk = self.new_sdk(auto=False)
+        dispatcher = sdk.dispatcher
+        trace = Trace.new(sdk)
+        with trace.span(name='span'):
+            pass
+
+        thread = threading.Thread(
+            target=dispatcher._dispatch, args=([trace],))
+        thread.start()
+        thread.join()
+
+        self.run_until_complete(dispatcher.flush())
+        self.assertEqual(self.sent(), [trace.export()])
+
+    def test_sdk_created_before_loop(self):
+        # Eg: created at import time, then `asyncio.run(main())`:
+        sdk = self.new_sdk()
+        dispatcher = self.dispatchers.pop()
+        self.assertIsNone(dispatcher.loop)
+        loop = asyncio.new_event_loop()
+
+        async def run():
+            trace = self.new_trace(sdk)
+            await sdk.aflush()
+            return trace
+
+        try:
+            trace = loop.run_until_complete(run())
+            self.assertIs(dispatcher.loop, loop)
+            self.assertEqual(self.sent(), [trace.export()])
+        finally:
+            loop.run_until_complete(dispatcher.aclose())
+            loop.close()
+
+    def test_dispatch_before_loop_runs(self):
+        sdk = self.new_sdk(auto=False)
+        dispatcher = sdk.dispatcher
+        trace = self.new_trace(sdk)
+        dispatcher()
+
+        self.assertIsNone(dispatcher.loop)
+        self.assertEqual(dispatcher.pending, 1)
+
+        self.run_until_complete(dispatcher.flush())
+        self.assertIs(dispatcher.loop, self.loop)
+        self.assertEqual(self.sent(), [trace.export()])
+
+    def test_does_not_block_loop(self):
+        sdk = self.new_sdk()
+        ticks = []
+
+        async def ticker():
+            for _ in range(5):
+                ticks.append(len(self.server.requests))
+                await asyncio.sleep(0)
+
+        async def run():
+            self.new_trace(sdk)
+            await asyncio.gather(sdk.aflush(), ticker())
+
+        self.run_until_complete(run())
+        self.assertEqual(ticks[0], 0)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_flush_error(self):
+        self.server.status = 500
+        sdk = self.new_sdk()
+        self.new_trace(sdk)
+
+        try:
+            self.run_until_complete(sdk.aflush())
+        except DispatchError as e:
+            self.assertEqual(e.status, 500)
+        else:
+            assert False
+        self.server.status = 200
+
+    def test_compression(self):
+        sdk = self.new_sdk(compression='gzip', compression_threshold=0)
+        self.new_trace(sdk)
+
+        self.run_until_complete(sdk.aflush())
+        (_, _, headers, _), = self.server.requests
+        self.assertEqual(headers['content-encoding'], 'gzip')
+
+    def test_aclose(self):
+        sdk = self.new_sdk()
+        dispatcher = sdk.dispatcher
+        self.new_trace(sdk)
+
+        self.run_until_complete(dispatcher.aclose())
+        self.assertEqual(len(self.sent()), 1)
+
+    def test_aflush_sync_dispatcher(self):
+        sdk = SDK.new(project_id=PROJECT_ID, auto=False, enabler=True)
+        calls = []
+        sdk.dispatcher._dispatch = lambda traces: calls.append(
+            threading.current_thread())
+        sdk.trace().end()
+
+        self.assertTrue(self.run_until_complete(sdk.aflush()))
+        self.assertIsNot(calls[0], threading.current_thread())
+
+
+class TestStreamsHttpClientTestCase(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+        asyncio.set_event_loop(None)
+
+    def test_request(self):
+        client = StreamsHttpClient()
+
+        with LocalServer(response=b'{"ok": true}') as server:
+            async def run():
+                results = []
+                for _ in range(3):
+                    results.append(await client.request(
+                        'PATCH', server.url + '/path?a=1', b'body',
+                        {'X-Header': 'value'}))
+                await client.close()
+                return results
+
+            results = self.loop.run_until_complete(run())
+
+            self.assertEqual(server.connections, 1)
+            self.assertEqual(client.created, 1)
+
+        status, headers, body = results[0]
+        self.assertEqual(status, 200)
+        self.assertEqual(headers['content-type'], 'application/json')
+        self.assertEqual(body, b'{"ok": true}')
+        method, path, request_headers, request_body = server.requests[0]
+        self.assertEqual((method, path), ('PATCH', '/path?a=1'))
+        self.assertEqual(request_headers['x-header'], 'value')
+        self.assertEqual(request_body, b'body')
+
+    def test_reconnects_closed_connection(self):
+        client = StreamsHttpClient()
+
+        with LocalServer() as server:
+            self.loop.run_until_complete(
+                client.request('PATCH', server.url, b''))
+
+            # The idle connection is closed (eg: by the server timing out):
+            (_, writer), = list(client._idle.values())[0]
+            writer.transport.abort()
+
+            status, _, _ = self.loop.run_until_complete(
+                client.request('PATCH', server.url, b''))
+
+        self.assertEqual(status, 200)
+        self.assertEqual(client.created, 2)
+        self.assertEqual(len(server.requests), 2)
+
+
+if __name__ == '__main__':  # pragma: no-cover
+    unittest.main()
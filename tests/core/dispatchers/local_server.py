@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+
+import threading
+
+from six.moves import BaseHTTPServer, socketserver
+
+
+class LocalServer(object):
+    """
+    Stand-in for the StackDriver REST API, listening on localhost.
+
+    Records every request as a (method, path, headers, body) tuple, with
+    the header names lower-cased (as python 2's mimetools gives them).
+    """
+
+    def __init__(self, status=200, response=b'{}'):
+        self.status = status
+        self.response = response
+        self.requests = []
+        self.connections = 0
+        server = self
+
+        class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                BaseHTTPServer.BaseHTTPRequestHandler.setup(self)
+                server.connections += 1
+
+            def do_PATCH(self):
+                length = int(self.headers.get('Content-Length', 0))
+                body = self.rfile.read(length)
+                headers = {
+                    name.lower(): value
+                    for name, value in self.headers.items()
+                }
+                server.requests.append(
+                    (self.command, self.path, headers, body))
+
+                self.send_response(server.status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(server.response)))
+                self.end_headers()
+                self.wfile.write(server.response)
+
+            def log_message(self, *args):
+                pass
+
+        class Server(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+            daemon_threads = True
+
+        self._server = Server(('127.0.0.1', 0), Handler)
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, kwargs={'poll_interval': 0.05})
+        self._thread.daemon = True
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:{0}'.format(self._server.server_address[1])
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, t, val, tb):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,17 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+
+import sys
+import unittest
+
+canTest = sys.version_info >= (3, 5)
+
+if canTest:
+    # Uses `async def`, which python 2 cannot even parse:
+    from tests.core.dispatchers.async_dispatcher_cases import (  # NOQA
+        TestAsyncDispatcherTestCase, TestStreamsHttpClientTestCase,
+    )
+
+
+if __name__ == '__main__':  # pragma: no-cover
+    unittest.main()
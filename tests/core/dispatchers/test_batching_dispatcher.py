@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+
+import threading
+import unittest
+
+from mock import Mock
+
+from gaesd.core.dispatchers.batching_dispatcher import BatchingDispatcher
+from gaesd.core.dispatchers.dispatcher import TracePatch
+from gaesd.core.dispatchers.rest_dispatcher import SimpleRestDispatcher
+from gaesd.core.trace import Trace
+from gaesd.sdk import SDK
+from tests import PROJECT_ID
+
+
+class TestBatchingDispatcherTestCase(unittest.TestCase):
+    def setUp(self):
+        self.sdk = SDK.new(project_id=PROJECT_ID, auto=False)
+        self.target = Mock()
+        self.target_type = Mock(return_value=self.target)
+
+    def tearDown(self):
+        SDK.clear()
+
+    def new_dispatcher(self, **kwargs):
+        kwargs.setdefault('interval', 60)
+        return BatchingDispatcher(
+            sdk=self.sdk, auto=True, dispatcher=self.target_type, **kwargs)
+
+    def new_trace(self):
+        trace = Trace.new(self.sdk)
+        with trace.span(name='span'):
+            pass
+        return trace
+
+    def assertDispatched(self, *traces):
+        self.target._dispatch_chunked.assert_called_once()
+        batch = self.target._dispatch_chunked.call_args[0][0]
+        self.assertEqual([getattr(i, 'trace', i) for i in batch], list(traces))
+
+    def test_init(self):
+        dispatcher = self.new_dispatcher()
+        self.target_type.assert_called_once_with(sdk=self.sdk, auto=False)
+        self.assertIs(dispatcher.dispatcher, self.target)
+        self.assertEqual(dispatcher.pending, 0)
+        self.assertEqual(dispatcher.dropped, 0)
+
+    def test_default_dispatcher(self):
+        from gaesd.core.dispatchers.google_api_client_dispatcher import \
+            GoogleApiClientDispatcher
+
+        dispatcher = BatchingDispatcher(sdk=self.sdk)
+        self.assertIsInstance(dispatcher.dispatcher, GoogleApiClientDispatcher)
+        self.assertFalse(dispatcher.dispatcher.auto)
+
+    def test_sdk_setter(self):
+        dispatcher = BatchingDispatcher(
+            sdk=self.sdk, dispatcher=SimpleRestDispatcher)
+
+        dispatcher.sdk = 123
+        self.assertEqual(dispatcher.sdk, 123)
+        self.assertEqual(dispatcher.dispatcher.sdk, 123)
+
+    def test_warmup(self):
+        self.new_dispatcher().warmup()
+        self.target.warmup.assert_called_once_with()
+
+    def test_patch_trace_does_not_dispatch_on_calling_thread(self):
+        dispatcher = self.new_dispatcher()
+        trace = self.new_trace()
+
+        dispatcher.patch_trace(trace)
+        self.target._dispatch_chunked.assert_not_called()
+
+        dispatcher.flush()
+        self.assertDispatched(trace)
+
+    def test_non_auto_caches(self):
+        dispatcher = self.new_dispatcher()
+        dispatcher.auto = False
+        trace = Trace.new(self.sdk)
+
+        dispatcher.patch_trace(trace)
+        self.assertEqual(dispatcher.traces, [trace])
+        self.assertIsNone(dispatcher._worker)
+
+        self.sdk.enabler = True
+        dispatcher()
+        dispatcher.flush()
+        self.target._dispatch_chunked.assert_called_once_with([trace])
+
+    def test_batches_by_size(self):
+        sent = threading.Event()
+        self.target._dispatch_chunked.side_effect = lambda traces: sent.set()
+        dispatcher = self.new_dispatcher(batch_size=3)
+        traces = [self.new_trace() for _ in range(3)]
+
+        for trace in traces:
+            dispatcher.patch_trace(trace)
+
+        self.assertTrue(sent.wait(5))
+        self.assertDispatched(*traces)
+
+    def test_batches_by_interval(self):
+        sent = threading.Event()
+        self.target._dispatch_chunked.side_effect = lambda traces: sent.set()
+        dispatcher = self.new_dispatcher(interval=0.01)
+        trace = self.new_trace()
+
+        dispatcher.patch_trace(trace)
+
+        self.assertTrue(sent.wait(5))
+        self.assertDispatched(trace)
+
+    def test_trace_without_new_spans_not_queued(self):
+        dispatcher = self.new_dispatcher()
+        trace = self.new_trace()
+
+        dispatcher.patch_trace(trace)
+        dispatcher.flush()
+        dispatcher.patch_trace(trace)
+        dispatcher.patch_trace(Trace.new(self.sdk))
+        dispatcher.flush()
+
+        self.assertDispatched(trace)
+
+    def test_same_trace_batched_once(self):
+        dispatcher = self.new_dispatcher()
+        trace = self.new_trace()
+
+        for index in range(5):
+            with trace.span(name='span-{0}'.format(index)):
+                pass
+            dispatcher.patch_trace(trace)
+
+        dispatcher.flush()
+        self.assertDispatched(trace)
+
+        patch = self.target._dispatch_chunked.call_args[0][0][0]
+        self.assertIsInstance(patch, TracePatch)
+        self.assertEqual(
+            len(patch.export()['spans']), len(trace.completed_spans))
+
+    def test_drops_when_full(self):
+        dispatcher = self.new_dispatcher(max_queue_size=1)
+        dispatcher._ensure_worker = Mock()
+
+        dispatcher.patch_trace(self.new_trace())
+        dispatcher.patch_trace(self.new_trace())
+
+        self.assertEqual(dispatcher.pending, 1)
+        self.assertEqual(dispatcher.dropped, 1)
+
+    def test_dispatch_error_does_not_kill_worker(self):
+        self.target._dispatch_chunked.side_effect = [Exception('bang!'), None]
+        dispatcher = self.new_dispatcher()
+
+        dispatcher.patch_trace(self.new_trace())
+        dispatcher.flush()
+        dispatcher.patch_trace(self.new_trace())
+        dispatcher.flush()
+
+        self.assertEqual(self.target._dispatch_chunked.call_count, 2)
+
+    def test_stop(self):
+        dispatcher = self.new_dispatcher()
+        trace = self.new_trace()
+
+        dispatcher.patch_trace(trace)
+        worker = dispatcher._worker
+        dispatcher.stop()
+
+        self.assertFalse(worker.is_alive())
+        self.assertIsNone(dispatcher._worker)
+        self.assertDispatched(trace)
+
+
+if __name__ == '__main__':  # pragma: no-cover
+    unittest.main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+
+import json
+import unittest
+
+from mock import Mock
+from nose_parameterized import parameterized
+
+from gaesd.core.dispatchers.chunking import (
+    DEFAULT_SEPARATORS, ENVELOPE_SIZE, ExportedTrace, split_traces,
+)
+
+
+def new_trace(size):
+    # Exports to exactly `size` bytes of compact json:
+    return Mock(export=Mock(return_value='x' * (size - 2)))
+
+
+class TestChunkingTestCase(unittest.TestCase):
+    def test_exported_trace(self):
+        trace = Mock(export=Mock(return_value={'traceId': 'abc'}))
+
+        exported = ExportedTrace(trace)
+        self.assertIs(exported.item, trace)
+        self.assertEqual(exported.export(), {'traceId': 'abc'})
+        self.assertEqual(exported.export(), {'traceId': 'abc'})
+        self.assertEqual(exported.size, len('{"traceId":"abc"}'))
+        trace.export.assert_called_once_with()
+
+    def test_envelope_size(self):
+        traces = [new_trace(10), new_trace(20)]
+        chunk, = split_traces(traces)
+        self.assertEqual(
+            len(json.dumps(
+                {'traces': [i.export() for i in chunk]},
+                separators=(',', ':'))),
+            ENVELOPE_SIZE + 10 + 1 + 20,
+        )
+
+    def test_default_separators(self):
+        trace = Mock(export=Mock(return_value={'traceId': 'abc'}))
+        exported = ExportedTrace(trace, separators=DEFAULT_SEPARATORS)
+        self.assertEqual(exported.size, len('{"traceId": "abc"}'))
+
+        traces = [trace] * 3
+        body_size = len(json.dumps({'traces': [trace.export()] * 2}))
+        for max_bytes, e_lengths in [
+            (body_size, [2, 1]),
+            (body_size - 1, [1, 1, 1]),
+        ]:
+            chunks = split_traces(
+                traces, max_bytes=max_bytes, separators=DEFAULT_SEPARATORS)
+            self.assertEqual([len(chunk) for chunk in chunks], e_lengths)
+
+    @parameterized.expand([
+        (None, None, [[10, 10, 10, 10]]),
+        (None, 3, [[10, 10, 10], [10]]),
+        (None, 1, [[10], [10], [10], [10]]),
+        (ENVELOPE_SIZE + 21, None, [[10, 10], [10, 10]]),
+        (ENVELOPE_SIZE + 20, None, [[10], [10], [10], [10]]),
+        (ENVELOPE_SIZE + 32, 2, [[10, 10], [10, 10]]),
+        (1, None, [[10], [10], [10], [10]]),
+    ])
+    def test_split_traces(self, max_bytes, max_traces, e_sizes):
+        traces = [new_trace(10) for _ in range(4)]
+
+        chunks = split_traces(
+            traces, max_bytes=max_bytes, max_traces=max_traces)
+        self.assertEqual(
+            [[i.size for i in chunk] for chunk in chunks], e_sizes)
+        self.assertEqual([i.item for chunk in chunks for i in chunk], traces)
+
+    def test_split_oversized_trace(self):
+        traces = [new_trace(10), new_trace(100), new_trace(10)]
+
+        chunks = split_traces(traces, max_bytes=50)
+        self.assertEqual([[i.size for i in chunk] for chunk in chunks],
+                         [[10], [100], [10]])
+
+    def test_split_nothing(self):
+        self.assertEqual(split_traces([], max_bytes=10), [])
+
+
+if __name__ == '__main__':  # pragma: no-cover
+    unittest.main()
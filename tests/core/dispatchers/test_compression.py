@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+
+import unittest
+import zlib
+
+from nose_parameterized import parameterized
+
+from gaesd.core.dispatchers.compression import Compressor
+
+DATA = b'{"spanId": "1", "kind": "RPC_SERVER", "name": "span"}' * 100
+
+
+class TestCompressorTestCase(unittest.TestCase):
+    @parameterized.expand([
+        ('gzip', 16 + zlib.MAX_WBITS),
+        ('deflate', zlib.MAX_WBITS),
+    ])
+    def test_compress(self, encoding, wbits):
+        compressor = Compressor(encoding)
+
+        data, e_encoding = compressor(DATA)
+        self.assertEqual(e_encoding, encoding)
+        self.assertLess(len(data), len(DATA))
+        self.assertEqual(zlib.decompress(data, wbits), DATA)
+
+    def test_compress_text(self):
+        data, encoding = Compressor('deflate')(DATA.decode('utf-8'))
+        self.assertEqual(encoding, 'deflate')
+        self.assertEqual(zlib.decompress(data), DATA)
+
+    def test_threshold(self):
+        compressor = Compressor(threshold=len(DATA) + 1)
+        self.assertEqual(compressor(DATA), (DATA, None))
+
+        compressor = Compressor(threshold=len(DATA))
+        self.assertEqual(compressor(DATA)[1], 'gzip')
+
+    def test_defaults(self):
+        compressor = Compressor()
+        self.assertEqual(compressor.encoding, 'gzip')
+        self.assertEqual(compressor.level, Compressor.LEVEL)
+        self.assertEqual(compressor.threshold, Compressor.THRESHOLD)
+
+    def test_invalid_encoding(self):
+        self.assertRaises(ValueError, Compressor, 'br')
+
+    @parameterized.expand([
+        (None, None),
+        (False, None),
+        (True, 'gzip'),
+        ('gzip', 'gzip'),
+        ('deflate', 'deflate'),
+    ])
+    def test_new(self, compression, e_encoding):
+        compressor = Compressor.new(compression, level=1, threshold=10)
+
+        if e_encoding is None:
+            self.assertIsNone(compressor)
+        else:
+            self.assertEqual(compressor.encoding, e_encoding)
+            self.assertEqual(compressor.level, 1)
+            self.assertEqual(compressor.threshold, 10)
+
+    def test_new_from_compressor(self):
+        compressor = Compressor('deflate')
+        self.assertIs(Compressor.new(compressor), compressor)
+
+
+if __name__ == '__main__':  # pragma: no-cover
+    unittest.main()
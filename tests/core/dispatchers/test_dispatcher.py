@@ -1,13 +1,17 @@
 #!/usr/bin/env python
 # -*- coding: latin-1 -*-
 
+import json
 import unittest
 
 from mock import Mock, patch
 from nose_parameterized import parameterized
 
+from gaesd.core.columnar import ColumnarTrace
+from gaesd.core.dispatchers.dispatcher import TracePatch
 from gaesd.core.dispatchers.google_api_client_dispatcher import GoogleApiClientDispatcher
 from gaesd.core.dispatchers.rest_dispatcher import SimpleRestDispatcher
+from gaesd.core.span import Span
 from gaesd.core.trace import Trace
 from gaesd.sdk import SDK
 from tests import PROJECT_ID
@@ -50,9 +54,101 @@ class TestDispatcherTestCase(unittest.TestCase):
 
         trace_id = Trace.new_trace_id()
         trace = Trace.new(self.sdk, trace_id=trace_id)
+        with trace.span(name='span'):
+            pass
 
         dispatcher.patch_trace(trace)
-        mock_dispatch.assert_called_once_with([trace])
+        mock_dispatch.assert_called_once()
+        (patch,), = mock_dispatch.call_args[0]
+        self.assertIsInstance(patch, TracePatch)
+        self.assertIs(patch.trace, trace)
+        self.assertEqual(patch.export(), trace.export())
+        self.assertEqual(dispatcher.traces, [])
+
+    @patch('gaesd.core.dispatchers.rest_dispatcher.SimpleRestDispatcher._dispatch')
+    def test_auto_dispatch_without_new_spans(self, mock_dispatch):
+        dispatcher = SimpleRestDispatcher(sdk=self.sdk, auto=True)
+        trace = Trace.new(self.sdk, trace_id=Trace.new_trace_id())
+
+        dispatcher.patch_trace(trace)
+        mock_dispatch.assert_not_called()
+
+    @patch('gaesd.core.dispatchers.rest_dispatcher.SimpleRestDispatcher._dispatch')
+    def test_auto_dispatch_sends_only_new_spans(self, mock_dispatch):
+        dispatcher = SimpleRestDispatcher(sdk=self.sdk, auto=True)
+        trace = Trace.new(self.sdk, trace_id=Trace.new_trace_id())
+        other_trace = Trace.new(self.sdk, trace_id=Trace.new_trace_id())
+
+        sent_span_ids = []
+        for index in range(5):
+            with trace.span(name='span-{0}'.format(index)):
+                pass
+            dispatcher.patch_trace(trace)
+            dispatcher.patch_trace(other_trace)
+
+            (patch,), = mock_dispatch.call_args[0]
+            sent_span_ids.extend(
+                span['spanId'] for span in patch.export()['spans'])
+
+        self.assertEqual(mock_dispatch.call_count, 5)
+        self.assertEqual(
+            sent_span_ids, [str(span.span_id) for span in trace.spans])
+
+    @parameterized.expand([(Trace,), (ColumnarTrace,)])
+    def test_auto_dispatch_skips_removed_spans(self, trace_type):
+        with patch('gaesd.core.dispatchers.rest_dispatcher.'
+                   'SimpleRestDispatcher._dispatch') as mock_dispatch:
+            dispatcher = SimpleRestDispatcher(sdk=self.sdk, auto=True)
+            trace = trace_type.new(self.sdk, trace_id=Trace.new_trace_id())
+
+            def complete(name):
+                with trace.span(name=name):
+                    pass
+                dispatcher.patch_trace(trace)
+                (patch_,), = mock_dispatch.call_args[0]
+                return [span['name'] for span in patch_.export()['spans']]
+
+            self.assertEqual(complete('a'), ['a'])
+            # Removed once sent:
+            trace - trace[0]
+            self.assertEqual(complete('b'), ['b'])
+            # Removed before being sent:
+            with trace.span(name='c'):
+                pass
+            del trace[-1]
+            self.assertEqual(complete('d'), ['d'])
+            with trace.span(name='e'):
+                pass
+            trace[-1] = Span(trace=trace, span_id=1234, name='x')
+            self.assertEqual(complete('f'), ['f'])
+
+            self.assertEqual(trace.completed_count, 3)
+            self.assertEqual(
+                [span.name for span in trace.completed_spans],
+                ['b', 'd', 'f'])
+
+    @patch('gaesd.core.dispatchers.rest_dispatcher.SimpleRestDispatcher._dispatch')
+    def test_auto_dispatch_resends_unacknowledged(self, mock_dispatch):
+        mock_dispatch.side_effect = [Exception('bang!'), None]
+        dispatcher = SimpleRestDispatcher(sdk=self.sdk, auto=True)
+        trace = Trace.new(self.sdk, trace_id=Trace.new_trace_id())
+        other_trace = Trace.new(self.sdk, trace_id=Trace.new_trace_id())
+
+        span = trace.span(name='span')
+        with span:
+            pass
+        self.assertRaises(Exception, dispatcher.patch_trace, trace)
+        self.assertEqual(len(dispatcher.traces), 1)
+
+        with other_trace.span(name='other-span'):
+            pass
+        dispatcher.patch_trace(other_trace)
+
+        patches = mock_dispatch.call_args[0][0]
+        self.assertEqual([i.trace for i in patches], [trace, other_trace])
+        self.assertEqual(
+            patches[0].export()['spans'], [span.export()])
+        self.assertEqual(dispatcher.traces, [])
 
     @patch('gaesd.core.dispatchers.rest_dispatcher.SimpleRestDispatcher._dispatch')
     def test_non_auto_dispatch(self, mock_dispatch):
@@ -86,6 +182,94 @@ class TestDispatcherTestCase(unittest.TestCase):
         mock_method.assert_not_called()
         self.assertEqual(dispatcher._traces, [])
 
+    def new_traces(self, count):
+        traces = []
+        for _ in range(count):
+            trace = Trace.new(self.sdk, trace_id=Trace.new_trace_id())
+            with trace.span(name='span'):
+                pass
+            traces.append(trace)
+        return traces
+
+    @parameterized.expand([
+        (None, 2, [2, 2, 1]),
+        (1, 2, [2, 2, 1]),
+        (3, None, [5]),
+        (3, 5, [5]),
+    ])
+    def test_call_split(self, concurrency, max_batch_traces, e_sizes):
+        sdk = SDK.new(project_id=self.project_id, enabler=True, auto=False)
+        dispatcher = SimpleRestDispatcher(
+            sdk=sdk,
+            auto=False,
+            max_batch_traces=max_batch_traces,
+            max_batch_bytes=100000,
+            concurrency=concurrency,
+        )
+        dispatcher._dispatch = Mock()
+        traces = self.new_traces(5)
+        for trace in traces:
+            dispatcher.patch_trace(trace)
+
+        dispatcher()
+
+        chunks = sorted(
+            [call[0][0] for call in dispatcher._dispatch.call_args_list],
+            key=lambda chunk: traces.index(chunk[0].item),
+        )
+        self.assertEqual([len(chunk) for chunk in chunks], e_sizes)
+        self.assertEqual([i.item for chunk in chunks for i in chunk], traces)
+        self.assertEqual(
+            [i.export() for chunk in chunks for i in chunk],
+            [trace.export() for trace in traces],
+        )
+
+    def test_call_split_by_bytes(self):
+        sdk = SDK.new(project_id=self.project_id, enabler=True, auto=False)
+        traces = self.new_traces(4)
+        size = len(json.dumps(
+            {'traces': [traces[0].export()] * 2}, separators=(',', ':')))
+
+        dispatcher = SimpleRestDispatcher(
+            sdk=sdk, auto=False, max_batch_bytes=size)
+        dispatcher._dispatch = Mock()
+        dispatcher._traces = traces[:]
+
+        dispatcher()
+
+        self.assertEqual(
+            [len(call[0][0]) for call in dispatcher._dispatch.call_args_list],
+            [2, 2],
+        )
+
+    def test_call_split_concurrently_failure(self):
+        sdk = SDK.new(project_id=self.project_id, enabler=True, auto=False)
+        dispatcher = SimpleRestDispatcher(
+            sdk=sdk, auto=True, max_batch_traces=1, concurrency=4)
+        failure = RuntimeError('failed')
+        dispatcher._dispatch = Mock(side_effect=[None, failure, None])
+        traces = self.new_traces(3)
+        dispatcher._traces = [TracePatch(trace, 0, 1) for trace in traces]
+
+        self.assertRaises(RuntimeError, dispatcher._dispatch_chunked,
+                          dispatcher.traces)
+        self.assertEqual(dispatcher._dispatch.call_count, 3)
+
+        # Nothing was acknowledged, so everything is sent again:
+        dispatcher._dispatch = Mock()
+        dispatcher.patch_trace(traces[0])
+        self.assertEqual(dispatcher._dispatch.call_count, 3)
+
+    def test_trace_patch_merge(self):
+        trace = Trace.new(self.sdk, trace_id=Trace.new_trace_id())
+
+        patch = TracePatch(trace, 0, 2).merge(TracePatch(trace, 2, 5))
+        self.assertIs(patch.trace, trace)
+        self.assertEqual((patch.start, patch.stop), (0, 5))
+
+        other_patch = TracePatch(Trace.new(self.sdk), 0, 1)
+        self.assertRaises(ValueError, patch.merge, other_patch)
+
     def test_set_logging_level(self):
         sdk = SDK.new(project_id=self.project_id, enabler=True)
         dispatcher = SimpleRestDispatcher(sdk=sdk, auto=True)
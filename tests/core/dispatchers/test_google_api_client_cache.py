@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+
+import datetime
+import json
+import logging
+import os
+import threading
+import unittest
+
+from mock import MagicMock, patch
+
+try:
+    from googleapiclient import discovery
+    from oauth2client.client import AccessTokenCredentials, GoogleCredentials
+
+    canTest = True
+except ImportError as e:  # pragma: no cover
+    logging.warn(
+        'Cannot test GoogleApiClientCache - please pip install `google_api_python_client` '
+        'and `oauth2client`'
+    )
+    canTest = False
+
+from gaesd.core.dispatchers.google_api_client_cache import (
+    DISCOVERY_DOCUMENT, GoogleApiClientCache,
+)
+
+
+class MockCredentials(object):
+    def __init__(self, access_token=None, token_expiry=None):
+        self.access_token = access_token
+        self.token_expiry = token_expiry
+        self.refresh = MagicMock(side_effect=self._refresh)
+
+    def _refresh(self, http):
+        self.access_token = 'token'
+        self.token_expiry = datetime.datetime.utcnow() + \
+            datetime.timedelta(hours=1)
+
+
+class TestGoogleApiClientCacheTestCase(unittest.TestCase):
+    def test_bundled_discovery_document(self):
+        with open(DISCOVERY_DOCUMENT) as f:
+            document = json.load(f)
+
+        self.assertEqual(document['name'], 'cloudtrace')
+        self.assertEqual(document['version'], 'v1')
+        self.assertIn('patchTraces', document['resources']['projects']['methods'])
+
+    @unittest.skipIf(
+        not canTest,
+        'Cannot test GoogleApiClientCache - please pip install `google_api_python_client` '
+        'and `oauth2client')
+    @patch('gaesd.core.dispatchers.google_api_client_cache.discovery.build')
+    def test_service_from_bundled_document(self, mock_build):
+        cache = GoogleApiClientCache()
+        cache._credentials = AccessTokenCredentials('token', 'user-agent')
+
+        request = cache.service.projects().patchTraces(
+            projectId='my-project', body={'traces': []})
+
+        mock_build.assert_not_called()
+        self.assertEqual(request.method, 'PATCH')
+        self.assertTrue(request.uri.startswith(
+            'https://cloudtrace.googleapis.com/v1/projects/my-project/traces'))
+
+    @unittest.skipIf(
+        not canTest,
+        'Cannot test GoogleApiClientCache - please pip install `google_api_python_client` '
+        'and `oauth2client')
+    @patch('gaesd.core.dispatchers.google_api_client_cache.discovery.build')
+    def test_service_falls_back_to_network(self, mock_build):
+        for document in [None, os.path.join('no', 'such', 'document.json')]:
+            mock_build.reset_mock()
+            cache = GoogleApiClientCache(discovery_document=document)
+            cache._credentials = credentials = MockCredentials()
+
+            self.assertIs(cache.service, mock_build.return_value)
+            mock_build.assert_called_once_with(
+                'cloudtrace', 'v1', credentials=credentials)
+
+    @unittest.skipIf(
+        not canTest,
+        'Cannot test GoogleApiClientCache - please pip install `google_api_python_client` '
+        'and `oauth2client')
+    @patch('gaesd.core.dispatchers.google_api_client_cache.discovery'
+           '.build_from_document')
+    def test_warmup(self, mock_build_from_document):
+        cache = GoogleApiClientCache()
+        cache._credentials = credentials = MockCredentials()
+
+        cache.warmup()
+
+        mock_build_from_document.assert_called_once()
+        credentials.refresh.assert_called_once()
+        self.assertIsNone(cache._refresher)
+
+    @unittest.skipIf(
+        not canTest,
+        'Cannot test GoogleApiClientCache - please pip install `google_api_python_client` '
+        'and `oauth2client')
+    def test_http_is_per_thread(self):
+        cache = GoogleApiClientCache()
+        credentials = MagicMock()
+        credentials.authorize.side_effect = lambda http: http
+        cache._credentials = credentials
+
+        https = []
+        thread = threading.Thread(target=lambda: https.append(cache.http))
+        thread.start()
+        thread.join()
+
+        self.assertIs(cache.http, cache.http)
+        self.assertIsNot(cache.http, https[0])
+        self.assertEqual(credentials.authorize.call_count, 2)
+
+    @unittest.skipIf(
+        not canTest,
+        'Cannot test GoogleApiClientCache - please pip install `google_api_python_client` '
+        'and `oauth2client')
+    def test_refresh(self):
+        cache = GoogleApiClientCache()
+        cache._credentials = credentials = MockCredentials()
+
+        wait = cache.refresh()
+        credentials.refresh.assert_called_once()
+        self.assertGreater(wait, cache.REFRESH_MARGIN)
+        self.assertLess(wait, 3600 - cache.REFRESH_MARGIN + 1)
+
+        # Token still fresh:
+        cache.refresh()
+        credentials.refresh.assert_called_once()
+
+        # Token about to expire:
+        credentials.token_expiry = datetime.datetime.utcnow() + \
+            datetime.timedelta(seconds=cache.REFRESH_MARGIN - 1)
+        cache.refresh()
+        self.assertEqual(credentials.refresh.call_count, 2)
+
+    @unittest.skipIf(
+        not canTest,
+        'Cannot test GoogleApiClientCache - please pip install `google_api_python_client` '
+        'and `oauth2client')
+    @patch('gaesd.core.dispatchers.google_api_client_cache.discovery'
+           '.build_from_document')
+    def test_prefetch(self, mock_build):
+        cache = GoogleApiClientCache()
+        cache._credentials = credentials = MockCredentials()
+        refreshed = threading.Event()
+        credentials.refresh.side_effect = lambda http: refreshed.set()
+
+        cache.prefetch()
+        refresher = cache._refresher
+        cache.prefetch()
+
+        self.assertIs(cache._refresher, refresher)
+        self.assertTrue(refreshed.wait(5))
+        mock_build.assert_called_once()
+        self.assertIs(
+            mock_build.call_args[1]['credentials'], credentials)
+
+        cache.clear()
+        self.assertFalse(refresher.is_alive())
+        self.assertIsNone(cache._service)
+        self.assertIsNone(cache._credentials)
+
+
+if __name__ == '__main__':  # pragma: no-cover
+    unittest.main()
@@ -1,8 +1,11 @@
 #!/usr/bin/env python
 # -*- coding: latin-1 -*-
 
+import json
 import logging
+import threading
 import unittest
+import zlib
 
 from mock import MagicMock, patch
 
@@ -10,7 +13,7 @@ from tests import PROJECT_ID
 
 try:
     from googleapiclient import discovery
-    from oauth2client.client import GoogleCredentials
+    from oauth2client.client import AccessTokenCredentials, GoogleCredentials
 
     canTest = True
 except ImportError as e:  # pragma: no cover
@@ -20,6 +23,9 @@ except ImportError as e:  # pragma: no cover
     )
     canTest = False
 
+from gaesd.core.dispatchers.google_api_client_cache import (
+    DISCOVERY_DOCUMENT, client_cache,
+)
 from gaesd.core.dispatchers.google_api_client_dispatcher import GoogleApiClientDispatcher
 from gaesd.sdk import SDK
 
@@ -50,6 +56,10 @@ class TestDispatcherTestCase(unittest.TestCase):
     def setUp(self):
         self.project_id = PROJECT_ID
         self.sdk = SDK.new(project_id=self.project_id, auto=False)
+        client_cache.clear()
+
+    def tearDown(self):
+        client_cache.clear()
 
     @unittest.skipIf(
         not canTest,
@@ -77,6 +87,9 @@ class TestDispatcherTestCase(unittest.TestCase):
             MockTrace(e_trace_result_3)
         ]
 
+        with open(DISCOVERY_DOCUMENT) as f:
+            e_document = f.read()
+
         def run(mb, mgad):
             mgad.return_value = e_credentials
             mock_service = MockService(return_value=e_result)
@@ -89,17 +102,115 @@ class TestDispatcherTestCase(unittest.TestCase):
                 body=e_body,
             )
             mb.assert_called_once_with(
-                'cloudtrace',
-                'v1',
+                e_document,
                 credentials=e_credentials,
             )
 
-        with patch('gaesd.core.dispatchers.google_api_client_dispatcher.discovery.build') as \
+        with patch('gaesd.core.dispatchers.google_api_client_dispatcher.discovery.build_from_document') as \
             mock_build:
             with patch('gaesd.core.dispatchers.google_api_client_dispatcher.GoogleCredentials'
                        '.get_application_default') as mock_get_application_default:
                 run(mock_build, mock_get_application_default)
 
+    @unittest.skipIf(
+        not canTest,
+        'Cannot test GoogleApiClientDispatcher - please pip install `google_api_python_client` '
+        'and `oauth2client')
+    @patch('gaesd.core.dispatchers.google_api_client_dispatcher.GoogleCredentials'
+           '.get_application_default')
+    @patch('gaesd.core.dispatchers.google_api_client_dispatcher.discovery'
+           '.build_from_document')
+    def test_service_is_cached(self, mock_build, mock_get_application_default):
+        mock_build.return_value = MockService(return_value='e-result')
+        dispatchers = [GoogleApiClientDispatcher(self.sdk) for _ in range(2)]
+
+        threads = [
+            threading.Thread(target=dispatcher._prep, args=([],))
+            for dispatcher in dispatchers for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        mock_get_application_default.assert_called_once_with()
+        mock_build.assert_called_once()
+
+    @unittest.skipIf(
+        not canTest,
+        'Cannot test GoogleApiClientDispatcher - please pip install `google_api_python_client` '
+        'and `oauth2client')
+    @patch('gaesd.core.dispatchers.google_api_client_cache.GoogleApiClientCache'
+           '.prefetch')
+    @patch('gaesd.core.dispatchers.google_api_client_cache.GoogleApiClientCache'
+           '.warmup')
+    def test_warmup(self, mock_warmup, mock_prefetch):
+        SDK.new(project_id=self.project_id, auto=False).warmup()
+        mock_warmup.assert_called_once_with()
+        mock_prefetch.assert_called_once_with()
+
+    @unittest.skipIf(
+        not canTest,
+        'Cannot test GoogleApiClientDispatcher - please pip install `google_api_python_client` '
+        'and `oauth2client')
+    @patch('gaesd.core.dispatchers.google_api_client_cache.GoogleCredentials'
+           '.get_application_default')
+    def test_compression(self, mock_get_application_default):
+        mock_get_application_default.return_value = AccessTokenCredentials(
+            'token', 'user-agent')
+        traces = [MockTrace({'spans': ['span'] * 500})]
+
+        dispatcher = GoogleApiClientDispatcher(self.sdk, compression='gzip')
+        request = dispatcher._prep(traces)
+
+        self.assertEqual(request.headers['content-encoding'], 'gzip')
+        self.assertEqual(
+            request.headers['content-length'], str(len(request.body)))
+        body = zlib.decompress(request.body, 16 + zlib.MAX_WBITS)
+        self.assertEqual(
+            json.loads(body.decode('utf-8')),
+            {'traces': [{'spans': ['span'] * 500}]},
+        )
+
+        # Below the threshold:
+        dispatcher = GoogleApiClientDispatcher(
+            self.sdk, compression='gzip', compression_threshold=100000)
+        request = dispatcher._prep(traces)
+        self.assertNotIn('content-encoding', request.headers)
+        self.assertEqual(
+            json.loads(request.body),
+            {'traces': [{'spans': ['span'] * 500}]},
+        )
+
+    @unittest.skipIf(
+        not canTest,
+        'Cannot test GoogleApiClientDispatcher - please pip install `google_api_python_client` '
+        'and `oauth2client')
+    @patch('gaesd.core.dispatchers.google_api_client_cache.GoogleCredentials'
+           '.get_application_default')
+    def test_max_batch_bytes(self, mock_get_application_default):
+        mock_get_application_default.return_value = AccessTokenCredentials(
+            'token', 'user-agent')
+        export = {'traceId': 'abc', 'spans': [{'spanId': '1', 'name': 'x'}]}
+        traces = [MockTrace(export) for _ in range(3)]
+        # googleapiclient's (not compact) encoding of 2 traces:
+        max_bytes = len(json.dumps({'traces': [export] * 2}))
+
+        for max_batch_bytes, e_sizes in [
+            (max_bytes, [2, 1]),
+            (max_bytes - 1, [1, 1, 1]),
+        ]:
+            dispatcher = GoogleApiClientDispatcher(
+                self.sdk, max_batch_bytes=max_batch_bytes)
+            bodies = []
+            dispatcher._dispatch = lambda chunk: bodies.append(
+                dispatcher._prep(chunk).body)
+
+            dispatcher._dispatch_chunked(traces)
+            self.assertEqual(
+                [len(json.loads(body)['traces']) for body in bodies], e_sizes)
+            self.assertLessEqual(len(bodies[0]), max_batch_bytes)
+
 
 if __name__ == '__main__':  # pragma: no-cover
     unittest.main()
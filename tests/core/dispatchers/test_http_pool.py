@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+
+import socket
+import threading
+import unittest
+
+from mock import patch
+
+from gaesd.core.dispatchers.http_pool import ConnectionPool, pool_for
+from tests.core.dispatchers.local_server import LocalServer
+
+
+class TestConnectionPoolTestCase(unittest.TestCase):
+    def test_pool_for(self):
+        pool = pool_for('http://127.0.0.1:1/a')
+        self.assertIs(pool_for('http://127.0.0.1:1/b'), pool)
+        self.assertIsNot(pool_for('http://127.0.0.1:2/a'), pool)
+        self.assertIsNot(pool_for('https://127.0.0.1:1/a'), pool)
+
+    def test_request(self):
+        with LocalServer(response=b'{"a":1}') as server:
+            pool = ConnectionPool(server.url)
+
+            status, headers, data = pool.request(
+                'PATCH', '/x?y=1', b'body', {'X-Header': 'value'})
+
+            self.assertEqual(status, 200)
+            self.assertEqual(headers['content-type'], 'application/json')
+            self.assertEqual(data, b'{"a":1}')
+
+            (method, path, request_headers, body), = server.requests
+            self.assertEqual(method, 'PATCH')
+            self.assertEqual(path, '/x?y=1')
+            self.assertEqual(request_headers['x-header'], 'value')
+            self.assertEqual(body, b'body')
+            pool.close()
+
+    def test_connections_are_reused(self):
+        with LocalServer() as server:
+            pool = ConnectionPool(server.url)
+
+            for _ in range(10):
+                pool.request('PATCH', '/', b'{}')
+
+            self.assertEqual(len(server.requests), 10)
+            self.assertEqual(pool.created, 1)
+            self.assertEqual(server.connections, 1)
+            pool.close()
+
+    def test_concurrent_requests(self):
+        with LocalServer() as server:
+            pool = ConnectionPool(server.url, size=2)
+
+            def run():
+                for _ in range(5):
+                    pool.request('PATCH', '/', b'{}')
+
+            threads = [threading.Thread(target=run) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            self.assertEqual(len(server.requests), 20)
+            self.assertLessEqual(pool.created, 4)
+            self.assertLessEqual(pool._idle.qsize(), 2)
+            pool.close()
+
+    def test_stale_connection_is_replaced(self):
+        with LocalServer() as server:
+            pool = ConnectionPool(server.url)
+            pool.request('PATCH', '/', b'{}')
+
+            stale = pool._idle.queue[0]
+            with patch.object(
+                stale, 'getresponse', side_effect=socket.error('reset')
+            ):
+                status, _, _ = pool.request('PATCH', '/', b'{}')
+
+            self.assertEqual(status, 200)
+            self.assertEqual(pool.created, 2)
+            pool.close()
+
+    def test_new_connection_error_raises(self):
+        with LocalServer() as server:
+            url = server.url
+        pool = ConnectionPool(url, timeout=1)
+
+        self.assertRaises(socket.error, pool.request, 'PATCH', '/', b'{}')
+
+    def test_https_connection_uses_context(self):
+        pool = ConnectionPool('https://cloudtrace.googleapis.com')
+        connection = pool._new_connection()
+
+        self.assertEqual(connection.host, 'cloudtrace.googleapis.com')
+        self.assertIs(connection._ssl_context, pool._ssl_context)
+        self.assertIs(connection._pool, pool)
+        self.assertIsNone(pool.tls_session)
+
+
+if __name__ == '__main__':  # pragma: no-cover
+    unittest.main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+
+import threading
+import unittest
+
+from mock import Mock, patch
+from nose_parameterized import parameterized
+
+from gaesd.core.dispatchers.resilience import (
+    CircuitBreaker, DispatchMetrics, DropFallback, RetryPolicy, SpoolFallback,
+    error_status,
+)
+from gaesd.core.utils import DispatchError
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestRetryPolicyTestCase(unittest.TestCase):
+    @parameterized.expand([
+        (DispatchError(500), 500),
+        (Mock(spec=['resp'], resp=Mock(status='503')), 503),
+        (IOError('connection reset'), None),
+    ])
+    def test_error_status(self, error, e_status):
+        self.assertEqual(error_status(error), e_status)
+
+    @parameterized.expand([
+        (DispatchError(500), True),
+        (DispatchError(503), True),
+        (DispatchError(429), True),
+        (DispatchError(408), True),
+        (DispatchError(400), False),
+        (DispatchError(403), False),
+        (IOError('connection reset'), True),
+    ])
+    def test_is_retryable(self, error, e_retryable):
+        self.assertEqual(RetryPolicy().is_retryable(error), e_retryable)
+
+    @patch('gaesd.core.dispatchers.resilience.random.uniform')
+    def test_delay(self, mock_uniform):
+        mock_uniform.side_effect = lambda low, high: high
+        policy = RetryPolicy(base_delay=0.5, max_delay=3)
+
+        self.assertEqual(
+            [policy.delay(retry) for retry in range(5)],
+            [0.5, 1.0, 2.0, 3, 3],
+        )
+        mock_uniform.assert_called_with(0, 3)
+
+    def test_backoff(self):
+        sleep = Mock()
+        policy = RetryPolicy(base_delay=1, sleep=sleep)
+
+        policy.backoff(2)
+        delay, = sleep.call_args[0]
+        self.assertTrue(0 <= delay <= 4)
+
+    def test_defaults(self):
+        self.assertEqual(RetryPolicy().retries, RetryPolicy.RETRIES)
+        self.assertEqual(RetryPolicy(retries=0).retries, 0)
+
+
+class TestCircuitBreakerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        self.breaker = CircuitBreaker(
+            failure_threshold=3, reset_timeout=10, clock=self.clock)
+
+    def test_opens_after_consecutive_failures(self):
+        self.assertFalse(self.breaker.record_failure())
+        self.assertFalse(self.breaker.record_failure())
+        self.breaker.record_success()
+        self.assertFalse(self.breaker.record_failure())
+        self.assertFalse(self.breaker.record_failure())
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(self.breaker.allow())
+
+        self.assertTrue(self.breaker.record_failure())
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(self.breaker.allow())
+
+    def test_half_open(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+
+        self.clock.now += 10
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        # Only one trial at a time:
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())
+
+        # A failed trial re-opens the breaker:
+        self.assertFalse(self.breaker.record_failure())
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+        self.clock.now += 10
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(self.breaker.allow())
+        self.assertTrue(self.breaker.allow())
+
+
+class TestDispatchMetricsTestCase(unittest.TestCase):
+    def test_increment(self):
+        metrics = DispatchMetrics()
+
+        def run():
+            for _ in range(1000):
+                metrics.increment('attempts')
+
+        threads = [threading.Thread(target=run) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        metrics.increment('dropped', 5)
+
+        self.assertEqual(metrics['attempts'], 4000)
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot['dropped'], 5)
+        self.assertEqual(snapshot['failures'], 0)
+        self.assertEqual(set(snapshot), set(DispatchMetrics.NAMES))
+
+
+class TestFallbackTestCase(unittest.TestCase):
+    def test_drop(self):
+        fallback = DropFallback()
+        fallback([1, 2])
+        self.assertEqual(fallback.drain(), [])
+
+    def test_spool(self):
+        fallback = SpoolFallback(max_size=3)
+        fallback([1, 2])
+        fallback([3, 4])
+        self.assertEqual(len(fallback), 3)
+
+        self.assertEqual(fallback.drain(), [2, 3, 4])
+        self.assertEqual(fallback.drain(), [])
+
+
+if __name__ == '__main__':  # pragma: no-cover
+    unittest.main()
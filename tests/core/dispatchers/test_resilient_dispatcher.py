@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+
+import unittest
+
+from mock import Mock
+
+from gaesd.core.dispatchers.resilience import (
+    CircuitBreaker, RetryPolicy, SpoolFallback,
+)
+from gaesd.core.dispatchers.resilient_dispatcher import ResilientDispatcher
+from gaesd.core.trace import Trace
+from gaesd.core.utils import DispatchError
+from gaesd.sdk import SDK
+from tests import PROJECT_ID
+
+
+class TestResilientDispatcherTestCase(unittest.TestCase):
+    def setUp(self):
+        self.sdk = SDK.new(project_id=PROJECT_ID, auto=False, enabler=True)
+        self.target = Mock()
+        self.target_type = Mock(return_value=self.target)
+        self.sleep = Mock()
+
+    def tearDown(self):
+        SDK.clear()
+
+    def new_dispatcher(self, **kwargs):
+        kwargs.setdefault('retry', RetryPolicy(retries=2, sleep=self.sleep))
+        kwargs.setdefault('breaker', CircuitBreaker(failure_threshold=2))
+        return ResilientDispatcher(
+            sdk=self.sdk, auto=True, dispatcher=self.target_type, **kwargs)
+
+    def new_trace(self):
+        trace = Trace.new(self.sdk)
+        with trace.span(name='span'):
+            pass
+        return trace
+
+    def test_init(self):
+        dispatcher = self.new_dispatcher()
+        self.target_type.assert_called_once_with(sdk=self.sdk, auto=False)
+        self.assertIs(dispatcher.dispatcher, self.target)
+
+        dispatcher.sdk = 123
+        self.assertEqual(self.target.sdk, 123)
+
+        dispatcher.warmup()
+        self.target.warmup.assert_called_once_with()
+
+    def test_default_dispatcher(self):
+        from gaesd.core.dispatchers.google_api_client_dispatcher import \
+            GoogleApiClientDispatcher
+
+        dispatcher = ResilientDispatcher(sdk=self.sdk)
+        self.assertIsInstance(dispatcher.dispatcher, GoogleApiClientDispatcher)
+
+    def test_dispatch(self):
+        dispatcher = self.new_dispatcher()
+        trace = self.new_trace()
+
+        dispatcher.patch_trace(trace)
+
+        self.target._dispatch_chunked.assert_called_once()
+        self.assertEqual(dispatcher.metrics['attempts'], 1)
+        self.assertEqual(dispatcher.metrics['successes'], 1)
+        self.sleep.assert_not_called()
+
+    def test_retry_then_succeed(self):
+        self.target._dispatch_chunked.side_effect = [
+            DispatchError(503), IOError('reset'), None]
+        dispatcher = self.new_dispatcher()
+
+        dispatcher.patch_trace(self.new_trace())
+
+        self.assertEqual(self.target._dispatch_chunked.call_count, 3)
+        self.assertEqual(self.sleep.call_count, 2)
+        metrics = dispatcher.metrics.snapshot()
+        self.assertEqual(metrics['retries'], 2)
+        self.assertEqual(metrics['successes'], 1)
+        self.assertEqual(metrics['failures'], 0)
+
+    def test_failure_does_not_raise(self):
+        self.target._dispatch_chunked.side_effect = DispatchError(503)
+        dispatcher = self.new_dispatcher()
+        trace = self.new_trace()
+
+        dispatcher.patch_trace(trace)
+
+        self.assertEqual(self.target._dispatch_chunked.call_count, 3)
+        metrics = dispatcher.metrics.snapshot()
+        self.assertEqual(metrics['failures'], 1)
+        self.assertEqual(metrics['dropped'], 1)
+        # Dropped traces are not sent again:
+        self.assertEqual(dispatcher.traces, [])
+
+    def test_no_retry_on_client_error(self):
+        self.target._dispatch_chunked.side_effect = DispatchError(400)
+        dispatcher = self.new_dispatcher()
+
+        dispatcher.patch_trace(self.new_trace())
+
+        self.target._dispatch_chunked.assert_called_once()
+        self.assertEqual(dispatcher.metrics['failures'], 1)
+
+    def test_circuit_breaker(self):
+        self.target._dispatch_chunked.side_effect = DispatchError(503)
+        dispatcher = self.new_dispatcher()
+
+        for _ in range(4):
+            dispatcher.patch_trace(self.new_trace())
+
+        self.assertEqual(dispatcher.breaker.state, CircuitBreaker.OPEN)
+        metrics = dispatcher.metrics.snapshot()
+        self.assertEqual(metrics['failures'], 2)
+        self.assertEqual(metrics['circuit_opened'], 1)
+        self.assertEqual(metrics['rejected'], 2)
+        self.assertEqual(metrics['dropped'], 4)
+        self.assertEqual(self.target._dispatch_chunked.call_count, 6)
+
+    def test_spool(self):
+        self.target._dispatch_chunked.side_effect = DispatchError(503)
+        dispatcher = self.new_dispatcher(
+            fallback='spool', retry=RetryPolicy(retries=0),
+            breaker=CircuitBreaker(failure_threshold=3))
+        self.assertIsInstance(dispatcher.fallback, SpoolFallback)
+        first = self.new_trace()
+
+        dispatcher.patch_trace(first)
+        self.assertEqual(dispatcher.metrics['spooled'], 1)
+        self.assertEqual(len(dispatcher.fallback), 1)
+
+        # Spooled again, but only counted once:
+        middle = self.new_trace()
+        dispatcher.patch_trace(middle)
+        self.assertEqual(dispatcher.metrics['spooled'], 2)
+        self.assertEqual(len(dispatcher.fallback), 2)
+
+        self.target._dispatch_chunked.side_effect = None
+        second = self.new_trace()
+        dispatcher.patch_trace(second)
+
+        sent = self.target._dispatch_chunked.call_args[0][0]
+        self.assertEqual([i.trace for i in sent], [first, middle, second])
+        self.assertEqual(len(dispatcher.fallback), 0)
+
+
+if __name__ == '__main__':  # pragma: no-cover
+    unittest.main()
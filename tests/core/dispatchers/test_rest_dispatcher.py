@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+
+import json
+import unittest
+import zlib
+
+from mock import Mock, patch
+
+from gaesd.core.dispatchers.rest_dispatcher import PrepData, SimpleRestDispatcher
+from gaesd.core.trace import Trace
+from gaesd.core.utils import DispatchError
+from gaesd.sdk import SDK
+from tests import PROJECT_ID
+from tests.core.dispatchers.local_server import LocalServer
+
+
+class TestSimpleRestDispatcherTestCase(unittest.TestCase):
+    def setUp(self):
+        self.sdk = SDK.new(project_id=PROJECT_ID, auto=False)
+        self.trace = Trace.new(self.sdk, trace_id=Trace.new_trace_id())
+        with self.trace.span(name='span'):
+            pass
+
+    def tearDown(self):
+        SDK.clear()
+
+    def test_prep_dispatch(self):
+        dispatcher = SimpleRestDispatcher(sdk=self.sdk)
+
+        prep = dispatcher._prep_dispatch([self.trace])
+        self.assertEqual(prep, PrepData(
+            'https://cloudtrace.googleapis.com/v1/projects/{0}/traces'.format(
+                PROJECT_ID),
+            {'traces': [self.trace.export()]},
+        ))
+
+    def test_dispatch(self):
+        with LocalServer() as server:
+            dispatcher = SimpleRestDispatcher(
+                sdk=self.sdk,
+                root_url=server.url,
+                token_provider=lambda: 'my-token',
+            )
+
+            dispatcher._dispatch([self.trace])
+
+            (method, path, headers, body), = server.requests
+            self.assertEqual(method, 'PATCH')
+            self.assertEqual(path, '/v1/projects/{0}/traces'.format(PROJECT_ID))
+            self.assertEqual(headers['authorization'], 'Bearer my-token')
+            self.assertEqual(headers['content-type'], 'application/json')
+            self.assertEqual(
+                json.loads(body.decode('utf-8')),
+                {'traces': [self.trace.export()]},
+            )
+
+    def test_dispatch_compressed(self):
+        for _ in range(50):
+            with self.trace.span(name='span'):
+                pass
+
+        with LocalServer() as server:
+            dispatcher = SimpleRestDispatcher(
+                sdk=self.sdk,
+                root_url=server.url,
+                token_provider=lambda: None,
+                compression='deflate',
+                compression_level=9,
+            )
+            self.assertEqual(dispatcher.compressor.level, 9)
+
+            dispatcher._dispatch([self.trace])
+
+            (_, _, headers, body), = server.requests
+            self.assertEqual(headers['content-encoding'], 'deflate')
+            self.assertEqual(
+                json.loads(zlib.decompress(body).decode('utf-8')),
+                {'traces': [self.trace.export()]},
+            )
+
+    def test_dispatch_below_compression_threshold(self):
+        with LocalServer() as server:
+            dispatcher = SimpleRestDispatcher(
+                sdk=self.sdk,
+                root_url=server.url,
+                token_provider=lambda: None,
+                compression='gzip',
+                compression_threshold=100000,
+            )
+
+            dispatcher._dispatch([self.trace])
+
+            (_, _, headers, body), = server.requests
+            self.assertNotIn('Content-Encoding', headers)
+            self.assertEqual(
+                json.loads(body.decode('utf-8')),
+                {'traces': [self.trace.export()]},
+            )
+
+    def test_dispatch_reuses_connection(self):
+        with LocalServer() as server:
+            dispatcher = SimpleRestDispatcher(
+                sdk=self.sdk, root_url=server.url, token_provider=lambda: None)
+
+            for _ in range(5):
+                dispatcher._dispatch([self.trace])
+
+            self.assertEqual(len(server.requests), 5)
+            self.assertEqual(server.connections, 1)
+            self.assertNotIn('Authorization', server.requests[0][2])
+
+    def test_dispatch_error(self):
+        with LocalServer(status=403, response=b'denied') as server:
+            dispatcher = SimpleRestDispatcher(
+                sdk=self.sdk, root_url=server.url, token_provider=lambda: None)
+
+            try:
+                dispatcher._dispatch([self.trace])
+            except DispatchError as e:
+                self.assertEqual(e.status, 403)
+                self.assertEqual(e.body, b'denied')
+            else:
+                assert False
+
+    @patch('gaesd.core.dispatchers.google_api_client_cache.client_cache')
+    def test_default_access_token(self, mock_client_cache):
+        token = Mock(access_token='default-token')
+        mock_client_cache.credentials.get_access_token.return_value = token
+        dispatcher = SimpleRestDispatcher(sdk=self.sdk)
+
+        dispatcher.warmup()
+        self.assertEqual(dispatcher._access_token(), 'default-token')
+
+
+if __name__ == '__main__':  # pragma: no-cover
+    unittest.main()
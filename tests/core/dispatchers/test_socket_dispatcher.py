@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+
+import os
+import shutil
+import socket
+import tempfile
+import unittest
+
+from gaesd.core.dispatchers.socket_dispatcher import (
+    SocketDispatcher, decode, encode,
+)
+from gaesd.core.trace import Trace
+from gaesd.sdk import SDK
+from tests import PROJECT_ID
+
+
+class TestSocketDispatcherTestCase(unittest.TestCase):
+    def setUp(self):
+        self.sdk = SDK.new(project_id=PROJECT_ID, auto=False)
+        self.receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.receiver.bind(('127.0.0.1', 0))
+        self.receiver.settimeout(5)
+
+    def tearDown(self):
+        self.receiver.close()
+        SDK.clear()
+
+    def new_trace(self, spans=1):
+        trace = Trace.new(self.sdk)
+        for _ in range(spans):
+            with trace.span(name='span'):
+                pass
+        return trace
+
+    def receive(self):
+        return decode(self.receiver.recv(65536))
+
+    def test_encode_decode(self):
+        exports = [{'traceId': '1', 'spans': []}]
+        self.assertEqual(decode(encode(exports)), exports)
+
+    def test_dispatch_udp(self):
+        dispatcher = SocketDispatcher(
+            sdk=self.sdk, address=self.receiver.getsockname())
+        self.assertEqual(dispatcher.socket.gettimeout(), 0.0)
+        trace = self.new_trace()
+
+        dispatcher.patch_trace(trace)
+
+        self.assertEqual(self.receive(), [trace.export()])
+        self.assertEqual(dispatcher.dropped, 0)
+
+    def test_dispatch_unix(self):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'agent.sock')
+        receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        receiver.bind(path)
+        receiver.settimeout(5)
+
+        try:
+            dispatcher = SocketDispatcher(sdk=self.sdk, address=path)
+            trace = self.new_trace()
+            dispatcher.patch_trace(trace)
+
+            self.assertEqual(decode(receiver.recv(65536)), [trace.export()])
+        finally:
+            receiver.close()
+            shutil.rmtree(directory)
+
+    def test_dispatch_splits_datagrams(self):
+        dispatcher = SocketDispatcher(
+            sdk=self.sdk,
+            auto=False,
+            address=self.receiver.getsockname(),
+            max_datagram_size=1000,
+        )
+        traces = [self.new_trace(spans=2) for _ in range(5)]
+        large_trace = self.new_trace(spans=30)
+
+        dispatcher._dispatch(traces + [large_trace])
+
+        received = []
+        while len(received) < 5 or received[-1]['spans'][-1] != \
+                large_trace.export()['spans'][-1]:
+            received.extend(self.receive())
+
+        self.assertEqual(received[:5], [trace.export() for trace in traces])
+        parts = received[5:]
+        self.assertGreater(len(parts), 1)
+        self.assertEqual(
+            [span for part in parts for span in part['spans']],
+            large_trace.export()['spans'],
+        )
+        self.assertEqual(
+            set(part['traceId'] for part in parts),
+            set([str(large_trace.trace_id)]),
+        )
+
+    def test_no_agent(self):
+        dispatcher = SocketDispatcher(
+            sdk=self.sdk, address='/nonexistent/agent.sock')
+
+        dispatcher.patch_trace(self.new_trace())
+
+        self.assertEqual(dispatcher.dropped, 1)
+        self.assertEqual(dispatcher.traces, [])
+
+
+if __name__ == '__main__':  # pragma: no-cover
+    unittest.main()
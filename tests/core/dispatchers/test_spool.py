@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import Mock, patch
+
+from gaesd.core.dispatchers.spool import SpoolLog, fcntl
+from gaesd.core.utils import SpoolLockedError
+
+
+def records(count, size=10):
+    return [
+        '{0:0{1}d}'.format(index, size).encode('ascii')
+        for index in range(count)
+    ]
+
+
+class TestSpoolLogTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def new_log(self, **kwargs):
+        kwargs.setdefault('segment_size', 64)
+        return SpoolLog(self.directory, **kwargs)
+
+    def segments(self):
+        return sorted(
+            name for name in os.listdir(self.directory)
+            if name.endswith('.seg'))
+
+    def test_empty(self):
+        log = self.new_log()
+        self.assertTrue(log.is_empty())
+        self.assertEqual(log.read(10), ([], (0, 0)))
+        self.assertEqual(self.segments(), [])
+
+    def test_append_read_acknowledge(self):
+        log = self.new_log()
+        e_records = records(12)
+        for record in e_records:
+            log.append(record)
+
+        # 18 byte records in 64 byte segments:
+        self.assertEqual(len(self.segments()), 4)
+
+        read, position = log.read(5)
+        self.assertEqual(read, e_records[:5])
+        # Reading does not move the cursor:
+        self.assertEqual(log.read(5)[0], e_records[:5])
+
+        log.acknowledge(position)
+        self.assertEqual(log.cursor, position)
+        read, position = log.read(100)
+        self.assertEqual(read, e_records[5:])
+
+        log.acknowledge(position)
+        self.assertTrue(log.is_empty())
+        # Acknowledged segments are deleted:
+        self.assertEqual(len(self.segments()), 1)
+
+    def test_record_larger_than_segment(self):
+        log = self.new_log()
+        big = b'x' * 1000
+
+        log.append(b'small')
+        log.append(big)
+        log.append(b'small')
+
+        self.assertEqual(log.read(10)[0], [b'small', big, b'small'])
+
+    def test_empty_record(self):
+        self.assertRaises(ValueError, self.new_log().append, b'')
+
+    def test_append_after_close(self):
+        log = self.new_log()
+        log.append(b'record')
+        log.close()
+        segments = self.segments()
+
+        self.assertRaises(ValueError, log.append, b'record')
+        self.assertEqual(self.segments(), segments)
+
+    def test_resume_after_restart(self):
+        log = self.new_log()
+        e_records = records(10)
+        for record in e_records:
+            log.append(record)
+        read, position = log.read(4)
+        log.acknowledge(position)
+        # No close(): simulate the process going away.
+        del log
+
+        log = self.new_log()
+        self.assertEqual(log.read(100)[0], e_records[4:])
+
+        log.append(b'after restart')
+        read, position = log.read(100)
+        self.assertEqual(read, e_records[4:] + [b'after restart'])
+        log.acknowledge(position)
+
+        log.close()
+        log = self.new_log()
+        self.assertTrue(log.is_empty())
+
+    def test_torn_record(self):
+        log = self.new_log(segment_size=4096)
+        log.append(b'complete')
+        log.append(b'torn record')
+        log.close()
+
+        path = os.path.join(self.directory, self.segments()[0])
+        with open(path, 'r+b') as f:
+            f.seek(8 + len(b'complete') + 8 + 2)
+            f.write(b'XX')
+
+        log = self.new_log()
+        self.assertEqual(log.read(10)[0], [b'complete'])
+        log.append(b'next')
+        self.assertEqual(log.read(10)[0], [b'complete', b'next'])
+
+    def test_sync_batching(self):
+        clock = Mock(return_value=0)
+        log = self.new_log(
+            segment_size=4096, sync_every=3, sync_interval=10, clock=clock)
+
+        with patch.object(log, '_sync', wraps=log._sync) as mock_sync:
+            log.append(b'1')
+            log.append(b'2')
+            mock_sync.assert_not_called()
+            log.append(b'3')
+            self.assertEqual(mock_sync.call_count, 1)
+
+            log.append(b'4')
+            clock.return_value = 10
+            log.append(b'5')
+            self.assertEqual(mock_sync.call_count, 2)
+
+    @unittest.skipIf(fcntl is None, 'flock requires fcntl')
+    def test_directory_is_locked(self):
+        log = self.new_log()
+
+        self.assertRaises(SpoolLockedError, self.new_log)
+
+        log.close()
+        self.new_log().close()
+
+    def test_corrupt_cursor(self):
+        log = self.new_log()
+        log.append(b'record')
+        log.close()
+        with open(os.path.join(self.directory, 'cursor'), 'w') as f:
+            f.write('garbage')
+
+        log = self.new_log()
+        self.assertEqual(log.read(10)[0], [b'record'])
+
+
+if __name__ == '__main__':  # pragma: no-cover
+    unittest.main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from mock import Mock, patch
+
+from gaesd.core.dispatchers.spool import fcntl
+from gaesd.core.dispatchers.spool_dispatcher import SpoolDispatcher
+from gaesd.core.trace import Trace
+from gaesd.core.utils import SpoolLockedError
+from gaesd.sdk import SDK
+from tests import PROJECT_ID
+
+
+class TestSpoolDispatcherTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.sdk = SDK.new(project_id=PROJECT_ID, auto=False)
+        self.target = Mock()
+        self.target_type = Mock(return_value=self.target)
+        self.sent = []
+        self.target._dispatch_chunked.side_effect = \
+            lambda traces: self.sent.extend(i.export() for i in traces)
+        self.dispatchers = []
+
+    def tearDown(self):
+        for dispatcher in self.dispatchers:
+            dispatcher.stop()
+        shutil.rmtree(self.directory)
+        SDK.clear()
+
+    def new_dispatcher(self, **kwargs):
+        kwargs.setdefault('retry_interval', 0.01)
+        dispatcher = SpoolDispatcher(
+            sdk=self.sdk,
+            auto=True,
+            dispatcher=self.target_type,
+            directory=self.directory,
+            **kwargs
+        )
+        self.dispatchers.append(dispatcher)
+        return dispatcher
+
+    def new_trace(self):
+        trace = Trace.new(self.sdk)
+        with trace.span(name='span'):
+            pass
+        return trace
+
+    def test_init(self):
+        dispatcher = self.new_dispatcher()
+        self.target_type.assert_called_once_with(sdk=self.sdk, auto=False)
+        self.assertIs(dispatcher.dispatcher, self.target)
+        self.assertEqual(dispatcher.log.directory, self.directory)
+
+        dispatcher.warmup()
+        self.target.warmup.assert_called_once_with()
+
+    def test_directory_is_required(self):
+        self.assertRaises(
+            ValueError, SpoolDispatcher, sdk=self.sdk,
+            dispatcher=self.target_type)
+
+    @unittest.skipIf(fcntl is None, 'flock requires fcntl')
+    def test_directory_is_locked(self):
+        dispatcher = self.new_dispatcher()
+
+        self.assertRaises(SpoolLockedError, self.new_dispatcher)
+
+        dispatcher.stop()
+        self.dispatchers.remove(dispatcher)
+        self.new_dispatcher()
+
+    def test_dispatch_after_stop(self):
+        dispatcher = self.new_dispatcher()
+        dispatcher.stop()
+        segments = os.listdir(self.directory)
+
+        with patch.object(dispatcher.logger, 'warning') as mock_warning:
+            dispatcher.patch_trace(self.new_trace())
+        mock_warning.assert_called_once_with(
+            'Dropped %s traces dispatched after stop()', 1)
+
+        self.assertEqual(os.listdir(self.directory), segments)
+        self.assertIsNone(dispatcher._replayer)
+        self.assertFalse(dispatcher.flush(timeout=0.05))
+        # Stopping again does nothing:
+        dispatcher.stop()
+
+    def test_patch_trace_spools(self):
+        dispatcher = self.new_dispatcher()
+        traces = [self.new_trace() for _ in range(3)]
+
+        for trace in traces:
+            dispatcher.patch_trace(trace)
+        self.assertTrue(dispatcher.flush(timeout=5))
+
+        self.assertEqual(self.sent, [trace.export() for trace in traces])
+        self.assertTrue(dispatcher.log.is_empty())
+        self.assertEqual(dispatcher.traces, [])
+
+    def test_dispatch_does_not_send_on_calling_thread(self):
+        calling_thread = threading.current_thread()
+        threads = []
+        self.target._dispatch_chunked.side_effect = \
+            lambda traces: threads.append(threading.current_thread())
+        dispatcher = self.new_dispatcher()
+
+        dispatcher.patch_trace(self.new_trace())
+        dispatcher.flush(timeout=5)
+
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads[0], calling_thread)
+
+    def test_failed_batch_is_resent(self):
+        failures = [RuntimeError('failed')]
+
+        def dispatch(traces):
+            if failures:
+                raise failures.pop()
+            self.sent.extend(i.export() for i in traces)
+
+        self.target._dispatch_chunked.side_effect = dispatch
+        dispatcher = self.new_dispatcher()
+        trace = self.new_trace()
+
+        dispatcher.patch_trace(trace)
+        self.assertTrue(dispatcher.flush(timeout=5))
+
+        self.assertEqual(self.sent, [trace.export()])
+        self.assertEqual(self.target._dispatch_chunked.call_count, 2)
+
+    def test_new_traces_do_not_cut_retry_short(self):
+        self.target._dispatch_chunked.side_effect = RuntimeError('failed')
+        dispatcher = self.new_dispatcher(retry_interval=60)
+
+        dispatcher.patch_trace(self.new_trace())
+        self.assertFalse(dispatcher.flush(timeout=0.05))
+        for _ in range(3):
+            dispatcher.patch_trace(self.new_trace())
+        self.assertFalse(dispatcher.flush(timeout=0.05))
+
+        self.assertEqual(self.target._dispatch_chunked.call_count, 1)
+
+    def test_flush_timeout(self):
+        self.target._dispatch_chunked.side_effect = RuntimeError('failed')
+        dispatcher = self.new_dispatcher(retry_interval=60)
+
+        dispatcher.patch_trace(self.new_trace())
+        self.assertFalse(dispatcher.flush(timeout=0.05))
+
+    def test_resume_after_restart(self):
+        self.target._dispatch_chunked.side_effect = RuntimeError('down')
+        dispatcher = self.new_dispatcher(retry_interval=60)
+        traces = [self.new_trace() for _ in range(2)]
+        for trace in traces:
+            dispatcher.patch_trace(trace)
+        dispatcher.stop()
+        self.dispatchers.remove(dispatcher)
+
+        self.target._dispatch_chunked.side_effect = \
+            lambda traces: self.sent.extend(i.export() for i in traces)
+        dispatcher = self.new_dispatcher()
+        self.assertTrue(dispatcher.flush(timeout=5))
+
+        self.assertEqual(self.sent, [trace.export() for trace in traces])
+
+    def test_batch_size(self):
+        dispatcher = self.new_dispatcher(batch_size=2)
+        dispatcher.auto = False
+        for _ in range(5):
+            dispatcher.patch_trace(self.new_trace())
+
+        self.sdk.enabler = True
+        dispatcher()
+        dispatcher.flush(timeout=5)
+
+        self.assertEqual(len(self.sent), 5)
+        self.assertTrue(all(
+            len(call[0][0]) <= 2
+            for call in self.target._dispatch_chunked.call_args_list
+        ))
+
+
+if __name__ == '__main__':  # pragma: no-cover
+    unittest.main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+
+import datetime
+import unittest
+
+from nose_parameterized import parameterized
+
+from gaesd.core.dispatchers.tail_sampling import (
+    ErrorPolicy, LatencyPolicy, ProbabilityPolicy, SpanNamePolicy,
+)
+from gaesd.core.trace import Trace
+from gaesd.sdk import SDK
+from tests import PROJECT_ID
+
+START = datetime.datetime(2017, 1, 1)
+
+
+class TestTailPoliciesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.sdk = SDK.new(project_id=PROJECT_ID, auto=False, enabler=True)
+
+    def tearDown(self):
+        SDK.clear()
+
+    def new_trace(self, *spans):
+        """
+        :param spans: (name, seconds, labels, nested) of each span.
+        """
+        trace = Trace.new(self.sdk, root_span_id=1)
+        parent = None
+        for name, seconds, labels, nested in spans:
+            span = trace.span(
+                parent_span=parent if nested else None, name=name,
+                start_time=START,
+                end_time=START + datetime.timedelta(seconds=seconds),
+                labels=labels,
+            )
+            parent = span
+        return trace
+
+    @parameterized.expand([
+        (1.0, [('root', 2.0, None, False)], True),
+        (1.0, [('root', 0.5, None, False)], False),
+        (datetime.timedelta(seconds=1), [('root', 2.0, None, False)], True),
+        # Only top-level spans count:
+        (1.0, [('root', 0.5, None, False), ('nested', 2.0, None, True)],
+         False),
+        (1.0, [], False),
+    ])
+    def test_latency(self, threshold, spans, e_keep):
+        policy = LatencyPolicy(threshold)
+
+        self.assertEqual(policy(self.new_trace(*spans)), e_keep)
+        self.assertEqual(policy.threshold, 1.0)
+
+    def test_latency_ignores_unfinished_spans(self):
+        trace = Trace.new(self.sdk)
+        trace.span(name='root')
+
+        self.assertIsNone(LatencyPolicy.duration(trace))
+        self.assertFalse(LatencyPolicy(0)(trace))
+
+    @parameterized.expand([
+        ({'error': 'true'}, True),
+        ({'/error/message': 'bang!'}, True),
+        ({'/http/status_code': '503'}, True),
+        ({'/http/status_code': 500}, True),
+        ({'/http/status_code': '404'}, False),
+        ({'other': 'label'}, False),
+        (None, False),
+    ])
+    def test_error(self, labels, e_keep):
+        trace = self.new_trace(
+            ('root', 1, None, False), ('nested', 1, labels, True))
+
+        self.assertEqual(ErrorPolicy()(trace), e_keep)
+
+    def test_error_custom_labels(self):
+        trace = self.new_trace(('root', 1, {'failed': '1'}, False))
+
+        self.assertTrue(ErrorPolicy(labels=['failed'])(trace))
+        self.assertFalse(ErrorPolicy()(trace))
+
+    def test_span_name(self):
+        policy = SpanNamePolicy(['checkout', 'payment'])
+
+        self.assertTrue(policy(self.new_trace(
+            ('root', 1, None, False), ('payment', 1, None, True))))
+        self.assertFalse(policy(self.new_trace(('root', 1, None, False))))
+
+    @parameterized.expand([
+        (0.0, False),
+        (1.0, True),
+    ])
+    def test_probability(self, rate, e_keep):
+        self.assertEqual(ProbabilityPolicy(rate)(self.new_trace()), e_keep)
+
+    def test_probability_invalid_rate(self):
+        self.assertRaises(ValueError, ProbabilityPolicy, 2)
+
+
+if __name__ == '__main__':  # pragma: no-cover
+    unittest.main()
@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+
+import threading
+import time
+import unittest
+
+from mock import Mock
+
+from gaesd.core.dispatchers.dispatcher import TracePatch
+from gaesd.core.dispatchers.tail_sampling import (
+    ErrorPolicy, SpanNamePolicy,
+)
+from gaesd.core.dispatchers.tail_sampling_dispatcher import \
+    TailSamplingDispatcher
+from gaesd.core.trace import Trace
+from gaesd.sdk import SDK
+from tests import PROJECT_ID
+
+
+class TestTailSamplingDispatcherTestCase(unittest.TestCase):
+    def setUp(self):
+        self.sdk = SDK.new(project_id=PROJECT_ID, auto=False, enabler=True)
+        self.target = Mock()
+        self.target_type = Mock(return_value=self.target)
+        self.now = 1000.0
+        self.dispatchers = []
+
+    def tearDown(self):
+        for dispatcher in self.dispatchers:
+            dispatcher.stop()
+        SDK.clear()
+
+    def new_dispatcher(self, **kwargs):
+        kwargs.setdefault('policies', [SpanNamePolicy(['keep'])])
+        kwargs.setdefault('clock', lambda: self.now)
+        dispatcher = TailSamplingDispatcher(
+            sdk=self.sdk, auto=True, dispatcher=self.target_type, **kwargs)
+        self.dispatchers.append(dispatcher)
+        return dispatcher
+
+    def new_trace(self, name, end=True):
+        trace = Trace.new(self.sdk)
+        span = trace.span(name=name)
+        if end:
+            with span:
+                pass
+        return trace
+
+    def sent(self):
+        return [
+            item for call in self.target._dispatch_chunked.call_args_list
+            for item in call[0][0]
+        ]
+
+    def test_init(self):
+        dispatcher = self.new_dispatcher()
+        self.target_type.assert_called_once_with(sdk=self.sdk, auto=False)
+        self.assertIs(dispatcher.dispatcher, self.target)
+
+        dispatcher.sdk = 123
+        self.assertEqual(self.target.sdk, 123)
+
+        dispatcher.warmup()
+        self.target.warmup.assert_called_once_with()
+
+    def test_defaults(self):
+        from gaesd.core.dispatchers.google_api_client_dispatcher import \
+            GoogleApiClientDispatcher
+
+        dispatcher = TailSamplingDispatcher(sdk=self.sdk)
+        self.dispatchers.append(dispatcher)
+
+        self.assertIsInstance(dispatcher.dispatcher, GoogleApiClientDispatcher)
+        policy, = dispatcher.policies
+        self.assertIsInstance(policy, ErrorPolicy)
+
+    def test_decides_completed_traces(self):
+        dispatcher = self.new_dispatcher(decision_wait=1)
+        kept = self.new_trace('keep')
+        dropped = self.new_trace('drop')
+        dispatcher.patch_trace(kept)
+        dispatcher.patch_trace(dropped)
+
+        # Not yet:
+        self.assertEqual(dispatcher._take_due(self.now + 0.5), ([], 0.5))
+        self.assertEqual(dispatcher.pending, 2)
+
+        due, wait = dispatcher._take_due(self.now + 1)
+        self.assertEqual(set(due), set([kept, dropped]))
+        self.assertIsNone(wait)
+        dispatcher._decide(due)
+
+        patch, = self.sent()
+        self.assertIs(patch.trace, kept)
+        self.assertEqual((patch.start, patch.stop), (0, 1))
+        self.assertEqual((dispatcher.kept, dispatcher.dropped), (1, 1))
+        self.assertEqual(dispatcher.pending, 0)
+
+    def test_waits_for_incomplete_traces(self):
+        dispatcher = self.new_dispatcher(decision_wait=1, max_wait=10)
+        trace = self.new_trace('keep')
+        # A span still running:
+        trace.span(name='running')
+        dispatcher.patch_trace(trace)
+
+        self.assertEqual(dispatcher._take_due(self.now + 5), ([], 5))
+        self.assertEqual(dispatcher._take_due(self.now + 10), ([trace], None))
+
+    def test_activity_delays_decision(self):
+        dispatcher = self.new_dispatcher(decision_wait=1)
+        trace = self.new_trace('keep')
+        dispatcher.patch_trace(trace)
+
+        self.now += 0.5
+        with trace.span(name='more'):
+            pass
+        dispatcher.patch_trace(trace)
+
+        self.assertEqual(dispatcher._take_due(self.now + 0.5), ([], 0.5))
+        self.assertEqual(dispatcher._take_due(self.now + 1), ([trace], None))
+
+    def test_only_due_traces_are_checked(self):
+        dispatcher = self.new_dispatcher(decision_wait=1)
+        # No decider thread:
+        dispatcher._ensure_decider = Mock()
+        traces = [self.new_trace('keep') for _ in range(10)]
+        for trace in traces[:-1]:
+            dispatcher.patch_trace(trace)
+        self.now += 0.5
+        dispatcher.patch_trace(traces[-1])
+        dispatcher._is_complete = Mock(return_value=True)
+
+        due, wait = dispatcher._take_due(self.now + 0.5)
+
+        self.assertEqual(due, traces[:-1])
+        self.assertEqual(wait, 0.5)
+        self.assertEqual(dispatcher._is_complete.call_count, 9)
+
+    def test_wakeup_only_for_earlier_decisions(self):
+        dispatcher = self.new_dispatcher(decision_wait=1)
+        # No decider thread:
+        dispatcher._ensure_decider = Mock()
+        trace = self.new_trace('keep')
+        dispatcher.patch_trace(trace)
+        self.assertTrue(dispatcher._wakeup.is_set())
+        dispatcher._wakeup.clear()
+
+        # Activity and later traces don't:
+        self.now += 0.5
+        dispatcher.patch_trace(trace)
+        dispatcher.patch_trace(self.new_trace('keep'))
+        self.assertFalse(dispatcher._wakeup.is_set())
+
+        dispatcher.flush()
+        dispatcher.patch_trace(self.new_trace('keep'))
+        self.assertTrue(dispatcher._wakeup.is_set())
+
+    def test_spans_after_decision(self):
+        dispatcher = self.new_dispatcher()
+        kept = self.new_trace('keep')
+        dropped = self.new_trace('drop')
+        dispatcher.patch_trace(kept)
+        dispatcher.patch_trace(dropped)
+        dispatcher.flush()
+        self.target._dispatch_chunked.reset_mock()
+
+        for trace in [kept, dropped]:
+            with trace.span(name='late'):
+                pass
+            dispatcher.patch_trace(trace)
+
+        patch, = self.sent()
+        self.assertIs(patch.trace, kept)
+        self.assertEqual((patch.start, patch.stop), (1, 2))
+        self.assertEqual(dispatcher.pending, 0)
+
+    def test_max_pending(self):
+        dispatcher = self.new_dispatcher(max_pending=2)
+        traces = [self.new_trace('keep') for _ in range(3)]
+
+        for trace in traces:
+            dispatcher.patch_trace(trace)
+
+        # The oldest was decided to make room:
+        patch, = self.sent()
+        self.assertIs(patch.trace, traces[0])
+        self.assertEqual(dispatcher.pending, 2)
+
+    def test_failing_policy(self):
+        policy = Mock(side_effect=Exception('bang!'))
+        dispatcher = self.new_dispatcher(
+            policies=[policy, SpanNamePolicy(['keep'])])
+
+        self.assertTrue(dispatcher.decide(self.new_trace('keep')))
+        self.assertFalse(dispatcher.decide(self.new_trace('drop')))
+
+    def test_send_error_is_logged(self):
+        self.target._dispatch_chunked.side_effect = Exception('bang!')
+        dispatcher = self.new_dispatcher()
+        dispatcher.patch_trace(self.new_trace('keep'))
+
+        dispatcher.flush()
+        self.assertEqual(dispatcher.kept, 1)
+
+    def test_decider_thread(self):
+        sent = threading.Event()
+        self.target._dispatch_chunked.side_effect = lambda items: sent.set()
+        dispatcher = self.new_dispatcher(decision_wait=0.01, clock=time.time)
+
+        dispatcher.patch_trace(self.new_trace('keep'))
+
+        self.assertTrue(sent.wait(5))
+        self.assertEqual(dispatcher.kept, 1)
+
+    def test_sdk_integration(self):
+        def dispatcher(sdk, auto):
+            return self.new_dispatcher()
+
+        sdk = SDK.new(
+            project_id=PROJECT_ID, dispatcher=dispatcher, auto=False,
+            enabler=True)
+        for name in ['keep', 'drop']:
+            with sdk.span(name=name):
+                pass
+            sdk()
+            SDK.clear()
+
+        sdk.dispatcher.flush()
+
+        item, = self.sent()
+        self.assertIsInstance(item, TracePatch)
+        self.assertEqual(item.export()['spans'][0]['name'], 'keep')
+
+
+if __name__ == '__main__':  # pragma: no-cover
+    unittest.main()
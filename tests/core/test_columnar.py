@@ -0,0 +1,371 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+
+import datetime
+import unittest
+
+from nose_parameterized import parameterized
+
+from gaesd import ColumnarSpan, ColumnarTrace, SDK, Span, SpanKind, Trace
+from gaesd.core.columnar import MISSING, NO_ID, SpanColumns
+from gaesd.core.utils import datetime_to_float
+from tests import PROJECT_ID
+
+
+class TestSpanColumnsTestCase(unittest.TestCase):
+    def test_append(self):
+        columns = SpanColumns()
+
+        self.assertEqual(columns.append(1), 0)
+        self.assertEqual(
+            columns.append(
+                '2', parent_span_id=1, name='a', span_kind=SpanKind.client,
+                start_ns=10, end_ns=20, labels={'x': 1},
+            ),
+            1,
+        )
+
+        self.assertEqual(len(columns), 2)
+        self.assertEqual(list(columns.span_ids), [1, 2])
+        self.assertEqual(list(columns.parent_ids), [NO_ID, 1])
+        self.assertEqual(list(columns.start_ns), [MISSING, 10])
+        self.assertEqual(list(columns.end_ns), [MISSING, 20])
+        self.assertEqual(columns.labels, {1: {'x': 1}})
+
+    def test_unsigned_ids(self):
+        columns = SpanColumns()
+        span_id = (1 << 64) - 1
+
+        columns.append(span_id, parent_span_id=1 << 63)
+
+        self.assertEqual(columns.span_ids[0], span_id)
+        self.assertEqual(columns.export(0)['spanId'], str(span_id))
+        self.assertEqual(columns.export(0)['parentSpanId'], str(1 << 63))
+
+    def test_intern(self):
+        columns = SpanColumns()
+
+        for _ in range(3):
+            columns.append(1, name='a')
+            columns.append(2, name='b')
+
+        self.assertEqual(columns.name_table, ['a', 'b'])
+        self.assertEqual(list(columns.names), [0, 1] * 3)
+
+    def test_export(self):
+        columns = SpanColumns()
+        columns.append(
+            1, parent_span_id=2, name='a', span_kind=SpanKind.server,
+            start_ns=1500000000123456000, end_ns=1500000001000000001,
+            labels={'x': 1},
+        )
+        columns.append(3)
+
+        self.assertEqual(columns.export(0), {
+            'spanId': '1',
+            'kind': SpanKind.server.value,
+            'name': 'a',
+            'startTime': '2017-07-14T02:40:00.123456Z',
+            'endTime': '2017-07-14T02:40:01.000000001Z',
+            'parentSpanId': '2',
+            'labels': {'x': '1'},
+        })
+        self.assertEqual(columns.export(1), {
+            'spanId': '3',
+            'kind': SpanKind.unspecified.value,
+            'name': '',
+            'startTime': None,
+            'endTime': None,
+            'parentSpanId': None,
+            'labels': {},
+        })
+
+
+class TestColumnarTraceTestCase(unittest.TestCase):
+    def setUp(self):
+        self.sdk = SDK.new(
+            project_id=PROJECT_ID, auto=False, trace_type=ColumnarTrace)
+        self.sdk.clear(traces=True, loggers=True)
+
+    def tearDown(self):
+        self.sdk.clear(traces=True, loggers=True)
+
+    def test_sdk_trace_type(self):
+        trace = self.sdk.trace()
+
+        self.assertIsInstance(trace, ColumnarTrace)
+        self.assertIs(self.sdk.trace_type, ColumnarTrace)
+        self.assertIs(self.sdk.current_trace, trace)
+
+        self.sdk.trace_type = Trace
+        self.assertIs(type(self.sdk.trace()), Trace)
+
+    def test_span_is_view(self):
+        trace = self.sdk.trace(root_span_id=123)
+
+        span = trace.span(name='a', span_kind=SpanKind.client)
+
+        self.assertIsInstance(span, ColumnarSpan)
+        self.assertIs(span.trace, trace)
+        self.assertEqual(span.row, 0)
+        self.assertEqual(span.name, 'a')
+        self.assertEqual(span.span_kind, SpanKind.client)
+        self.assertEqual(span.parent_span_id, 123)
+        self.assertEqual(trace.span_ids, [span.span_id])
+        self.assertEqual(trace.spans, [span])
+        self.assertEqual(trace[0], span)
+        self.assertIsNot(trace[0], span)
+        self.assertEqual(hash(trace[0]), hash(span))
+        self.assertEqual(len(trace), 1)
+        self.assertEqual(len(trace.columns), 1)
+
+    def test_view_writes_columns(self):
+        trace = self.sdk.trace()
+        span = trace.span()
+        start_time = datetime.datetime(2017, 7, 14, 2, 40)
+
+        span.name = 'b'
+        span.span_kind = SpanKind.server
+        span.parent_span_id = 7
+        span.start_time = start_time
+        span.labels['x'] = 1
+
+        view = trace[0]
+        self.assertEqual(view.name, 'b')
+        self.assertEqual(view.span_kind, SpanKind.server)
+        self.assertEqual(view.parent_span_id, 7)
+        self.assertEqual(view.start_time, start_time)
+        self.assertIsNone(view.end_time)
+        self.assertEqual(view.labels, {'x': 1})
+
+    def test_labels_stored_on_write(self):
+        trace = self.sdk.trace()
+        span = trace.span()
+        other = trace.span(labels={'a': 1})
+
+        self.assertEqual(span.labels, {})
+        self.assertEqual(trace.columns.labels, {1: {'a': 1}})
+
+        labels = span.labels
+        trace[0].labels['x'] = 1
+        labels['y'] = 2
+        labels.setdefault('z', 3)
+        trace[0].labels.update(w=4)
+        other.labels.update(b=2)
+
+        self.assertEqual(trace[0].labels, {'w': 4, 'x': 1, 'y': 2, 'z': 3})
+        self.assertEqual(other.labels, {'a': 1, 'b': 2})
+        self.assertEqual(
+            trace.columns.export(0)['labels'],
+            {'w': '4', 'x': '1', 'y': '2', 'z': '3'})
+
+    def test_unsigned_ids(self):
+        span_id = (1 << 64) - 1
+        trace = self.sdk.trace_from_header(
+            'abc/{0};o=1'.format(span_id))
+
+        span = trace.span()
+        trace + Span(trace=trace, span_id=span_id - 1, parent_span_id=1)
+
+        self.assertEqual(span.parent_span_id, span_id)
+        self.assertEqual(trace.get_children(span_id), [span])
+        self.assertEqual(trace.get_span(span_id - 1).parent_span_id, 1)
+        self.assertEqual(
+            trace.export()['spans'][0]['parentSpanId'], str(span_id))
+
+    def test_nested_spans(self):
+        with self.sdk.trace() as trace:
+            with trace.span(name='parent') as parent:
+                with parent.span(name='child') as child:
+                    pass
+
+        self.assertEqual(child.parent_span_id, parent.span_id)
+        self.assertEqual(trace.completed_count, 2)
+        self.assertTrue(parent.has_duration)
+        self.assertLessEqual(parent.start_ns, child.start_ns)
+        self.assertLessEqual(child.end_ns, parent.end_ns)
+        self.assertEqual(
+            [span['name'] for span in trace.export_completed()['spans']],
+            ['child', 'parent'],
+        )
+
+    def test_removed_span_is_not_completed(self):
+        trace = self.sdk.trace()
+        spans = [trace.span(name=str(i)) for i in range(3)]
+        for span in spans:
+            span.end_time = datetime.datetime(2017, 7, 14)
+        trace.end()
+
+        trace - spans[0]
+        del trace[0]
+
+        self.assertEqual(trace.completed_spans, [spans[2]])
+        self.assertEqual(trace.completed_count, 1)
+        self.assertEqual(trace.completed_offset, 3)
+        self.assertEqual(
+            [span['name'] for span in trace.export_completed()['spans']],
+            ['2'])
+
+    def test_export_matches_trace(self):
+        start_time = datetime.datetime(2017, 7, 14, 2, 40)
+        end_time = start_time + datetime.timedelta(microseconds=1)
+        exported = []
+
+        for trace_type in [Trace, ColumnarTrace]:
+            trace = trace_type.new(self.sdk, trace_id='abc', root_span_id=1)
+            span = trace.span(
+                name='a', start_time=start_time, end_time=end_time,
+                labels={'x': 1},
+            )
+            span.span(name='b')
+            exported.append(trace.export())
+
+        # The span ids differ:
+        for export in exported:
+            a, b = export['spans']
+            self.assertEqual(a.pop('parentSpanId'), '1')
+            self.assertEqual(b.pop('parentSpanId'), a.pop('spanId'))
+            b.pop('spanId')
+
+        self.assertEqual(exported[0], exported[1])
+
+    def test_export_spans(self):
+        trace = self.sdk.trace()
+        spans = [trace.span(name=str(i)) for i in range(3)]
+        other = Span(trace=trace, span_id=1234, name='other')
+
+        exported = trace.export(spans=[spans[2], None, other])
+
+        self.assertEqual(
+            [span['name'] for span in exported['spans']], ['2', 'other'])
+
+    def test_add_copies_span(self):
+        trace = self.sdk.trace()
+        span = Span(trace=trace, span_id=1234, name='other')
+
+        trace + span
+
+        self.assertEqual(trace.span_ids, [1234])
+        self.assertIsInstance(trace[0], ColumnarSpan)
+        self.assertEqual(trace[0].name, 'other')
+        self.assertRaises(ValueError, trace.__add__, span)
+        self.assertRaises(TypeError, trace.__add__, 'abc')
+
+    def test_sub(self):
+        trace = self.sdk.trace()
+        spans = [trace.span() for _ in range(3)]
+
+        trace - spans[1]
+
+        self.assertEqual(trace.spans, [spans[0], spans[2]])
+        self.assertRaises(ValueError, trace.__sub__, spans[1])
+
+        trace + spans[1]
+        self.assertEqual(trace.spans, [spans[0], spans[2], spans[1]])
+        # The row is reused:
+        self.assertEqual(len(trace.columns), 3)
+
+    def test_setitem_insert_delitem(self):
+        trace = self.sdk.trace()
+        spans = [trace.span() for _ in range(3)]
+
+        trace[0] = Span(trace=trace, span_id=1234)
+        del trace[2]
+        trace.insert(0, spans[0])
+
+        self.assertEqual(trace.span_ids, [spans[0].span_id, 1234,
+                                          spans[1].span_id])
+        self.assertIn(spans[1], trace._spans)
+        self.assertNotIn(spans[2], trace._spans)
+        self.assertRaises(TypeError, trace.insert, 0, 'abc')
+        self.assertRaises(ValueError, trace.insert, 0, spans[1])
+        self.assertRaises(ValueError, trace.__setitem__, 0, spans[1])
+
+    @parameterized.expand([
+        (0, []),
+        (1, [0]),
+        (5, [0, 1, 2, 3, 4]),
+    ])
+    def test_getitem_timedelta(self, seconds, e_indexes):
+        trace = self.sdk.trace()
+        start_time = datetime.datetime(2017, 7, 14)
+        spans = [
+            trace.span(
+                start_time=start_time,
+                end_time=start_time + datetime.timedelta(seconds=i + 1),
+            )
+            for i in range(5)
+        ]
+        trace.span(start_time=start_time)
+
+        self.assertEqual(
+            trace[datetime.timedelta(seconds=seconds)],
+            [spans[i] for i in e_indexes],
+        )
+
+    def test_getitem_reordered(self):
+        trace = self.sdk.trace()
+        start_time = datetime.datetime(2017, 7, 14)
+        spans = [
+            trace.span(
+                start_time=start_time,
+                end_time=start_time + datetime.timedelta(seconds=i + 1),
+            )
+            for i in range(3)
+        ]
+        self.assertTrue(trace._sequential)
+
+        del trace[0]
+        trace + spans[0]
+
+        self.assertFalse(trace._sequential)
+        self.assertEqual(
+            trace[datetime.timedelta(seconds=2)], [spans[1], spans[0]])
+        self.assertEqual(trace[start_time:], [spans[1], spans[2], spans[0]])
+
+    def test_getitem_ranges(self):
+        trace = self.sdk.trace()
+        start_time = datetime.datetime(2017, 7, 14)
+        spans = [
+            trace.span(
+                start_time=start_time + datetime.timedelta(seconds=i),
+                end_time=start_time + datetime.timedelta(seconds=i + 1),
+            )
+            for i in range(5)
+        ]
+        trace.span()
+        upper = start_time + datetime.timedelta(seconds=3, microseconds=1)
+
+        self.assertEqual(trace[:upper], spans[:3])
+        self.assertEqual(trace[start_time + datetime.timedelta(seconds=1):],
+                         spans[1:])
+        self.assertEqual(
+            trace[datetime_to_float(start_time):datetime_to_float(upper)],
+            spans[:3],
+        )
+        self.assertEqual(trace[1], spans[1])
+
+    def test_get_span(self):
+        trace = self.sdk.trace(root_span_id='1')
+        span_a = trace.span()
+        span_b = span_a.span()
+        # Built on first use:
+        self.assertIsNone(trace._span_index)
+
+        self.assertEqual(trace.get_span(span_a.span_id), span_a)
+        self.assertEqual(trace.get_span(str(span_b.span_id)), span_b)
+        self.assertIsNone(trace.get_span('abc'))
+        self.assertIsNone(trace.get_span(None))
+        self.assertEqual(trace.get_children(1), [span_a])
+        self.assertEqual(trace.get_children(span_a.span_id), [span_b])
+
+        # Kept up to date once built:
+        span_c = trace.span()
+        span_c >> span_b
+        trace - span_a
+        self.assertEqual(trace.get_span(span_c.span_id), span_c)
+        self.assertEqual(trace.get_children(span_b.span_id), [span_c])
+        self.assertIsNone(trace.get_span(span_a.span_id))
+        self.assertEqual(trace.get_children(1), [])
+        self.assertTrue(span_c in self.sdk)
+        self.assertFalse(span_a in self.sdk)
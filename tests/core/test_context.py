@@ -0,0 +1,318 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+
+import threading
+import unittest
+
+from mock import Mock
+from nose_parameterized import parameterized
+
+from gaesd.core.context import (
+    ContextVarsContext, ThreadLocalContext, TraceList, contextvars,
+    new_context,
+)
+from gaesd.sdk import SDK
+from tests import PROJECT_ID
+
+canTestContextVars = contextvars is not None
+
+backends = [(ThreadLocalContext,)]
+if canTestContextVars:
+    backends.append((ContextVarsContext,))
+
+
+class TestContextTestCase(unittest.TestCase):
+    @parameterized.expand(backends)
+    def test_attributes(self, backend):
+        context = backend()
+
+        self.assertFalse(hasattr(context, 'loggers'))
+        context.loggers = {'a': 1}
+        self.assertEqual(context.loggers, {'a': 1})
+
+    @parameterized.expand(backends)
+    def test_defaults(self, backend):
+        context = backend()
+
+        self.assertEqual(context.traces, [])
+        self.assertEqual(context.span_stacks, {})
+        # A new copy every time:
+        self.assertIsNot(context.traces, context.traces)
+
+    @parameterized.expand(backends)
+    def test_span_stack(self, backend):
+        context = backend()
+        trace, other_trace = object(), object()
+
+        self.assertIsNone(context.current_span(trace))
+        self.assertEqual(context.span_stack(trace), [])
+
+        context.push_span(trace, 'a')
+        context.push_span(trace, 'b')
+        context.push_span(other_trace, 'x')
+        self.assertEqual(context.current_span(trace), 'b')
+        self.assertEqual(context.span_stack(trace), ['a', 'b'])
+        self.assertEqual(context.span_stack(other_trace), ['x'])
+
+        context.pop_span(trace)
+        self.assertEqual(context.current_span(trace), 'a')
+        context.pop_span(trace)
+        self.assertIsNone(context.current_span(trace))
+        self.assertNotIn(trace, context.span_stacks)
+
+        # Nothing to pop:
+        context.pop_span(trace)
+        self.assertEqual(context.span_stack(other_trace), ['x'])
+
+    @parameterized.expand(backends)
+    def test_trace_index(self, backend):
+        context = backend()
+        trace_a, trace_b = Mock(trace_id='a'), Mock(trace_id='b')
+
+        self.assertIsNone(context.find_trace('a'))
+
+        context.set_traces([trace_a, trace_b], added=[trace_a, trace_b])
+        self.assertIs(context.find_trace('a'), trace_a)
+        self.assertIs(context.find_trace('b'), trace_b)
+
+        context.set_traces([trace_b], removed=[trace_a])
+        self.assertIsNone(context.find_trace('a'))
+        self.assertEqual(context.traces, [trace_b])
+
+        trace_b.trace_id = 'c'
+        context.trace_id_changed(trace_b, 'b')
+        self.assertIsNone(context.find_trace('b'))
+        self.assertIs(context.find_trace('c'), trace_b)
+
+    @parameterized.expand(backends)
+    def test_trace_index_rebuilt(self, backend):
+        context = backend()
+        trace = Mock(trace_id='a')
+
+        # The traces were replaced without updating the index:
+        context.find_trace('a')
+        context.traces = [trace]
+        self.assertIs(context.find_trace('a'), trace)
+
+    @parameterized.expand(backends)
+    def test_threads_are_isolated(self, backend):
+        context = backend()
+        context.traces = [1]
+        found = []
+
+        def target():
+            found.append(context.traces)
+            context.traces = [2]
+
+        thread = threading.Thread(target=target)
+        thread.start()
+        thread.join()
+
+        self.assertEqual(found, [[]])
+        self.assertEqual(context.traces, [1])
+
+    @parameterized.expand(backends)
+    def test_append_trace(self, backend):
+        context = backend()
+        trace_a, trace_b = Mock(trace_id='a'), Mock(trace_id='b')
+        context.traces = [trace_a]
+
+        context.append_trace(trace_b)
+
+        self.assertIsInstance(context.traces, TraceList)
+        self.assertEqual(context.traces, [trace_a, trace_b])
+        self.assertIs(context.find_trace('b'), trace_b)
+        context.append_trace(trace_a)
+        self.assertEqual(len(context.traces), 3)
+
+    def test_new_context(self):
+        expected = ContextVarsContext if canTestContextVars else \
+            ThreadLocalContext
+        self.assertIsInstance(new_context(), expected)
+
+    @unittest.skipIf(
+        canTestContextVars, 'contextvars is available on python 3.7+')
+    def test_contextvars_unavailable(self):
+        self.assertRaises(RuntimeError, ContextVarsContext)
+
+
+class TestTraceListTestCase(unittest.TestCase):
+    def test_sequence(self):
+        traces = TraceList([1, 2, 3])
+
+        self.assertEqual(len(traces), 3)
+        self.assertEqual(list(traces), [1, 2, 3])
+        self.assertEqual(traces[0], 1)
+        self.assertEqual(traces[-1], 3)
+        self.assertEqual(traces[1:], [2, 3])
+        self.assertRaises(IndexError, traces.__getitem__, 3)
+        self.assertRaises(IndexError, traces.__getitem__, -4)
+        self.assertEqual(traces, [1, 2, 3])
+        self.assertEqual(traces, TraceList([1, 2, 3]))
+        self.assertNotEqual(traces, [1, 2])
+        self.assertNotEqual(traces, (1, 2, 3))
+        self.assertEqual(repr(traces), 'TraceList([1, 2, 3])')
+        self.assertEqual(TraceList(), [])
+
+    def test_appended_shares_items(self):
+        traces = TraceList([1])
+
+        appended = traces.appended(2)
+        twice = appended.appended(3)
+
+        self.assertEqual(traces, [1])
+        self.assertEqual(appended, [1, 2])
+        self.assertEqual(twice, [1, 2, 3])
+        self.assertIs(twice._items, traces._items)
+        self.assertEqual(list(appended), [1, 2])
+
+    def test_appended_after_another(self):
+        traces = TraceList([1])
+        appended = traces.appended(2)
+
+        other = traces.appended(3)
+
+        self.assertEqual(appended, [1, 2])
+        self.assertEqual(other, [1, 3])
+        self.assertIsNot(other._items, traces._items)
+        # Appending the same trace again can share the items:
+        self.assertIs(traces.appended(2)._items, traces._items)
+
+
+@unittest.skipIf(
+    not canTestContextVars, 'ContextVarsContext requires python 3.7+')
+class TestContextVarsContextTestCase(unittest.TestCase):
+    def test_copy_on_write(self):
+        context = ContextVarsContext()
+        trace = object()
+        context.push_span(trace, 'parent')
+        found = []
+
+        def child(span):
+            # Starts with the creating context's values:
+            found.append(context.current_span(trace))
+            context.push_span(trace, span)
+            found.append(context.span_stack(trace))
+
+        contextvars.copy_context().run(child, 'a')
+        contextvars.copy_context().run(child, 'b')
+
+        self.assertEqual(found, [
+            'parent', ['parent', 'a'], 'parent', ['parent', 'b']])
+        self.assertEqual(context.span_stack(trace), ['parent'])
+
+    def test_trace_index_copy_on_write(self):
+        context = ContextVarsContext()
+        parent = Mock(trace_id='parent')
+        context.set_traces([parent], added=[parent])
+        found = []
+
+        def child(trace_id):
+            trace = Mock(trace_id=trace_id)
+            # Starts with the creating context's traces:
+            found.append(context.find_trace('parent'))
+            context.append_trace(trace)
+            found.append(context.find_trace(trace_id))
+
+        child_context = contextvars.copy_context()
+        child_context.run(child, 'a')
+        # The child's changes are not seen by the parent:
+        self.assertIsNone(context.find_trace('a'))
+        self.assertEqual(context.traces, [parent])
+
+        other = Mock(trace_id='other')
+        context.append_trace(other)
+        # Nor the parent's by the child:
+        self.assertIsNone(child_context.run(context.find_trace, 'other'))
+        self.assertIsNotNone(child_context.run(context.find_trace, 'a'))
+
+        self.assertEqual(found[0], parent)
+        self.assertEqual(found[1].trace_id, 'a')
+        self.assertEqual(context.traces, [parent, other])
+        self.assertEqual(
+            child_context.run(getattr, context, 'traces'), [parent, found[1]])
+
+    def test_interleaved_tasks(self):
+        previous = SDK._context
+        SDK.set_context(ContextVarsContext())
+        self.addCleanup(SDK.set_context, previous)
+        sdk = SDK.new(project_id=PROJECT_ID, auto=False, enabler=True)
+
+        def handler(name):
+            trace = sdk.current_trace
+            with sdk.span(name=name) as outer:
+                yield
+                with sdk.span(name=name) as inner:
+                    yield
+                    self.assertIs(sdk.current_span, inner)
+                    self.assertEqual(inner.parent_span_id, outer.span_id)
+                self.assertIs(sdk.current_span, outer)
+            results.append((trace, sdk.traces))
+
+        # Step the handlers in turn, each in it's own copy of the context,
+        # as the asyncio event loop does with tasks:
+        results = []
+        tasks = [
+            (contextvars.copy_context(), handler(i)) for i in range(100)]
+        while tasks:
+            for task in tasks[:]:
+                context, coroutine = task
+                try:
+                    context.run(next, coroutine)
+                except StopIteration:
+                    tasks.remove(task)
+
+        for trace, traces in results:
+            self.assertEqual(traces, [trace])
+            self.assertEqual(len(trace.spans), 2)
+        self.assertEqual(len(set(id(trace) for trace, _ in results)), 100)
+        self.assertEqual(sdk.traces, [])
+
+
+class TestSDKContextTestCase(unittest.TestCase):
+    def tearDown(self):
+        SDK.clear()
+
+    def test_set_context(self):
+        previous = SDK._context
+        context = ThreadLocalContext()
+        SDK.set_context(context)
+        self.addCleanup(SDK.set_context, previous)
+
+        sdk = SDK.new(project_id=PROJECT_ID, auto=False, enabler=True)
+        trace = sdk.trace()
+
+        self.assertIs(sdk.context, context)
+        self.assertEqual(context.traces, [trace])
+
+    def test_traces_are_copied_on_write(self):
+        sdk = SDK.new(project_id=PROJECT_ID, auto=False, enabler=True)
+        traces = sdk.context.traces
+        trace = sdk.trace()
+        appended = sdk.context.traces
+        sdk.trace()
+
+        self.assertEqual(traces, [])
+        self.assertEqual(appended, [trace])
+        self.assertEqual(len(sdk.context.traces), 2)
+
+    def test_span_stack_is_per_thread(self):
+        sdk = SDK.new(project_id=PROJECT_ID, auto=False, enabler=True)
+        trace = sdk.trace()
+        span = trace.span(name='main')
+        found = []
+
+        def target():
+            found.append(trace._span_tree)
+
+        thread = threading.Thread(target=target)
+        thread.start()
+        thread.join()
+
+        self.assertEqual(found, [[]])
+        self.assertEqual(trace._span_tree, [span])
+        self.assertIs(trace.current_span, span)
+
+
+if __name__ == '__main__':  # pragma: no-cover
+    unittest.main()
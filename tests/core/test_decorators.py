@@ -6,7 +6,11 @@ import unittest
 
 import six
 
-from gaesd import Span
+from gaesd import (
+    AlwaysOffSampler, AlwaysOnSampler, Span, SpanNameRuleSampler,
+)
+from gaesd.core.span import NOOP_SPAN
+from gaesd.core.trace import NOOP_TRACE
 from gaesd.sdk import SDK
 from tests import PROJECT_ID
 
@@ -326,5 +330,82 @@ class TestDecoratorsSpanSpanTestCase(DecoratorsCaseBase, unittest.TestCase):
         )
 
 
+class TestDecoratorsSlotsTestCase(DecoratorsCaseBase, unittest.TestCase):
+    def test_slots(self):
+        trace = self.sdk.trace()
+        span = trace.span()
+
+        for decorators in [
+            self.sdk.decorators, trace.decorators, span.decorators,
+            NOOP_SPAN.decorators,
+        ]:
+            self.assertFalse(hasattr(decorators, '__dict__'))
+
+
+class TestDecoratorsNoopTestCase(DecoratorsCaseBase, unittest.TestCase):
+    def test_disabled_sdk(self):
+        self.sdk.enabler = False
+
+        @self.sdk.decorators.span
+        def func(a):
+            self.assertIs(self.sdk.current_span, NOOP_SPAN)
+            return a
+
+        self.assertEqual(func(1), 1)
+        self.assertIs(self.sdk.current_trace, NOOP_TRACE)
+        self.assertEqual(self.sdk.traces, [])
+
+    def test_unsampled_trace(self):
+        self.sdk.sampler = AlwaysOffSampler()
+        trace = self.sdk.trace()
+
+        @self.sdk.decorators.span(name='name')
+        def func(a):
+            return a
+
+        @trace.decorators.span
+        def trace_func(a):
+            return a
+
+        self.assertEqual(func(1), 1)
+        self.assertEqual(trace_func(2), 2)
+        self.assertEqual(trace.spans, [])
+
+    def test_unsampled_explicit_trace(self):
+        self.sdk.sampler = AlwaysOffSampler()
+        trace = self.sdk.trace()
+        self.sdk.sampler = AlwaysOnSampler()
+        sampled = self.sdk.trace()
+
+        @self.sdk.decorators.span(trace=trace)
+        def func(a):
+            return a
+
+        self.assertEqual(func(1), 1)
+        self.assertEqual(trace.spans, [])
+        self.assertEqual(sampled.spans, [])
+
+    def test_disabled_span_name(self):
+        self.sdk.span_sampler = SpanNameRuleSampler({'datastore.*': False})
+        trace = self.sdk.trace()
+
+        @self.sdk.decorators.span(name='datastore.get')
+        def get(a):
+            self.assertEqual(self.sdk.current_span.name, 'handler')
+            return a
+
+        @trace.decorators.span(name='datastore.put')
+        def put(a):
+            return a
+
+        @self.sdk.decorators.span(name='handler')
+        def handler(a):
+            return get(a) + put(a)
+
+        self.assertEqual(handler(1), 2)
+        span, = trace.spans
+        self.assertEqual(span.name, 'handler')
+
+
 if __name__ == '__main__':  # pragma: no-cover
     unittest.main()
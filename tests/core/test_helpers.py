@@ -5,6 +5,7 @@ import abc
 import unittest
 
 import six
+from mock import Mock
 
 from gaesd.core.helpers import Helpers
 from gaesd.sdk import SDK
@@ -69,7 +70,8 @@ class TestHelpersSDKTraceTestCase(HelpersCaseBase, unittest.TestCase):
 
             return _inner
 
-        self.sdk.decorators.span = decorator
+        # Decorators have no `__dict__`, so replace the instance:
+        self.sdk._decorators = Mock(span=decorator)
         enabler = True
         e_name = 'my-name'
         nested = True
@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+
+import unittest
+
+from mock import Mock, patch
+from nose_parameterized import parameterized
+
+from gaesd.core.sampling import (
+    AlwaysOffSampler, AlwaysOnSampler, ParentBasedSampler, ProbabilitySampler,
+    RateLimitingSpanSampler, SpanNameRuleSampler, TraceContext,
+    parse_trace_context,
+)
+from gaesd.core.trace import Trace
+
+
+class TestParseTraceContextTestCase(unittest.TestCase):
+    @parameterized.expand([
+        ('105445aa7843bc8bf206b12000100000/1;o=1',
+         TraceContext('105445aa7843bc8bf206b12000100000', 1, True)),
+        ('105445AA7843BC8BF206B12000100000/123;o=0',
+         TraceContext('105445aa7843bc8bf206b12000100000', 123, False)),
+        ('105445aa7843bc8bf206b12000100000/123',
+         TraceContext('105445aa7843bc8bf206b12000100000', 123, None)),
+        ('105445aa7843bc8bf206b12000100000;o=1',
+         TraceContext('105445aa7843bc8bf206b12000100000', None, True)),
+        ('105445aa7843bc8bf206b12000100000/;o=3',
+         TraceContext('105445aa7843bc8bf206b12000100000', None, True)),
+        ('105445aa7843bc8bf206b12000100000/123;o=2',
+         TraceContext('105445aa7843bc8bf206b12000100000', 123, False)),
+        (None, None),
+        ('', None),
+        ('NNNN/NNNN;xxxxx', None),
+        ('105445aa/abc;o=1', None),
+    ])
+    def test_parse_trace_context(self, header, e_context):
+        self.assertEqual(parse_trace_context(header), e_context)
+
+
+class TestSamplersTestCase(unittest.TestCase):
+    @parameterized.expand([
+        (None,),
+        (True,),
+        (False,),
+    ])
+    def test_always(self, parent_sampled):
+        trace_id = Trace.new_trace_id()
+
+        self.assertTrue(
+            AlwaysOnSampler().should_sample(trace_id, parent_sampled))
+        self.assertFalse(
+            AlwaysOffSampler().should_sample(trace_id, parent_sampled))
+
+    @parameterized.expand([
+        (0.0, 0),
+        (0.25, 250),
+        (1.0, 1000),
+    ])
+    def test_probability(self, rate, e_sampled):
+        sampler = ProbabilitySampler(rate)
+        # Evenly spread over the id's random bits:
+        trace_ids = [
+            '{0:032x}'.format((2 * i + 1) * (1 << 48) // 2000)
+            for i in range(1000)
+        ]
+
+        sampled = [i for i in trace_ids if sampler.should_sample(i)]
+
+        self.assertEqual(sampler.rate, rate)
+        self.assertEqual(len(sampled), e_sampled)
+
+    def test_probability_is_deterministic(self):
+        sampler = ProbabilitySampler(0.5)
+        trace_ids = [Trace.new_trace_id() for _ in range(100)]
+
+        self.assertEqual(
+            [sampler.should_sample(i) for i in trace_ids],
+            [sampler.should_sample(i) for i in trace_ids],
+        )
+
+    def test_probability_non_hex_trace_id(self):
+        self.assertTrue(ProbabilitySampler(1.0).should_sample('not-hex'))
+        self.assertFalse(ProbabilitySampler(0.0).should_sample('not-hex'))
+
+    @parameterized.expand([
+        (-0.1,),
+        (1.1,),
+    ])
+    def test_probability_invalid_rate(self, rate):
+        self.assertRaises(ValueError, ProbabilitySampler, rate)
+
+    @parameterized.expand([
+        (True, True),
+        (False, False),
+        (None, 'root'),
+    ])
+    def test_parent_based(self, parent_sampled, e_sampled):
+        root = Mock()
+        root.should_sample.return_value = 'root'
+        sampler = ParentBasedSampler(root)
+
+        self.assertIs(sampler.root, root)
+        self.assertEqual(
+            sampler.should_sample('trace', parent_sampled), e_sampled)
+
+    def test_parent_based_default_root(self):
+        self.assertIsInstance(ParentBasedSampler().root, AlwaysOnSampler)
+        self.assertTrue(ParentBasedSampler().should_sample('trace'))
+
+
+class TestRateLimitingSpanSamplerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+
+    def new_sampler(self, rate, **kwargs):
+        return RateLimitingSpanSampler(rate, clock=lambda: self.now, **kwargs)
+
+    def test_rate(self):
+        sampler = self.new_sampler(2)
+        self.assertEqual(sampler.rate, 2)
+
+        # The bucket starts full (burst=rate):
+        self.assertEqual(
+            [sampler.sample('hot') for _ in range(4)], [1, 1, None, None])
+
+        self.now += 0.5
+        # One token refilled, standing for the two dropped spans:
+        self.assertEqual(
+            [sampler.sample('hot') for _ in range(2)], [3, None])
+
+        self.now += 10
+        # Refills only up to the burst:
+        self.assertEqual(
+            [sampler.sample('hot') for _ in range(3)], [2, 1, None])
+
+    def test_names_are_independent(self):
+        sampler = self.new_sampler(1)
+
+        self.assertEqual(sampler.sample('hot'), 1)
+        self.assertIsNone(sampler.sample('hot'))
+        self.assertEqual(sampler.sample('rare'), 1)
+
+    def test_burst(self):
+        sampler = self.new_sampler(1, burst=3)
+
+        self.assertEqual(
+            [sampler.sample('hot') for _ in range(4)], [1, 1, 1, None])
+
+    def test_rates(self):
+        sampler = self.new_sampler(1, rates={'datastore': 0})
+
+        self.assertEqual(sampler.rate_for('datastore'), 0)
+        self.assertEqual(sampler.rate_for('other'), 1)
+        # The burst is at least one span:
+        self.assertEqual(
+            [sampler.sample('datastore') for _ in range(2)], [1, None])
+        self.now += 100
+        self.assertIsNone(sampler.sample('datastore'))
+
+    def test_clock_going_backwards(self):
+        sampler = self.new_sampler(1)
+        sampler.sample('hot')
+
+        self.now -= 10
+        self.assertIsNone(sampler.sample('hot'))
+
+    @parameterized.expand([
+        (-1, None),
+        (1, {'name': -1}),
+    ])
+    def test_invalid_rate(self, rate, rates):
+        self.assertRaises(
+            ValueError, RateLimitingSpanSampler, rate, rates=rates)
+
+
+class TestSpanNameRuleSamplerTestCase(unittest.TestCase):
+    RULES = {
+        '*': 0.5,
+        'datastore': False,
+        'datastore.memcache': True,
+        'handlers.*': 0.25,
+        'handlers.checkout': 0.1,
+        'handlers.checkout.pay.*': 0,
+    }
+
+    @parameterized.expand([
+        ('other', 0.5),
+        ('other.child', 0.5),
+        ('datastore', 0.0),
+        ('datastore.get', 0.0),
+        ('datastore.memcache', 1.0),
+        ('datastore.memcache.get', 1.0),
+        ('handlers', 0.5),
+        ('handlers.home', 0.25),
+        ('handlers.home.get', 0.25),
+        ('handlers.checkout', 0.1),
+        ('handlers.checkout.cart', 0.1),
+        ('handlers.checkout.pay', 0.1),
+        ('handlers.checkout.pay.card', 0.0),
+        ('', 0.5),
+    ])
+    def test_rate_for(self, name, e_rate):
+        sampler = SpanNameRuleSampler(self.RULES)
+
+        self.assertEqual(sampler.rate_for(name), e_rate)
+        # Memoized:
+        self.assertEqual(sampler.rate_for(name), e_rate)
+        self.assertEqual(sampler.is_disabled(name), e_rate == 0.0)
+
+    @parameterized.expand([
+        (None, 1.0),
+        (0.0, 0.0),
+    ])
+    def test_default(self, default, e_rate):
+        kwargs = {} if default is None else {'default': default}
+        sampler = SpanNameRuleSampler({'a.b': 0.5}, **kwargs)
+
+        self.assertEqual(sampler.rate_for('other'), e_rate)
+        self.assertEqual(sampler.rate_for('a.b'), 0.5)
+
+    @patch('gaesd.core.sampling.random.random')
+    def test_sample(self, mock_random):
+        sampler = SpanNameRuleSampler(
+            {'off': False, 'tenth': 0.1, 'on': True})
+
+        mock_random.return_value = 0.05
+        self.assertEqual(sampler.sample('tenth'), 10)
+        self.assertEqual(sampler.sample('on'), 1)
+        self.assertIsNone(sampler.sample('off'))
+
+        mock_random.return_value = 0.5
+        self.assertIsNone(sampler.sample('tenth'))
+
+    def test_sample_with_sampler(self):
+        inner = RateLimitingSpanSampler(1, clock=lambda: 0)
+        sampler = SpanNameRuleSampler({'off': False}, sampler=inner)
+        self.assertIs(sampler.sampler, inner)
+
+        self.assertEqual(sampler.sample('hot'), 1)
+        self.assertIsNone(sampler.sample('hot'))
+        self.assertIsNone(sampler.sample('off'))
+        # The rules drop spans before the inner sampler counts them:
+        self.assertEqual(sampler.sample('hot'), None)
+        self.assertEqual(inner._buckets['hot'][2], 2)
+
+    def test_is_disabled_with_sampler(self):
+        inner = Mock(is_disabled=Mock(return_value=True))
+        sampler = SpanNameRuleSampler({}, sampler=inner)
+
+        self.assertTrue(sampler.is_disabled('name'))
+        inner.is_disabled.assert_called_once_with('name')
+
+    @parameterized.expand([
+        ({'a': 2},),
+        ({'a': -0.1},),
+    ])
+    def test_invalid_rate(self, rules):
+        self.assertRaises(ValueError, SpanNameRuleSampler, rules)
+
+    def test_invalid_default(self):
+        self.assertRaises(ValueError, SpanNameRuleSampler, {}, default=2)
+
+
+if __name__ == '__main__':  # pragma: no-cover
+    unittest.main()
@@ -3,10 +3,16 @@
 
 import datetime
 import json
+import logging
 import operator
 import unittest
+import weakref
+
+from mock import ANY, patch
 
 from gaesd import SDK, Span, SpanKind
+from gaesd.core.span import NOOP_SPAN, NoopSpan
+from gaesd.core.trace import NOOP_TRACE
 from gaesd.core.utils import DuplicateSpanEntryError, NoDurationError, datetime_to_timestamp
 from tests import PROJECT_ID
 
@@ -114,6 +120,41 @@ class TestSpanTestCase(unittest.TestCase):
         self.assertEqual(span.start_time, start_time)
         self.assertIsNotNone(span.end_time)
 
+    @patch('gaesd.core.span.monotonic_ns')
+    def test_context_manager_monotonic_clock(self, mock_monotonic_ns):
+        offset = self.trace.clock_offset
+        span = Span.new(self.trace, Span.new_span_id(), name='span')
+
+        mock_monotonic_ns.return_value = 1000
+        with span:
+            mock_monotonic_ns.return_value = 3500
+
+        self.assertEqual(span.start_ns, 1000 + offset)
+        self.assertEqual(span.end_ns, 3500 + offset)
+        self.assertEqual(span.duration_ns, 2500)
+        self.assertEqual(span.duration, datetime.timedelta(microseconds=2))
+
+    def test_export_nanoseconds(self):
+        span = Span.new(
+            self.trace, Span.new_span_id(),
+            start_time=datetime.datetime(2017, 1, 20))
+        span._end_ns = span.start_ns + 1500
+
+        data = span.export()
+
+        self.assertEqual(data['startTime'], '2017-01-20T00:00:00Z')
+        self.assertEqual(data['endTime'], '2017-01-20T00:00:00.000001500Z')
+        self.assertEqual(span.duration_ns, 1500)
+
+    def test_times(self):
+        start_time = datetime.datetime(2017, 1, 20, 1, 2, 3, 456789)
+        span = Span.new(self.trace, Span.new_span_id(), start_time=start_time)
+
+        self.assertEqual(span.start_time, start_time)
+        self.assertEqual(span.start_ns, 1484874123456789000)
+        self.assertIsNone(span.end_ns)
+        self.assertRaises(NoDurationError, getattr, span, 'duration_ns')
+
     def test_context_manager_raises_DuplicateSpanEntryError(self):
         span = Span.new(self.trace, Span.new_span_id(), name='bob')
 
@@ -175,7 +216,7 @@ class TestSpanTestCase(unittest.TestCase):
         span_b = Span.new(self.trace, new_span_id)
 
         operator.lshift(span_b, span_a)
-        self.assertIs(span_a.parent_span, span_b)
+        self.assertEqual(span_a.parent_span_id, span_b.span_id)
 
     def test_lshift_trace(self):
         trace = self.sdk.current_trace
@@ -226,12 +267,11 @@ class TestSpanTestCase(unittest.TestCase):
         span.end_time = datetime.datetime.utcnow()
         self.assertTrue(span.has_duration)
 
-        span.start_time = 123
+        span.start_time = None
         self.assertFalse(span.has_duration)
 
-        span.start_time = datetime.datetime.utcnow()
-        span.end_time = 456
-        self.assertFalse(span.has_duration)
+        self.assertRaises(TypeError, setattr, span, 'start_time', 123)
+        self.assertRaises(TypeError, setattr, span, 'end_time', 456)
 
     def test_duration_raises(self):
         trace = self.sdk.current_trace
@@ -299,7 +339,7 @@ class TestSpanTestCase(unittest.TestCase):
         span_b = Span.new(self.trace, new_span_id)
 
         result = operator.ilshift(span_b, span_a)
-        self.assertIs(span_a.parent_span, span_b)
+        self.assertEqual(span_a.parent_span_id, span_b.span_id)
         self.assertIsInstance(result, Span)
 
     def test_ilshift_trace(self):
@@ -317,16 +357,99 @@ class TestSpanTestCase(unittest.TestCase):
 
         self.assertRaises(TypeError, operator.ilshift, span, 1)
 
+    def test_slots(self):
+        span = Span.new(self.trace, Span.new_span_id())
+
+        self.assertFalse(hasattr(span, '__dict__'))
+        self.assertRaises(AttributeError, setattr, span, 'other', 1)
+        self.assertIs(weakref.ref(span)(), span)
+
+    def test_subclass(self):
+        class MySpan(Span):
+            __slots__ = ('extra',)
+
+            def __init__(self, *args, **kwargs):
+                super(MySpan, self).__init__(*args, **kwargs)
+                self.extra = 1
+
+        span = MySpan.new(self.trace, Span.new_span_id(), name='my')
+
+        self.assertEqual((span.name, span.extra), ('my', 1))
+        self.assertFalse(hasattr(span, '__dict__'))
+
     def test_set_logging_level(self):
         trace = self.sdk.current_trace
         span = trace.span()
 
         new_level = 66
+        self.addCleanup(span.logger.setLevel, logging.NOTSET)
         self.assertNotEqual(span.logger.level, new_level)
 
         span.set_logging_level(new_level)
         self.assertEqual(span.logger.level, new_level)
 
+    @patch('gaesd.core.span.Span.__repr__')
+    def test_new_formats_lazily(self, mock_repr):
+        mock_repr.return_value = 'Span()'
+        trace = self.sdk.current_trace
+        self.addCleanup(Span.logger.setLevel, logging.NOTSET)
+
+        Span.logger.setLevel(logging.INFO)
+        span = Span.new(trace, 1)
+        mock_repr.assert_not_called()
+
+        Span.logger.setLevel(logging.DEBUG)
+        with patch.object(Span.logger, 'debug') as mock_debug:
+            Span.new(trace, 2)
+        mock_debug.assert_called_once_with('Created %s', ANY)
+        self.assertIs(span.logger, Span.logger)
+        self.assertEqual(
+            [i for i in self.sdk.loggers if i.startswith('Span')], [])
+
+
+class TestNoopSpanTestCase(unittest.TestCase):
+    def test_noop_span(self):
+        span = NOOP_SPAN
+
+        with span as entered:
+            with entered.span(name='nested') as nested:
+                nested.labels['a'] = 1
+                nested.name = 'name'
+                nested.start_time = datetime.datetime.utcnow()
+
+        self.assertIs(entered, span)
+        self.assertIs(nested, span)
+        self.assertIs(span.trace, NOOP_TRACE)
+        self.assertIsNone(span.sdk)
+        self.assertIsNone(span.span_id)
+        self.assertIsNone(span.parent_span_id)
+        self.assertEqual(span.labels, {})
+        self.assertEqual(span.name, '')
+        self.assertIsNone(span.start_time)
+        self.assertIsNone(span.end_time)
+        self.assertFalse(span.has_duration)
+        self.assertEqual(span.span_kind, SpanKind.unspecified)
+        self.assertEqual(span.export(), {})
+
+    def test_operators(self):
+        span = NOOP_SPAN
+        other = NoopSpan()
+
+        span += other
+        span >>= other
+        span <<= other
+        operator.add(span, other)
+
+        self.assertIs(span, NOOP_SPAN)
+        self.assertIsNone(span.parent_span_id)
+
+    def test_decorators(self):
+        def func(a):
+            return a
+
+        self.assertIs(NOOP_SPAN.decorators.span(func), func)
+        self.assertIs(NOOP_SPAN.decorators.span(name='name')(func), func)
+
 
 if __name__ == '__main__':  # pragma: no-cover
     unittest.main()
@@ -4,13 +4,23 @@
 import datetime
 import itertools
 import json
+import logging
 import operator
 import random
 import unittest
+import weakref
 
+import six
 from mock import patch
+from nose_parameterized import parameterized
 
 from gaesd import InvalidSliceError, SDK, Span, Trace
+from gaesd.core.sampling import (
+    SAMPLING_WEIGHT_LABEL, AlwaysOffSampler, ParentBasedSampler,
+    RateLimitingSpanSampler,
+)
+from gaesd.core.span import NOOP_SPAN
+from gaesd.core.trace import NOOP_TRACE
 from gaesd.core.utils import datetime_to_float
 from tests import PROJECT_ID
 
@@ -19,7 +29,7 @@ class TestTraceTestCase(unittest.TestCase):
     def setUp(self):
         self.project_id = PROJECT_ID
         self.sdk = SDK.new(project_id=self.project_id, auto=False)
-        self.sdk.clear(traces=True, enabler=True, dispatcher=True, loggers=True)
+        self.sdk.clear(traces=True, loggers=True)
 
     def test_init(self):
         trace_id = Trace.new_trace_id()
@@ -32,6 +42,63 @@ class TestTraceTestCase(unittest.TestCase):
         self.assertEqual(self.sdk.project_id, trace.project_id)
         self.assertEqual(trace.root_span_id, 123)
 
+    @parameterized.expand([
+        (None, True),
+        (True, True),
+        (False, False),
+    ])
+    def test_init_samples(self, parent_sampled, e_sampled):
+        self.sdk.sampler = ParentBasedSampler()
+
+        trace = Trace.new(self.sdk, parent_sampled=parent_sampled)
+
+        self.assertEqual(trace.sampled, e_sampled)
+
+    @patch('gaesd.sdk.SDK.patch_trace')
+    def test_unsampled(self, mock_patch_trace):
+        self.sdk.sampler = AlwaysOffSampler()
+        trace = Trace.new(self.sdk)
+
+        with trace.span(name='outer') as span:
+            with span.span(name='inner') as nested:
+                pass
+        trace.end()
+
+        self.assertIs(span, NOOP_SPAN)
+        self.assertIs(nested, NOOP_SPAN)
+        self.assertIs(trace.current_span, NOOP_SPAN)
+
+        self.assertFalse(trace.sampled)
+        self.assertEqual(trace.spans, [])
+        self.assertEqual(trace.completed_spans, [])
+        self.assertEqual(trace._span_tree, [])
+        mock_patch_trace.assert_not_called()
+
+    def test_span_sampler(self):
+        self.sdk.span_sampler = RateLimitingSpanSampler(1, clock=lambda: 0)
+        trace = Trace.new(self.sdk, root_span_id=123)
+
+        with trace.span(name='outer', labels={'a': 'b'}) as outer:
+            spans = [
+                trace.span(parent_span=outer, name='hot') for _ in range(3)]
+            # A child of a dropped span:
+            child = trace.span(parent_span=spans[1], name='child')
+
+        self.assertEqual(outer.labels, {'a': 'b', SAMPLING_WEIGHT_LABEL: '1'})
+        self.assertIsInstance(spans[0], Span)
+        self.assertIs(spans[1], NOOP_SPAN)
+        self.assertIs(spans[2], NOOP_SPAN)
+        self.assertEqual(child.parent_span_id, 123)
+        self.assertEqual(trace.spans, [outer, spans[0], child])
+
+    def test_span_sampler_unsampled_trace(self):
+        self.sdk.sampler = AlwaysOffSampler()
+        self.sdk.span_sampler = span_sampler = RateLimitingSpanSampler(1)
+
+        Trace.new(self.sdk).span(name='span')
+
+        self.assertEqual(span_sampler._buckets, {})
+
     @patch('gaesd.sdk.SDK.patch_trace')
     def test_patch_trace(self, mock_patch_trace):
         trace_id = Trace.new_trace_id()
@@ -41,6 +108,57 @@ class TestTraceTestCase(unittest.TestCase):
         mock_patch_trace.assert_called_once()
         mock_patch_trace.assert_called_with(trace)
 
+    @patch('gaesd.sdk.SDK.patch_trace')
+    def test_completed_spans(self, mock_patch_trace):
+        trace = Trace.new(self.sdk, trace_id=Trace.new_trace_id())
+        self.assertEqual(trace.completed_spans, [])
+
+        outer_span = trace.span(name='outer')
+        with outer_span:
+            with trace.span(name='inner') as inner_span:
+                pass
+            self.assertEqual(trace.completed_spans, [inner_span])
+
+        self.assertEqual(trace.completed_spans, [inner_span, outer_span])
+        self.assertEqual(trace.completed_count, 2)
+        self.assertEqual(
+            trace.export_completed(1)['spans'], [outer_span.export()])
+
+        manual_span = trace.span(
+            start_time=datetime.datetime.utcnow(),
+            end_time=datetime.datetime.utcnow(),
+        )
+        trace.end()
+        self.assertEqual(
+            trace.completed_spans, [inner_span, outer_span, manual_span])
+
+    @parameterized.expand([
+        ('sub', lambda trace, span: trace - span),
+        ('setitem', lambda trace, span: trace.__setitem__(
+            0, Span(trace=trace, span_id=1234))),
+        ('delitem', lambda trace, span: trace.__delitem__(0)),
+        ('delitem_slice', lambda trace, span: trace.__delitem__(slice(0, 1))),
+    ])
+    @patch('gaesd.sdk.SDK.patch_trace')
+    def test_removed_span_is_not_completed(self, _, remove, mock_patch_trace):
+        trace = Trace.new(self.sdk, trace_id=Trace.new_trace_id())
+        spans = [trace.span(name=str(i)) for i in range(2)]
+        for span in spans:
+            with span:
+                pass
+
+        remove(trace, spans[0])
+
+        self.assertEqual(trace.completed_spans, [spans[1]])
+        self.assertEqual(trace.completed_count, 1)
+        # The other spans keep their offsets:
+        self.assertEqual(trace.completed_offset, 2)
+        self.assertEqual(
+            trace.export_completed()['spans'], [spans[1].export()])
+        self.assertEqual(
+            trace.export_completed(1)['spans'], [spans[1].export()])
+        self.assertEqual(trace.export_completed(0, 1)['spans'], [])
+
     def test_setters(self):
         trace_id = Trace.new_trace_id()
 
@@ -179,6 +297,89 @@ class TestTraceTestCase(unittest.TestCase):
         operator.sub(trace, span)
         self.assertNotIn(span, trace.spans)
 
+    def test_get_span(self):
+        trace = Trace.new(self.sdk, root_span_id=1)
+        span_a = trace.span()
+        span_b = span_a.span()
+
+        self.assertIs(trace.get_span(span_a.span_id), span_a)
+        self.assertIs(trace.get_span(span_b.span_id), span_b)
+        self.assertIsNone(trace.get_span(-1))
+        self.assertIs(trace.get_span(-1, span_a), span_a)
+        self.assertEqual(trace.get_children(1), [span_a])
+        self.assertEqual(trace.get_children(span_a.span_id), [span_b])
+        self.assertEqual(trace.get_children(span_b.span_id), [])
+
+    def test_index_add_sub(self):
+        trace = Trace.new(self.sdk)
+        span = Span(trace=trace, span_id=1234, parent_span_id=12)
+
+        trace + span
+        self.assertIs(trace.get_span(1234), span)
+        self.assertEqual(trace.get_children(12), [span])
+
+        trace - span
+        self.assertIsNone(trace.get_span(1234))
+        self.assertEqual(trace.get_children(12), [])
+
+        # Can be added again:
+        trace + span
+        self.assertIs(trace.get_span(1234), span)
+
+    def test_index_setitem_delitem_insert(self):
+        trace = Trace.new(self.sdk)
+        spans = [trace.span() for _ in range(3)]
+        span = Span(trace=trace, span_id=1234)
+
+        trace[1] = span
+        self.assertIs(trace.get_span(1234), span)
+        self.assertIsNone(trace.get_span(spans[1].span_id))
+
+        trace.insert(0, spans[1])
+        self.assertIs(trace.get_span(spans[1].span_id), spans[1])
+
+        del trace[0:2]
+        self.assertEqual(trace.spans, [span, spans[2]])
+        self.assertIsNone(trace.get_span(spans[0].span_id))
+        self.assertIsNone(trace.get_span(spans[1].span_id))
+        # In the order they were added:
+        self.assertEqual(trace.get_children(None), [spans[2], span])
+
+        # Replacing a span by itself is fine:
+        trace[0] = span
+        self.assertEqual(trace.spans, [span, spans[2]])
+
+    @parameterized.expand([
+        ('insert', lambda trace, span: trace.insert(0, span)),
+        ('setitem', lambda trace, span: operator.setitem(trace, 0, span)),
+        ('add', operator.add),
+    ])
+    def test_duplicate_span_id_raises(self, _, add):
+        trace = Trace.new(self.sdk)
+        spans = [trace.span() for _ in range(2)]
+
+        self.assertRaises(ValueError, add, trace, spans[1])
+        self.assertRaises(
+            ValueError, add, trace, Span(trace, span_id=spans[1].span_id))
+        self.assertEqual(trace.spans, spans)
+
+    def test_index_reparent(self):
+        trace = Trace.new(self.sdk)
+        span_a, span_b, span_c = [trace.span() for _ in range(3)]
+
+        span_b.parent_span_id = span_a.span_id
+        span_c >> span_a
+        self.assertEqual(trace.get_children(span_a.span_id), [span_b, span_c])
+
+        span_b << span_c
+        self.assertEqual(trace.get_children(span_a.span_id), [span_b])
+        self.assertEqual(trace.get_children(span_b.span_id), [span_c])
+
+        span = Span(trace=Trace.new(self.sdk), span_id=1234)
+        span_c += span
+        self.assertEqual(trace.get_children(span_c.span_id), [span])
+        self.assertEqual(trace.get_children(None), [span_a])
+
     def test_iter(self):
         for _ in range(10):
             self.sdk.trace()
@@ -368,20 +569,54 @@ class TestTraceTestCase(unittest.TestCase):
         self.assertNotIn(span, trace.spans)
         self.assertIsInstance(result, Trace)
 
-    def test_set_logging_level(self):
-        self.assertEqual(len([i for i in self.sdk.loggers.keys() if i.startswith('Trace.')]), 0)
+    @patch('gaesd.core.trace.monotonic_ns', return_value=100)
+    @patch('gaesd.core.trace.wall_clock_ns', return_value=10 ** 18)
+    def test_clock_offset(self, mock_wall_clock_ns, mock_monotonic_ns):
+        trace = Trace.new(self.sdk)
+
+        self.assertEqual(trace.clock_offset, 10 ** 18 - 100)
 
+    def test_slots(self):
+        trace = Trace.new(self.sdk)
+
+        if six.PY3:
+            # (python 2's MutableSequence has no `__slots__`)
+            self.assertFalse(hasattr(trace, '__dict__'))
+        self.assertIs(weakref.ref(trace)(), trace)
+
+    def test_subclass(self):
+        class MyTrace(Trace):
+            pass
+
+        trace = MyTrace.new(self.sdk)
+        trace.extra = 1
+
+        with trace.span(name='span') as span:
+            pass
+        self.assertEqual(trace.spans, [span])
+        self.assertEqual(trace.extra, 1)
+
+    def test_set_logging_level(self):
         trace = self.sdk.current_trace
+        other = Trace.new(self.sdk)
         new_level = 66
-        for logger in self.sdk.loggers.values():
-            self.assertFalse(logger.level == new_level)
+        self.addCleanup(trace.logger.setLevel, logging.NOTSET)
+        self.assertNotEqual(trace.logger.level, new_level)
 
-        self.assertEqual(len([i for i in self.sdk.loggers.keys() if i.startswith('Trace.')]), 1)
         trace.set_logging_level(new_level)
 
-        for logger_name, logger in self.sdk.loggers.items():
-            if logger_name.startswith('Trace.'):
-                self.assertEqual(logger.level, new_level)
+        self.assertEqual(trace.logger.level, new_level)
+        self.assertIs(other.logger, trace.logger)
+
+    def test_logger_is_per_class(self):
+        trace = self.sdk.current_trace
+
+        self.assertIs(trace.logger, Trace.logger)
+        self.assertEqual(trace.logger.name, 'Trace')
+        self.assertIs(NOOP_TRACE.logger, logging.getLogger('NoopTrace'))
+        # Not cached in the SDK:
+        self.assertEqual(
+            [i for i in self.sdk.loggers if i.startswith('Trace')], [])
 
     def test_set_item_raises_TypeError(self):
         for i in [Trace(self.sdk), self.sdk, 123, 'abc']:
@@ -442,5 +677,53 @@ class TestTraceTestCase(unittest.TestCase):
             self.assertIsNot(s, span)
 
 
+class TestNoopTraceTestCase(unittest.TestCase):
+    def test_noop_trace(self):
+        trace = NOOP_TRACE
+
+        with trace as entered:
+            with entered.span(name='span') as span:
+                operator.add(entered, Span(trace=None, span_id=1))
+        trace.set_default(trace_id='trace', root_span_id=1)
+        trace.end()
+
+        self.assertIs(entered, trace)
+        self.assertIs(span, NOOP_SPAN)
+        self.assertIs(trace.current_span, NOOP_SPAN)
+        self.assertFalse(trace.sampled)
+        self.assertIsNone(trace.sdk)
+        self.assertIsNone(trace.trace_id)
+        self.assertIsNone(trace.root_span_id)
+        self.assertEqual(trace.spans, [])
+        self.assertEqual(trace.completed_spans, [])
+        self.assertEqual(trace.completed_count, 0)
+        self.assertEqual(trace.completed_offset, 0)
+        self.assertEqual(trace.span_ids, [])
+        self.assertIsNone(trace.get_span(1))
+        self.assertEqual(trace.get_children(None), [])
+        self.assertEqual(len(trace), 0)
+        self.assertEqual(list(trace), [])
+        self.assertEqual(trace.export()['spans'], [])
+
+    def test_sequence(self):
+        trace = NOOP_TRACE
+
+        self.assertRaises(IndexError, operator.getitem, trace, 0)
+        self.assertEqual(trace[:], [])
+        self.assertEqual(trace[datetime.timedelta(seconds=1)], [])
+        trace.insert(0, NOOP_SPAN)
+        trace[0] = NOOP_SPAN
+        del trace[0]
+        self.assertEqual(len(trace), 0)
+
+    def test_decorators(self):
+        def func(a):
+            return a
+
+        self.assertIs(NOOP_TRACE.decorators.span(func), func)
+        self.assertIs(NOOP_TRACE.decorators.trace(func), func)
+        self.assertIs(NOOP_TRACE.decorators.trace(trace_id='a')(func), func)
+
+
 if __name__ == '__main__':  # pragma: no-cover
     unittest.main()
@@ -7,10 +7,12 @@ import random
 import unittest
 
 import six
+from nose_parameterized import parameterized
 
 from gaesd import (DuplicateSpanEntryError, InvalidSliceError, NoDurationError, SDK)
 from gaesd.core.utils import (
-    datetime_to_float, datetime_to_timestamp, find_spans_in_datetime_range,
+    ClassLogger, datetime_to_float, datetime_to_ns, monotonic_ns,
+    ns_to_datetime, ns_to_timestamp, wall_clock_ns, datetime_to_timestamp, find_spans_in_datetime_range,
     find_spans_in_float_range, find_spans_with_duration_less_than,
 )
 from tests import PROJECT_ID
@@ -20,7 +22,7 @@ class TestUtilsTestCase(unittest.TestCase):
     def setUp(self):
         self.project_id = PROJECT_ID
         self.sdk = SDK.new(project_id=self.project_id, auto=False)
-        self.sdk.clear(traces=True, enabler=True, dispatcher=True, loggers=True)
+        self.sdk.clear(traces=True, loggers=True)
 
     def tearDown(self):
         SDK.clear(loggers=True)
@@ -51,12 +53,68 @@ class TestUtilsTestCase(unittest.TestCase):
             self.assertEqual(str(e), 'Already entered this span\'s context: {span}'.format(
                 span=span))
 
+    def test_ClassLogger(self):
+        class Parent(object):
+            logger = ClassLogger()
+
+        class Child(Parent):
+            pass
+
+        self.assertIs(Parent.logger, Parent().logger)
+        self.assertEqual(Parent.logger.name, 'Parent')
+        self.assertEqual(Child().logger.name, 'Child')
+        self.assertTrue({'Parent', 'Child'} <= ClassLogger.names)
+
     def test_datetime_to_timestamp(self):
         dt = datetime.datetime.utcnow()
 
         self.assertEqual(datetime_to_timestamp(dt), '{0}Z'.format(dt.isoformat('T')))
         self.assertEqual(datetime_to_timestamp(None), None)
 
+    @parameterized.expand([
+        (datetime.datetime(1970, 1, 1), 0),
+        (datetime.datetime(1970, 1, 2, 0, 0, 1), 86401 * 10 ** 9),
+        (datetime.datetime(2017, 1, 20, 12, 30, 15, 123456),
+         1484915415123456000),
+        (datetime.datetime(1969, 12, 31, 23, 59, 59), -10 ** 9),
+    ])
+    def test_datetime_to_ns(self, dt, e_ns):
+        self.assertEqual(datetime_to_ns(dt), e_ns)
+        self.assertEqual(ns_to_datetime(e_ns), dt)
+
+    def test_datetime_to_ns_raises_TypeError(self):
+        self.assertRaises(TypeError, datetime_to_ns, 123)
+
+    def test_ns_to_datetime_truncates_to_microseconds(self):
+        self.assertEqual(
+            ns_to_datetime(1484915415123456789),
+            datetime.datetime(2017, 1, 20, 12, 30, 15, 123456))
+
+    @parameterized.expand([
+        (None, None),
+        (1484915415000000000, '2017-01-20T12:30:15Z'),
+        (1484915415123000000, '2017-01-20T12:30:15.123000Z'),
+        (1484915415123456000, '2017-01-20T12:30:15.123456Z'),
+        (1484915415123456789, '2017-01-20T12:30:15.123456789Z'),
+        (1484915415000000001, '2017-01-20T12:30:15.000000001Z'),
+    ])
+    def test_ns_to_timestamp(self, ns, e_timestamp):
+        self.assertEqual(ns_to_timestamp(ns), e_timestamp)
+        if ns is not None and ns % 1000 == 0:
+            # As `datetime_to_timestamp`:
+            self.assertEqual(
+                e_timestamp, datetime_to_timestamp(ns_to_datetime(ns)))
+
+    def test_clocks(self):
+        first = monotonic_ns()
+        second = monotonic_ns()
+
+        self.assertIsInstance(first, six.integer_types)
+        self.assertGreaterEqual(second, first)
+        self.assertAlmostEqual(
+            wall_clock_ns() / 1e9,
+            datetime_to_float(datetime.datetime.utcnow()), delta=1)
+
     def test_datetime_to_float(self):
         SECONDS_IN_A_DAY = (60 * 60 * 24)
         epoch = datetime.datetime.utcfromtimestamp(0)
@@ -84,9 +142,9 @@ class TestUtilsTestCase(unittest.TestCase):
             span = self.sdk.span()
             # Make sure some spans raise NoDurationError when duration is called on them:
             if index % 3 != 0:
-                span._start_time = end_time - datetime.timedelta(seconds=change_type(index))
+                span.start_time = end_time - datetime.timedelta(seconds=change_type(index))
             if index % 4 != 0:
-                span._end_time = end_time
+                span.end_time = end_time
             spans.append(span)
 
         result = find_spans_with_duration_less_than(spans, duration)
@@ -100,8 +158,8 @@ class TestUtilsTestCase(unittest.TestCase):
 
         for index in range(l):
             span = self.sdk.span()
-            span._start_time = end_time - datetime.timedelta(seconds=index)
-            span._end_time = end_time
+            span.start_time = end_time - datetime.timedelta(seconds=index)
+            span.end_time = end_time
             spans.append(span)
 
         result = find_spans_in_datetime_range(spans)
@@ -118,8 +176,8 @@ class TestUtilsTestCase(unittest.TestCase):
             span = self.sdk.span()
             start_time = start_time + datetime.timedelta(seconds=index)
             start_times.append(start_time)
-            span._start_time = start_times[-1]
-            span._end_time = end_time
+            span.start_time = start_times[-1]
+            span.end_time = end_time
             spans.append(span)
 
         i = random.randint(0, l - 1)
@@ -137,8 +195,8 @@ class TestUtilsTestCase(unittest.TestCase):
             span = self.sdk.span()
             end_time = start_time + datetime.timedelta(seconds=index)
             end_times.append(end_time)
-            span._start_time = start_time
-            span._end_time = end_time
+            span.start_time = start_time
+            span.end_time = end_time
             spans.append(span)
 
         i = random.randint(0, l - 1)
@@ -168,8 +226,8 @@ class TestUtilsTestCase(unittest.TestCase):
                 start_time + datetime.timedelta(seconds=80)),
         ]:
             span = self.sdk.span()
-            span._start_time = from_
-            span._end_time = to_
+            span.start_time = from_
+            span.end_time = to_
             spans.append(span)
 
         from_ = start_time + datetime.timedelta(seconds=10)
@@ -191,8 +249,8 @@ class TestUtilsTestCase(unittest.TestCase):
 
         for index in range(l):
             span = self.sdk.span()
-            span._start_time = end_time - datetime.timedelta(seconds=index)
-            span._end_time = end_time
+            span.start_time = end_time - datetime.timedelta(seconds=index)
+            span.end_time = end_time
             spans.append(span)
 
         result = find_spans_in_float_range(spans)
@@ -209,8 +267,8 @@ class TestUtilsTestCase(unittest.TestCase):
             span = self.sdk.span()
             start_time = start_time + datetime.timedelta(seconds=index)
             start_times.append(start_time)
-            span._start_time = start_times[-1]
-            span._end_time = end_time
+            span.start_time = start_times[-1]
+            span.end_time = end_time
             spans.append(span)
 
         i = random.randint(0, l - 1)
@@ -228,8 +286,8 @@ class TestUtilsTestCase(unittest.TestCase):
             span = self.sdk.span()
             end_time = start_time + datetime.timedelta(seconds=index)
             end_times.append(end_time)
-            span._start_time = start_time
-            span._end_time = end_time
+            span.start_time = start_time
+            span.end_time = end_time
             spans.append(span)
 
         i = random.randint(0, l - 1)
@@ -259,8 +317,8 @@ class TestUtilsTestCase(unittest.TestCase):
                 start_time + datetime.timedelta(seconds=80)),
         ]:
             span = self.sdk.span()
-            span._start_time = from_
-            span._end_time = to_
+            span.start_time = from_
+            span.end_time = to_
             spans.append(span)
 
         from_ = datetime_to_float(start_time + datetime.timedelta(seconds=10))
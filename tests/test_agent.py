@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+
+import socket
+import threading
+import time
+import unittest
+
+from mock import Mock, patch
+from nose_parameterized import parameterized
+
+from gaesd.agent import Agent, MergedTrace, main
+from gaesd.core.dispatchers.socket_dispatcher import SocketDispatcher, encode
+from gaesd.core.trace import Trace
+from gaesd.sdk import SDK
+from tests import PROJECT_ID
+
+
+def span(span_id, name='span'):
+    return {'spanId': span_id, 'name': name}
+
+
+class TestAgentTestCase(unittest.TestCase):
+    def setUp(self):
+        self.sdk = SDK.new(project_id=PROJECT_ID, auto=False)
+        self.dispatchers = {}
+        self.sent = []
+
+        def dispatcher_type(sdk, auto):
+            dispatcher = Mock(sdk=sdk)
+            dispatcher._dispatch_chunked.side_effect = \
+                lambda traces: self.sent.extend(
+                    (sdk.project_id, i.export()) for i in traces)
+            self.dispatchers[sdk.project_id] = dispatcher
+            return dispatcher
+
+        self.agent = Agent(
+            address=('127.0.0.1', 0),
+            dispatcher=dispatcher_type,
+            batch_size=3,
+            interval=60,
+        )
+
+    def tearDown(self):
+        self.agent.close()
+        SDK.clear()
+
+    def test_merged_trace(self):
+        trace = MergedTrace('project', 'trace')
+        trace.merge([span('1'), span('2')])
+        trace.merge([span('2', name='updated'), span('3')])
+
+        self.assertEqual(len(trace), 3)
+        self.assertEqual(trace.export(), {
+            'projectId': 'project',
+            'traceId': 'trace',
+            'spans': [span('1'), span('2', name='updated'), span('3')],
+        })
+
+    def test_receive_merges_by_trace_id(self):
+        self.agent.receive(encode([
+            {'projectId': 'p', 'traceId': 'a', 'spans': [span('1')]},
+            {'projectId': 'p', 'traceId': 'b', 'spans': [span('2')]},
+        ]))
+        self.agent.receive(encode([
+            {'projectId': 'p', 'traceId': 'a', 'spans': [span('3')]},
+        ]))
+
+        self.assertEqual(self.agent.received, 3)
+        self.assertEqual(self.agent.pending, 2)
+        self.assertFalse(self.agent.is_due())
+
+        self.agent.forward()
+        self.assertEqual(self.sent, [
+            ('p', {'projectId': 'p', 'traceId': 'a',
+                   'spans': [span('1'), span('3')]}),
+            ('p', {'projectId': 'p', 'traceId': 'b', 'spans': [span('2')]}),
+        ])
+        self.assertEqual(self.agent.forwarded, 2)
+        self.assertEqual(self.agent.pending, 0)
+
+    def test_forward_per_project(self):
+        self.agent.receive(encode([
+            {'projectId': 'p1', 'traceId': 'a', 'spans': [span('1')]},
+            {'projectId': 'p2', 'traceId': 'b', 'spans': [span('2')]},
+            {'projectId': 'p1', 'traceId': 'c', 'spans': [span('3')]},
+        ]))
+        self.assertTrue(self.agent.is_due())
+
+        self.agent.forward()
+        self.assertEqual(sorted(self.dispatchers), ['p1', 'p2'])
+        self.assertEqual(
+            len(self.dispatchers['p1']._dispatch_chunked.call_args[0][0]), 2)
+
+        # Dispatchers are re-used:
+        self.assertIs(
+            self.agent.dispatcher_for('p1'), self.dispatchers['p1'])
+
+    def test_forward_failure(self):
+        self.agent.receive(encode([
+            {'projectId': 'p', 'traceId': 'a', 'spans': [span('1')]}]))
+        self.agent.dispatcher_for('p')._dispatch_chunked.side_effect = \
+            RuntimeError('failed')
+
+        self.agent.forward()
+        self.assertEqual(self.agent.forwarded, 0)
+        self.assertEqual(self.agent.pending, 0)
+
+    def test_malformed_datagram(self):
+        self.agent.receive(b'not json')
+        self.agent.receive(b'{"no": "traces"}')
+        self.assertEqual(self.agent.received, 0)
+
+    @parameterized.expand([
+        (b'[]',),
+        (b'{"traces": "x"}',),
+        (b'{"traces": ["x"]}',),
+        (b'{"traces": [{"projectId": "p"}]}',),
+        (b'{"traces": [{"projectId": "p", "traceId": ["a"]}]}',),
+        (b'{"traces": [{"projectId": "p", "traceId": "a", "spans": "x"}]}',),
+        (b'{"traces": [{"projectId": "p", "traceId": "a", "spans": ["x"]}]}',),
+        (b'{"traces": [{"projectId": "p", "traceId": "a", '
+         b'"spans": [{"spanId": {}}]}]}',),
+        # Valid, then malformed:
+        (b'{"traces": [{"projectId": "p", "traceId": "a"}, "x"]}',),
+    ])
+    def test_malformed_traces(self, datagram):
+        self.agent.receive(datagram)
+        self.assertEqual(self.agent.received, 0)
+        self.assertEqual(self.agent.pending, 0)
+
+    def test_interval(self):
+        agent = Agent(address=('127.0.0.1', 0), interval=0)
+        agent.receive(encode([
+            {'projectId': 'p', 'traceId': 'a', 'spans': [span('1')]}]))
+        self.assertTrue(agent.is_due())
+
+    def test_serve_forever(self):
+        self.agent.bind()
+        thread = threading.Thread(
+            target=self.agent.serve_forever, kwargs={'poll_interval': 0.01})
+        thread.start()
+
+        dispatcher = SocketDispatcher(sdk=self.sdk, address=self.agent.address)
+        traces = []
+        for _ in range(2):
+            trace = Trace.new(self.sdk)
+            with trace.span(name='span'):
+                pass
+            traces.append(trace)
+            dispatcher.patch_trace(trace)
+
+        self.agent.stop()
+        thread.join(5)
+
+        self.assertEqual(
+            self.sent, [(PROJECT_ID, trace.export()) for trace in traces])
+
+    def test_serve_forever_slow_forward(self):
+        self.agent.bind()
+        dispatcher = self.agent.dispatcher_for('p')
+        forwarding = threading.Event()
+        release = threading.Event()
+
+        def dispatch_chunked(traces):
+            forwarding.set()
+            release.wait(5)
+            self.sent.extend(trace.export() for trace in traces)
+
+        dispatcher._dispatch_chunked.side_effect = dispatch_chunked
+        thread = threading.Thread(
+            target=self.agent.serve_forever, kwargs={'poll_interval': 0.01})
+        thread.start()
+
+        client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            client.sendto(encode([
+                {'projectId': 'p', 'traceId': trace_id, 'spans': [span('1')]}
+                for trace_id in 'abc']), self.agent.address)
+            self.assertTrue(forwarding.wait(5))
+
+            # Still received and merged while the batch is being forwarded:
+            client.sendto(encode([
+                {'projectId': 'p', 'traceId': 'd', 'spans': [span('1')]}]),
+                self.agent.address)
+            deadline = time.time() + 5
+            while self.agent.received < 4 and time.time() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(self.agent.received, 4)
+            self.assertEqual(self.agent.pending, 1)
+            self.assertEqual(self.sent, [])
+        finally:
+            client.close()
+            release.set()
+            self.agent.stop()
+            thread.join(5)
+
+        self.assertEqual(
+            [export['traceId'] for export in self.sent], ['a', 'b', 'c', 'd'])
+        self.assertEqual(self.agent.forwarded, 4)
+
+    @patch('gaesd.agent.Agent.serve_forever')
+    def test_main(self, mock_serve_forever):
+        main(['--udp', '127.0.0.1:0', '--batch-size', '7'])
+        mock_serve_forever.assert_called_once_with()
+
+        self.assertRaises(
+            SystemExit, main, ['--udp', 'host:1', '--unix', '/tmp/x'])
+
+
+if __name__ == '__main__':  # pragma: no-cover
+    unittest.main()
@@ -2,9 +2,10 @@
 # -*- coding: latin-1 -*-
 
 import operator
+import threading
 import unittest
 import uuid
-from logging import getLogger
+from logging import NOTSET, getLogger
 
 from mock import Mock, patch
 from nose_parameterized import parameterized
@@ -12,6 +13,13 @@ from nose_parameterized import parameterized
 from gaesd import SDK, Span, Trace
 from gaesd.core.dispatchers.google_api_client_dispatcher import \
     GoogleApiClientDispatcher
+from gaesd.core.sampling import (
+    AlwaysOffSampler, AlwaysOnSampler, ParentBasedSampler,
+    RateLimitingSpanSampler,
+)
+from gaesd.core.span import NOOP_SPAN
+from gaesd.core.trace import NOOP_TRACE
+from gaesd.core.utils import ClassLogger
 from tests import PROJECT_ID
 
 
@@ -190,22 +198,20 @@ class TestSDKTestCase(unittest.TestCase):
     def test_clear(self):
         project_id = PROJECT_ID
         sdk = SDK.new(project_id=project_id, auto=False)
+        dispatcher = sdk.dispatcher
         self.assertEqual(len(sdk._context.traces), 0)
 
         sdk._context.traces.append(1)
-        sdk._context.enabler = 123
-        sdk._context.dispatcher = '123'
         sdk._context.loggers = {'a': 1}
         self.assertEqual(len(sdk._context.traces), 1)
         self.assertEqual(sdk._context.loggers, {'a': 1})
-        self.assertEqual(sdk._context.enabler, 123)
-        self.assertEqual(sdk._context.dispatcher, '123')
 
         sdk.clear()
         self.assertEqual(len(sdk._context.traces), 0)
-        self.assertFalse(sdk._context.enabler)
-        self.assertIsNone(sdk._context.dispatcher)
         self.assertEqual(sdk._context.loggers, {'a': 1})
+        # The dispatcher and enabler belong to the sdk instance:
+        self.assertIs(sdk.dispatcher, dispatcher)
+        self.assertTrue(sdk.is_enabled)
 
     def test_clear_all_set(self):
         project_id = PROJECT_ID
@@ -213,19 +219,13 @@ class TestSDKTestCase(unittest.TestCase):
         self.assertEqual(len(sdk._context.traces), 0)
 
         sdk._context.traces.append(1)
-        sdk._context.enabler = 123
-        sdk._context.dispatcher = '123'
         sdk._context.loggers = {'a': 1}
 
         self.assertEqual(len(sdk._context.traces), 1)
         self.assertEqual(sdk._context.loggers, {'a': 1})
-        self.assertEqual(sdk._context.enabler, 123)
-        self.assertEqual(sdk._context.dispatcher, '123')
 
-        sdk.clear(traces=True, enabler=True, dispatcher=True, loggers=True)
+        sdk.clear(traces=True, loggers=True)
         self.assertEqual(len(sdk._context.traces), 0)
-        self.assertFalse(sdk._context.enabler)
-        self.assertIsNone(sdk._context.dispatcher)
         self.assertEqual(sdk._context.loggers, {})
 
     def test_clear_all_cleared(self):
@@ -234,20 +234,60 @@ class TestSDKTestCase(unittest.TestCase):
         self.assertEqual(len(sdk._context.traces), 0)
 
         sdk._context.traces.append(1)
-        sdk._context.enabler = 123
-        sdk._context.dispatcher = '123'
         sdk._context.loggers = {'a': 1}
 
         self.assertEqual(len(sdk._context.traces), 1)
         self.assertEqual(sdk._context.loggers, {'a': 1})
-        self.assertEqual(sdk._context.enabler, 123)
-        self.assertEqual(sdk._context.dispatcher, '123')
 
-        sdk.clear(traces=False, enabler=False, dispatcher=False, loggers=False)
+        sdk.clear(traces=False, loggers=False)
         self.assertEqual(len(sdk._context.traces), 1)
         self.assertEqual(sdk._context.loggers, {'a': 1})
-        self.assertEqual(sdk._context.enabler, 123)
-        self.assertEqual(sdk._context.dispatcher, '123')
+
+    def test_clear_positional(self):
+        sdk = SDK.new(project_id=PROJECT_ID, auto=False)
+        dispatcher = sdk.dispatcher
+        sdk._context.traces.append(1)
+        sdk._context.loggers = {'a': 1}
+
+        # traces, enabler, dispatcher, loggers:
+        sdk.clear(False, False, False, True)
+        self.assertEqual(len(sdk._context.traces), 1)
+        self.assertEqual(sdk._context.loggers, {})
+
+        sdk.clear(enabler=True, dispatcher=True)
+        self.assertEqual(len(sdk._context.traces), 0)
+        self.assertIs(sdk.dispatcher, dispatcher)
+        self.assertTrue(sdk.is_enabled)
+
+    def test_dispatcher_is_shared_by_threads(self):
+        sdk = SDK.new(project_id=PROJECT_ID, auto=False)
+        sdk.dispatcher._dispatch = Mock()
+        found = []
+
+        def target():
+            # Each thread has it's own traces, but the same dispatcher:
+            trace = sdk.trace()
+            found.append((sdk.dispatcher, sdk.is_enabled))
+            trace.end()
+            found.append(sdk.dispatcher.traces)
+            sdk()
+
+        threads = [threading.Thread(target=target) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+            thread.join()
+
+        (dispatcher_1, enabled_1), traces_1, (dispatcher_2, enabled_2), \
+            traces_2 = found
+        self.assertIs(dispatcher_1, sdk.dispatcher)
+        self.assertIs(dispatcher_2, sdk.dispatcher)
+        self.assertTrue(enabled_1 and enabled_2)
+        self.assertEqual(len(traces_1), 1)
+        self.assertEqual(len(traces_2), 1)
+        self.assertIsNot(traces_1[0], traces_2[0])
+        self.assertEqual(sdk.dispatcher._dispatch.call_count, 2)
+        self.assertEqual(sdk.traces, [])
+        self.assertEqual(sdk.dispatcher.traces, [])
 
     def test_default_dispatcher(self):
         project_id = PROJECT_ID
@@ -415,6 +455,74 @@ class TestSDKTestCase(unittest.TestCase):
         if isinstance(enabler, Mock):
             enabler.assert_called_once()
 
+    @patch('gaesd.sdk.time.time', return_value=1000.0)
+    def test_enabled_fast(self, mock_time):
+        enabler = Mock(return_value=True)
+        sdk = SDK.new(
+            project_id=PROJECT_ID, auto=False, enabler=enabler, enabler_ttl=5)
+        self.assertEqual(sdk.enabler_ttl, 5)
+
+        self.assertTrue(sdk.enabled_fast)
+        enabler.return_value = False
+        self.assertTrue(sdk.enabled_fast)
+        enabler.assert_called_once_with()
+
+        # Expired:
+        mock_time.return_value += 5
+        self.assertFalse(sdk.enabled_fast)
+        self.assertEqual(enabler.call_count, 2)
+
+        # `is_enabled` always evaluates the enabler:
+        enabler.return_value = True
+        self.assertTrue(sdk.is_enabled)
+        self.assertFalse(sdk.enabled_fast)
+
+        sdk.invalidate_enabler()
+        self.assertTrue(sdk.enabled_fast)
+
+    @parameterized.expand([
+        ('enabler', False),
+        ('enabler_ttl', 10),
+    ])
+    def test_enabled_fast_invalidated_by_setters(self, attr, value):
+        enabler = Mock(return_value=True)
+        sdk = SDK.new(
+            project_id=PROJECT_ID, auto=False, enabler=enabler, enabler_ttl=5)
+        self.assertTrue(sdk.enabled_fast)
+
+        enabler.return_value = False
+        setattr(sdk, attr, value)
+
+        self.assertFalse(sdk.enabled_fast)
+
+    def test_enabled_fast_no_ttl(self):
+        enabler = Mock(return_value=True)
+        sdk = SDK.new(project_id=PROJECT_ID, auto=False, enabler=enabler)
+
+        self.assertTrue(sdk.enabled_fast)
+        self.assertTrue(sdk.enabled_fast)
+        self.assertEqual(enabler.call_count, 2)
+
+        # Plain values are cached until the enabler changes:
+        sdk.enabler = False
+        self.assertFalse(sdk.enabled_fast)
+        self.assertEqual(sdk._enabled_cache, (False, None))
+
+    def test_enabled_fast_hot_paths(self):
+        enabler = Mock(return_value=True)
+        sdk = SDK.new(
+            project_id=PROJECT_ID, auto=False, enabler=enabler, enabler_ttl=60)
+        sdk.dispatcher._dispatch = Mock()
+
+        for _ in range(3):
+            with sdk.trace() as trace:
+                with trace.span(name='span'):
+                    pass
+            sdk()
+
+        enabler.assert_called_once_with()
+        self.assertEqual(sdk.dispatcher._dispatch.call_count, 3)
+
     def test_enabler_raise_ValueError(self):
         project_id = PROJECT_ID
         sdk = SDK.new(project_id=project_id, auto=False)
@@ -424,11 +532,108 @@ class TestSDKTestCase(unittest.TestCase):
 
         self.assertRaises(ValueError, func)
 
+    def test_disabled_trace(self):
+        sdk = SDK.new(project_id=PROJECT_ID, auto=True, enabler=False)
+        sdk.dispatcher._dispatch = Mock()
+
+        trace = sdk.trace()
+        with sdk.span(name='span') as span:
+            pass
+        sdk()
+
+        self.assertIs(trace, NOOP_TRACE)
+        self.assertIs(sdk.current_trace, NOOP_TRACE)
+        self.assertIs(span, NOOP_SPAN)
+        self.assertEqual(sdk.traces, [])
+        self.assertFalse(sdk.has_current_span)
+        sdk.dispatcher._dispatch.assert_not_called()
+
+    @parameterized.expand([
+        (True, None, True),
+        (True, True, True),
+        (True, False, False),
+        (False, None, False),
+    ])
+    def test_is_recording(self, enabler, sampled, e_recording):
+        sdk = SDK.new(
+            project_id=PROJECT_ID, auto=False, enabler=True,
+            sampler=ParentBasedSampler())
+        if sampled is not None:
+            sdk.trace(parent_sampled=sampled)
+        sdk.enabler = enabler
+
+        self.assertEqual(sdk.is_recording, e_recording)
+
+    def test_default_sampler(self):
+        sdk = SDK.new(project_id=PROJECT_ID, auto=False)
+
+        self.assertIsInstance(sdk.sampler, AlwaysOnSampler)
+        self.assertTrue(sdk.trace().sampled)
+
+    def test_sampler(self):
+        sampler = AlwaysOffSampler()
+        sdk = SDK.new(project_id=PROJECT_ID, auto=False, sampler=sampler)
+        self.assertIs(sdk.sampler, sampler)
+
+        def func():
+            sdk.sampler = None
+
+        self.assertRaises(ValueError, func)
+
+    def test_span_sampler(self):
+        span_sampler = RateLimitingSpanSampler(1)
+        sdk = SDK.new(
+            project_id=PROJECT_ID, auto=False, span_sampler=span_sampler)
+        self.assertIs(sdk.span_sampler, span_sampler)
+
+        sdk.span_sampler = None
+        self.assertIsNone(sdk.span_sampler)
+        self.assertIsNone(SDK.new(project_id=PROJECT_ID).span_sampler)
+
+    def test_unsampled_trace_is_not_dispatched(self):
+        sdk = SDK.new(
+            project_id=PROJECT_ID, auto=True, sampler=AlwaysOffSampler())
+        sdk.dispatcher._dispatch = Mock()
+
+        with sdk.span(name='span'):
+            pass
+        sdk()
+
+        sdk.dispatcher._dispatch.assert_not_called()
+        self.assertEqual(sdk.dispatcher.traces, [])
+
+    @parameterized.expand([
+        ('105445aa7843bc8bf206b12000100000/123;o=1',
+         '105445aa7843bc8bf206b12000100000', 123, True),
+        ('105445aa7843bc8bf206b12000100000/123;o=0',
+         '105445aa7843bc8bf206b12000100000', 123, False),
+        ('105445aa7843bc8bf206b12000100000/123',
+         '105445aa7843bc8bf206b12000100000', 123, 'root'),
+        ('NNNN/NNNN;xxxxx', None, None, 'root'),
+        (None, None, None, 'root'),
+    ])
+    def test_trace_from_header(
+        self, header, e_trace_id, e_root_span_id, e_sampled,
+    ):
+        root = Mock()
+        root.should_sample.return_value = 'root'
+        sdk = SDK.new(
+            project_id=PROJECT_ID, auto=False,
+            sampler=ParentBasedSampler(root))
+
+        trace = sdk.trace_from_header(header)
+
+        self.assertIs(sdk.current_trace, trace)
+        if e_trace_id is not None:
+            self.assertEqual(trace.trace_id, e_trace_id)
+        self.assertEqual(trace.root_span_id, e_root_span_id)
+        self.assertEqual(trace.sampled, e_sampled)
+
     def test_call_invokes_dispatcher(self):
         project_id = PROJECT_ID
         sdk = SDK.new(project_id=project_id, auto=False)
         mock_dispatcher = Mock()
-        sdk._context.dispatcher = mock_dispatcher
+        sdk._dispatcher = mock_dispatcher
         sdk()
         mock_dispatcher.assert_called_once_with()
 
@@ -498,6 +703,59 @@ class TestSDKTestCase(unittest.TestCase):
         self.assertRaises(TypeError, operator.setitem, sdk, 0, 123)
         self.assertRaises(TypeError, operator.setitem, sdk, 0, 'xyz')
 
+    def test_duplicate_trace_id_in_sequence(self):
+        sdk = SDK.new(project_id=PROJECT_ID, auto=False)
+        trace_a = sdk.trace(trace_id='a')
+        trace_b = sdk.trace(trace_id='b')
+
+        self.assertRaises(ValueError, sdk.insert, 0, Trace(sdk, 'a'))
+        self.assertRaises(
+            ValueError, operator.setitem, sdk, 1, Trace(sdk, 'a'))
+        # Replacing a trace by itself, or one with the same trace id:
+        sdk[0] = trace_a
+        trace_c = Trace(sdk, 'a')
+        sdk[0] = trace_c
+        self.assertEqual(sdk.traces, [trace_c, trace_b])
+
+        del sdk[:]
+        self.assertEqual(len(sdk), 0)
+        self.assertFalse(trace_b in sdk)
+        sdk.trace(trace_id='b')
+
+    def test_trace_id_changed(self):
+        sdk = SDK.new(project_id=PROJECT_ID, auto=False)
+        trace = sdk.trace(trace_id='a')
+
+        trace.trace_id = 'b'
+        self.assertTrue(trace in sdk)
+        sdk.trace(trace_id='a')
+        self.assertRaises(ValueError, sdk.trace, trace_id='b')
+
+        trace.set_default(trace_id='c')
+        self.assertTrue(trace in sdk)
+        sdk.trace(trace_id='b')
+
+    def test_clear_resets_trace_index(self):
+        sdk = SDK.new(project_id=PROJECT_ID, auto=False)
+        trace = sdk.trace(trace_id='a')
+
+        SDK.clear()
+
+        self.assertFalse(trace in sdk)
+        sdk.trace(trace_id='a')
+
+    def test_contains_span_moved_to_other_trace(self):
+        sdk = SDK.new(project_id=PROJECT_ID, auto=False)
+        trace = Trace(sdk, 'outside')
+        span = Span(trace=trace, span_id=1234)
+        self.assertFalse(span in sdk)
+
+        new_trace = sdk.trace()
+        new_trace + span
+        self.assertIs(span.trace, new_trace)
+        self.assertTrue(span in sdk)
+        self.assertFalse(span in trace)
+
     def test_contains_not_span_or_trace(self):
         project_id = PROJECT_ID
         sdk = SDK.new(project_id=project_id, auto=False)
@@ -556,9 +814,29 @@ class TestSDKTestCase(unittest.TestCase):
         for logger in SDK._context.loggers.values():
             self.assertNotEqual(logger.level, new_level)
 
+        self.addCleanup(self.reset_class_loggers)
         SDK.set_logging_level(level=new_level)
         for logger in SDK._context.loggers.values():
             self.assertEqual(logger.level, new_level)
+        # Shared by every Trace, Span and Dispatcher:
+        self.assertEqual(sdk_1.current_trace.logger.level, new_level)
+        self.assertEqual(sdk_1.dispatcher.logger.level, new_level)
+
+    def reset_class_loggers(self):
+        for logger_name in ClassLogger.names:
+            getLogger(logger_name).setLevel(NOTSET)
+
+    def test_set_logging_level_through_hierarchy(self):
+        sdk = SDK.new(project_id=PROJECT_ID, auto=False)
+        self.addCleanup(getLogger('SDK').setLevel, NOTSET)
+        child = getLogger('SDK.child')
+
+        SDK.set_logging_level(level=55, prefix='SDK')
+
+        self.assertEqual(sdk.logger.getEffectiveLevel(), 55)
+        # Loggers below it inherit the level:
+        self.assertEqual(child.level, NOTSET)
+        self.assertEqual(child.getEffectiveLevel(), 55)
 
     def test_set_logging_level_with_prefix(self):
         project_id_1 = 'my-project-1'